@@ -0,0 +1,227 @@
+import bisect
+from datetime import date, datetime, timedelta
+from statistics import median
+from typing import Any, Dict, List, Optional, Tuple
+
+import data_io
+import medication_log
+from aggregates import week_key
+from catalogs import get_medications
+
+# Adherence compares the doses taken of each scheduled medication with its
+# doses_per_day. Medications marked "prn" (taken as needed) have no schedule:
+# their doses are counted but never make a day more or less adherent. Extra
+# doses of a scheduled medication don't make up for missed ones, so a day's
+# taken count is capped at what was prescribed.
+#
+# Doses come from the medication event log, or from the day's record (the
+# count entered in the daily prompts) where no events were logged; where both
+# exist the larger count is used, as they usually describe the same doses.
+# Only tracked days, those with a record holding medications or with logged
+# doses, count towards adherence.
+LATENCY_LOOKBACK_HOURS = 4
+LATENCY_WINDOW_HOURS = 8
+LATENCY_MIN_DROP = 1
+EPOCH = datetime(1970, 1, 1)
+
+
+def _parse_date(date_str: str) -> date:
+    return datetime.strptime(date_str, "%Y-%m-%d").date()
+
+
+def schedule(medications: Optional[List[Dict[str, Any]]] = None) -> Tuple[Dict[str, int], List[str]]:
+    """Split the medication catalog into scheduled and as-needed medications.
+
+    Returns:
+        ({name: doses_per_day} of scheduled medications, names of PRN medications)
+    """
+    medications = (get_medications() or []) if medications is None else medications
+    scheduled = {med["name"]: med["doses_per_day"] for med in medications if not med.get("prn")}
+    prn = [med["name"] for med in medications if med.get("prn")]
+    return scheduled, prn
+
+
+def doses_by_day(start: Optional[str] = None, end: Optional[str] = None) -> Dict[str, Dict[str, int]]:
+    """Doses taken per tracked day and medication, from the event log and the daily records.
+
+    Returns:
+        Dictionary of date -> {medication: doses}, sorted by date
+    """
+    days: Dict[str, Dict[str, int]] = {}
+    for date_str, data in data_io.query_range(start, end, fields=["medications"]):
+        days[date_str] = {name: doses for name, doses in (data.get("medications") or {}).items()
+                          if isinstance(doses, int) and not isinstance(doses, bool)}
+    for date_str, logged in medication_log.daily_doses(start, end).items():
+        day = days.setdefault(date_str, {})
+        for name, doses in logged.items():
+            day[name] = max(day.get(name, 0), doses)
+    return dict(sorted(days.items()))
+
+
+def _day_summary(taken: Dict[str, int], scheduled: Dict[str, int], prn: List[str]) -> Dict[str, Any]:
+    medications = {name: {"taken": min(taken.get(name, 0), prescribed), "prescribed": prescribed}
+                   for name, prescribed in scheduled.items()}
+    return _totals(1, medications, {name: taken[name] for name in prn if taken.get(name)})
+
+
+def _totals(days: int, medications: Dict[str, Dict[str, int]], prn: Dict[str, int]) -> Dict[str, Any]:
+    taken = sum(med["taken"] for med in medications.values())
+    prescribed = sum(med["prescribed"] for med in medications.values())
+    for med in medications.values():
+        med["rate"] = med["taken"] / med["prescribed"] if med["prescribed"] else None
+    return {"days": days, "taken": taken, "prescribed": prescribed,
+            "rate": taken / prescribed if prescribed else None, "medications": medications, "prn": prn}
+
+
+def merge(summaries: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine day (or week) adherence summaries into one over all their days."""
+    medications: Dict[str, Dict[str, int]] = {}
+    prn: Dict[str, int] = {}
+    for summary in summaries:
+        for name, med in summary["medications"].items():
+            target = medications.setdefault(name, {"taken": 0, "prescribed": 0})
+            target["taken"] += med["taken"]
+            target["prescribed"] += med["prescribed"]
+        for name, doses in summary["prn"].items():
+            prn[name] = prn.get(name, 0) + doses
+    return _totals(sum(summary["days"] for summary in summaries), medications, prn)
+
+
+def daily_adherence(start: Optional[str] = None, end: Optional[str] = None,
+                    medications: Optional[List[Dict[str, Any]]] = None) -> List[Tuple[str, Dict[str, Any]]]:
+    """Adherence of every tracked day in [start, end].
+
+    Args:
+        start: First date (YYYY-MM-DD), or None for the earliest tracked day
+        end: Last date (YYYY-MM-DD), or None for the latest tracked day
+        medications: Medication catalog, defaults to the saved one
+
+    Returns:
+        List of (date, summary) tuples in date order. A summary holds the
+        days, taken, prescribed and rate totals, per scheduled medication
+        taken/prescribed/rate, and PRN doses per as-needed medication; rate is
+        None when nothing is scheduled.
+    """
+    scheduled, prn = schedule(medications)
+    return [(date_str, _day_summary(taken, scheduled, prn)) for date_str, taken in doses_by_day(start, end).items()]
+
+
+def weekly_adherence(start: Optional[str] = None, end: Optional[str] = None,
+                     medications: Optional[List[Dict[str, Any]]] = None) -> List[Tuple[str, Dict[str, Any]]]:
+    """Adherence per ISO week (YYYY-Www) over the tracked days in [start, end]."""
+    weeks: Dict[str, List[Dict[str, Any]]] = {}
+    for date_str, summary in daily_adherence(start, end, medications):
+        weeks.setdefault(week_key(date_str), []).append(summary)
+    return [(week, merge(summaries)) for week, summaries in weeks.items()]
+
+
+def range_adherence(start: Optional[str] = None, end: Optional[str] = None,
+                    medications: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """Adherence over all the tracked days in [start, end]."""
+    return merge([summary for _, summary in daily_adherence(start, end, medications)])
+
+
+def rolling_adherence(start: str, end: str, window: int = 7,
+                      medications: Optional[List[Dict[str, Any]]] = None) -> List[Tuple[str, Optional[float]]]:
+    """Adherence over the trailing ``window`` days, for every day in [start, end].
+
+    Days before ``start`` are included in the first windows. Untracked days
+    count for neither taken nor prescribed doses.
+
+    Returns:
+        List of (date, rate) tuples for each calendar day; rate is None when
+        no scheduled dose falls in the window
+    """
+    if window < 1:
+        raise ValueError("The window must be at least one day")
+    first, last = _parse_date(start), _parse_date(end)
+    lead = (first - timedelta(days=window - 1)).strftime("%Y-%m-%d")
+    by_day = dict(daily_adherence(lead, end, medications))
+    # Running totals of (taken, prescribed) up to and including each day
+    running: List[Tuple[int, int]] = [(0, 0)]
+    days = []
+    current = _parse_date(lead)
+    while current <= last:
+        date_str = current.strftime("%Y-%m-%d")
+        summary = by_day.get(date_str)
+        taken, prescribed = running[-1]
+        if summary is not None:
+            taken, prescribed = taken + summary["taken"], prescribed + summary["prescribed"]
+        running.append((taken, prescribed))
+        days.append(date_str)
+        current += timedelta(days=1)
+    results = []
+    for i in range(window - 1, len(days)):
+        taken = running[i + 1][0] - running[i + 1 - window][0]
+        prescribed = running[i + 1][1] - running[i + 1 - window][1]
+        results.append((days[i], taken / prescribed if prescribed else None))
+    return results
+
+
+def _minutes(time: str) -> float:
+    """Minutes since the epoch of a naive local event time, for subtracting."""
+    return (datetime.fromisoformat(time) - EPOCH).total_seconds() / 60
+
+
+def _shift(time: str, hours: float) -> str:
+    return (datetime.fromisoformat(time) + timedelta(hours=hours)).strftime(medication_log.TIME_FORMAT)
+
+
+def dose_pain_latency(start: Optional[str] = None, end: Optional[str] = None, medication: Optional[str] = None,
+                      lookback_hours: float = LATENCY_LOOKBACK_HOURS, window_hours: float = LATENCY_WINDOW_HOURS,
+                      min_drop: int = LATENCY_MIN_DROP) -> Dict[str, Dict[str, Any]]:
+    """How long after a dose pain readings show relief, per medication.
+
+    A dose's baseline is the last pain reading in the ``lookback_hours``
+    before it; its latency is the time to the first reading in the
+    ``window_hours`` after it that is at least ``min_drop`` below the
+    baseline. Only logged pain readings are used (daily pain levels have no
+    time of day), so latencies are only as fine as the readings.
+
+    Args:
+        start: First date or time of the doses, or None
+        end: Last date or time of the doses, inclusive, or None
+        medication: Only this medication
+
+    Returns:
+        Dictionary of medication -> {doses, with_baseline, relieved,
+        relief_rate, median_minutes, mean_minutes}; doses without a baseline
+        count towards doses only
+    """
+    doses = [(time, name) for time, _, kind, name, _ in medication_log.event_rows(start, end)
+             if kind == "dose" and (medication is None or name == medication)]
+    if not doses:
+        return {}
+    # Pain readings from the first baseline to the last window
+    readings = [(_minutes(time), level) for time, _, kind, _, level in
+                medication_log.event_rows(_shift(doses[0][0], -lookback_hours), _shift(doses[-1][0], window_hours))
+                if kind == "pain"]
+    reading_minutes = [minutes for minutes, _ in readings]
+    lookback, window = lookback_hours * 60, window_hours * 60
+
+    stats: Dict[str, Dict[str, Any]] = {}
+    for time, name in doses:
+        entry = stats.setdefault(name, {"doses": 0, "with_baseline": 0, "minutes": []})
+        entry["doses"] += 1
+        dose_minutes = _minutes(time)
+        i = bisect.bisect_right(reading_minutes, dose_minutes)
+        if i == 0 or reading_minutes[i - 1] < dose_minutes - lookback:
+            continue
+        entry["with_baseline"] += 1
+        baseline = readings[i - 1][1]
+        while i < len(readings) and reading_minutes[i] <= dose_minutes + window:
+            if readings[i][1] <= baseline - min_drop:
+                entry["minutes"].append(reading_minutes[i] - dose_minutes)
+                break
+            i += 1
+
+    results = {}
+    for name, entry in sorted(stats.items()):
+        minutes = entry["minutes"]
+        results[name] = {
+            "doses": entry["doses"], "with_baseline": entry["with_baseline"], "relieved": len(minutes),
+            "relief_rate": len(minutes) / entry["with_baseline"] if entry["with_baseline"] else None,
+            "median_minutes": median(minutes) if minutes else None,
+            "mean_minutes": sum(minutes) / len(minutes) if minutes else None,
+        }
+    return results
@@ -0,0 +1,353 @@
+import json
+import os
+import threading
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import data_io
+from catalogs import get_time_activities
+
+# Materialized rollups of the daily data, kept in data/.index/aggregates.json:
+#
+#   day:   YYYY-MM-DD -> rollup of that day
+#   week:  YYYY-Www   -> rollup of the ISO week's day rollups
+#   month: YYYY-MM    -> rollup of the month's day rollups
+#
+# A rollup holds sums, counts and extremes rather than averages so buckets can
+# be merged. Saving a day recomputes only that day, its week and its month.
+# Rollups are only checked against the stored dates when the date index
+# changed since the last check, and only saved under the write lock; _lock
+# guards the in-memory state between threads and is always taken after the
+# write lock.
+AGGREGATES_FILE = "aggregates.json"
+TOTAL_UNITS = ("minutes", "hours", "kilometers")
+LEVELS = ("day", "week", "month")
+
+_state: Optional[Dict[str, Any]] = None
+_lock = threading.Lock()
+
+
+def _parse_date(date_str: str) -> date:
+    return datetime.strptime(date_str, "%Y-%m-%d").date()
+
+
+def week_key(date_str: str) -> str:
+    year, week, _ = _parse_date(date_str).isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def month_key(date_str: str) -> str:
+    return date_str[:7]
+
+
+def _number(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return float(value)
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def empty_rollup() -> Dict[str, Any]:
+    return {"days": 0, "pain_sum": 0.0, "pain_count": 0, "pain_min": None, "pain_max": None,
+            "meditation_days": 0, "activities": {}, "doses_taken": {}, "doses_expected": {},
+            "exercise_volume": {}}
+
+
+def day_rollup(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Rollup for a single day's tracking data."""
+    rollup = empty_rollup()
+    rollup["days"] = 1
+    pain = _number(data.get("pain"))
+    if pain is not None:
+        rollup.update(pain_sum=pain, pain_count=1, pain_min=pain, pain_max=pain)
+    if data.get("meditation"):
+        rollup["meditation_days"] = 1
+
+    activity_types = get_time_activities() or {}
+    for activity, value in (data.get("time_based") or {}).items():
+        amount = _number(value)
+        if amount is None:
+            continue
+        unit = activity_types.get(activity, {}).get("type", "")
+        rollup["activities"][activity] = {"unit": unit, "sum": amount, "count": 1}
+
+    taken = data.get("medications") or {}
+    schedule = data.get(data_io.SCHEDULE_FIELD)
+    if not isinstance(schedule, dict):
+        # Saved before the schedule was stored with the day
+        schedule = data_io.medication_schedule()
+    rollup["doses_expected"].update(schedule)
+    for med_name, doses in taken.items():
+        amount = _number(doses)
+        if amount is not None:
+            rollup["doses_taken"][med_name] = amount
+
+    for ex_name, ex_data in (data.get("exercises") or {}).items():
+        rollup["exercise_volume"][ex_name] = (ex_data.get("repeats") or 0) * (ex_data.get("sets") or 0)
+    return rollup
+
+
+def merge_rollups(rollups: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine rollups of disjoint buckets into one."""
+    merged = empty_rollup()
+    for rollup in rollups:
+        merged["days"] += rollup["days"]
+        merged["pain_sum"] += rollup["pain_sum"]
+        merged["pain_count"] += rollup["pain_count"]
+        for key, pick in (("pain_min", min), ("pain_max", max)):
+            if rollup[key] is not None:
+                merged[key] = rollup[key] if merged[key] is None else pick(merged[key], rollup[key])
+        merged["meditation_days"] += rollup["meditation_days"]
+        for activity, stats in rollup["activities"].items():
+            target = merged["activities"].setdefault(activity, {"unit": stats["unit"], "sum": 0.0, "count": 0})
+            target["sum"] += stats["sum"]
+            target["count"] += stats["count"]
+        for key in ("doses_taken", "doses_expected", "exercise_volume"):
+            for name, amount in rollup[key].items():
+                merged[key][name] = merged[key].get(name, 0) + amount
+    return merged
+
+
+def _path() -> str:
+    return os.path.join(data_io.index_dir(), AGGREGATES_FILE)
+
+
+def _save(state: Dict[str, Any]) -> None:
+    """Write the rollups. Called with the write lock and _lock held."""
+    filepath = _path()
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    tmp_path = data_io.temp_path(filepath)
+    with open(tmp_path, "w") as f:
+        saved = {level: state[level] for level in LEVELS}
+        saved["index_version"] = state["index_version"]
+        f.write(json.dumps(saved, separators=(",", ":")))
+    os.replace(tmp_path, filepath)
+    state["signature"] = _signature()
+
+
+def _signature() -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(_path())
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _recompute_buckets(state: Dict[str, Any], dates: Iterable[str]) -> None:
+    """Rebuild the week and month rollups containing any of ``dates`` from
+    their day rollups."""
+    days = state["day"]
+    for level, key_of in (("week", week_key), ("month", month_key)):
+        for key in {key_of(d) for d in dates}:
+            members = [days[d] for d in _bucket_dates(level, key) if d in days]
+            if members:
+                state[level][key] = merge_rollups(members)
+            else:
+                state[level].pop(key, None)
+
+
+def _bucket_dates(level: str, key: str) -> List[str]:
+    if level == "week":
+        first = datetime.strptime(key + "-1", "%G-W%V-%u").date()
+        count = 7
+    else:
+        first = datetime.strptime(key + "-01", "%Y-%m-%d").date()
+        count = ((first + timedelta(days=32)).replace(day=1) - first).days
+    return [(first + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(count)]
+
+
+def _get_state() -> Dict[str, Any]:
+    """Return the rollups as last saved. Called with _lock held."""
+    global _state
+    # Reload when another process rewrote the file since this one last saw it
+    if _state is None or _state["path"] != _path() or _state["signature"] != _signature():
+        state = {"path": _path(), "signature": _signature()}
+        saved = None
+        if os.path.exists(_path()):
+            try:
+                saved = data_io.load_json(_path())
+            except json.JSONDecodeError:
+                saved = None
+        for level in LEVELS:
+            state[level] = (saved or {}).get(level, {})
+        state["index_version"] = (saved or {}).get("index_version")
+        _state = state
+    return _state
+
+
+def _reconcile(state: Dict[str, Any], version: Optional[List[int]]) -> None:
+    """Add the rollups of stored days that have none and drop those of removed
+    days. Called with the write lock and _lock held."""
+    stored = data_io.list_dates()
+    days = state["day"]
+    if len(stored) != len(days) or any(d not in days for d in stored):
+        stored_set = set(stored)
+        removed = [d for d in days if d not in stored_set]
+        for date_str in removed:
+            del days[date_str]
+        missing = [d for d in stored if d not in days]
+        # Load the missing days in as few range scans as possible
+        for date_str, data in _records_for(missing):
+            days[date_str] = day_rollup(data)
+        _recompute_buckets(state, removed + missing)
+    state["index_version"] = version
+    _save(state)
+
+
+def _reconciled_state() -> Dict[str, Any]:
+    """Return the rollups, reconciled with the stored days if the date index changed."""
+    version = data_io.daily_index_version()
+    with _lock:
+        state = _get_state()
+        if state["index_version"] == version:
+            return state
+    with data_io.write_lock(), _lock:
+        state = _get_state()
+        version = data_io.daily_index_version()
+        if state["index_version"] != version:
+            _reconcile(state, version)
+        return state
+
+
+def _records_for(dates: List[str]) -> Iterable[Tuple[str, Dict[str, Any]]]:
+    if not dates:
+        return []
+    wanted = set(dates)
+    return ((d, data) for d, data in data_io.query_range(dates[0], dates[-1], with_schedule=True)
+            if d in wanted)
+
+
+def on_day_saved(date_str: str, data: Dict[str, Any], defer: bool = False) -> None:
+    """Update the day's rollup and re-merge only its week and month.
+
+    Called with the write lock held.
+
+    Args:
+        date_str: Date that was saved
+        data: The day's saved data
+        defer: Only update the day rollup in memory; the caller passes the
+            saved dates to ``recompute`` afterwards (used by bulk imports)
+    """
+    with data_io.write_lock(), _lock:
+        state = _get_state()
+        state["day"][date_str] = day_rollup(data)
+        if defer:
+            return
+        _recompute_buckets(state, [date_str])
+        _save(state)
+
+
+def recompute(dates: Iterable[str]) -> None:
+    """Re-merge and save the week and month rollups of days updated with ``defer``."""
+    with data_io.write_lock(), _lock:
+        state = _get_state()
+        _recompute_buckets(state, set(dates))
+        _reconcile(state, data_io.daily_index_version())
+
+
+def rebuild() -> None:
+    """Discard the stored rollups and recompute them from the daily data."""
+    global _state
+    with data_io.write_lock(), _lock:
+        _state = None
+        if os.path.exists(_path()):
+            os.remove(_path())
+        _reconcile(_get_state(), data_io.daily_index_version())
+
+
+def summarize(rollup: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn a rollup into report-ready figures.
+
+    Returns:
+        Dictionary with pain min/max/mean, meditation days, per-activity totals
+        and means, totals per unit (minutes/hours/kilometers), per-medication
+        adherence (doses taken / doses_per_day over the days tracked) and
+        exercise volume
+    """
+    totals = {unit: 0.0 for unit in TOTAL_UNITS}
+    activities = {}
+    for activity, stats in sorted(rollup["activities"].items()):
+        activities[activity] = {"unit": stats["unit"], "total": stats["sum"],
+                                "mean": stats["sum"] / stats["count"] if stats["count"] else None}
+        if stats["unit"] in totals:
+            totals[stats["unit"]] += stats["sum"]
+
+    adherence = {}
+    for med_name in sorted(set(rollup["doses_expected"]) | set(rollup["doses_taken"])):
+        taken = rollup["doses_taken"].get(med_name, 0)
+        expected = rollup["doses_expected"].get(med_name, 0)
+        adherence[med_name] = {"taken": taken, "expected": expected,
+                               "rate": taken / expected if expected else None}
+
+    return {
+        "days": rollup["days"],
+        "pain": {"min": rollup["pain_min"], "max": rollup["pain_max"],
+                 "mean": rollup["pain_sum"] / rollup["pain_count"] if rollup["pain_count"] else None},
+        "meditation_days": rollup["meditation_days"],
+        "activities": activities,
+        "totals": totals,
+        "adherence": adherence,
+        "exercise_volume": dict(sorted(rollup["exercise_volume"].items())),
+    }
+
+
+def rollups(level: str, start: Optional[str] = None, end: Optional[str] = None) -> List[Tuple[str, Dict[str, Any]]]:
+    """Summaries for every stored day, week or month bucket.
+
+    Args:
+        level: "day", "week" or "month"
+        start: Only buckets containing dates on or after this date
+        end: Only buckets containing dates on or before this date
+
+    Returns:
+        List of (bucket key, summary) tuples in order
+    """
+    if level not in LEVELS:
+        raise ValueError(f"Unknown level '{level}', expected one of: {', '.join(LEVELS)}")
+    state = _reconciled_state()
+    key_of = {"day": lambda d: d, "week": week_key, "month": month_key}[level]
+    lo = key_of(start) if start else None
+    hi = key_of(end) if end else None
+    with _lock:
+        return [
+            (key, summarize(rollup)) for key, rollup in sorted(state[level].items())
+            if (lo is None or key >= lo) and (hi is None or key <= hi)
+        ]
+
+
+def summarize_range(start: str, end: str) -> Dict[str, Any]:
+    """Summary for an arbitrary date range."""
+    return summarize(range_rollup(start, end))
+
+
+def range_rollup(start: str, end: str) -> Dict[str, Any]:
+    """Rollup of an arbitrary date range.
+
+    Whole months inside the range come from their month rollup; only the
+    partial months at either end are merged from day rollups.
+    """
+    state = _reconciled_state()
+    with _lock:
+        first, last = _parse_date(start), _parse_date(end)
+        parts = []
+        current = first
+        while current <= last:
+            month_start = current.replace(day=1)
+            month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+            key = month_start.strftime("%Y-%m")
+            if current == month_start and month_end <= last:
+                if key in state["month"]:
+                    parts.append(state["month"][key])
+                current = month_end + timedelta(days=1)
+                continue
+            stop = min(month_end, last)
+            while current <= stop:
+                rollup = state["day"].get(current.strftime("%Y-%m-%d"))
+                if rollup is not None:
+                    parts.append(rollup)
+                current += timedelta(days=1)
+        return merge_rollups(parts)
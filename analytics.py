@@ -0,0 +1,178 @@
+"""Vectorized analysis of the tracking history with pandas.
+
+The history is loaded into a date-indexed frame with one row per calendar
+day (days without an entry are NaN) and one column per measure:
+
+    pain, meditation            daily values (meditation as 0/1)
+    time:<activity>             time_based value in the activity's own unit
+    med:<medication>            doses taken
+    exercise:<exercise>         volume, repeats x sets
+"""
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from columnar import MappedHistory
+from data_io import open_history_view, query_range
+from models import DailyEntry
+
+TIME_PREFIX = "time:"
+MEDICATION_PREFIX = "med:"
+EXERCISE_PREFIX = "exercise:"
+
+
+def _flatten_day(entry: DailyEntry) -> Dict[str, Any]:
+    row: Dict[str, Any] = {"pain": entry.pain, "meditation": entry.meditation}
+    for activity, value in entry.time_based.items():
+        row[TIME_PREFIX + activity] = value
+    for med in entry.medications:
+        row[MEDICATION_PREFIX + med.name] = med.doses
+    for ex in entry.exercises:
+        row[EXERCISE_PREFIX + ex.name] = ex.volume
+    return row
+
+
+def frame_from_records(records: Iterable[Tuple[str, Dict[str, Any]]]) -> pd.DataFrame:
+    """Build the analysis frame from (date_str, data) records.
+
+    Args:
+        records: Daily records, e.g. from ``data_io.query_range``; the data
+            may be a stored record or a DailyEntry
+
+    Returns:
+        Float DataFrame indexed by every calendar day between the first and last record
+    """
+    dates = []
+    rows = []
+    for date_str, data in records:
+        dates.append(date_str)
+        rows.append(_flatten_day(data if isinstance(data, DailyEntry) else DailyEntry.from_dict(date_str, data)))
+    if not rows:
+        return pd.DataFrame(dtype=float)
+
+    frame = pd.DataFrame.from_records(rows, index=pd.to_datetime(dates))
+    # DailyEntry has already coerced every value to a number (or None -> NaN)
+    frame = frame.astype(float)
+    frame = frame[~frame.index.duplicated(keep="last")].sort_index()
+    return frame.asfreq("D")
+
+
+def frame_from_history(history: MappedHistory, start: Optional[str] = None,
+                       end: Optional[str] = None) -> pd.DataFrame:
+    """Build the analysis frame column by column from a memory-mapped store.
+
+    Only the cells of the selected dates are read, straight into float
+    arrays; no per-day records are built.
+
+    Args:
+        history: View from ``data_io.open_history_view``
+        start: First date (YYYY-MM-DD), or None for the earliest stored date
+        end: Last date (YYYY-MM-DD), or None for the latest stored date
+    """
+    dates = list(history.dates(start, end))
+    if not dates:
+        return pd.DataFrame(dtype=float)
+
+    def column(path) -> np.ndarray:
+        return np.frombuffer(history.numeric(path, start, end), dtype=float)
+
+    paths = history.columns(["pain", "meditation", "time_based", "medications", "exercises"])
+    columns: Dict[str, np.ndarray] = {}
+    for name in ("pain", "meditation"):
+        if (name,) in paths:
+            columns[name] = column((name,))
+    for section, prefix in (("time_based", TIME_PREFIX), ("medications", MEDICATION_PREFIX)):
+        for path in paths:
+            if path[0] == section and len(path) == 2:
+                columns[prefix + path[1]] = column(path)
+    for path in paths:
+        if path[0] == "exercises" and len(path) == 3 and path[2] == "repeats":
+            repeats, sets = column(path), column(path[:2] + ("sets",))
+            # Like ExerciseLog.volume: a missing count is 0 unless the exercise is missing altogether
+            volume = np.nan_to_num(repeats) * np.nan_to_num(sets)
+            volume[np.isnan(repeats) & np.isnan(sets)] = np.nan
+            columns[EXERCISE_PREFIX + path[1]] = volume
+    frame = pd.DataFrame(columns, index=pd.to_datetime(dates), dtype=float)
+    return frame.asfreq("D")
+
+
+def load_frame(start: Optional[str] = None, end: Optional[str] = None) -> pd.DataFrame:
+    """Load the stored history between start and end (YYYY-MM-DD, inclusive)."""
+    history = open_history_view()
+    if history is not None:
+        with history:
+            return frame_from_history(history, start, end)
+    return frame_from_records(query_range(start, end))
+
+
+def _columns(frame: pd.DataFrame, columns: Optional[Sequence[str]]) -> List[str]:
+    return list(frame.columns) if columns is None else [c for c in columns if c in frame.columns]
+
+
+def rolling_means(frame: pd.DataFrame, window: int = 7, columns: Optional[Sequence[str]] = None,
+                  min_periods: int = 1) -> pd.DataFrame:
+    """Rolling mean over a window of calendar days; missing days are skipped."""
+    return frame[_columns(frame, columns)].rolling(window, min_periods=min_periods).mean()
+
+
+def week_over_week(frame: pd.DataFrame, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """Weekly (Monday-start) means and their change from the previous week.
+
+    Returns:
+        DataFrame indexed by week start with ``<column>`` (mean), ``<column> delta``
+        and ``<column> pct`` for each column
+    """
+    selected = _columns(frame, columns)
+    weekly = frame[selected].resample("W-MON", label="left", closed="left").mean()
+    delta = weekly.diff().add_suffix(" delta")
+    pct = (weekly.pct_change(fill_method=None) * 100).replace([np.inf, -np.inf], np.nan).add_suffix(" pct")
+    return pd.concat([weekly, delta, pct], axis=1)
+
+
+def lagged_correlations(frame: pd.DataFrame, target: str = "pain", lags: Sequence[int] = (0, 1, 2),
+                        columns: Optional[Sequence[str]] = None, min_periods: int = 5) -> pd.DataFrame:
+    """Correlate each column with the target ``lag`` days later.
+
+    A lag of 1 pairs e.g. Guitar minutes on one day with pain on the next.
+
+    Args:
+        frame: Analysis frame from ``load_frame``
+        target: Column the others are correlated against
+        lags: Day offsets to test
+        columns: Columns to correlate, defaults to every other column
+        min_periods: Minimum number of paired days for a correlation to be reported
+
+    Returns:
+        DataFrame with one row per column and one "lag N" column per lag (Pearson r)
+    """
+    selected = [c for c in _columns(frame, columns) if c != target]
+    values = frame[selected]
+    result = {}
+    for lag in lags:
+        shifted = frame[target].shift(-lag)
+        paired = values.notna() & shifted.notna().to_numpy()[:, None]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Constant columns (e.g. an exercise always done 10x1) have no variance
+            corr = values.corrwith(shifted)
+        corr[paired.sum() < min_periods] = np.nan
+        result[f"lag {lag}"] = corr
+    return pd.DataFrame(result)
+
+
+def main() -> None:
+    frame = load_frame()
+    if frame.empty:
+        print("No daily data found.")
+        return
+    with pd.option_context("display.width", 160, "display.max_columns", 20):
+        print("\n7-day rolling pain:")
+        print(rolling_means(frame, 7, ["pain"]).tail(14).round(2).to_string())
+        print("\nWeek over week:")
+        print(week_over_week(frame, ["pain", "meditation"]).round(2).to_string())
+        print("\nCorrelation with pain (lag in days):")
+        print(lagged_correlations(frame, min_periods=3).round(2).dropna(how="all").to_string())
+
+
+if __name__ == "__main__":
+    main()
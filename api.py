@@ -0,0 +1,348 @@
+"""Local HTTP/JSON API over the tracker data.
+
+Run with ``python tracker.py serve``. Endpoints:
+
+    GET  /api/health
+    GET  /api/days?from=&to=&fields=pain,mood    records in a date range
+    GET  /api/days/<date>                        one record; its version is the ETag
+    PUT  /api/days/<date>                        save a record (If-Match: version for compare-and-swap,
+                                                 or * to require an existing record)
+    GET  /api/diary?from=&to=                    diary entries in a date range
+    GET  /api/diary/search?q=&from=&to=&stem=1&limit=
+    GET  /api/diary/<date>
+    PUT  /api/diary/<date>                       {"entry": "..."} (If-Match as above)
+    GET  /api/catalogs                           exercises, time activities and medications
+    GET  /api/rollups/<day|week|month>?from=&to=
+    GET  /api/reports/summary?from=&to=          report page (HTML) for a run of days
+
+Requests are handled by a fixed pool of worker threads. Reads run
+concurrently; saves serialize on the data directory's write lock. The process keeps
+the catalog, index and rollup caches of the modules it calls warm between
+requests, and caches range query results and rendered reports until the
+data they were built from changes on disk (a save by this server or by any
+other process), so repeated reads don't touch the day files.
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import columnar
+import data_io
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 8
+# Range query results and rendered reports kept per process
+RESPONSE_CACHE_SIZE = 256
+# Longest range a summary report may cover
+MAX_REPORT_DAYS = 92
+
+class ResponseCache:
+    """LRU cache of computed responses, each stored with the data signature it was built from."""
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[Hashable, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key: Hashable, signature: Hashable, build: Callable[[], Any]) -> Any:
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and cached[0] == signature:
+                self._entries.move_to_end(key)
+                return cached[1]
+        value = build()
+        with self._lock:
+            self._entries[key] = (signature, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+
+def _stat_signature(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def days_signature() -> Tuple:
+    """Changes whenever a daily record is saved, by any process.
+
+    Every save rewrites the daily index file (a new inode each time, as it is
+    replaced atomically), and the catalogs decide how records are reported.
+    """
+    from catalogs import EXERCISES_FILE, MEDICATIONS_FILE, TIME_ACTIVITIES_FILE, catalog_path
+    return (_stat_signature(os.path.join(data_io.index_dir(), data_io.DAILY_INDEX_FILE)),
+            _stat_signature(data_io.DATA_DIR),
+            _stat_signature(os.path.join(data_io.history_dir(), columnar.DATES_FILE)),
+            tuple(_stat_signature(catalog_path(f)) for f in (EXERCISES_FILE, TIME_ACTIVITIES_FILE, MEDICATIONS_FILE)))
+
+
+def diary_signature() -> Tuple:
+    """Changes whenever a diary entry is saved or the diary log is compacted."""
+    import diary
+    return diary.log_position()
+
+
+def _check_date(value: Optional[str], name: str) -> Optional[str]:
+    if value is None or value == "":
+        return None
+    try:
+        datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise ValueError(f"{name} must be a date (YYYY-MM-DD), got '{value}'")
+    return value
+
+
+class PreconditionFailed(Exception):
+    """An If-Match precondition can't hold, e.g. ``If-Match: *`` on a missing record."""
+
+
+def _expected_version(header: Optional[str], current: Callable[[], int]) -> Optional[int]:
+    """Version an If-Match header makes a save conditional on, or None.
+
+    ``*`` matches whatever version the record is at, as long as it exists
+    (``current`` returns 0 when it doesn't); call with the write lock held so
+    that version still holds when the record is saved.
+    """
+    if header is None:
+        return None
+    value = header.strip()
+    if value == "*":
+        version = current()
+        if version == 0:
+            raise PreconditionFailed("If-Match: * requires an existing record")
+        return version
+    # Versions are exact, so a weak ETag (W/"3") names the same version
+    if value.startswith("W/"):
+        value = value[2:]
+    try:
+        return int(value.strip('"'))
+    except ValueError:
+        raise ValueError(f"If-Match must be a record version, got '{header}'")
+
+
+def _dates_between(start: str, end: str) -> List[str]:
+    first = datetime.strptime(start, "%Y-%m-%d").date()
+    last = datetime.strptime(end, "%Y-%m-%d").date()
+    return [(first + timedelta(days=i)).strftime("%Y-%m-%d") for i in range((last - first).days + 1)]
+
+
+def create_app():
+    """Build the Flask application."""
+    from flask import Flask, Response, jsonify, request
+
+    import aggregates
+    import diary
+    import diary_search
+    from batch_entry import validate_entries
+    from catalogs import get_exercises, get_medications, get_time_activities
+    from validation import parse_int
+
+    app = Flask(__name__)
+    cache = ResponseCache()
+
+    def error(status: int, message: str, **details):
+        response = jsonify({"error": message, **details})
+        response.status_code = status
+        return response
+
+    @app.errorhandler(ValueError)
+    def bad_request(e):
+        return error(400, str(e))
+
+    @app.errorhandler(PreconditionFailed)
+    def precondition_failed(e):
+        return error(412, str(e))
+
+    @app.errorhandler(data_io.ConflictError)
+    def conflict(e):
+        return error(409, str(e), expected_version=e.expected, current_version=e.actual)
+
+    @app.errorhandler(404)
+    def not_found(e):
+        return error(404, "Not found")
+
+    def json_body() -> Dict[str, Any]:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            raise ValueError("Expected a JSON object")
+        return data
+
+    def range_args() -> Tuple[Optional[str], Optional[str]]:
+        return _check_date(request.args.get("from"), "from"), _check_date(request.args.get("to"), "to")
+
+    @app.get("/api/health")
+    def health():
+        return jsonify({"status": "ok", "backend": data_io.STORAGE_BACKEND})
+
+    @app.get("/api/days")
+    def days():
+        start, end = range_args()
+        fields = request.args.get("fields")
+        fields = tuple(f.strip() for f in fields.split(",") if f.strip()) if fields else None
+
+        def build():
+            records = data_io.query_range(start, end, fields)
+            return json.dumps([{"date": date_str, "data": data} for date_str, data in records])
+
+        body = cache.get_or_build(("days", start, end, fields), days_signature(), build)
+        return Response(body, mimetype="application/json")
+
+    @app.get("/api/days/<date_str>")
+    def get_day(date_str):
+        _check_date(date_str, "date")
+        data = data_io.load_daily_data(date_str)
+        if data is None:
+            return error(404, f"No data for {date_str}")
+        version = data_io.record_version(data)
+        data.pop(data_io.SCHEDULE_FIELD, None)
+        response = jsonify({"date": date_str, "version": version, "data": data})
+        response.set_etag(str(version))
+        return response
+
+    @app.put("/api/days/<date_str>")
+    def put_day(date_str):
+        _check_date(date_str, "date")
+        data = json_body()
+        data.pop(data_io.VERSION_FIELD, None)
+        data.pop(data_io.SCHEDULE_FIELD, None)
+        valid, problems = validate_entries([(date_str, data, None)])
+        if problems:
+            return error(400, "Invalid record", problems=problems)
+        with data_io.write_lock():
+            expected = _expected_version(request.headers.get("If-Match"),
+                                         lambda: data_io.record_version(data_io.load_daily_data(date_str)))
+            version = data_io.save_daily_data(date_str, valid[0][1], expected_version=expected)
+        response = jsonify({"date": date_str, "version": version})
+        response.set_etag(str(version))
+        return response
+
+    @app.get("/api/diary")
+    def diary_entries():
+        start, end = range_args()
+
+        def build():
+            entries = diary.load_diary_entries()
+            return json.dumps({d: entry for d, entry in entries.items()
+                               if (start is None or d >= start) and (end is None or d <= end)})
+
+        body = cache.get_or_build(("diary", start, end), diary_signature(), build)
+        return Response(body, mimetype="application/json")
+
+    @app.get("/api/diary/search")
+    def diary_search_results():
+        start, end = range_args()
+        query = request.args.get("q", "").strip()
+        if not query:
+            raise ValueError("q is required")
+        use_stem = request.args.get("stem", "").lower() in ("1", "true", "yes")
+        try:
+            limit = parse_int(request.args.get("limit", 20), minimum=1)
+        except ValueError as e:
+            raise ValueError(f"limit: {e}")
+        results = diary_search.search(query, start=start, end=end, use_stem=use_stem, limit=limit)
+        return jsonify(results)
+
+    @app.get("/api/diary/<date_str>")
+    def get_diary(date_str):
+        _check_date(date_str, "date")
+        entry, version = diary.get_diary_record(date_str)
+        if entry is None:
+            return error(404, f"No diary entry for {date_str}")
+        response = jsonify({"date": date_str, "version": version, "entry": entry})
+        response.set_etag(str(version))
+        return response
+
+    @app.put("/api/diary/<date_str>")
+    def put_diary(date_str):
+        _check_date(date_str, "date")
+        entry = json_body().get("entry")
+        if not isinstance(entry, str):
+            raise ValueError("entry must be text")
+        with data_io.write_lock():
+            expected = _expected_version(request.headers.get("If-Match"),
+                                         lambda: diary.get_diary_record(date_str)[1])
+            version = diary.save_diary_entry(date_str, entry, expected_version=expected)
+        response = jsonify({"date": date_str, "version": version})
+        response.set_etag(str(version))
+        return response
+
+    @app.get("/api/catalogs")
+    def catalogs():
+        return jsonify({"exercises": get_exercises(), "time_activities": get_time_activities(),
+                        "medications": get_medications() or []})
+
+    @app.get("/api/rollups/<level>")
+    def rollups(level):
+        if level not in ("day", "week", "month"):
+            return error(404, f"Unknown rollup level '{level}'")
+        start, end = range_args()
+        return jsonify(dict(aggregates.rollups(level, start=start, end=end)))
+
+    @app.get("/api/reports/summary")
+    def summary_report():
+        start, end = range_args()
+        end = end or date.today().strftime("%Y-%m-%d")
+        start = start or (datetime.strptime(end, "%Y-%m-%d") - timedelta(days=6)).strftime("%Y-%m-%d")
+        dates = _dates_between(start, end)
+        if not dates or len(dates) > MAX_REPORT_DAYS:
+            raise ValueError(f"A report covers 1 to {MAX_REPORT_DAYS} days")
+
+        def build():
+            from visualize import render_report
+            period_data = dict(data_io.query_range(start, end))
+            entries = {d: diary.get_diary_entry(d) for d in dates}
+            return render_report(f"Summary {start} to {end}", f"Summary ({start} to {end})",
+                                 dates, period_data, entries)
+
+        html = cache.get_or_build(("report", start, end), (days_signature(), diary_signature()), build)
+        return Response(html, mimetype="text/html")
+
+    return app
+
+
+def make_server(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, workers: int = DEFAULT_WORKERS):
+    """A WSGI server for the API whose requests run on a fixed pool of worker threads."""
+    from werkzeug.serving import BaseWSGIServer
+
+    class PooledWSGIServer(BaseWSGIServer):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api")
+
+        def process_request(self, request, client_address):
+            self.pool.submit(self._process_request, request, client_address)
+
+        def _process_request(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+        def server_close(self):
+            super().server_close()
+            self.pool.shutdown(wait=True)
+
+    return PooledWSGIServer(host, port, create_app())
+
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, workers: int = DEFAULT_WORKERS) -> None:
+    """Serve the API until interrupted."""
+    server = make_server(host, port, workers)
+    print(f"Serving the tracker API on http://{host}:{server.server_port}/api/ with {workers} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
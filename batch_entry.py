@@ -0,0 +1,159 @@
+"""Non-interactive data entry.
+
+Builds daily records from command-line style values ("Guitar=20",
+"Grip Rotation (500g)=10x2") or JSON objects, validates them with the same
+rules as the interactive prompts (see validation.py) and saves a whole
+batch in one transaction.
+"""
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import data_io
+from catalogs import get_exercises, get_medications, get_time_activities
+from diary import save_diary_entry
+from validation import validate_record
+
+# JSON input field holding the day's diary entry; it is saved to the diary,
+# not the daily record
+DIARY_FIELD = "diary"
+
+Entry = Tuple[str, Dict[str, Any], Optional[str]]
+
+
+def parse_assignments(items: Iterable[str]) -> Dict[str, str]:
+    """Split "name=value" strings into a dictionary.
+
+    Raises:
+        ValueError: An item has no "="
+    """
+    values = {}
+    for item in items:
+        name, sep, value = item.partition("=")
+        if not sep or not name.strip():
+            raise ValueError(f"Expected name=value, got '{item}'")
+        values[name.strip()] = value.strip()
+    return values
+
+
+def _resolve_names(values: Dict[str, Any], known: Iterable[str]) -> Dict[str, Any]:
+    """Match names to their catalog spelling, ignoring case."""
+    by_lower = {name.lower(): name for name in known}
+    return {by_lower.get(name.lower(), name): value for name, value in values.items()}
+
+
+def _exercise_value(value: Any) -> Any:
+    # "10x2" is accepted as well as the prompt's "10 2"
+    if isinstance(value, str):
+        return value.lower().replace("x", " ")
+    return value
+
+
+def build_record(pain: Any = None, mood: Optional[str] = None, meditation: Any = None,
+                 time_based: Optional[Dict[str, Any]] = None, exercises: Optional[Dict[str, Any]] = None,
+                 medications: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Collect the given values into a (not yet validated) daily record.
+
+    Names are matched to the catalogs case-insensitively; fields left as
+    None are not included.
+    """
+    record: Dict[str, Any] = {}
+    if pain is not None:
+        record["pain"] = pain
+    if mood is not None:
+        record["mood"] = mood
+    if meditation is not None:
+        record["meditation"] = meditation
+    if time_based:
+        record["time_based"] = _resolve_names(time_based, get_time_activities())
+    if exercises:
+        record["exercises"] = {name: _exercise_value(value)
+                               for name, value in _resolve_names(exercises, get_exercises()).items()}
+    if medications:
+        record["medications"] = _resolve_names(medications, [med["name"] for med in get_medications() or []])
+    return record
+
+
+def read_jsonl_entries(lines: Iterable[str], source: str = "<stdin>") -> Iterator[Entry]:
+    """Parse JSON Lines input, one {"date": ..., ...} object per line.
+
+    A "diary" field is taken out of the record and saved as the diary entry.
+    """
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{source}:{line_number}: {e}")
+        if not isinstance(data, dict) or "date" not in data:
+            raise ValueError(f"{source}:{line_number}: expected an object with a \"date\" field")
+        date_str = data.pop("date")
+        diary = data.pop(DIARY_FIELD, None)
+        record = build_record(data.pop("pain", None), data.pop("mood", None), data.pop("meditation", None),
+                              data.pop("time_based", None), data.pop("exercises", None),
+                              data.pop("medications", None))
+        record.update(data)
+        yield date_str, record, diary
+
+
+def validate_entries(entries: Iterable[Entry]) -> Tuple[List[Entry], List[str]]:
+    """Validate a batch before anything is written.
+
+    Returns:
+        (normalized entries, problems as "date: message" strings)
+    """
+    exercises, time_activities = get_exercises(), get_time_activities()
+    medications = get_medications() or []
+    valid: List[Entry] = []
+    problems: List[str] = []
+    for date_str, data, diary in entries:
+        try:
+            datetime.strptime(str(date_str), "%Y-%m-%d")
+        except ValueError:
+            problems.append(f"{date_str}: invalid date, expected YYYY-MM-DD")
+            continue
+        record, record_problems = validate_record(data, exercises, time_activities, medications)
+        problems.extend(f"{date_str}: {problem}" for problem in record_problems)
+        if diary is not None and not isinstance(diary, str):
+            problems.append(f"{date_str}: diary entry must be text")
+        if not record_problems:
+            valid.append((date_str, record, diary))
+    return valid, problems
+
+
+def log_entries(entries: Iterable[Entry], replace: bool = False) -> List[Tuple[str, int]]:
+    """Validate and save a batch of entries as one all-or-nothing write.
+
+    Args:
+        entries: (date_str, record, diary entry or None) tuples
+        replace: Replace stored days instead of merging the new values into them
+
+    Returns:
+        (date_str, new version) for each saved day
+
+    Raises:
+        ValueError: Some entry is invalid; nothing was saved
+    """
+    valid, problems = validate_entries(entries)
+    if problems:
+        raise ValueError("\n".join(problems))
+
+    saved = []
+    # One transaction: a single journal commit (and fsync) for the whole batch,
+    # and the date index and rollups updated once as a bulk write when it commits
+    with data_io.transaction():
+        pending: Dict[str, Dict[str, Any]] = {}
+        for date_str, record, diary in valid:
+            if not replace:
+                if date_str not in pending:
+                    existing = data_io.load_daily_data(date_str) or {}
+                    existing.pop(data_io.VERSION_FIELD, None)
+                    pending[date_str] = existing
+                record = data_io.merge_record(pending[date_str], record)
+            pending[date_str] = record
+            if diary is not None:
+                save_diary_entry(date_str, diary)
+        for date_str, record in pending.items():
+            saved.append((date_str, data_io.save_daily_data(date_str, record)))
+    return saved
@@ -0,0 +1,58 @@
+"""Overhead of the instrumentation layer (instrumentation.py), off and on.
+
+Times a bare span() and count() call in each state, then a year-long
+query_range over a deterministic synthetic history (one load_json per day,
+each counting files, bytes and parses) with tracing off and on.
+
+Usage:
+    python benchmarks/bench_instrumentation.py [--days 365] [--seed 1] [--json]
+"""
+import json
+import os
+import sys
+import timeit
+
+from synthetic import bench_parser, scratch_store, synthetic_records
+
+
+def per_call_ns(statement, number: int) -> float:
+    return min(timeit.repeat(statement, number=number, repeat=5)) / number * 1e9
+
+
+def main(argv=None) -> int:
+    args = bench_parser(__doc__, days=365).parse_args(argv)
+
+    os.environ.pop("TRACKER_TRACE", None)
+    with scratch_store("tracker-instrumentation-", records=synthetic_records(args.days, args.seed)):
+        import data_io
+        import instrumentation
+        from instrumentation import count, span
+
+        def with_span():
+            with span("bench"):
+                pass
+
+        def query():
+            data_io.query_range()
+
+        results = {}
+        for state in ("off", "on"):
+            if state == "on":
+                instrumentation.enable()
+            results[f"span_{state}_ns"] = round(per_call_ns(with_span, 200000), 1)
+            results[f"count_{state}_ns"] = round(per_call_ns(lambda: count("bench"), 200000), 1)
+            results[f"query_range_{state}_ms"] = round(per_call_ns(query, 5) / 1e6, 3)
+        instrumentation.disable()
+
+    if args.json:
+        print(json.dumps({"days": args.days, **results}, indent=2))
+    else:
+        print(f"span() + with        off {results['span_off_ns']:8.1f} ns   on {results['span_on_ns']:8.1f} ns")
+        print(f"count()              off {results['count_off_ns']:8.1f} ns   on {results['count_on_ns']:8.1f} ns")
+        print(f"query_range {args.days} days off {results['query_range_off_ms']:8.3f} ms   "
+              f"on {results['query_range_on_ms']:8.3f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""Memory and time of the memory-mapped read path against loading whole ranges.
+
+Writes a deterministic synthetic history into a scratch columnar store, then
+compares reading it all with query_range (every record on the heap at once)
+to streaming it with iter_records over the mapped store, and building the
+analysis frame from records to building it from mapped columns. Peak traced
+memory of the streaming steps should stay flat as --days grows.
+
+Usage:
+    python benchmarks/bench_mapped_history.py [--days 10000] [--seed 1] [--json]
+"""
+import json
+import sys
+import time
+import tracemalloc
+
+from synthetic import bench_parser, scratch_store, synthetic_records
+
+
+def measure(label: str, step) -> dict:
+    tracemalloc.start()
+    started = time.perf_counter()
+    step()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<36} {elapsed:8.3f}s  peak {peak / 1024:>9.0f} KB")
+    return {"step": label, "seconds": round(elapsed, 4), "peak_memory_kb": round(peak / 1024)}
+
+
+def main(argv=None) -> int:
+    args = bench_parser(__doc__, days=10000).parse_args(argv)
+
+    with scratch_store("tracker-mapped-", backend="columnar"):
+        import columnar
+        import data_io
+
+        for date_str, data in synthetic_records(args.days, args.seed):
+            columnar.append_day(date_str, data, data_io.history_dir(), sync=False)
+        last_week = list(data_io.list_dates())[-7:]
+
+        def count(records) -> int:
+            return sum(1 for _ in records)
+
+        results = [
+            measure("query_range: whole history", lambda: len(data_io.query_range())),
+            measure("iter_records: whole history", lambda: count(data_io.iter_records())),
+            measure("iter_records: last week", lambda: count(data_io.iter_records(last_week[0], last_week[-1]))),
+        ]
+        try:
+            import analytics
+        except ImportError:
+            print("pandas not installed; skipping the analysis frame steps")
+        else:
+            results.append(measure("analysis frame from records",
+                                   lambda: analytics.frame_from_records(data_io.query_range())))
+            results.append(measure("analysis frame from mapped columns", analytics.load_frame))
+
+    if args.json:
+        print(json.dumps({"days": args.days, "results": results}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
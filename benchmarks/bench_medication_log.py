@@ -0,0 +1,132 @@
+"""Medication event log and adherence queries over years of multi-dose history.
+
+Logs a deterministic synthetic history into a scratch profile: every
+scheduled dose of the catalog's medications (some skipped), as-needed doses
+on bad days and a few timestamped pain readings a day. Then times logging a
+dose, loading the events in a new process (from the log alone and from the
+persisted index) and the adherence engine's queries over the whole history.
+
+Usage:
+    python benchmarks/bench_medication_log.py [--years 5] [--readings 4] [--repeat 5] [--seed 1] [--json]
+"""
+import contextlib
+import json
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import synthetic
+
+MEDICATIONS = [
+    {"name": "Pregabalin (150mg)", "doses_per_day": 2},
+    {"name": "Palexia SR (100mg)", "doses_per_day": 2},
+    {"name": "Amitriptyline (10mg)", "doses_per_day": 1},
+    {"name": "Palexia IR (50mg)", "doses_per_day": 3, "prn": True},
+]
+
+
+def generate_events(years: int, readings: int, seed: int, end: date):
+    """Yield ("dose", time, medication) and ("pain", time, level) in time order per day."""
+    rng = random.Random(seed)
+    first = end - timedelta(days=years * 365 - 1)
+    pain = 4.0
+    for i in range(years * 365):
+        day = datetime.combine(first + timedelta(days=i), datetime.min.time())
+        pain = 4 + 0.6 * (pain - 4) + rng.gauss(0, 1.2)
+        events = []
+        for med in MEDICATIONS:
+            if med.get("prn"):
+                taken = rng.randint(1, med["doses_per_day"]) if pain > 5 else 0
+                hours = sorted(rng.uniform(8, 22) for _ in range(taken))
+            else:
+                hours = [8 + 12 * k / med["doses_per_day"] for k in range(med["doses_per_day"])
+                         if rng.random() < 0.9]
+            events += [("dose", day + timedelta(hours=h, minutes=rng.randint(0, 30)), med["name"]) for h in hours]
+        for k in range(readings):
+            level = max(0, min(10, round(pain + rng.gauss(0, 1))))
+            events.append(("pain", day + timedelta(hours=7 + 15 * k / max(1, readings - 1)), level))
+        for kind, when, value in sorted(events, key=lambda e: e[1]):
+            yield kind, when.strftime("%Y-%m-%dT%H:%M:%S"), value
+
+
+def timed(step, repeat: int) -> float:
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        step()
+        runs.append(time.perf_counter() - started)
+    return min(runs) * 1000
+
+
+def main(argv=None) -> int:
+    parser = synthetic.bench_parser(__doc__)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--readings", type=int, default=4, help="Pain readings per day")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    end = date(2025, 12, 31)
+    first_day = end - timedelta(days=args.years * 365 - 1)
+    with synthetic.scratch_store("tracker-medlog-"):
+        import adherence
+        import data_io
+        import medication_log
+        from catalogs import MEDICATIONS_FILE, catalog_path, save_catalog
+
+        save_catalog(catalog_path(MEDICATIONS_FILE), {"medications": MEDICATIONS})
+        catalogs = dict(synthetic.load_catalogs(), medications=MEDICATIONS)
+        started = time.perf_counter()
+        events = 0
+        with data_io.batch_writes():
+            for kind, when, value in generate_events(args.years, args.readings, args.seed, end):
+                if kind == "dose":
+                    medication_log.record_dose(value, when)
+                else:
+                    medication_log.record_pain(value, when)
+                events += 1
+        # Daily records too, as entered in the prompts, for the days before the log was started
+        import transfer
+        with contextlib.redirect_stdout(open(os.devnull, "w")):
+            transfer.import_records(synthetic.synthetic_records(args.years * 365, args.seed, first_day, catalogs))
+        generated = time.perf_counter() - started
+
+        def new_process():
+            medication_log._state = None
+            return medication_log.daily_doses()
+
+        first = first_day.strftime("%Y-%m-%d")
+        last = end.strftime("%Y-%m-%d")
+        year_start = (end - timedelta(days=364)).strftime("%Y-%m-%d")
+        results = {}
+        log_path = os.path.join(data_io.DATA_DIR, medication_log.EVENT_LOG_FILE)
+        index_path = os.path.join(data_io.index_dir(), medication_log.EVENT_INDEX_FILE)
+        if os.path.exists(index_path):
+            os.remove(index_path)
+        results["load_from_log_ms"] = timed(new_process, args.repeat)
+        medication_log.flush_index()
+        results["load_from_index_ms"] = timed(new_process, args.repeat)
+        results["record_dose_ms"] = timed(lambda: medication_log.record_dose("Palexia IR (50mg)"), args.repeat)
+        results["daily_adherence_year_ms"] = timed(lambda: adherence.daily_adherence(year_start, last), args.repeat)
+        results["weekly_adherence_all_ms"] = timed(lambda: adherence.weekly_adherence(first, last), args.repeat)
+        results["rolling_30_days_all_ms"] = timed(lambda: adherence.rolling_adherence(first, last, 30), args.repeat)
+        results["latency_all_ms"] = timed(lambda: adherence.dose_pain_latency(first, last), args.repeat)
+        results["latency_month_ms"] = timed(
+            lambda: adherence.dose_pain_latency(last[:8] + "01", last, "Palexia IR (50mg)"), args.repeat)
+        total = adherence.range_adherence(first, last)["rate"]
+        log_bytes = os.path.getsize(log_path)
+
+    results = {name: round(ms, 3) for name, ms in results.items()}
+    if args.json:
+        print(json.dumps({"years": args.years, "events": events, "log_bytes": log_bytes, **results}, indent=2))
+    else:
+        print(f"Logged {events} events ({log_bytes} bytes) over {args.years} year(s) in {generated:.1f}s; "
+              f"overall adherence {total:.0%}")
+        for name, ms in results.items():
+            print(f"{name[:-3]:<28} {ms:10.3f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
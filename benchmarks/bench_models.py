@@ -0,0 +1,104 @@
+"""Memory and access cost of DailyEntry (models.py) against the plain record dicts.
+
+Builds a deterministic synthetic history, holds it once as the dicts
+json.loads produces (what query_range returns) and once as DailyEntry
+objects, and reports the traced memory of each, the one-off conversion time
+and the time of a report-style pass reading pain, meditation, one activity,
+one medication and every exercise's volume from each day.
+
+Usage:
+    python benchmarks/bench_models.py [--days 36500] [--seed 1] [--json]
+"""
+import gc
+import json
+import sys
+import time
+import tracemalloc
+
+from synthetic import bench_parser, synthetic_records
+
+
+def traced(build):
+    """Run ``build`` and return (its result, bytes it left allocated)."""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def timed(step) -> float:
+    started = time.perf_counter()
+    step()
+    return time.perf_counter() - started
+
+
+def dict_pass(records, activity: str, medication: str) -> float:
+    total = 0.0
+    for _, data in records:
+        pain = data.get("pain")
+        if isinstance(pain, str):
+            pain = int(pain) if pain.isdigit() else None
+        total += (pain or 0) + (1 if data.get("meditation") else 0)
+        total += data.get("time_based", {}).get(activity) or 0
+        total += data.get("medications", {}).get(medication, 0)
+        for ex_data in (data.get("exercises") or {}).values():
+            total += (ex_data.get("repeats") or 0) * (ex_data.get("sets") or 0)
+    return total
+
+
+def entry_pass(entries, activity: str, medication: str) -> float:
+    total = 0.0
+    for entry in entries:
+        total += (entry.pain or 0) + (1 if entry.meditation else 0)
+        total += entry.time_based.get(activity) or 0
+        total += entry.doses(medication)
+        for ex in entry.exercises:
+            total += ex.volume
+    return total
+
+
+def main(argv=None) -> int:
+    args = bench_parser(__doc__, days=36500).parse_args(argv)
+
+    from models import DailyEntry
+
+    texts = []
+    for date_str, data in synthetic_records(args.days, args.seed):
+        texts.append((date_str, json.dumps(data)))
+
+    records, dict_bytes = traced(lambda: [(date_str, json.loads(text)) for date_str, text in texts])
+
+    def convert():
+        return [DailyEntry.from_dict(date_str, data) for date_str, data in records]
+
+    entries, entry_bytes = traced(convert)
+    convert_seconds = timed(convert)
+    activity, medication = "Guitar", "Pregabalin (150mg)"
+    if dict_pass(records, activity, medication) != entry_pass(entries, activity, medication):
+        print("Dict and entry passes disagree")
+        return 1
+
+    results = {
+        "days": args.days,
+        "dict_bytes_per_day": round(dict_bytes / args.days),
+        "entry_bytes_per_day": round(entry_bytes / args.days),
+        "convert_seconds": round(convert_seconds, 4),
+        "dict_pass_seconds": round(min(timed(lambda: dict_pass(records, activity, medication)) for _ in range(3)), 4),
+        "entry_pass_seconds": round(min(timed(lambda: entry_pass(entries, activity, medication)) for _ in range(3)), 4),
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{args.days} days")
+        print(f"dicts       {results['dict_bytes_per_day']:>6} bytes/day   pass {results['dict_pass_seconds']:.4f}s")
+        print(f"DailyEntry  {results['entry_bytes_per_day']:>6} bytes/day   pass {results['entry_pass_seconds']:.4f}s"
+              f"   (converted once in {results['convert_seconds']:.4f}s)")
+        print(f"{results['dict_bytes_per_day'] / results['entry_bytes_per_day']:.1f}x less memory")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""Streaming every day file serially against the pooled loader of iter_records.
+
+Writes a deterministic synthetic history as per-day files into a scratch
+store, then times a full pass of visualize.load_all_data serially, on a
+thread pool and on a process pool for each --workers count. With --cold the
+page cache is dropped before every pass (Linux, needs root), which is the
+case the pool is for: reads then wait on the disk and overlap across
+workers. On a warm cache the work is JSON parsing, which only processes
+spread across cores.
+
+Usage:
+    python benchmarks/bench_parallel_load.py [--days 10000] [--backend json|compact]
+        [--workers 2 4 8] [--cold] [--seed 1] [--json]
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+
+from synthetic import bench_parser, scratch_store, synthetic_records
+
+
+def drop_caches() -> bool:
+    try:
+        subprocess.run(["sync"], check=True)
+        with open("/proc/sys/vm/drop_caches", "w") as f:
+            f.write("3\n")
+        return True
+    except OSError:
+        return False
+
+
+def main(argv=None) -> int:
+    parser = bench_parser(__doc__, days=10000, backends=["json", "compact"])
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4, 8])
+    parser.add_argument("--cold", action="store_true", help="Drop the page cache before every pass")
+    args = parser.parse_args(argv)
+
+    with scratch_store("tracker-load-", args.backend, synthetic_records(args.days, args.seed)):
+        import data_io
+        import visualize
+
+        data_io.list_dates()  # Keep the index load out of the timings
+        if args.cold and not drop_caches():
+            print("Can't drop the page cache (needs root on Linux); timing warm passes")
+            args.cold = False
+
+        expected = None
+        results = []
+        runs = [("serial", 1, False)]
+        for workers in args.workers:
+            runs += [(f"threads x{workers}", workers, False), (f"processes x{workers}", workers, True)]
+        for label, workers, processes in runs:
+            if args.cold:
+                drop_caches()
+            started = time.perf_counter()
+            records = list(visualize.load_all_data(workers=workers, processes=processes))
+            elapsed = time.perf_counter() - started
+            if expected is None:
+                expected = records
+            elif records != expected:
+                print(f"{label}: records differ from the serial pass")
+                return 1
+            results.append({"loader": label, "workers": workers, "processes": processes,
+                            "seconds": round(elapsed, 4), "days_per_second": round(len(records) / elapsed)})
+            print(f"{label:<16} {elapsed:8.3f}s {results[-1]['days_per_second']:>9} days/s")
+
+    if args.json:
+        print(json.dumps({"days": args.days, "backend": args.backend, "cold": args.cold,
+                          "cpus": os.cpu_count(), "results": results}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
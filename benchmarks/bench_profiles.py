@@ -0,0 +1,91 @@
+"""Cross-profile queries run one profile after another against in parallel.
+
+Creates --profiles profiles in a scratch directory, each holding a
+deterministic synthetic history of --days days, then times a full scan of
+every profile's history (reading each day and totalling its pain and
+activity minutes) and a rollup summary of every profile, first in this
+process one profile at a time and then with profiles.map_profiles.
+
+Usage:
+    python benchmarks/bench_profiles.py [--profiles 8] [--days 3650] [--backend json|columnar|compact]
+        [--workers N] [--seed 1] [--json]
+"""
+import json
+import os
+import sys
+import time
+
+from synthetic import BACKENDS, bench_parser, scratch_store, synthetic_records
+
+
+def scan_history() -> dict:
+    """Read every day of the active profile and total a few fields."""
+    import data_io
+    days = pain = minutes = 0
+    for _, data in data_io.iter_records():
+        days += 1
+        pain += data.get("pain") or 0
+        minutes += sum(value or 0 for value in (data.get("time_based") or {}).values())
+    return {"days": days, "pain": pain, "minutes": minutes}
+
+
+def summarize_history() -> dict:
+    import aggregates
+    return aggregates.summarize_range("1900-01-01", "2100-12-31")
+
+
+def sequential(profile_names, func) -> dict:
+    import data_io
+    results = {}
+    for profile in profile_names:
+        data_io.use_profile(profile)
+        results[profile] = func()
+    data_io.use_profile(data_io.DEFAULT_PROFILE)
+    return results
+
+
+def timed(label: str, step):
+    started = time.perf_counter()
+    result = step()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<40} {elapsed:8.3f}s")
+    return result, round(elapsed, 4)
+
+
+def main(argv=None) -> int:
+    parser = bench_parser(__doc__, days=3650, backends=BACKENDS)
+    parser.add_argument("--profiles", type=int, default=8)
+    parser.add_argument("--workers", type=int, help="Worker processes, defaults to one per profile up to the CPU count")
+    args = parser.parse_args(argv)
+
+    with scratch_store("tracker-profiles-", args.backend):
+        import data_io
+        import profiles
+        import transfer
+
+        names = [f"patient-{i:02d}" for i in range(args.profiles)]
+        for i, profile in enumerate(names):
+            profiles.create_profile(profile)
+            data_io.use_profile(profile)
+            transfer.import_records(synthetic_records(args.days, args.seed + i))
+        data_io.use_profile(data_io.DEFAULT_PROFILE)
+
+        results = {}
+        for label, func in (("scan", scan_history), ("summary", summarize_history)):
+            one_by_one, seq_seconds = timed(f"{label}: one profile at a time", lambda: sequential(names, func))
+            parallel, par_seconds = timed(f"{label}: map_profiles",
+                                          lambda: profiles.map_profiles(func, profiles=names, workers=args.workers))
+            if one_by_one != parallel:
+                print(f"{label}: sequential and parallel results differ")
+                return 1
+            results[label] = {"sequential_seconds": seq_seconds, "parallel_seconds": par_seconds,
+                              "speedup": round(seq_seconds / par_seconds, 2)}
+
+    if args.json:
+        print(json.dumps({"profiles": args.profiles, "days": args.days, "backend": args.backend,
+                          "cpus": os.cpu_count(), "results": results}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""Range queries with the parsed-record cache off, cold, from its sidecar file and warm.
+
+Writes a deterministic synthetic history as per-day files into a scratch
+store, then times a year-long query_range and the last week's query (what
+the weekly report loads) in four states: with the cache turned off, on an
+empty cache (every file parsed and cached), after the cache was saved and
+dropped from memory (a new run reading the sidecar file) and with the cache
+already in memory. Also reports how many files each state read.
+
+Usage:
+    python benchmarks/bench_record_cache.py [--days 365] [--backend json|compact]
+        [--repeat 20] [--seed 1] [--json]
+"""
+import json
+import os
+import sys
+import time
+
+from synthetic import bench_parser, scratch_store, synthetic_records
+
+
+def main(argv=None) -> int:
+    parser = bench_parser(__doc__, days=365, backends=["json", "compact"])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    os.environ.pop("TRACKER_TRACE", None)
+    with scratch_store("tracker-record-cache-", args.backend, synthetic_records(args.days, args.seed)):
+        import data_io
+        import instrumentation
+        import record_cache
+
+        dates = data_io.list_dates()
+        week = dates[-7:]
+        enabled_bytes = record_cache.MAX_BYTES
+
+        def prepare(state: str) -> None:
+            record_cache.MAX_BYTES = 0 if state == "off" else enabled_bytes
+            if state == "cold":
+                record_cache.clear()
+            elif state == "sidecar":
+                record_cache.forget()
+
+        results = {}
+        expected = data_io.query_range()
+        for state in ("off", "cold", "sidecar", "warm"):
+            for label, (start, end) in (("year", (dates[0], dates[-1])), ("week", (week[0], week[-1]))):
+                runs = []
+                for _ in range(args.repeat):
+                    prepare(state)
+                    instrumentation.reset()
+                    instrumentation.enable()
+                    started = time.perf_counter()
+                    records = data_io.query_range(start, end)
+                    runs.append(time.perf_counter() - started)
+                    instrumentation.disable()
+                if label == "year" and records != expected:
+                    print(f"{state}: records differ from the uncached query")
+                    return 1
+                counters = instrumentation.snapshot()["counters"]
+                results[f"{label}_{state}"] = {"ms": round(min(runs) * 1000, 3),
+                                               "files_read": counters.get("files.read", 0)}
+        cache_bytes = os.path.getsize(os.path.join(data_io.index_dir(), record_cache.RECORD_CACHE_FILE))
+
+    if args.json:
+        print(json.dumps({"days": args.days, "backend": args.backend, "sidecar_bytes": cache_bytes,
+                          "results": results}, indent=2))
+    else:
+        for name, result in results.items():
+            print(f"query_range {name:<14} {result['ms']:9.3f} ms   {result['files_read']:>5} files read")
+        print(f"sidecar file {cache_bytes} bytes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""Size and parse time of compact records (record_codec.py) against day JSON files.
+
+Encodes a deterministic synthetic history both ways, checks every compact
+record decodes back to the normalized JSON record, and reports bytes per day
+and decode/encode time per day. "json" is the text save_json writes
+(indent=2), so it compares like for like with the json backend's files.
+
+Usage:
+    python benchmarks/bench_record_codec.py [--days 3650] [--seed 1] [--json]
+"""
+import json
+import sys
+import time
+
+from synthetic import bench_parser, scratch_store, synthetic_records
+
+
+def per_day(step, items) -> float:
+    """Best of three passes, in microseconds per item."""
+    best = None
+    for _ in range(3):
+        started = time.perf_counter()
+        for item in items:
+            step(item)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(items) * 1e6
+
+
+def main(argv=None) -> int:
+    args = bench_parser(__doc__, days=3650).parse_args(argv)
+
+    with scratch_store("tracker-codec-"):
+        import record_codec
+
+        records = []
+        for _, data in synthetic_records(args.days, args.seed):
+            data["version"] = 1
+            # Some days saved as 0/1 before meditation was a yes/no prompt
+            if len(records) % 3 == 0:
+                data["meditation"] = int(data["meditation"])
+            records.append(data)
+        texts = [json.dumps(data, indent=2) for data in records]
+        blobs = [record_codec.encode(data) for data in records]
+        for data, blob in zip(records, blobs):
+            if record_codec.decode(blob) != record_codec.normalize(data):
+                print(f"Round trip mismatch: {data}")
+                return 1
+
+        results = {
+            "days": args.days,
+            "json_bytes_per_day": round(sum(len(t.encode("utf-8")) for t in texts) / args.days, 1),
+            "compact_bytes_per_day": round(sum(len(b) for b in blobs) / args.days, 1),
+            "json_decode_us": round(per_day(json.loads, texts), 2),
+            "compact_decode_us": round(per_day(record_codec.decode, blobs), 2),
+            "json_encode_us": round(per_day(lambda data: json.dumps(data, indent=2), records), 2),
+            "compact_encode_us": round(per_day(record_codec.encode, records), 2),
+        }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'':<8} {'bytes/day':>10} {'decode us':>10} {'encode us':>10}")
+        for name in ("json", "compact"):
+            print(f"{name:<8} {results[name + '_bytes_per_day']:>10} {results[name + '_decode_us']:>10} "
+                  f"{results[name + '_encode_us']:>10}")
+        print(f"size {results['json_bytes_per_day'] / results['compact_bytes_per_day']:.1f}x smaller, "
+              f"decode {results['json_decode_us'] / results['compact_decode_us']:.1f}x faster")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
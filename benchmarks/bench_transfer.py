@@ -0,0 +1,72 @@
+"""Throughput of the import/export pipeline.
+
+Generates a deterministic synthetic history, imports it into a scratch
+store and exports it in every format, reporting days per second, output
+size and peak traced memory for each step. Streaming steps should use about
+the same memory whatever --days is.
+
+Usage:
+    python benchmarks/bench_transfer.py [--days 3650] [--backend json|columnar|compact] [--seed 1]
+"""
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from synthetic import BACKENDS, bench_parser, scratch_store, synthetic_records
+
+
+def measure(label: str, days: int, step, output: str = None) -> dict:
+    tracemalloc.start()
+    started = time.perf_counter()
+    step()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    size = None
+    if output and os.path.isdir(output):
+        size = sum(os.path.getsize(os.path.join(output, name)) for name in os.listdir(output))
+    elif output and os.path.exists(output):
+        size = os.path.getsize(output)
+    result = {"step": label, "days": days, "seconds": round(elapsed, 4),
+              "days_per_second": round(days / elapsed) if elapsed else None,
+              "bytes": size, "peak_memory_kb": round(peak / 1024)}
+    size_text = f"{size / 1e6:8.2f} MB" if size is not None else " " * 11
+    print(f"{label:<28} {elapsed:8.3f}s {result['days_per_second'] or 0:>9} days/s "
+          f"{size_text} peak {result['peak_memory_kb']:>7} KB")
+    return result
+
+
+def main(argv=None) -> int:
+    args = bench_parser(__doc__, days=3650, backends=BACKENDS).parse_args(argv)
+
+    with scratch_store("tracker-transfer-", args.backend) as work_dir:
+        import transfer
+
+        source = os.path.join(work_dir, "source.jsonl")
+        transfer.write_jsonl(synthetic_records(args.days, args.seed), source)
+        out = os.path.join(work_dir, "out")
+        results = [
+            measure("validate jsonl", args.days,
+                    lambda: sum(1 for _ in transfer.validated(transfer.read_jsonl(source)))),
+            measure(f"import jsonl -> {args.backend} store", args.days,
+                    lambda: transfer.import_records(transfer.validated(transfer.read_jsonl(source)))),
+        ]
+        for fmt, path in (("jsonl", out + ".jsonl"), ("csv", out + ".csv"),
+                          ("columnar", out + ".ctc"), ("json", out + "_days")):
+            results.append(measure(f"export store -> {fmt}", args.days,
+                                   lambda: transfer.export_records(fmt, path), path))
+        for source_fmt, path in (("csv", out + ".csv"), ("columnar", out + ".ctc")):
+            target = os.path.join(work_dir, f"converted_from_{source_fmt}.jsonl")
+            results.append(measure(f"convert {source_fmt} -> jsonl", args.days,
+                                   lambda: transfer.write_jsonl(transfer.read_records(source_fmt, path), target),
+                                   target))
+
+    if args.json:
+        print(json.dumps({"backend": args.backend, "days": args.days, "results": results}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
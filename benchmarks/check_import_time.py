@@ -0,0 +1,79 @@
+"""Check that the tracker CLI still starts quickly.
+
+Imports each entry-point module in a fresh interpreter with ``-X importtime``
+and fails (exit status 1) if the median cumulative import time goes over the
+budget, or if any heavy dependency is imported eagerly.
+
+Usage:
+    python benchmarks/check_import_time.py [--budget-ms 100] [--runs 5]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENTRY_MODULES = ["menu", "tracker"]
+
+# Dependencies that must only be imported when the feature using them runs
+LAZY_MODULES = ["playwright", "prompt_toolkit", "tabulate", "jinja2", "numpy", "pandas", "flask",
+                "multiprocessing", "record_cache", "medication_log", "adherence"]
+
+# Measured at ~40 ms for `import menu` once the lazy imports were in place
+# (down from ~350 ms); the budget leaves headroom for slower machines.
+DEFAULT_BUDGET_MS = 100
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+\d+\s+\|\s+(\d+)\s+\|\s*(\S+)\s*$")
+
+
+def measure_import_ms(module: str) -> float:
+    """Cumulative import time of ``module`` in a fresh interpreter, in ms."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_DIR, capture_output=True, text=True, check=True,
+    )
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match and match.group(2) == module:
+            return int(match.group(1)) / 1000
+    raise RuntimeError(f"No import time reported for {module}")
+
+
+def eagerly_imported(module: str) -> list:
+    """Heavy dependencies that end up in sys.modules after importing ``module``."""
+    code = (
+        f"import sys, {module}\n"
+        f"print(' '.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=REPO_DIR,
+                            capture_output=True, text=True, check=True)
+    return result.stdout.split()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    failed = False
+    for module in ENTRY_MODULES:
+        timings = [measure_import_ms(module) for _ in range(args.runs)]
+        median = statistics.median(timings)
+        status = "ok" if median <= args.budget_ms else "OVER BUDGET"
+        print(f"import {module}: median {median:.1f} ms over {args.runs} runs "
+              f"(budget {args.budget_ms:.0f} ms) {status}")
+        failed |= median > args.budget_ms
+
+        eager = eagerly_imported(module)
+        if eager:
+            print(f"import {module}: heavy dependencies imported eagerly: {', '.join(eager)}")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""Load test for the HTTP API (api.py) against a local instance.
+
+Fills a scratch store with a deterministic synthetic history, starts
+``tracker.py serve`` on it in a subprocess, and drives each endpoint with
+concurrent clients, reporting p50/p99 latency and requests per second for
+the read and write endpoints. Range queries and reports pick from the
+history's months and weeks, so repeats are served from the response cache
+as they would be for a dashboard polling the API.
+
+Usage:
+    python benchmarks/load_test_api.py [--days 730] [--backend json|columnar|compact]
+        [--workers 8] [--clients 16] [--requests 1000] [--seed 1] [--json]
+"""
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from synthetic import BACKENDS, FIRST_DATE, REPO_DIR, bench_parser, scratch_store, synthetic_records
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(port: int, timeout: float = 30.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/api/health")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("API server did not start")
+
+
+def request(port: int, method: str, path: str, body=None) -> int:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    try:
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        conn.request(method, path, json.dumps(body) if body is not None else None, headers)
+        response = conn.getresponse()
+        response.read()
+        return response.status
+    finally:
+        conn.close()
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def run_scenario(port: int, name: str, kind: str, make_request, count: int, clients: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    jobs = [make_request(rng) for _ in range(count)]
+
+    def timed(job):
+        started = time.perf_counter()
+        status = request(port, *job)
+        return time.perf_counter() - started, status
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        results = list(pool.map(timed, jobs))
+    elapsed = time.perf_counter() - started
+    latencies = sorted(latency for latency, _ in results)
+    errors = sum(1 for _, status in results if status >= 400)
+    result = {"endpoint": name, "kind": kind, "requests": count, "errors": errors,
+              "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+              "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+              "requests_per_second": round(count / elapsed, 1)}
+    print(f"{kind:<6}{name:<40} p50 {result['p50_ms']:>8.2f} ms  p99 {result['p99_ms']:>8.2f} ms  "
+          f"{result['requests_per_second']:>8.1f} req/s  errors {errors}")
+    return result
+
+
+def main(argv=None) -> int:
+    parser = bench_parser(__doc__, days=730, backends=BACKENDS)
+    parser.add_argument("--workers", type=int, default=8, help="Server worker threads")
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent client connections")
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per endpoint")
+    args = parser.parse_args(argv)
+
+    with scratch_store("tracker-api-", args.backend, synthetic_records(args.days, args.seed)) as work_dir:
+        server = None
+        try:
+            port = free_port()
+            server = subprocess.Popen(
+                [sys.executable, os.path.join(REPO_DIR, "tracker.py"), "serve",
+                 "--port", str(port), "--workers", str(args.workers)],
+                cwd=work_dir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            wait_until_up(port)
+
+            def day(rng) -> date:
+                return FIRST_DATE + timedelta(days=rng.randrange(args.days))
+
+            def month_range(rng):
+                first = day(rng).replace(day=1)
+                return f"/api/days?from={first}&to={first + timedelta(days=30)}"
+
+            def week_report(rng):
+                monday = day(rng) - timedelta(days=day(rng).weekday())
+                return f"/api/reports/summary?from={monday}&to={monday + timedelta(days=6)}"
+
+            scenarios = [
+                ("GET /api/days (a month)", "read", lambda rng: ("GET", month_range(rng))),
+                ("GET /api/days/<date>", "read", lambda rng: ("GET", f"/api/days/{day(rng)}")),
+                ("GET /api/reports/summary (a week)", "read", lambda rng: ("GET", week_report(rng))),
+                ("GET /api/catalogs", "read", lambda rng: ("GET", "/api/catalogs")),
+                ("PUT /api/days/<date>", "write",
+                 lambda rng: ("PUT", f"/api/days/{day(rng)}", {"pain": rng.randint(0, 10), "mood": "ok"})),
+                ("PUT /api/diary/<date>", "write",
+                 lambda rng: ("PUT", f"/api/diary/{day(rng)}", {"entry": f"Load test entry {rng.random()}"})),
+            ]
+            results = [run_scenario(port, name, kind, make_request, args.requests, args.clients, args.seed + i)
+                       for i, (name, kind, make_request) in enumerate(scenarios)]
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+    if args.json:
+        print(json.dumps({"backend": args.backend, "days": args.days, "workers": args.workers,
+                          "clients": args.clients, "results": results}, indent=2))
+    return 1 if any(result["errors"] for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+"""Benchmark suite over a synthetic multi-year, multi-user history.
+
+Populates a scratch directory with --users profiles of --years years each
+(see synthetic.py), then times the everyday operations: loading every day,
+range queries, saving days and diary entries, diary search and rendering
+the summary tables and reports. Each benchmark runs --repeat times; the
+results, with the parameters, commit and Python version they came from,
+are written to a JSON file. Pass an earlier results file to --compare to
+see which benchmarks got slower.
+
+Usage:
+    python benchmarks/run_suite.py [--years 3] [--users 2] [--backend json|columnar|compact]
+        [--seed 1] [--end YYYY-MM-DD] [--repeat 5] [--saves 20] [--only NAME]
+        [--output FILE] [--compare FILE] [--threshold 0.1]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import synthetic  # noqa: E402
+
+RESULTS_DIR = os.path.join(REPO_DIR, "benchmarks", "results")
+SEARCH_QUERIES = ("burning", '"pain crept back"', "tingling hands", "flare")
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def benchmarks(users, end: date, saves: int):
+    """(name, operations per run, setup or None, callable) for every benchmark.
+
+    Reads come before writes, so every read sees the same generated data.
+    """
+    import data_io
+    import diary
+    import diary_search
+    import visualize
+
+    first_user = users[0]
+    last_week = [(end - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(6, -1, -1)]
+    last_month = (end - timedelta(days=29)).strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+    last_year = (end - timedelta(days=364)).strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+
+    def use_first_user():
+        data_io.use_profile(first_user)
+
+    def load_all_users():
+        count = 0
+        for profile in users:
+            data_io.use_profile(profile)
+            count += sum(1 for _ in visualize.load_all_data())
+        data_io.use_profile(first_user)
+        return count
+
+    def display_month():
+        with contextlib.redirect_stdout(io.StringIO()):
+            visualize.display_entries(data_io.query_range(*last_month))
+
+    def month_report():
+        dates = [(end - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(29, -1, -1)]
+        return visualize.render_report("Monthly report", "Monthly report", dates,
+                                       dict(data_io.query_range(*last_month)),
+                                       {d: diary.get_diary_entry(d) for d in dates})
+
+    def search_cold():
+        diary_search.rebuild_index()
+        return [diary_search.search(q) for q in SEARCH_QUERIES]
+
+    def save_days():
+        for date_str, data in data_io.query_range(last_year[0], last_year[1])[:saves]:
+            data.pop(data_io.VERSION_FIELD, None)
+            data["mood"] = "benchmark"
+            data_io.save_daily_data(date_str, data)
+
+    def save_diary():
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i in range(saves):
+                diary.save_diary_entry(last_week[i % 7], f"Benchmark entry {i}: burning in fingers after guitar.")
+
+    return [
+        ("load_all_data (every user)", len(users), use_first_user, load_all_users),
+        ("load_all_data (one user)", 1, use_first_user, lambda: sum(1 for _ in visualize.load_all_data())),
+        ("query_range (a month)", 1, use_first_user, lambda: data_io.query_range(*last_month)),
+        ("query_range (a year)", 1, use_first_user, lambda: data_io.query_range(*last_year)),
+        ("get_weekly_summary_html_table", 1, use_first_user, visualize.get_weekly_summary_html_table),
+        ("render_report (a month)", 1, use_first_user, month_report),
+        ("display_entries (a month)", 1, use_first_user, display_month),
+        ("diary_search (cold index)", len(SEARCH_QUERIES), use_first_user, search_cold),
+        ("diary_search (warm index)", len(SEARCH_QUERIES), use_first_user,
+         lambda: [diary_search.search(q) for q in SEARCH_QUERIES]),
+        ("save_daily_data", saves, use_first_user, save_days),
+        ("save_diary_entry", saves, use_first_user, save_diary),
+    ]
+
+
+def run(name: str, operations: int, setup, step, repeat: int) -> dict:
+    if setup is not None:
+        setup()
+    step()  # Warm-up: imports, template compilation, first index loads
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        step()
+        runs.append(time.perf_counter() - started)
+    median = statistics.median(runs)
+    result = {"name": name, "operations": operations, "runs": [round(r, 6) for r in runs],
+              "min_seconds": round(min(runs), 6), "median_seconds": round(median, 6),
+              "per_operation_ms": round(median / operations * 1000, 4)}
+    print(f"{name:<36} median {median * 1000:10.2f} ms   min {min(runs) * 1000:10.2f} ms   "
+          f"{result['per_operation_ms']:9.3f} ms/op")
+    return result
+
+
+def compare(results: list, baseline_path: str, threshold: float) -> int:
+    """Print each benchmark's change against an earlier results file; returns how many got slower."""
+    with open(baseline_path, "r") as f:
+        baseline = {r["name"]: r for r in json.load(f)["results"]}
+    slower = 0
+    print(f"\nCompared with {baseline_path}:")
+    for result in results:
+        before = baseline.get(result["name"])
+        if before is None:
+            print(f"{result['name']:<36} (new)")
+            continue
+        ratio = result["median_seconds"] / before["median_seconds"] if before["median_seconds"] else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            flag, slower = "  SLOWER", slower + 1
+        elif ratio < 1 - threshold:
+            flag = "  faster"
+        print(f"{result['name']:<36} {before['median_seconds'] * 1000:10.2f} ms -> "
+              f"{result['median_seconds'] * 1000:10.2f} ms  x{ratio:5.2f}{flag}")
+    return slower
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--users", type=int, default=2)
+    parser.add_argument("--backend", choices=synthetic.BACKENDS, default=synthetic.BACKENDS[0])
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--end", help="Last generated date (YYYY-MM-DD), defaults to today so the weekly "
+                                      "summary has data; pin it to compare runs on different days")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per benchmark")
+    parser.add_argument("--saves", type=int, default=20, help="Saves per run of the save benchmarks")
+    parser.add_argument("--only", action="append", metavar="NAME",
+                        help="Run only benchmarks whose name contains NAME; repeatable")
+    parser.add_argument("--output", help="Results file, defaults to benchmarks/results/<time>-<commit>.json")
+    parser.add_argument("--compare", metavar="FILE", help="Earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="Relative change in median time reported as slower or faster")
+    args = parser.parse_args(argv)
+
+    end = datetime.strptime(args.end, "%Y-%m-%d").date() if args.end else date.today()
+    commit = git_commit()
+    started_at = datetime.now(timezone.utc)
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{started_at.strftime('%Y%m%dT%H%M%SZ')}-{commit or 'nocommit'}.json")
+    output = os.path.abspath(output)
+
+    with synthetic.scratch_store("tracker-suite-", args.backend):
+        populate_started = time.perf_counter()
+        users = synthetic.populate(args.users, args.years, args.seed, end)
+        print(f"Generated {args.users} user(s) x {args.years} year(s) in "
+              f"{time.perf_counter() - populate_started:.1f}s ({args.backend} backend)")
+        results = []
+        for name, operations, setup, step in benchmarks(users, end, args.saves):
+            if args.only and not any(part in name for part in args.only):
+                continue
+            try:
+                results.append(run(name, operations, setup, step, args.repeat))
+            except ImportError as e:
+                print(f"{name:<36} skipped ({e})")
+
+    report = {
+        "started_at": started_at.isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "parameters": {"years": args.years, "users": args.users, "backend": args.backend, "seed": args.seed,
+                       "end": end.strftime("%Y-%m-%d"), "repeat": args.repeat, "saves": args.saves},
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+    if args.compare:
+        return 1 if compare(results, args.compare, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""Stress the write path with many processes saving at once.
+
+Every worker process saves its own range of dates (daily data and a diary
+entry each), then all of them race to increment a shared counter day with
+compare-and-swap retries. Runs against a throwaway data directory and
+exits with status 1 if any save was lost.
+
+Usage:
+    python benchmarks/stress_concurrent_writes.py [--workers 8] [--dates 25] [--increments 20]
+        [--backend json|columnar|compact] [--keep] [--json]
+"""
+import json
+import multiprocessing
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+from synthetic import BACKENDS, bench_parser, scratch_store
+
+FIRST_DATE = date(2024, 1, 1)
+COUNTER_DATE = "2023-12-31"
+
+
+def _open_store(work_dir: str, backend: str):
+    # Must run before the tracker modules are imported in this process
+    os.environ["TRACKER_STORAGE"] = backend
+    os.chdir(work_dir)
+    import data_io
+    import diary
+    return data_io, diary
+
+
+def worker_date(worker: int, i: int, dates: int) -> str:
+    return (FIRST_DATE + timedelta(days=worker * dates + i)).strftime("%Y-%m-%d")
+
+
+def run_worker(worker: int, work_dir: str, backend: str, dates: int, increments: int) -> int:
+    """Save this worker's dates, then increment the counter; returns the number of conflicts hit."""
+    data_io, diary = _open_store(work_dir, backend)
+    with open(os.devnull, "w") as devnull:
+        sys.stdout = devnull  # save_diary_entry prints every save
+        for i in range(dates):
+            date_str = worker_date(worker, i, dates)
+            data_io.save_daily_data(date_str, {"pain": i % 11, "mood": worker, "time_based": {"Guitar": i}})
+            diary.save_diary_entry(date_str, f"worker {worker} entry {i}")
+
+        conflicts = 0
+        for _ in range(increments):
+            while True:
+                data = data_io.load_daily_data(COUNTER_DATE) or {}
+                entry, diary_version = diary.get_diary_record(COUNTER_DATE)
+                try:
+                    with data_io.transaction():
+                        diary.save_diary_entry(COUNTER_DATE, str(int(entry or 0) + 1),
+                                               expected_version=diary_version)
+                        data_io.save_daily_data(COUNTER_DATE, {"pain": data.get("pain", 0) + 1},
+                                                expected_version=data_io.record_version(data))
+                    break
+                except data_io.ConflictError:
+                    conflicts += 1
+        return conflicts
+
+
+def verify(work_dir: str, backend: str, workers: int, dates: int, increments: int) -> list:
+    data_io, diary = _open_store(work_dir, backend)
+    import aggregates
+    problems = []
+    stored = dict(data_io.query_range())
+    entries = diary.load_diary_entries()
+    for worker in range(workers):
+        for i in range(dates):
+            date_str = worker_date(worker, i, dates)
+            data = stored.get(date_str)
+            if not data or data.get("mood") != worker or data.get("time_based", {}).get("Guitar") != i:
+                problems.append(f"{date_str}: daily data lost or wrong ({data})")
+            if entries.get(date_str) != f"worker {worker} entry {i}":
+                problems.append(f"{date_str}: diary entry lost or wrong ({entries.get(date_str)!r})")
+
+    expected = workers * increments
+    counter = stored.get(COUNTER_DATE, {})
+    if counter.get("pain") != expected or data_io.record_version(counter) != expected:
+        problems.append(f"counter day: pain {counter.get('pain')}, version "
+                        f"{data_io.record_version(counter)}, expected {expected}")
+    if entries.get(COUNTER_DATE) != str(expected):
+        problems.append(f"counter diary entry: {entries.get(COUNTER_DATE)!r}, expected {expected}")
+    rollup_days = len(aggregates.rollups("day"))
+    if rollup_days != workers * dates + 1:
+        problems.append(f"rollups cover {rollup_days} days, expected {workers * dates + 1}")
+    return problems
+
+
+def main(argv=None) -> int:
+    parser = bench_parser(__doc__, backends=BACKENDS)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--dates", type=int, default=25, help="Dates saved by each worker")
+    parser.add_argument("--increments", type=int, default=20, help="Counter increments per worker")
+    parser.add_argument("--keep", action="store_true", help="Keep the data directory for inspection")
+    args = parser.parse_args(argv)
+
+    ctx = multiprocessing.get_context("spawn")
+    # The workers open the store themselves; the backend is passed to them
+    with scratch_store("tracker-stress-", keep=args.keep) as work_dir:
+        started = time.perf_counter()
+        with ctx.Pool(args.workers) as pool:
+            conflicts = pool.starmap(run_worker, [
+                (worker, work_dir, args.backend, args.dates, args.increments) for worker in range(args.workers)
+            ])
+        elapsed = time.perf_counter() - started
+        with ctx.Pool(1) as pool:
+            problems = pool.apply(verify, (work_dir, args.backend, args.workers, args.dates, args.increments))
+
+    saves = args.workers * (args.dates + args.increments)
+    print(f"{args.workers} processes, {saves} daily saves and {saves} diary saves ({args.backend}) "
+          f"in {elapsed:.2f}s; {sum(conflicts)} compare-and-swap conflicts retried")
+    for problem in problems:
+        print(f"LOST: {problem}")
+    print("ok" if not problems else f"{len(problems)} problem(s)")
+    if args.json:
+        print(json.dumps({"backend": args.backend, "workers": args.workers, "saves": saves,
+                          "seconds": round(elapsed, 4), "conflicts": sum(conflicts), "problems": problems}, indent=2))
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
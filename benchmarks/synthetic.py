@@ -0,0 +1,255 @@
+"""Deterministic synthetic tracker histories and scratch stores for the benchmarks.
+
+Days are drawn from the repo's catalogs (exercises.json, time_activities.json
+and medications.json, or the built-in defaults where one is missing). Each
+user gets their own habits from the seed: a pain baseline that days wander
+around with occasional flare-ups, how often they meditate, exercise, do each
+activity and take their medication as prescribed, and how often they write
+a diary entry. The same seed, number of days and dates always give the
+same data.
+
+Every benchmark builds its history with ``synthetic_records`` (or
+``generate_days``/``populate`` when it needs diary entries or profiles) and
+works in a throwaway data directory from ``scratch_store``.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+MOODS = (
+    (3, ("good", "calm", "ok", "content")),
+    (6, ("ok", "tired", "flat", "restless")),
+    (10, ("low", "anxious", "irritable", "exhausted")),
+)
+DIARY_SENTENCES = (
+    "Burning in my fingers after {activity}.",
+    "Pain around {pain}/10 most of the day.",
+    "Took {medication} later than usual.",
+    "Forearms ached in the evening, better after stretching.",
+    "Slept badly, woke up with tingling in both hands.",
+    "Good session of {activity}, no flare afterwards.",
+    "Cubital tunnels sensitive when leaning on the desk.",
+    "Skipped the exercises, too sore to bother.",
+    "Meditation helped settle the nerve pain before bed.",
+    "Cold weather made the burning worse.",
+    "Felt almost normal until lunch, then the pain crept back.",
+    "Worried about the flare lasting into tomorrow.",
+)
+# First day of the histories of synthetic_records
+FIRST_DATE = date(2015, 1, 1)
+BACKENDS = ("json", "columnar", "compact")
+
+
+def load_catalogs(catalog_dir: str = REPO_DIR) -> Dict[str, Any]:
+    """Exercise, time activity and medication catalogs to draw days from."""
+    from catalogs import DEFAULT_EXERCISES, DEFAULT_TIME_ACTIVITIES, EXERCISES_FILE, MEDICATIONS_FILE, TIME_ACTIVITIES_FILE
+
+    def read(filename: str, default: Any) -> Any:
+        path = os.path.join(catalog_dir, filename)
+        if not os.path.exists(path):
+            return default
+        with open(path, "r") as f:
+            return json.load(f)
+
+    return {
+        "exercises": read(EXERCISES_FILE, DEFAULT_EXERCISES),
+        "time_based": read(TIME_ACTIVITIES_FILE, DEFAULT_TIME_ACTIVITIES),
+        "medications": read(MEDICATIONS_FILE, {"medications": []}).get("medications") or [],
+    }
+
+
+def user_habits(rng: random.Random, catalogs: Dict[str, Any]) -> Dict[str, Any]:
+    """Per-user probabilities and typical amounts."""
+    return {
+        "pain_baseline": rng.uniform(2, 6),
+        "meditation": rng.uniform(0.2, 0.8),
+        "exercise": rng.uniform(0.3, 0.9),
+        "adherence": rng.uniform(0.7, 0.98),
+        "diary": rng.uniform(0.2, 0.6),
+        "activities": {name: (rng.uniform(0.1, 0.8), rng.uniform(0.5, 1.5)) for name in catalogs["time_based"]},
+    }
+
+
+def _amount(rng: random.Random, spec: Dict[str, Any], scale: float) -> Any:
+    kind = spec.get("type")
+    if spec.get("scale_range"):
+        low, high = spec["scale_range"]
+        return rng.randint(low, high)
+    if kind == "hours":
+        return round(min(14.0, max(0.5, rng.gauss(4 * scale, 1.5))), 1)
+    if kind == "kilometers":
+        return round(rng.lognormvariate(2.5, 0.8), 1)
+    return float(max(5, 5 * round(rng.gauss(30 * scale, 15) / 5)))
+
+
+def generate_days(catalogs: Dict[str, Any], years: int, seed: int,
+                  end: Optional[date] = None) -> Iterator[Tuple[str, Dict[str, Any], Optional[str]]]:
+    """Yield (date_str, record, diary entry or None) for every day of ``years`` years up to ``end``."""
+    days = years * 365
+    return _generate(catalogs, (end or date.today()) - timedelta(days=days - 1), days, seed)
+
+
+def synthetic_records(days: int, seed: int, first: date = FIRST_DATE,
+                      catalogs: Optional[Dict[str, Any]] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yield (date_str, record) for ``days`` days from ``first``, as transfer.import_records takes them."""
+    for date_str, record, _ in _generate(catalogs or load_catalogs(), first, days, seed):
+        yield date_str, record
+
+
+def _generate(catalogs: Dict[str, Any], first: date, days: int,
+              seed: int) -> Iterator[Tuple[str, Dict[str, Any], Optional[str]]]:
+    rng = random.Random(seed)
+    habits = user_habits(rng, catalogs)
+    pain = habits["pain_baseline"]
+    flare = 0
+    activities = list(catalogs["time_based"].items())
+    for i in range(days):
+        if flare == 0 and rng.random() < 0.03:
+            flare = rng.randint(2, 5)
+        pain = habits["pain_baseline"] + 0.6 * (pain - habits["pain_baseline"]) + rng.gauss(0, 1.2)
+        level = max(0, min(10, round(pain + (3 if flare else 0))))
+        flare = max(0, flare - 1)
+
+        record: Dict[str, Any] = {}
+        if rng.random() < habits["exercise"]:
+            record["exercises"] = {
+                name: {"repeats": spec.get("repeats", 10), "sets": spec.get("sets", 1) + rng.choice((0, 0, 1))}
+                for name, spec in catalogs["exercises"].items() if rng.random() < 0.8
+            }
+        record["meditation"] = rng.random() < habits["meditation"]
+        record["mood"] = rng.choice(next(moods for limit, moods in MOODS if level <= limit))
+        record["pain"] = level
+        record["time_based"] = {
+            name: _amount(rng, spec, habits["activities"][name][1])
+            for name, spec in activities if rng.random() < habits["activities"][name][0]
+        }
+        record["medications"] = {
+            med["name"]: med.get("doses_per_day", 1) if rng.random() < habits["adherence"]
+            else rng.randint(0, max(0, med.get("doses_per_day", 1) - 1))
+            for med in catalogs["medications"]
+        }
+
+        entry = None
+        if rng.random() < habits["diary"]:
+            entry = " ".join(
+                rng.choice(DIARY_SENTENCES).format(
+                    activity=rng.choice(activities)[0] if activities else "work",
+                    pain=level,
+                    medication=rng.choice(catalogs["medications"])["name"] if catalogs["medications"] else "my tablets")
+                for _ in range(rng.randint(1, 4)))
+        yield (first + timedelta(days=i)).strftime("%Y-%m-%d"), record, entry
+
+
+def populate(users: int, years: int, seed: int, end: Optional[date] = None,
+             catalogs: Optional[Dict[str, Any]] = None) -> List[str]:
+    """Create ``users`` profiles in the working directory, each with a synthetic history.
+
+    Each profile gets its own copy of the catalogs and its own habits (the
+    seed of user i is ``seed + i``).
+
+    Returns:
+        The profile names
+    """
+    import data_io
+    import diary
+    import profiles
+    import transfer
+    from catalogs import EXERCISES_FILE, MEDICATIONS_FILE, TIME_ACTIVITIES_FILE, catalog_path, save_catalog
+
+    catalogs = catalogs or load_catalogs()
+    names = [f"user-{i:02d}" for i in range(users)]
+    previous = data_io.PROFILE
+    try:
+        for i, profile in enumerate(names):
+            profiles.create_profile(profile)
+            data_io.use_profile(profile)
+            save_catalog(catalog_path(EXERCISES_FILE), catalogs["exercises"])
+            save_catalog(catalog_path(TIME_ACTIVITIES_FILE), catalogs["time_based"])
+            save_catalog(catalog_path(MEDICATIONS_FILE), {"medications": catalogs["medications"]})
+            days = list(generate_days(catalogs, years, seed + i, end))
+            transfer.import_records((date_str, record) for date_str, record, _ in days)
+            # save_diary_entry reports each save on stdout
+            with data_io.batch_writes(), contextlib.redirect_stdout(io.StringIO()):
+                for date_str, _, entry in days:
+                    if entry is not None:
+                        diary.save_diary_entry(date_str, entry)
+    finally:
+        data_io.use_profile(previous)
+    return names
+
+
+@contextlib.contextmanager
+def scratch_store(prefix: str = "tracker-bench-", backend: Optional[str] = None,
+                  records: Optional[Iterable[Tuple[str, Dict[str, Any]]]] = None, keep: bool = False) -> Iterator[str]:
+    """Run the block in a new temporary directory holding an empty data/ directory
+    and a copy of the repo's catalogs.
+
+    The storage modules read TRACKER_STORAGE when first imported, so import
+    them inside the block.
+
+    Args:
+        prefix: Prefix of the directory name
+        backend: Storage backend to select, or None to leave TRACKER_STORAGE as is
+        records: (date_str, data) pairs to import before the block runs
+        keep: Leave the directory in place for inspection
+
+    Yields:
+        The directory
+    """
+    work_dir = tempfile.mkdtemp(prefix=prefix)
+    previous_dir = os.getcwd()
+    if backend is not None:
+        os.environ["TRACKER_STORAGE"] = backend
+    from catalogs import EXERCISES_FILE, MEDICATIONS_FILE, TIME_ACTIVITIES_FILE
+
+    # The repo's catalogs, which synthetic_records draws from by default
+    for filename in (EXERCISES_FILE, TIME_ACTIVITIES_FILE, MEDICATIONS_FILE):
+        if os.path.exists(os.path.join(REPO_DIR, filename)):
+            shutil.copyfile(os.path.join(REPO_DIR, filename), os.path.join(work_dir, filename))
+    os.chdir(work_dir)
+    os.makedirs("data")
+    try:
+        if records is not None:
+            import transfer
+            transfer.import_records(records)
+        yield work_dir
+    finally:
+        if "record_cache" in sys.modules:
+            # Its exit hook would save to the relative data path, outside work_dir
+            sys.modules["record_cache"].forget()
+        os.chdir(previous_dir)
+        if keep:
+            print(f"Kept the data in {work_dir}")
+        else:
+            shutil.rmtree(work_dir)
+
+
+def bench_parser(doc: str, days: Optional[int] = None, backends: Optional[Iterable[str]] = None) -> argparse.ArgumentParser:
+    """Argument parser with the options every benchmark shares.
+
+    Args:
+        doc: The benchmark's module docstring; its first line is the description
+        days: Default of --days, or None for no --days option
+        backends: Choices of --backend (the first is the default), or None for no --backend option
+    """
+    parser = argparse.ArgumentParser(description=doc.splitlines()[0])
+    if days is not None:
+        parser.add_argument("--days", type=int, default=days)
+    if backends is not None:
+        backends = list(backends)
+        parser.add_argument("--backend", choices=backends, default=backends[0])
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    return parser
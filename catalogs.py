@@ -0,0 +1,104 @@
+import copy
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from data_io import load_json, profile_path, save_json
+from instrumentation import count
+
+EXERCISES_FILE = "exercises.json"
+TIME_ACTIVITIES_FILE = "time_activities.json"
+MEDICATIONS_FILE = "medications.json"
+
+DEFAULT_EXERCISES = {
+    "Scapula pull (3 secs)": {"repeats": 10, "sets": 1},
+    "Shoulder Shrug (downward arm extension)": {"repeats": 10, "sets": 1},
+    "Grip Rotation (500g)": {"repeats": 10, "sets": 1},
+    "Thoracic ext w/ foam roller": {"repeats": 10, "sets": 1},
+    "Wall Roller Shoulder Flexion": {"repeats": 10, "sets": 1},
+    "Diagonal Cervical Neck Tilt (RHS)": {"repeats": 10, "sets": 1}
+}
+
+DEFAULT_TIME_ACTIVITIES = {
+    "Driving": {"type": "minutes"},
+    "Guitar": {"type": "minutes"},
+    "Piano": {"type": "minutes"},
+    "Computer Training": {"type": "minutes"},
+    "Total Computer Use": {"type": "hours"}
+}
+
+# filename -> ((mtime_ns, size), parsed data)
+_cache: Dict[str, Tuple[Optional[Tuple[int, int]], Any]] = {}
+
+
+def _signature(filename: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(filename)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def load_catalog(filename: str, default: Optional[Callable[[], Any]] = None) -> Any:
+    """Load a catalog file, parsing it only when it changed on disk.
+
+    Every caller in the process shares the same parsed object, so it must be
+    treated as read-only; write changes back through ``save_catalog``.
+
+    Args:
+        filename: Path to the catalog JSON file
+        default: Called to build (and save) the catalog if the file doesn't exist
+
+    Returns:
+        Parsed catalog data, or None if the file doesn't exist and there is no default
+    """
+    signature = _signature(filename)
+    cached = _cache.get(filename)
+    count("catalog.lookups")
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    if signature is None and default is not None:
+        save_catalog(filename, default())
+        return _cache[filename][1]
+    data = load_json(filename) if signature is not None else None
+    _cache[filename] = (signature, data)
+    return data
+
+
+def save_catalog(filename: str, data: Any) -> None:
+    """Write a catalog file and refresh its cache entry.
+
+    Args:
+        filename: Path to the catalog JSON file
+        data: Catalog data to save
+    """
+    save_json(filename, data)
+    _cache[filename] = (_signature(filename), data)
+
+
+def invalidate(filename: Optional[str] = None) -> None:
+    """Drop a cached catalog (or all of them) so the next load re-reads it."""
+    if filename is None:
+        _cache.clear()
+    else:
+        _cache.pop(filename, None)
+
+
+def catalog_path(filename: str) -> str:
+    """Path of one of the catalog files (EXERCISES_FILE, ...) of the active profile."""
+    return profile_path(filename)
+
+
+def get_exercises() -> Dict[str, Any]:
+    """Exercise catalog: name -> default repeats and sets."""
+    return load_catalog(catalog_path(EXERCISES_FILE), default=lambda: copy.deepcopy(DEFAULT_EXERCISES))
+
+
+def get_time_activities() -> Dict[str, Any]:
+    """Time-based activity catalog: name -> type (and scale range)."""
+    return load_catalog(catalog_path(TIME_ACTIVITIES_FILE), default=lambda: copy.deepcopy(DEFAULT_TIME_ACTIVITIES))
+
+
+def get_medications() -> List[Dict[str, Any]]:
+    """Medication catalog: list of {name, doses_per_day}, with "prn": true for as-needed medications."""
+    data = load_catalog(catalog_path(MEDICATIONS_FILE))
+    return data.get("medications") if data else None
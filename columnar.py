@@ -0,0 +1,650 @@
+import bisect
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+from array import array
+from collections.abc import Mapping
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from instrumentation import count
+
+HISTORY_DIRNAME = "history"
+MANIFEST_FILE = "columns.json"
+DATES_FILE = "dates.col"
+
+# Every column file is a sequence of fixed-width cells, one per row, so row N
+# always lives at offset N * CELL_SIZE. Strings and other non-numeric values
+# live in a per-column heap file and the cell stores (offset, length).
+CELL = struct.Struct("<B8s")
+CELL_SIZE = CELL.size
+DATE_CELL = struct.Struct("<i")
+
+TAG_MISSING = 0
+TAG_FALSE = 1
+TAG_TRUE = 2
+TAG_INT = 3
+TAG_FLOAT = 4
+TAG_STR = 5
+TAG_NONE = 6
+TAG_JSON = 7
+TAG_EMPTY_DICT = 8
+
+_INT = struct.Struct("<q")
+_FLOAT = struct.Struct("<d")
+_HEAP_REF = struct.Struct("<II")
+_EMPTY = b"\x00" * 8
+MISSING_CELL = CELL.pack(TAG_MISSING, _EMPTY)
+
+DATE_FILE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}\.json$")
+
+# A scan reads each run of selected rows with one read per column; runs at
+# most this many rows apart are merged rather than read separately
+SCAN_MAX_GAP_ROWS = 16
+
+# history_dir -> {"dates_size", "rows_by_date", "manifest"}
+_state: Dict[str, Dict[str, Any]] = {}
+
+
+def _date_to_ordinal(date_str: str) -> int:
+    return datetime.strptime(date_str, "%Y-%m-%d").date().toordinal()
+
+
+def _ordinal_to_date(ordinal: int) -> str:
+    return date.fromordinal(ordinal).strftime("%Y-%m-%d")
+
+
+def flatten_record(data: Dict[str, Any], prefix: Tuple[str, ...] = ()) -> Iterator[Tuple[Tuple[str, ...], Any]]:
+    """Yield (path, value) for every leaf of a record, e.g. (("exercises", "Grip", "sets"), 2).
+
+    Empty dicts are leaves themselves, so ``{"exercises": {}}`` keeps its key
+    through ``unflatten_record``.
+    """
+    for key, value in data.items():
+        path = prefix + (key,)
+        if isinstance(value, dict) and value:
+            yield from flatten_record(value, path)
+        else:
+            yield path, value
+
+
+def unflatten_record(record: Dict[Tuple[str, ...], Any]) -> Dict[str, Any]:
+    """Rebuild a record from the (path, value) pairs of ``flatten_record``."""
+    data: Dict[str, Any] = {}
+    for path, value in record.items():
+        node = data
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+        node[path[-1]] = value
+    return data
+
+
+def _load_manifest(history_dir: str) -> Dict[str, Any]:
+    filepath = os.path.join(history_dir, MANIFEST_FILE)
+    if os.path.exists(filepath):
+        with open(filepath, "r") as f:
+            manifest = json.load(f)
+    else:
+        manifest = {"columns": []}
+    manifest["by_path"] = {tuple(col["path"]): col for col in manifest["columns"]}
+    return manifest
+
+
+def _save_manifest(history_dir: str, manifest: Dict[str, Any], sync: bool = True) -> None:
+    filepath = os.path.join(history_dir, MANIFEST_FILE)
+    tmp_path = filepath + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"columns": manifest["columns"]}, f, indent=2)
+        if sync:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp_path, filepath)
+
+
+def _fsync_path(path: str) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass  # Directories can't be fsynced on every platform
+    finally:
+        os.close(fd)
+
+
+def _fsync_parent(path: str) -> None:
+    if os.name == "posix":
+        _fsync_path(os.path.dirname(os.path.abspath(path)))
+
+
+def sync_store(history_dir: str) -> None:
+    """Flush every file of the store to disk.
+
+    Used after appends made with ``sync=False`` so a bulk write pays for one
+    fsync per file instead of one per row.
+    """
+    if not os.path.exists(history_dir):
+        return
+    for filename in os.listdir(history_dir):
+        if not filename.endswith(".tmp"):
+            _fsync_path(os.path.join(history_dir, filename))
+    if os.name == "posix":
+        _fsync_path(history_dir)
+
+
+def _get_state(history_dir: str) -> Dict[str, Any]:
+    """Return the cached date index and manifest, refreshing them if another
+    writer has appended rows since they were last read."""
+    dates_path = os.path.join(history_dir, DATES_FILE)
+    size = os.path.getsize(dates_path) if os.path.exists(dates_path) else 0
+    state = _state.get(history_dir)
+    if state is not None and state["dates_size"] == size:
+        return state
+
+    if state is None or size < state["dates_size"]:
+        state = {"dates_size": 0, "rows_by_date": {}}
+    rows_by_date = state["rows_by_date"]
+    if size > state["dates_size"]:
+        with open(dates_path, "rb") as f:
+            f.seek(state["dates_size"])
+            chunk = f.read(size - state["dates_size"])
+        first_row = state["dates_size"] // DATE_CELL.size
+        for i, (ordinal,) in enumerate(DATE_CELL.iter_unpack(chunk)):
+            # Later rows supersede earlier ones for the same date
+            rows_by_date[ordinal] = first_row + i
+    state["dates_size"] = size
+    state["manifest"] = _load_manifest(history_dir)
+    _state[history_dir] = state
+    return state
+
+
+def row_count(history_dir: str) -> int:
+    """Number of rows appended to the store, including superseded ones."""
+    return _get_state(history_dir)["dates_size"] // DATE_CELL.size
+
+
+def _encode_cell(value: Any, heap_path: str, touched: Optional[List[str]] = None) -> bytes:
+    if isinstance(value, bool):
+        return CELL.pack(TAG_TRUE if value else TAG_FALSE, _EMPTY)
+    if isinstance(value, int) and -2**63 <= value < 2**63:
+        return CELL.pack(TAG_INT, _INT.pack(value))
+    if isinstance(value, float):
+        return CELL.pack(TAG_FLOAT, _FLOAT.pack(value))
+    if value is None:
+        return CELL.pack(TAG_NONE, _EMPTY)
+    if isinstance(value, dict) and not value:
+        return CELL.pack(TAG_EMPTY_DICT, _EMPTY)
+    if isinstance(value, str):
+        tag, payload = TAG_STR, value.encode("utf-8")
+    else:
+        tag, payload = TAG_JSON, json.dumps(value).encode("utf-8")
+    with open(heap_path, "ab") as f:
+        offset = f.tell()
+        f.write(payload)
+    if touched is not None:
+        touched.append(heap_path)
+    return CELL.pack(tag, _HEAP_REF.pack(offset, len(payload)))
+
+
+def _decode_cell(raw: bytes, heap) -> Tuple[int, Any]:
+    tag, payload = CELL.unpack(raw)
+    if tag == TAG_FALSE:
+        return tag, False
+    if tag == TAG_TRUE:
+        return tag, True
+    if tag == TAG_INT:
+        return tag, _INT.unpack(payload)[0]
+    if tag == TAG_FLOAT:
+        return tag, _FLOAT.unpack(payload)[0]
+    if tag in (TAG_STR, TAG_JSON):
+        offset, length = _HEAP_REF.unpack(payload)
+        heap.seek(offset)
+        text = heap.read(length).decode("utf-8")
+        return tag, text if tag == TAG_STR else json.loads(text)
+    if tag == TAG_EMPTY_DICT:
+        return tag, {}
+    return tag, None
+
+
+def _column_paths(history_dir: str, column: Dict[str, Any]) -> Tuple[str, str]:
+    base = os.path.join(history_dir, column["file"])
+    return base + ".col", base + ".heap"
+
+
+def append_day(date_str: str, data: Dict[str, Any], history_dir: str, sync: bool = True) -> int:
+    """Append a day's record as a new row.
+
+    Only the columns present in ``data`` are touched. The row becomes visible
+    once its date is appended to the dates column, so an interrupted append
+    leaves the previous version of the day in place. With ``sync`` the cells
+    are flushed to disk before the date is appended, and the date after.
+
+    Args:
+        date_str: Date in YYYY-MM-DD format
+        data: Daily tracking data to store
+        history_dir: Directory holding the column files
+        sync: fsync the written files; pass False for bulk writes and call
+            ``sync_store`` once at the end
+
+    Returns:
+        Row number the record was written to
+    """
+    os.makedirs(history_dir, exist_ok=True)
+    state = _get_state(history_dir)
+    manifest = state["manifest"]
+    row = state["dates_size"] // DATE_CELL.size
+
+    values = dict(flatten_record(data))
+    for path, column in manifest["by_path"].items():
+        col_path, _ = _column_paths(history_dir, column)
+        if path not in values and os.path.exists(col_path) and os.path.getsize(col_path) > row * CELL_SIZE:
+            # Leftover from an append that never reached the dates column
+            with open(col_path, "ab") as f:
+                f.truncate(row * CELL_SIZE)
+
+    new_columns = False
+    touched: List[str] = []
+    for path, value in values.items():
+        column = manifest["by_path"].get(path)
+        if column is None:
+            column = {"path": list(path), "file": f"c{len(manifest['columns']):05d}"}
+            manifest["columns"].append(column)
+            manifest["by_path"][path] = column
+            new_columns = True
+        col_path, heap_path = _column_paths(history_dir, column)
+        with open(col_path, "ab") as f:
+            cells = f.tell() // CELL_SIZE
+            if cells > row:
+                # Leftover from an append that never reached the dates column
+                f.truncate(row * CELL_SIZE)
+            elif cells < row:
+                f.write(MISSING_CELL * (row - cells))
+            f.write(_encode_cell(value, heap_path, touched))
+        touched.append(col_path)
+    if new_columns:
+        _save_manifest(history_dir, manifest, sync)
+    if sync:
+        for path in touched:
+            _fsync_path(path)
+
+    with open(os.path.join(history_dir, DATES_FILE), "ab") as f:
+        f.write(DATE_CELL.pack(_date_to_ordinal(date_str)))
+        if sync:
+            f.flush()
+            os.fsync(f.fileno())
+    return row
+
+
+def _select_columns(manifest: Dict[str, Any], fields: Optional[Iterable[str]]) -> List[Dict[str, Any]]:
+    if fields is None:
+        return list(manifest["columns"])
+    wanted = set(fields)
+    return [col for col in manifest["columns"] if col["path"][0] in wanted]
+
+
+def scan(history_dir: str, start: Optional[str] = None, end: Optional[str] = None,
+         fields: Optional[Iterable[str]] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yield (date_str, data) for every stored day in [start, end], in date order.
+
+    Each requested column file is opened once and only the cells of the
+    selected rows are read, one block per run of nearby rows: a day edited
+    after later days were stored doesn't pull in every row in between.
+
+    Args:
+        history_dir: Directory holding the column files
+        start: First date to include (YYYY-MM-DD), or None for no lower bound
+        end: Last date to include (YYYY-MM-DD), or None for no upper bound
+        fields: Top-level keys to read (e.g. ``["pain", "time_based"]``), or None for all
+    """
+    if not os.path.exists(os.path.join(history_dir, DATES_FILE)):
+        return
+    state = _get_state(history_dir)
+    lo = _date_to_ordinal(start) if start else None
+    hi = _date_to_ordinal(end) if end else None
+    selected = sorted(
+        (ordinal, row) for ordinal, row in state["rows_by_date"].items()
+        if (lo is None or ordinal >= lo) and (hi is None or ordinal <= hi)
+    )
+    if not selected:
+        return
+
+    rows = sorted(row for _, row in selected)
+    runs = _row_runs(rows)
+    records: Dict[int, Dict[Tuple[str, ...], Any]] = {row: {} for row in rows}
+    for column in _select_columns(state["manifest"], fields):
+        col_path, heap_path = _column_paths(history_dir, column)
+        heap = None
+        try:
+            with open(col_path, "rb") as f:
+                for run in runs:
+                    first = run[0]
+                    f.seek(first * CELL_SIZE)
+                    block = f.read((run[-1] - first + 1) * CELL_SIZE)
+                    count("bytes.read", len(block))
+                    for row in run:
+                        offset = (row - first) * CELL_SIZE
+                        raw = block[offset:offset + CELL_SIZE]
+                        if len(raw) < CELL_SIZE:
+                            continue
+                        if raw[0] in (TAG_STR, TAG_JSON) and heap is None:
+                            heap = open(heap_path, "rb")
+                        tag, value = _decode_cell(raw, heap)
+                        if tag != TAG_MISSING:
+                            records[row][tuple(column["path"])] = value
+            count("files.read")
+        finally:
+            if heap is not None:
+                heap.close()
+
+    for ordinal, row in selected:
+        yield _ordinal_to_date(ordinal), unflatten_record(records[row])
+
+
+def _row_runs(rows: List[int]) -> List[List[int]]:
+    """Split sorted row numbers into runs with gaps of at most SCAN_MAX_GAP_ROWS."""
+    runs = [[rows[0]]]
+    for row in rows[1:]:
+        if row - runs[-1][-1] > SCAN_MAX_GAP_ROWS:
+            runs.append([])
+        runs[-1].append(row)
+    return runs
+
+
+def read_day(date_str: str, history_dir: str) -> Optional[Dict[str, Any]]:
+    """Read one day's record, or None if the day is not in the store."""
+    for _, data in scan(history_dir, date_str, date_str):
+        return data
+    return None
+
+
+def locate(date_str: str, history_dir: str) -> Optional[int]:
+    """Row holding the latest version of a day, or None if it is not stored."""
+    if not os.path.exists(os.path.join(history_dir, DATES_FILE)):
+        return None
+    return _get_state(history_dir)["rows_by_date"].get(_date_to_ordinal(date_str))
+
+
+def has_day(date_str: str, history_dir: str) -> bool:
+    return locate(date_str, history_dir) is not None
+
+
+def import_json_dir(data_dir: str, history_dir: str, overwrite: bool = False) -> int:
+    """Import legacy ``YYYY-MM-DD.json`` files into the columnar store.
+
+    Args:
+        data_dir: Directory containing the per-day JSON files
+        history_dir: Directory holding the column files
+        overwrite: Re-import days that are already in the store
+
+    Returns:
+        Number of days imported
+    """
+    imported = 0
+    for filename in sorted(os.listdir(data_dir)):
+        if not DATE_FILE_PATTERN.match(filename):
+            continue
+        date_str = filename[:-5]
+        if not overwrite and has_day(date_str, history_dir):
+            continue
+        with open(os.path.join(data_dir, filename), "r") as f:
+            try:
+                data = json.load(f)
+            except json.JSONDecodeError:
+                print(f"Warning: Could not decode {filename}")
+                continue
+        append_day(date_str, data, history_dir, sync=False)
+        imported += 1
+    if imported:
+        sync_store(history_dir)
+    return imported
+
+
+def _swap_dirs(history_dir: str) -> Tuple[str, str]:
+    """The (new, old) directories a compaction swaps the store through."""
+    base = history_dir.rstrip(os.sep)
+    return base + ".new", base + ".old"
+
+
+def recover(history_dir: str) -> None:
+    """Finish or discard a compaction that was interrupted by a crash.
+
+    Call with the write lock held, before the store is read. The new store is
+    synced before the swap starts, so a crash between the two renames is
+    finished by moving it into place; leftovers of any other stage are
+    removed.
+    """
+    new_dir, old_dir = _swap_dirs(history_dir)
+    if not os.path.exists(history_dir) and os.path.exists(old_dir):
+        os.replace(new_dir if os.path.exists(new_dir) else old_dir, history_dir)
+        _fsync_parent(history_dir)
+    for stale in (new_dir, old_dir):
+        if os.path.exists(stale):
+            _remove_dir(stale)
+    _state.pop(history_dir, None)
+
+
+def compact(history_dir: str) -> int:
+    """Rewrite the store keeping only the latest row of each day, in date order.
+
+    The rows are written to a fresh directory which then replaces the store.
+    Call with the write lock held.
+
+    Returns:
+        Number of rows in the compacted store
+    """
+    recover(history_dir)
+    if not os.path.exists(os.path.join(history_dir, DATES_FILE)):
+        return 0
+    records = list(scan(history_dir))
+    new_dir, old_dir = _swap_dirs(history_dir)
+    for date_str, data in records:
+        append_day(date_str, data, new_dir, sync=False)
+    sync_store(new_dir)
+    _state.pop(new_dir, None)
+
+    os.replace(history_dir, old_dir)
+    os.replace(new_dir, history_dir)
+    _fsync_parent(history_dir)
+    _remove_dir(old_dir)
+    _state.pop(history_dir, None)
+    return len(records)
+
+
+def _map_file(path: str) -> Optional[mmap.mmap]:
+    """Map a file read-only, or None if it is missing or empty (which can't be mapped)."""
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except FileNotFoundError:
+        return None
+
+
+class MappedHistory(Mapping):
+    """Read-only, memory-mapped view of a store, as of when it was opened.
+
+    Behaves as a mapping of date string to that day's record, decoded only
+    when it is looked up. Column and heap files are mapped rather than read,
+    so the operating system pages in just the cells that are touched and
+    iterating a history much larger than memory keeps memory use flat. Only
+    the date index (8 bytes per stored day) is held on the heap.
+
+    Lookups don't move any file position, so a view can be shared between
+    threads. Close it (or use it as a context manager) to unmap the files.
+    """
+
+    def __init__(self, history_dir: str):
+        self.history_dir = history_dir
+        self._manifest = _load_manifest(history_dir)
+        self._maps: Dict[str, Optional[mmap.mmap]] = {}
+        self._maps_lock = threading.Lock()
+
+        ordinals = array("i")
+        with open(os.path.join(history_dir, DATES_FILE), "rb") as f:
+            raw = f.read()
+        ordinals.frombytes(raw[:len(raw) - len(raw) % DATE_CELL.size])
+        if sys.byteorder != "little":
+            ordinals.byteswap()
+        if all(ordinals[i] < ordinals[i + 1] for i in range(len(ordinals) - 1)):
+            # Compacted store: rows are already one per day in date order
+            self._ordinals, self._rows = ordinals, None
+        else:
+            rows_by_date = {ordinal: row for row, ordinal in enumerate(ordinals)}
+            self._ordinals = array("i", sorted(rows_by_date))
+            self._rows = array("q", (rows_by_date[ordinal] for ordinal in self._ordinals))
+
+    def __enter__(self) -> "MappedHistory":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Unmap every mapped file."""
+        with self._maps_lock:
+            maps, self._maps = self._maps, {}
+        for mapped in maps.values():
+            if mapped is not None:
+                mapped.close()
+
+    def _map(self, path: str) -> Optional[mmap.mmap]:
+        try:
+            return self._maps[path]
+        except KeyError:
+            pass
+        # Files are mapped on first use; the lock stops racing threads from
+        # each mapping the same file and leaking all but one of the maps
+        with self._maps_lock:
+            if path not in self._maps:
+                self._maps[path] = _map_file(path)
+            return self._maps[path]
+
+    def _span(self, start: Optional[str], end: Optional[str]) -> Tuple[int, int]:
+        lo = bisect.bisect_left(self._ordinals, _date_to_ordinal(start)) if start else 0
+        hi = bisect.bisect_right(self._ordinals, _date_to_ordinal(end)) if end else len(self._ordinals)
+        return lo, hi
+
+    def _row(self, i: int) -> int:
+        return i if self._rows is None else self._rows[i]
+
+    def _value(self, column: Dict[str, Any], row: int) -> Tuple[int, Any]:
+        col_path, heap_path = _column_paths(self.history_dir, column)
+        cells = self._map(col_path)
+        if cells is None or (row + 1) * CELL_SIZE > len(cells):
+            return TAG_MISSING, None
+        tag, payload = CELL.unpack_from(cells, row * CELL_SIZE)
+        if tag == TAG_INT:
+            return tag, _INT.unpack(payload)[0]
+        if tag == TAG_FLOAT:
+            return tag, _FLOAT.unpack(payload)[0]
+        if tag in (TAG_STR, TAG_JSON):
+            offset, length = _HEAP_REF.unpack(payload)
+            text = self._map(heap_path)[offset:offset + length].decode("utf-8")
+            return tag, text if tag == TAG_STR else json.loads(text)
+        if tag == TAG_EMPTY_DICT:
+            return tag, {}
+        return tag, tag == TAG_TRUE if tag in (TAG_TRUE, TAG_FALSE) else None
+
+    def _record(self, row: int, columns: List[Dict[str, Any]]) -> Dict[str, Any]:
+        record = {}
+        for column in columns:
+            tag, value = self._value(column, row)
+            if tag != TAG_MISSING:
+                record[tuple(column["path"])] = value
+        return unflatten_record(record)
+
+    def __getitem__(self, date_str: str) -> Dict[str, Any]:
+        i = bisect.bisect_left(self._ordinals, _date_to_ordinal(date_str))
+        if i == len(self._ordinals) or _ordinal_to_date(self._ordinals[i]) != date_str:
+            raise KeyError(date_str)
+        return self._record(self._row(i), self._manifest["columns"])
+
+    def __contains__(self, date_str: object) -> bool:
+        if not isinstance(date_str, str):
+            return False
+        try:
+            ordinal = _date_to_ordinal(date_str)
+        except ValueError:
+            return False
+        i = bisect.bisect_left(self._ordinals, ordinal)
+        return i < len(self._ordinals) and self._ordinals[i] == ordinal
+
+    def __iter__(self) -> Iterator[str]:
+        return self.dates()
+
+    def __len__(self) -> int:
+        return len(self._ordinals)
+
+    def dates(self, start: Optional[str] = None, end: Optional[str] = None) -> Iterator[str]:
+        """Stored dates in [start, end], in order."""
+        lo, hi = self._span(start, end)
+        return (_ordinal_to_date(self._ordinals[i]) for i in range(lo, hi))
+
+    def columns(self, fields: Optional[Iterable[str]] = None) -> List[Tuple[str, ...]]:
+        """Paths of the stored columns, e.g. ``("time_based", "Guitar")``."""
+        return [tuple(column["path"]) for column in _select_columns(self._manifest, fields)]
+
+    def records(self, start: Optional[str] = None, end: Optional[str] = None,
+                fields: Optional[Iterable[str]] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield (date_str, data) for the days in [start, end], decoding one day at a time.
+
+        Args:
+            start: First date (YYYY-MM-DD), or None for the earliest stored date
+            end: Last date (YYYY-MM-DD), or None for the latest stored date
+            fields: Top-level keys to read, or None for all
+        """
+        columns = _select_columns(self._manifest, fields)
+        lo, hi = self._span(start, end)
+        for i in range(lo, hi):
+            yield _ordinal_to_date(self._ordinals[i]), self._record(self._row(i), columns)
+
+    def column_values(self, path: Iterable[str], start: Optional[str] = None,
+                      end: Optional[str] = None) -> Iterator[Tuple[str, Any]]:
+        """Yield (date_str, value) for the days in [start, end] that have a value in one column."""
+        column = self._manifest["by_path"].get(tuple(path))
+        if column is None:
+            return
+        lo, hi = self._span(start, end)
+        for i in range(lo, hi):
+            tag, value = self._value(column, self._row(i))
+            if tag != TAG_MISSING:
+                yield _ordinal_to_date(self._ordinals[i]), value
+
+    def numeric(self, path: Iterable[str], start: Optional[str] = None, end: Optional[str] = None) -> array:
+        """One column as a float array aligned with ``dates(start, end)``.
+
+        Booleans become 0/1 and numeric strings are parsed; missing or
+        non-numeric cells are NaN. Only the selected cells are read.
+        """
+        lo, hi = self._span(start, end)
+        result = array("d", [float("nan")]) * (hi - lo)
+        column = self._manifest["by_path"].get(tuple(path))
+        if column is None:
+            return result
+        for i in range(lo, hi):
+            tag, value = self._value(column, self._row(i))
+            if tag in (TAG_INT, TAG_FLOAT, TAG_TRUE, TAG_FALSE):
+                result[i - lo] = value
+            elif tag == TAG_STR:
+                try:
+                    result[i - lo] = float(value)
+                except ValueError:
+                    pass
+        return result
+
+
+def open_mapped(history_dir: str) -> Optional[MappedHistory]:
+    """Open a memory-mapped view of a store, or None if the store is empty."""
+    if not os.path.exists(os.path.join(history_dir, DATES_FILE)):
+        return None
+    return MappedHistory(history_dir)
+
+
+def _remove_dir(path: str) -> None:
+    for filename in os.listdir(path):
+        os.remove(os.path.join(path, filename))
+    os.rmdir(path)
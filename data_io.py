@@ -1,8 +1,208 @@
+import base64
+import bisect
 import json
 import os
-from typing import Any, Optional, Dict
+import re
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Optional, Dict, Iterable, Iterator, List, Tuple, Union
 
-DATA_DIR = "data"
+import columnar
+from instrumentation import count, span, traced
+
+# Each profile (one tracked person) keeps its own data directory and catalog
+# files. The default profile uses data/ and the catalogs in the working
+# directory, or in TRACKER_HOME if set; a named profile has the same layout
+# under profiles/<name>/ there. Every module resolves its paths through
+# PROFILE_DIR and DATA_DIR, which use_profile() switches.
+HOME_DIR = os.environ.get("TRACKER_HOME", "")
+PROFILES_DIRNAME = "profiles"
+DEFAULT_PROFILE = "default"
+PROFILE_NAME_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]*$")
+
+def profile_dir(profile: str) -> str:
+    """Directory holding a profile's data directory and catalogs.
+
+    Raises:
+        ValueError: The name is not a valid profile name
+    """
+    if profile == DEFAULT_PROFILE:
+        return HOME_DIR
+    if not PROFILE_NAME_PATTERN.match(profile):
+        raise ValueError(f"Invalid profile name '{profile}': use letters, digits, '.', '_' and '-'")
+    return os.path.join(HOME_DIR, PROFILES_DIRNAME, profile)
+
+PROFILE = os.environ.get("TRACKER_PROFILE") or DEFAULT_PROFILE
+PROFILE_DIR = profile_dir(PROFILE)
+DATA_DIR = os.path.join(PROFILE_DIR, "data")
+
+# "json" keeps one data/YYYY-MM-DD.json file per day; "columnar" stores the
+# history in data/history/ (see columnar.py) and falls back to the per-day
+# files for days that have not been migrated yet. "compact" keeps one
+# data/YYYY-MM-DD.rec file per day in the binary layout of record_codec.py,
+# also falling back to the JSON files.
+STORAGE_BACKEND = os.environ.get("TRACKER_STORAGE", "json")
+COMPACT_EXTENSION = ".rec"
+COMPACT_FILE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}\.rec$")
+
+# Derived files (indexes, caches) live in their own directory so that writing
+# them does not touch the mtime of DATA_DIR, which is how the daily index
+# notices day files created or deleted behind its back.
+INDEX_DIRNAME = ".index"
+DAILY_INDEX_FILE = "daily.json"
+
+_daily_index_cache: Dict[str, Any] = {"path": None, "index": None, "dates": []}
+# Guards the cached index between threads; taken after the write lock
+_daily_index_lock = threading.RLock()
+# Dates loaded per query_range call when streaming records without a mapped view
+ITER_CHUNK_DAYS = 366
+# Streaming day files loads them on a pool: LOAD_BATCH_DAYS files per task,
+# at most LOAD_WINDOW_BATCHES tasks per worker queued or done but not yet
+# consumed. Ranges of up to one batch are loaded serially.
+LOAD_WORKERS = 8
+LOAD_BATCH_DAYS = 32
+LOAD_WINDOW_BATCHES = 2
+
+# Multi-file updates are written to the journal first and replayed by
+# recover_journal() if the process dies before all of them were applied.
+JOURNAL_FILE = "journal.json"
+# Above this many files a batch ends with one os.sync() instead of an fsync each
+BATCH_SYNC_ALL_THRESHOLD = 64
+
+# Writers in every process serialize on an advisory lock on this file
+LOCK_FILE = "write.lock"
+# Top-level field holding a daily record's version number; records saved
+# before versioning count as version 0
+VERSION_FIELD = "version"
+# Top-level field holding the medication schedule ({name: doses_per_day} of
+# the scheduled medications) in force when a day's medications were first
+# saved, so later catalog changes don't rewrite its expected doses
+SCHEDULE_FIELD = "medication_schedule"
+
+# Per thread: "transaction" holds the ops and commit callbacks of the open
+# transaction, "batch" the files, directories and stores whose fsync was deferred
+_write_state = threading.local()
+_lock_state: Dict[str, Any] = {"file": None, "depth": 0}
+_thread_lock = threading.RLock()
+
+class ConflictError(Exception):
+    """A record changed since it was read, so a compare-and-swap save was refused."""
+
+    def __init__(self, key: str, expected: int, actual: int):
+        super().__init__(f"{key} was changed by another writer (expected version {expected}, found {actual})")
+        self.key = key
+        self.expected = expected
+        self.actual = actual
+
+def _transaction() -> Optional[Dict[str, Any]]:
+    return getattr(_write_state, "transaction", None)
+
+def _batch() -> Optional[Dict[str, Any]]:
+    return getattr(_write_state, "batch", None)
+
+def _bulk() -> Optional[Dict[str, Any]]:
+    return getattr(_write_state, "bulk", None)
+
+def temp_path(filepath: str) -> str:
+    """Temporary file name next to ``filepath``, unique to this process and thread."""
+    return f"{filepath}.{os.getpid()}-{threading.get_ident()}.tmp"
+
+def _lock_file(f) -> None:
+    if os.name == "nt":
+        import msvcrt
+        while True:
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue  # LK_LOCK gives up after ~10 seconds; keep waiting
+    import fcntl
+    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+def _unlock_file(f) -> None:
+    if os.name == "nt":
+        import msvcrt
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        return
+    import fcntl
+    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+@contextmanager
+def write_lock():
+    """Hold the exclusive write lock on the data directory.
+
+    Every save takes this lock, so writers in other processes and threads
+    wait for each other. Readers don't need it: files are replaced
+    atomically and appended records only count once complete. The lock is
+    reentrant within a thread.
+    """
+    with _thread_lock:
+        if _lock_state["depth"] == 0:
+            os.makedirs(index_dir(), exist_ok=True)
+            f = open(os.path.join(index_dir(), LOCK_FILE), "a+b")
+            try:
+                with span("data_io.write_lock_wait"):
+                    _lock_file(f)
+            except BaseException:
+                f.close()
+                raise
+            _lock_state["file"] = f
+        _lock_state["depth"] += 1
+        try:
+            yield
+        finally:
+            _lock_state["depth"] -= 1
+            if _lock_state["depth"] == 0:
+                f, _lock_state["file"] = _lock_state["file"], None
+                try:
+                    _unlock_file(f)
+                finally:
+                    f.close()
+
+def use_profile(profile: str) -> None:
+    """Point this process at another profile's data directory and catalogs.
+
+    Raises:
+        ValueError: The name is not a valid profile name
+        RuntimeError: A write lock or transaction is open in this process
+    """
+    profile_dir(profile)
+    with _thread_lock:
+        if _lock_state["depth"] or _transaction() is not None:
+            raise RuntimeError("Can't switch profiles while a write is in progress")
+        _set_profile(profile)
+        os.makedirs(DATA_DIR, exist_ok=True)
+        _daily_index_cache.update(path=None, index=None, dates=[])
+
+def _set_profile(profile: str) -> None:
+    """Point the path globals at a profile.
+
+    Also the initializer of loader processes, so it takes no locks: a forked
+    child may inherit them held by another thread.
+    """
+    global PROFILE, PROFILE_DIR, DATA_DIR
+    directory = profile_dir(profile)
+    PROFILE, PROFILE_DIR, DATA_DIR = profile, directory, os.path.join(directory, "data")
+
+def profile_path(filename: str) -> str:
+    """Path of a file kept at the top of the active profile, such as a catalog."""
+    return os.path.join(PROFILE_DIR, filename)
+
+def record_version(data: Optional[Dict[str, Any]]) -> int:
+    """Version number of a loaded daily record (0 if it doesn't exist)."""
+    return (data or {}).get(VERSION_FIELD, 0)
+
+def merge_record(existing: Dict[str, Any], data: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge new values into a daily record; sections such as "time_based" are merged key by key."""
+    merged = dict(existing)
+    for key, value in data.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = dict(merged[key], **value)
+        else:
+            merged[key] = value
+    return merged
 
 def load_json(filename: str) -> Optional[Dict[str, Any]]:
     """Load JSON data from file.
@@ -14,20 +214,364 @@ def load_json(filename: str) -> Optional[Dict[str, Any]]:
         Parsed JSON data as dictionary, or None if file doesn't exist
     """
     if os.path.exists(filename):
-        with open(filename, "r") as f:
-            return json.load(f)
+        with open(filename, "rb") as f:
+            raw = f.read()
+        count("files.read")
+        count("bytes.read", len(raw))
+        count("json.parses")
+        return json.loads(raw)
     return None
 
 def save_json(filename: str, data: Dict[str, Any]) -> None:
     """Save data to JSON file.
-    
+
+    The file is replaced atomically (see ``write_file``), so a crash leaves
+    either the old or the new contents, never a truncated file.
+
     Args:
         filename: Path to save file
         data: Dictionary to save as JSON
     """
-    with open(filename, "w") as f:
-        json.dump(data, f, indent=2)
+    write_file(filename, json.dumps(data, indent=2))
+
+def _fsync_path(path: str) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+        count("fsyncs")
+    except OSError:
+        pass  # Directories can't be fsynced on every platform
+    finally:
+        os.close(fd)
+
+def _fsync_dir(path: str) -> None:
+    if os.name == "posix":
+        _fsync_path(os.path.dirname(os.path.abspath(path)))
+
+def sync_file(f, path: Optional[str] = None) -> None:
+    """Flush an open file to disk, or defer it to the end of the current batch.
+
+    Args:
+        f: Open file
+        path: Name the file is renamed to before the batch ends, if any; the
+            deferred fsync must find it there
+    """
+    f.flush()
+    batch = _batch()
+    if batch is not None:
+        batch["files"].add(os.path.abspath(path or f.name))
+    else:
+        os.fsync(f.fileno())
+        count("fsyncs")
+
+def _synced_replace(tmp_path: str, filepath: str) -> None:
+    os.replace(tmp_path, filepath)
+    batch = _batch()
+    if batch is not None:
+        batch["dirs"].add(os.path.dirname(os.path.abspath(filepath)))
+    else:
+        _fsync_dir(filepath)
+
+def atomic_write(filepath: str, content: Union[str, bytes]) -> None:
+    """Replace a file's contents via a temporary file, fsync and rename.
+
+    Args:
+        filepath: File to write
+        content: New contents; str is written as UTF-8
+    """
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    tmp_path = temp_path(filepath)
+    with open(tmp_path, "wb") as f:
+        f.write(content)
+        sync_file(f, filepath)
+    _synced_replace(tmp_path, filepath)
+    count("files.written")
+    count("bytes.written", len(content))
+
+def write_file(filepath: str, content: Union[str, bytes]) -> None:
+    """Atomically replace a file, as part of the open transaction if any."""
+    transaction = _transaction()
+    if transaction is None:
+        atomic_write(filepath, content)
+        return
+    op = {"op": "write", "path": os.path.abspath(filepath)}
+    if isinstance(content, bytes):
+        try:
+            op["content"] = content.decode("utf-8")
+        except UnicodeDecodeError:
+            op["base64"] = base64.b64encode(content).decode("ascii")
+    else:
+        op["content"] = content
+    transaction["ops"].append(op)
+
+def append_file(filepath: str, content: bytes, on_written: Optional[Callable[[int], None]] = None) -> None:
+    """Durably append newline-terminated records to a log file.
+
+    A record torn by an interrupted append (bytes after the file's last
+    newline) is cut off first, so the new records never run on from it.
+
+    Args:
+        filepath: File to append to
+        content: Bytes to append, ending with a newline
+        on_written: Called with the offset the bytes were written at, once they
+            are on disk (after commit when a transaction is open)
+    """
+    transaction = _transaction()
+    if transaction is None:
+        with open(filepath, "r+b" if os.path.exists(filepath) else "wb") as f:
+            offset = _complete_size(f)
+            f.seek(offset)
+            f.truncate()
+            f.write(content)
+            sync_file(f)
+        count("bytes.written", len(content))
+        if on_written is not None:
+            on_written(offset)
+        return
+    path = os.path.abspath(filepath)
+    pending = transaction["append_sizes"]
+    if path not in pending:
+        pending[path] = 0
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                pending[path] = _complete_size(f)
+    offset = pending[path]
+    pending[path] += len(content)
+    # Replaying the op truncates the file to the offset, dropping any torn record
+    transaction["ops"].append({"op": "append", "path": path, "offset": offset,
+                               "content": content.decode("utf-8")})
+    if on_written is not None:
+        transaction["callbacks"].append(lambda: on_written(offset))
+
+def _complete_size(f, chunk_size: int = 64 * 1024) -> int:
+    """Size of an open log file up to and including its last newline."""
+    end = f.seek(0, os.SEEK_END)
+    position = end
+    while position > 0:
+        start = max(0, position - chunk_size)
+        f.seek(start)
+        newline = f.read(position - start).rfind(b"\n")
+        if newline != -1:
+            return start + newline + 1
+        position = start
+    return 0
+
+def scan_log(log, start: int = 0) -> Iterator[Tuple[int, int, Optional[Dict[str, Any]]]]:
+    """Read the JSON-lines records of an open log file from byte offset ``start``.
+
+    A final line without a newline (a record still being written, or torn)
+    is not yielded. A line that can't be decoded, such as a torn record that
+    an older version appended after, is reported and yielded as None so the
+    caller can skip it and still advance past it.
+
+    Yields:
+        (offset, length, record or None) for each complete line
+    """
+    log.seek(start)
+    offset = start
+    for line in log:
+        if not line.endswith(b"\n"):
+            break
+        try:
+            record = json.loads(line)
+        except ValueError:
+            print(f"Warning: Skipping unreadable record at byte {offset} of {getattr(log, 'name', 'log')}")
+            record = None
+        yield offset, len(line), record
+        offset += len(line)
+
+def pending_versions() -> Optional[Dict[str, int]]:
+    """Versions given to records saved in the open transaction.
+
+    Keyed by the date for daily records and "diary:<date>" for diary entries.
+    Until the commit the stored version of such a record still lags behind,
+    so a second save of it in the same transaction must number its version
+    from here. None when no transaction is open.
+    """
+    transaction = _transaction()
+    return transaction["versions"] if transaction is not None else None
+
+def after_commit(callback: Callable[[], None]) -> None:
+    """Run ``callback`` once the open transaction is committed, or now if none is open.
+
+    Used for derived state (indexes, caches) that must only reflect data that
+    actually reached the disk.
+    """
+    transaction = _transaction()
+    if transaction is None:
+        callback()
+    else:
+        transaction["callbacks"].append(callback)
+
+@contextmanager
+def batch_writes():
+    """Defer fsyncs until the end of the block.
+
+    Bulk writes then pay for one fsync per file (or a single os.sync() for
+    large batches) instead of one per write. Files written inside the block
+    are only guaranteed to be durable once it exits.
+    """
+    if _batch() is not None:
+        yield
+        return
+    batch = _write_state.batch = _new_batch()
+    try:
+        yield
+    finally:
+        _write_state.batch = None
+        _flush_batch(batch)
+
+@contextmanager
+def _synced_batch():
+    """Batch the writes of the block and flush them when it completes.
+
+    Unlike ``batch_writes`` this also flushes inside an enclosing batch, for
+    journal replays: the journal may only be removed once the writes it
+    covers are on disk.
+    """
+    outer = _batch()
+    batch = _write_state.batch = _new_batch()
+    try:
+        yield
+    finally:
+        _write_state.batch = outer
+    _flush_batch(batch)
+
+@contextmanager
+def bulk_writes():
+    """Hold the write lock and batch a large number of saves.
+
+    On top of deferring fsyncs (see ``batch_writes``), the date index and the
+    aggregate rollups are written once at the end instead of after every
+    saved day, so importing years of history stays linear.
+    """
+    if _bulk() is not None:
+        yield
+        return
+    with write_lock(), batch_writes():
+        bulk = _write_state.bulk = {"index": None, "dates": []}
+        try:
+            yield
+        finally:
+            _write_state.bulk = None
+            if bulk["index"] is not None:
+                _write_index_file(os.path.join(index_dir(), DAILY_INDEX_FILE), bulk["index"])
+            if bulk["dates"]:
+                import aggregates
+                aggregates.recompute(bulk["dates"])
+
+def _new_batch() -> Dict[str, Any]:
+    return {"files": set(), "dirs": set(), "stores": set()}
+
+def _flush_batch(batch: Dict[str, Any]) -> None:
+    if len(batch["files"]) > BATCH_SYNC_ALL_THRESHOLD and hasattr(os, "sync"):
+        os.sync()
+        return
+    for path in batch["files"]:
+        if os.path.exists(path):
+            _fsync_path(path)
+    for store in batch["stores"]:
+        columnar.sync_store(store)
+    for directory in batch["dirs"]:
+        if os.name == "posix" and os.path.exists(directory):
+            _fsync_path(directory)
+
+def _journal_path() -> str:
+    return os.path.join(DATA_DIR, JOURNAL_FILE)
+
+@contextmanager
+def transaction():
+    """Group writes to several files into one all-or-nothing update.
+
+    The write lock is held for the whole block, so version checks made in it
+    stay valid until the commit. Writes made through ``save_json``, ``write_file``, ``append_file`` and
+    ``save_daily_data`` inside the block are collected, written to the journal
+    and only then applied. If the process dies while applying them,
+    ``recover_journal`` finishes the job on the next start. If the block
+    raises, nothing is written.
+    """
+    if _transaction() is not None:
+        yield  # Nested: part of the enclosing transaction
+        return
+    with write_lock():
+        transaction = _write_state.transaction = {"ops": [], "callbacks": [], "append_sizes": {}, "versions": {}}
+        try:
+            yield
+        finally:
+            _write_state.transaction = None
+
+        if transaction["ops"]:
+            journal_path = _journal_path()
+            atomic_write(journal_path, json.dumps({"ops": transaction["ops"]}))
+            with _synced_batch():
+                for op in transaction["ops"]:
+                    _apply_op(op)
+            os.remove(journal_path)
+            _fsync_dir(journal_path)
+        # Derived state (date index, rollups) is written once for the whole transaction
+        with bulk_writes():
+            for callback in transaction["callbacks"]:
+                callback()
+
+def _apply_op(op: Dict[str, Any]) -> None:
+    """Apply one journaled write. Every op can be replayed safely."""
+    if op["op"] == "write":
+        atomic_write(op["path"], base64.b64decode(op["base64"]) if "base64" in op else op["content"])
+    elif op["op"] == "append":
+        # Rewrite from the recorded offset so a replay never duplicates a record
+        with open(op["path"], "r+b" if os.path.exists(op["path"]) else "wb") as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(min(op["offset"], f.tell()))
+            f.truncate()
+            f.write(op["content"].encode("utf-8"))
+            sync_file(f)
+    elif op["op"] == "columnar":
+        if columnar.read_day(op["date"], op["history_dir"]) != op["data"]:
+            _columnar_append(op["date"], op["data"], op["history_dir"])
+    else:
+        raise ValueError(f"Unknown journal op '{op['op']}'")
+
+def _columnar_append(date_str: str, data: Dict[str, Any], store: str) -> int:
+    batch = _batch()
+    if batch is not None:
+        batch["stores"].add(store)
+    return columnar.append_day(date_str, data, store, sync=batch is None)
+
+def recover_journal() -> int:
+    """Finish a transaction (or a history compaction) interrupted by a crash.
 
+    Call once at startup before reading any data. A journal that was itself
+    only partly written is discarded, since none of its writes had started.
+
+    Returns:
+        Number of writes replayed
+    """
+    journal_path = _journal_path()
+    if not os.path.exists(DATA_DIR):
+        return 0
+    with write_lock():
+        columnar.recover(history_dir())
+        for filename in os.listdir(DATA_DIR):
+            if filename.startswith(JOURNAL_FILE + ".") and filename.endswith(".tmp"):
+                os.remove(os.path.join(DATA_DIR, filename))
+        if not os.path.exists(journal_path):
+            return 0
+        try:
+            journal = load_json(journal_path)
+        except json.JSONDecodeError:
+            journal = None
+        replayed = 0
+        if journal:
+            with _synced_batch():
+                for op in journal["ops"]:
+                    _apply_op(op)
+                    replayed += 1
+        os.remove(journal_path)
+        _fsync_dir(journal_path)
+    return replayed
+
+@traced("data_io.load_daily_data")
 def load_daily_data(date_str: str) -> Optional[Dict[str, Any]]:
     """Load daily tracking data for given date.
     
@@ -37,40 +581,483 @@ def load_daily_data(date_str: str) -> Optional[Dict[str, Any]]:
     Returns:
         Daily tracking data or None if not found
     """
-    filepath = os.path.join(DATA_DIR, f"{date_str}.json")
-    return load_json(filepath)
+    if STORAGE_BACKEND == "columnar":
+        data = columnar.read_day(date_str, history_dir())
+        if data is not None:
+            return data
+    elif STORAGE_BACKEND == "compact":
+        data = _load_day_file(f"{date_str}{COMPACT_EXTENSION}")
+        if data is not None:
+            return data
+    return _load_day_file(f"{date_str}.json")
+
+def _day_filename(date_str: str) -> str:
+    """Name of the file a day is saved to by the json and compact backends."""
+    return f"{date_str}{COMPACT_EXTENSION if STORAGE_BACKEND == 'compact' else '.json'}"
+
+def _save_day_file(date_str: str, data: Dict[str, Any]) -> None:
+    filepath = os.path.join(DATA_DIR, _day_filename(date_str))
+    if STORAGE_BACKEND == "compact":
+        import record_codec
+        record_codec.save(filepath, data)
+    else:
+        save_json(filepath, data)
+
+def _load_day_file(filename: str) -> Optional[Dict[str, Any]]:
+    """Load a day file of either format, through the record cache (see record_cache.py).
+
+    Returns:
+        The record, or None if the file doesn't exist
+
+    Raises:
+        ValueError: The file is corrupt
+    """
+    filepath = os.path.join(DATA_DIR, filename)
+    if filename.endswith(COMPACT_EXTENSION):
+        import record_codec
+        load = record_codec.load
+    else:
+        load = load_json
+    # The cache module (and its exit hook) is only loaded once a day file is read
+    import record_cache
+    return record_cache.load(filename, filepath, load)
 
-def save_daily_data(date_str: str, data: Dict[str, Any]) -> None:
+@traced("data_io.save_daily_data")
+def save_daily_data(date_str: str, data: Dict[str, Any], expected_version: Optional[int] = None) -> int:
     """Save daily tracking data for given date.
-    
+
+    Each save bumps the record's version (stored in its "version" field).
+    Passing the version the data was loaded at turns the save into a
+    compare-and-swap that fails if another writer saved the day in between.
+
     Args:
         date_str: Date in YYYY-MM-DD format
         data: Daily tracking data to save
+        expected_version: Version the record must still be at (0 for a day
+            that must not exist yet), or None to overwrite unconditionally
+
+    Returns:
+        The record's new version
+
+    Raises:
+        ConflictError: The stored version is not ``expected_version``
+    """
+    with write_lock():
+        existing = load_daily_data(date_str) or {}
+        current = record_version(existing)
+        versions = pending_versions()
+        if versions is not None:
+            current = versions.get(date_str, current)
+        if expected_version is not None and current != expected_version:
+            raise ConflictError(date_str, expected_version, current)
+        data = dict(data)
+        data[VERSION_FIELD] = current + 1
+        if SCHEDULE_FIELD not in data:
+            # Edits keep the schedule stamped when the day's medications were first saved
+            if SCHEDULE_FIELD in existing:
+                data[SCHEDULE_FIELD] = existing[SCHEDULE_FIELD]
+            elif "medications" in data:
+                data[SCHEDULE_FIELD] = medication_schedule()
+
+        def update_derived(row: Optional[int] = None) -> None:
+            # Runs inside the bulk write transaction() opens for its callbacks
+            _index_day(_daily_index(), date_str, data, row=row)
+            _rollup_day(date_str, data)
+
+        transaction = _transaction()
+        if transaction is not None:
+            transaction["versions"][date_str] = data[VERSION_FIELD]
+            # Applied when the transaction commits; see transaction()
+            if STORAGE_BACKEND == "columnar":
+                transaction["ops"].append({"op": "columnar", "date": date_str, "data": data,
+                                           "history_dir": os.path.abspath(history_dir())})
+                transaction["callbacks"].append(lambda: update_derived(columnar.locate(date_str, history_dir())))
+            else:
+                _save_day_file(date_str, data)
+                transaction["callbacks"].append(update_derived)
+            return data[VERSION_FIELD]
+
+        # Load the index first so the write below isn't mistaken for an outside change
+        index = _daily_index()
+        if STORAGE_BACKEND == "columnar":
+            row = _columnar_append(date_str, data, history_dir())
+            _index_day(index, date_str, data, row=row)
+        else:
+            _save_day_file(date_str, data)
+            _index_day(index, date_str, data)
+        _rollup_day(date_str, data)
+        return data[VERSION_FIELD]
+
+def _rollup_day(date_str: str, data: Dict[str, Any]) -> None:
+    import aggregates
+    bulk = _bulk()
+    if bulk is not None:
+        # Week and month rollups are merged once when the bulk write ends
+        aggregates.on_day_saved(date_str, data, defer=True)
+        bulk["dates"].append(date_str)
+    else:
+        # Only this day's rollups (and its week and month) are recomputed
+        aggregates.on_day_saved(date_str, data)
+
+def history_dir() -> str:
+    """Directory holding the columnar history store."""
+    return os.path.join(DATA_DIR, columnar.HISTORY_DIRNAME)
+
+def index_dir() -> str:
+    """Directory holding derived index and cache files."""
+    return os.path.join(DATA_DIR, INDEX_DIRNAME)
+
+def _write_index_file(filepath: str, data: Dict[str, Any]) -> None:
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    tmp_path = temp_path(filepath)
+    with open(tmp_path, "w") as f:
+        f.write(json.dumps(data, separators=(",", ":")))
+    os.replace(tmp_path, filepath)
+
+def _store_rows() -> int:
+    if STORAGE_BACKEND != "columnar" or not os.path.exists(history_dir()):
+        return 0
+    return columnar.row_count(history_dir())
+
+def _refresh_daily_index(index: Dict[str, Any]) -> None:
+    """Bring the index in line with the day files and the columnar store."""
+    os.makedirs(index_dir(), exist_ok=True)
+    days = index["days"]
+    on_disk = {}
+    # Sorted so a day's .rec file (the compact backend's) wins over its .json file
+    for filename in sorted(os.listdir(DATA_DIR)):
+        if columnar.DATE_FILE_PATTERN.match(filename) or (
+                STORAGE_BACKEND == "compact" and COMPACT_FILE_PATTERN.match(filename)):
+            on_disk[filename[:10]] = filename
+    for date_str in [d for d, entry in days.items() if "file" in entry and entry["file"] != on_disk.get(d)]:
+        del days[date_str]
+    for date_str, filename in on_disk.items():
+        if date_str in days:
+            continue
+        try:
+            data = _load_day_file(filename) or {}
+        except ValueError:
+            print(f"Warning: Could not decode {filename}")
+            continue
+        days[date_str] = {"file": filename, "fields": sorted(data)}
+
+    store_rows = _store_rows()
+    if store_rows != index.get("store_rows", 0):
+        for date_str, data in columnar.scan(history_dir()):
+            days[date_str] = {"row": columnar.locate(date_str, history_dir()), "fields": sorted(data)}
+        index["store_rows"] = store_rows
+    index["data_dir_mtime_ns"] = os.stat(DATA_DIR).st_mtime_ns
+
+def _daily_index() -> Dict[str, Any]:
+    """Return the persistent date index, refreshing it if the data changed.
+
+    The index maps each date to where its record is stored (a day file or a
+    row of the columnar store) and which top-level fields it contains. A
+    query costs one stat of DATA_DIR unless day files were added or removed.
+    """
+    with _daily_index_lock:
+        filepath = os.path.join(index_dir(), DAILY_INDEX_FILE)
+        cache = _daily_index_cache
+        index = cache["index"] if cache["path"] == filepath else None
+        if index is None:
+            try:
+                index = load_json(filepath)
+            except json.JSONDecodeError:
+                index = None
+            if not index or index.get("backend") != STORAGE_BACKEND:
+                index = {"backend": STORAGE_BACKEND, "days": {}, "store_rows": 0}
+
+        if (index.get("data_dir_mtime_ns") != os.stat(DATA_DIR).st_mtime_ns
+                or index.get("store_rows", 0) != _store_rows()):
+            _refresh_daily_index(index)
+            _write_index_file(filepath, index)
+            cache["dates"] = []
+
+        if cache["path"] != filepath or cache["index"] is not index or not cache["dates"]:
+            cache.update(path=filepath, index=index, dates=sorted(index["days"]))
+        return index
+
+def _index_day(index: Dict[str, Any], date_str: str, data: Dict[str, Any], row: Optional[int] = None) -> None:
+    entry = {"row": row} if row is not None else {"file": _day_filename(date_str)}
+    entry["fields"] = sorted(data)
+    with _daily_index_lock:
+        if date_str not in index["days"]:
+            bisect.insort(_daily_index_cache["dates"], date_str)
+        index["days"][date_str] = entry
+        index["store_rows"] = _store_rows()
+        index["data_dir_mtime_ns"] = os.stat(DATA_DIR).st_mtime_ns
+    bulk = _bulk()
+    if bulk is not None:
+        bulk["index"] = index  # Written when the bulk write ends
+    else:
+        _write_index_file(os.path.join(index_dir(), DAILY_INDEX_FILE), index)
+
+def daily_index_version() -> Optional[List[int]]:
+    """Changes whenever the date index is rewritten, i.e. when days are saved, added or removed."""
+    _daily_index()
+    try:
+        stat = os.stat(os.path.join(index_dir(), DAILY_INDEX_FILE))
+    except FileNotFoundError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+def rebuild_daily_index() -> None:
+    """Discard the persistent date index and rebuild it from the stored data."""
+    filepath = os.path.join(index_dir(), DAILY_INDEX_FILE)
+    if os.path.exists(filepath):
+        os.remove(filepath)
+    _daily_index_cache.update(path=None, index=None, dates=[])
+    _daily_index()
+
+def list_dates(start: Optional[str] = None, end: Optional[str] = None,
+               fields: Optional[Iterable[str]] = None) -> List[str]:
+    """List stored dates in [start, end] without loading any records.
+
+    Args:
+        start: First date (YYYY-MM-DD), or None for the earliest stored date
+        end: Last date (YYYY-MM-DD), or None for the latest stored date
+        fields: Only include dates whose record has at least one of these top-level fields
+
+    Returns:
+        Sorted list of date strings
+    """
+    with _daily_index_lock:
+        index = _daily_index()
+        dates = _daily_index_cache["dates"]
+        lo = bisect.bisect_left(dates, start) if start else 0
+        hi = bisect.bisect_right(dates, end) if end else len(dates)
+        selected = dates[lo:hi]
+        if fields is not None:
+            wanted = set(fields)
+            selected = [d for d in selected if wanted.intersection(index["days"][d]["fields"])]
+    return selected
+
+@traced("data_io.query_range")
+def query_range(start: Optional[str] = None, end: Optional[str] = None,
+                fields: Optional[Iterable[str]] = None,
+                with_schedule: bool = False) -> List[Tuple[str, Dict[str, Any]]]:
+    """Load daily records for the dates in [start, end].
+
+    Uses the date index so only records inside the range (and, when ``fields``
+    is given, only records containing one of those fields) are read.
+
+    Args:
+        start: First date (YYYY-MM-DD), or None for the earliest stored date
+        end: Last date (YYYY-MM-DD), or None for the latest stored date
+        fields: Top-level keys to return (e.g. ``["pain", "time_based"]``), or None for all
+        with_schedule: Keep the medication schedule stored with each day
+            (SCHEDULE_FIELD), which is left out of whole records by default
+
+    Returns:
+        List of (date_str, data) tuples sorted by date
+    """
+    fields = list(fields) if fields is not None else None
+    dates = list_dates(start, end, fields)
+    if not dates:
+        return []
+    days = _daily_index()["days"]
+
+    results = {}
+    if any("row" in days[d] for d in dates):
+        results.update(columnar.scan(history_dir(), dates[0], dates[-1], fields))
+    for date_str in dates:
+        if date_str in results or "file" not in days[date_str]:
+            continue
+        try:
+            data = _load_day_file(days[date_str]["file"])
+        except ValueError:
+            print(f"Warning: Could not decode {days[date_str]['file']}")
+            continue
+        if data is None:
+            continue
+        if fields is not None:
+            data = {key: value for key, value in data.items() if key in fields}
+        results[date_str] = data
+    if fields is None and not with_schedule:
+        for data in results.values():
+            data.pop(SCHEDULE_FIELD, None)
+    return [(date_str, results[date_str]) for date_str in dates if date_str in results]
+
+def iter_records(start: Optional[str] = None, end: Optional[str] = None,
+                 fields: Optional[Iterable[str]] = None, workers: Optional[int] = None,
+                 processes: bool = False) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Stream daily records for the dates in [start, end], in date order.
+
+    Unlike ``query_range`` this never holds the whole range in memory: records
+    come from the memory-mapped store one day at a time when the whole
+    history is in it (see ``open_history_view``). Otherwise day files are
+    read and parsed on a pool of workers a batch at a time, with a bounded
+    number of batches in flight, while this generator hands out the loaded
+    batches in order. Records are yielded as stored, medication schedule
+    included, so exports keep it.
+
+    Args:
+        start: First date (YYYY-MM-DD), or None for the earliest stored date
+        end: Last date (YYYY-MM-DD), or None for the latest stored date
+        fields: Top-level keys to return, or None for all
+        workers: Pool size for loading day files, defaults to LOAD_WORKERS; 1 loads them serially
+        processes: Parse in worker processes instead of threads, so parsing
+            isn't limited to one core (each record is then pickled back)
+    """
+    view = open_history_view()
+    if view is not None:
+        with view:
+            for date_str, data in view.records(start, end, fields):
+                if data or fields is None:  # query_range skips days without the fields
+                    yield date_str, data
+        return
+    fields = list(fields) if fields is not None else None
+    dates = list_dates(start, end, fields)
+    workers = workers or LOAD_WORKERS
+    if workers <= 1 or len(dates) <= LOAD_BATCH_DAYS:
+        for i in range(0, len(dates), ITER_CHUNK_DAYS):
+            chunk = dates[i:i + ITER_CHUNK_DAYS]
+            yield from query_range(chunk[0], chunk[-1], fields, with_schedule=True)
+        return
+    yield from _iter_loaded(dates, fields, workers, processes)
+
+def _load_day_batch(filenames: List[str], fields: Optional[List[str]]) -> List[Tuple[str, Optional[Dict[str, Any]]]]:
+    """Load day files on a pool worker: (filename, data) for each, data False if it can't be decoded."""
+    loaded = []
+    for filename in filenames:
+        try:
+            data = _load_day_file(filename)
+        except ValueError:
+            loaded.append((filename, False))
+            continue
+        if data is not None and fields is not None:
+            data = {key: value for key, value in data.items() if key in fields}
+        loaded.append((filename, data))
+    return loaded
+
+def _iter_loaded(dates: List[str], fields: Optional[List[str]], workers: int,
+                 processes: bool) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    # concurrent.futures pulls in multiprocessing, too slow to import at startup
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+    days = _daily_index()["days"]
+    batches = iter([dates[i:i + LOAD_BATCH_DAYS] for i in range(0, len(dates), LOAD_BATCH_DAYS)])
+    if processes:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_set_profile, initargs=(PROFILE,))
+    else:
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="load")
+    pending: "deque[Tuple[List[str], Any]]" = deque()
+
+    def submit_next() -> None:
+        batch = next(batches, None)
+        if batch is not None:
+            filenames = [days[d]["file"] for d in batch if "file" in days[d]]
+            pending.append((batch, executor.submit(_load_day_batch, filenames, fields) if filenames else None))
+
+    try:
+        for _ in range(workers * LOAD_WINDOW_BATCHES):
+            submit_next()
+        while pending:
+            batch, future = pending.popleft()
+            loaded = {}
+            for filename, data in future.result() if future is not None else ():
+                if data is False:
+                    print(f"Warning: Could not decode {filename}")
+                elif data is not None:
+                    loaded[filename[:10]] = data
+            if any("row" in days[d] for d in batch):
+                # Columnar rows are read here: the store's state isn't shared across threads
+                loaded.update(columnar.scan(history_dir(), batch[0], batch[-1], fields))
+            submit_next()
+            for date_str in batch:
+                if date_str in loaded:
+                    yield date_str, loaded[date_str]
+    finally:
+        for _, future in pending:
+            if future is not None:
+                future.cancel()
+        executor.shutdown(wait=True)
+
+def open_history_view() -> Optional["columnar.MappedHistory"]:
+    """Open a read-only, memory-mapped view of the whole history.
+
+    Only available with the columnar backend once every stored day is in the
+    columnar store; days still kept as per-day JSON files would be missing
+    from the view.
+
+    Returns:
+        A ``columnar.MappedHistory`` (close it when done), or None
+    """
+    if STORAGE_BACKEND != "columnar":
+        return None
+    if any("file" in entry for entry in _daily_index()["days"].values()):
+        return None
+    return columnar.open_mapped(history_dir())
+
+def migrate_to_columnar(overwrite: bool = False) -> int:
+    """Import the per-day JSON files into the columnar history store.
+
+    The JSON files are left in place so they stay readable by the json backend.
+
+    Args:
+        overwrite: Re-import days that are already in the store
+
+    Returns:
+        Number of days imported
+    """
+    with write_lock():
+        return columnar.import_json_dir(DATA_DIR, history_dir(), overwrite=overwrite)
+
+def migrate_to_compact(overwrite: bool = False) -> int:
+    """Write a compact .rec file for every per-day JSON file.
+
+    The JSON files are left in place so they stay readable by the json backend.
+
+    Args:
+        overwrite: Rewrite days that already have a .rec file
+
+    Returns:
+        Number of days converted
     """
-    filepath = os.path.join(DATA_DIR, f"{date_str}.json")
-    save_json(filepath, data)
+    import record_codec
+    converted = 0
+    with write_lock(), batch_writes():
+        for filename in sorted(os.listdir(DATA_DIR)):
+            if not columnar.DATE_FILE_PATTERN.match(filename):
+                continue
+            target = os.path.join(DATA_DIR, filename[:10] + COMPACT_EXTENSION)
+            if os.path.exists(target) and not overwrite:
+                continue
+            try:
+                data = load_json(os.path.join(DATA_DIR, filename))
+            except json.JSONDecodeError:
+                print(f"Warning: Could not decode {filename}")
+                continue
+            atomic_write(target, record_codec.encode(data))
+            converted += 1
+    return converted
 
-def load_medications(filename: str = "medications.json") -> Optional[Dict[str, Any]]:
+def load_medications(filename: Optional[str] = None) -> Optional[Dict[str, Any]]:
     """Load medications data from file.
     
     Args:
-        filename: Path to JSON file containing medications
+        filename: Path to JSON file containing medications, defaults to the profile's catalog
         
     Returns:
         List of medication objects or None if not found
     """
-    data = load_json(filename)
+    from catalogs import MEDICATIONS_FILE, load_catalog
+    data = load_catalog(filename or profile_path(MEDICATIONS_FILE))
     return data.get("medications") if data else None
 
-def save_medications(medications: Dict[str, Any], filename: str = "medications.json") -> None:
+def medication_schedule() -> Dict[str, int]:
+    """Doses per day of every scheduled medication in the catalog; as-needed ones have none."""
+    return {med["name"]: med["doses_per_day"] for med in load_medications() or [] if not med.get("prn")}
+
+def save_medications(medications: Dict[str, Any], filename: Optional[str] = None) -> None:
     """Save medications data to file.
     
     Args:
         medications: Medications data to save
-        filename: Path to save file
+        filename: Path to save file, defaults to the profile's catalog
     """
-    data = {"medications": medications}
-    save_json(filename, data)
+    from catalogs import MEDICATIONS_FILE, save_catalog
+    save_catalog(filename or profile_path(MEDICATIONS_FILE), {"medications": medications})
 
 # Initialize data directory if it doesn't exist
 if not os.path.exists(DATA_DIR):
@@ -1,69 +1,250 @@
 import json
 import os
-from typing import Dict, Optional
-from prompt_toolkit import PromptSession, HTML
-from prompt_toolkit.history import InMemoryHistory
-from prompt_toolkit.key_binding import KeyBindings
-from prompt_toolkit.styles import Style
+import threading
+from typing import Dict, Optional, Tuple
 
-DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+import data_io
+from data_io import INDEX_DIRNAME
+from instrumentation import traced
+
+# Entries are appended to diary.log as one JSON record per line; the latest
+# record for a date wins. The date -> (offset, length) index is persisted
+# lazily: records appended after it was written are re-indexed from the log
+# tail on the next start.
+DIARY_JSON_FILE = "diary_entries.json"
+DIARY_LOG_FILE = "diary.log"
+DIARY_INDEX_FILE = "diary.json"
+INDEX_FLUSH_BYTES = 64 * 1024
+COMPACT_MIN_BYTES = 256 * 1024
+
+_state: Optional[Dict] = None
+# Guards _state between threads; taken after the write lock
+_state_lock = threading.Lock()
 
 def load_json(filepath: str) -> Dict:
     with open(filepath, 'r') as f:
         return json.load(f)
 
 def save_json(filepath: str, data: Dict) -> None:
-    with open(filepath, 'w') as f:
-        json.dump(data, f, indent=4)
+    data_io.write_file(filepath, json.dumps(data, indent=4))
+
+def _diary_json_path() -> str:
+    return os.path.join(data_io.DATA_DIR, DIARY_JSON_FILE)
+
+def _log_path() -> str:
+    return os.path.join(data_io.DATA_DIR, DIARY_LOG_FILE)
+
+def _index_path() -> str:
+    return os.path.join(data_io.DATA_DIR, INDEX_DIRNAME, DIARY_INDEX_FILE)
+
+def _save_index(state: Dict) -> None:
+    filepath = _index_path()
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    tmp_path = data_io.temp_path(filepath)
+    with open(tmp_path, 'w') as f:
+        f.write(json.dumps({"log_id": state["log_id"], "log_size": state["log_size"],
+                              "garbage": state["garbage"], "offsets": state["offsets"]}, separators=(",", ":")))
+    os.replace(tmp_path, filepath)
+    state["indexed_size"] = state["log_size"]
+
+def _scan_log(state: Dict, log, start: int) -> None:
+    """Index every complete record in the log from byte offset ``start``."""
+    offsets = state["offsets"]
+    state["log_size"] = start
+    for offset, length, record in data_io.scan_log(log, start):
+        state["log_size"] = offset + length
+        if record is None:
+            state["garbage"] += length
+            continue
+        previous = offsets.get(record["date"])
+        if previous:
+            state["garbage"] += previous[1]
+        offsets[record["date"]] = [offset, length]
+
+def log_id() -> int:
+    """Identity of the current diary log file; changes when it is compacted."""
+    return os.stat(_log_path()).st_ino
+
+def log_position() -> Tuple[int, int]:
+    """Return (log_id, size in bytes) of the indexed part of the diary log."""
+    state = _get_state()
+    return state["log_id"], state["log_size"]
+
+def iter_log(start: int = 0):
+    """Yield (end_offset, date_str, entry) for each complete record in the
+    diary log from byte offset ``start``, in the order they were written."""
+    with open(_log_path(), 'rb') as log:
+        for offset, length, record in data_io.scan_log(log, start):
+            if record is not None:
+                yield offset + length, record["date"], record["entry"]
 
+def _import_legacy_entries() -> None:
+    """Seed the log from diary_entries.json the first time the log is used.
+
+    The log is created under the write lock, so when several processes start
+    at once only the first imports; once it exists the entries are never
+    imported again. The JSON file itself is left untouched.
+    """
+    with data_io.write_lock():
+        if os.path.exists(_log_path()):
+            return
+        legacy = {}
+        if os.path.exists(_diary_json_path()):
+            legacy = load_json(_diary_json_path()) or {}
+        data_io.atomic_write(_log_path(), b"".join(_encode_record(date_str, legacy[date_str], 1)
+                                                   for date_str in sorted(legacy)))
+
+def _encode_record(date_str: str, entry: str, version: int) -> bytes:
+    return (json.dumps({"date": date_str, "entry": entry, "version": version}) + "\n").encode("utf-8")
+
+def _get_state() -> Dict:
+    """Return the offset index for the diary log, catching up on any records
+    appended since the index was last persisted."""
+    global _state
+    if not os.path.exists(data_io.DATA_DIR):
+        os.makedirs(data_io.DATA_DIR)
+    if not os.path.exists(_log_path()):
+        _import_legacy_entries()
+
+    with _state_lock:
+        stat = os.stat(_log_path())
+        size = stat.st_size
+        state = _state if _state and _state["path"] == _log_path() else None
+        if state is None and os.path.exists(_index_path()):
+            try:
+                saved = load_json(_index_path())
+                state = dict(saved, path=_log_path(), indexed_size=saved["log_size"])
+            except (ValueError, KeyError):
+                state = None
+        if state is None or state.get("log_id") != stat.st_ino or state["log_size"] > size:
+            # No usable index, or the log was replaced underneath it
+            state = {"path": _log_path(), "log_id": stat.st_ino, "log_size": 0,
+                     "indexed_size": 0, "garbage": 0, "offsets": {}}
+        if state["log_size"] < size:
+            with open(_log_path(), 'rb') as log:
+                _scan_log(state, log, state["log_size"])
+        _state = state
+        return state
+
+def _read_record(log, offset: int, length: int) -> Dict:
+    log.seek(offset)
+    return json.loads(log.read(length))
+
+@traced("diary.load_entries")
 def load_diary_entries() -> Dict[str, str]:
-    """Load all diary entries from diary_entries.json
+    """Load all diary entries.
 
     Returns:
         Dictionary mapping dates to diary entries
     """
     try:
-        # First ensure directory exists
-        if not os.path.exists(DATA_DIR):
-            os.makedirs(DATA_DIR)
-
-        filepath = os.path.join(DATA_DIR, "diary_entries.json")
-
-        # Explicitly create file if it doesn't exist
-        if not os.path.exists(filepath):
-            print("Creating new diary_entries.json file")  # Debug
-            with open(filepath, 'w') as f:
-                json.dump({}, f)
-
-        # Now load the file with additional verification
-        if os.path.exists(filepath):
-            entries = load_json(filepath)
-            return entries if entries else {}
-        else:
-            raise FileNotFoundError(f"Failed to create {filepath}")
-
+        state = _get_state()
+        entries = {}
+        with open(_log_path(), 'rb') as log:
+            for offset, _, record in data_io.scan_log(log):
+                if offset >= state["log_size"]:
+                    break
+                if record is not None:
+                    entries[record["date"]] = record["entry"]
+        return dict(sorted(entries.items()))
     except Exception as e:
         print(f"Error in load_diary_entries: {e}")
         return {}
 
-def save_diary_entry(date_str: str, entry: str) -> None:
+def compact_diary() -> None:
+    """Rewrite the diary log keeping only the latest record for each date."""
+    with data_io.write_lock():
+        state = _get_state()
+        tmp_path = data_io.temp_path(_log_path())
+        offsets = {}
+        with open(_log_path(), 'rb') as source, open(tmp_path, 'wb') as log:
+            for date_str in sorted(state["offsets"]):
+                offset, length = state["offsets"][date_str]
+                source.seek(offset)
+                offsets[date_str] = [log.tell(), length]
+                log.write(source.read(length))
+            size = log.tell()
+            data_io.sync_file(log, _log_path())
+        os.replace(tmp_path, _log_path())
+        with _state_lock:
+            state.update(log_id=log_id(), log_size=size, garbage=0, offsets=offsets)
+        _save_index(state)
+
+    import diary_search
+    diary_search.on_log_compacted()
+
+@traced("diary.save_entry")
+def save_diary_entry(date_str: str, entry: str, expected_version: Optional[int] = None) -> int:
     """Save a diary entry for a specific date
 
+    The entry is appended to the diary log; older versions are dropped the
+    next time the log is compacted. Each save bumps the entry's version;
+    passing the version it was read at makes the save a compare-and-swap.
+
     Args:
         date_str: Date in YYYY-MM-DD format
         entry: Diary entry text to save
+        expected_version: Version the entry must still be at (0 for no entry),
+            or None to overwrite unconditionally
+
+    Returns:
+        The entry's new version
+
+    Raises:
+        data_io.ConflictError: The stored version is not ``expected_version``
     """
     try:
-        entries = load_diary_entries()
-        print(f"DEBUG: Entries before save: {entries}") #Added log
-        entries[date_str] = entry
-        save_json(os.path.join(DATA_DIR, "diary_entries.json"), entries)
-        print(f"DEBUG: Entries after save: {entries}") #Added log
-        print(f"Diary entry saved for {date_str}")  # Debug output
+        with data_io.write_lock():
+            return _append_entry(date_str, entry, expected_version)
+    except data_io.ConflictError:
+        raise
     except Exception as e:
         print(f"Error saving diary entry: {e}")
         raise
 
+def _append_entry(date_str: str, entry: str, expected_version: Optional[int]) -> int:
+    # Catches up on records other processes appended before the lock was taken
+    state = _get_state()
+    current = _entry_version(state, date_str)
+    # A save earlier in the same transaction isn't in the log yet
+    versions = data_io.pending_versions()
+    key = f"diary:{date_str}"
+    if versions is not None:
+        current = versions.get(key, current)
+    if expected_version is not None and current != expected_version:
+        raise data_io.ConflictError(f"Diary entry {date_str}", expected_version, current)
+    record = _encode_record(date_str, entry, current + 1)
+    if versions is not None:
+        versions[key] = current + 1
+
+    def on_written(offset: int) -> None:
+        with _state_lock:
+            previous = state["offsets"].get(date_str)
+            if previous:
+                state["garbage"] += previous[1]
+            state["offsets"][date_str] = [offset, len(record)]
+            state["log_size"] = offset + len(record)
+
+        import diary_search
+        diary_search.on_entry_saved(date_str, entry, state["log_id"], offset, state["log_size"])
+
+        if state["log_size"] >= COMPACT_MIN_BYTES and state["garbage"] * 2 > state["log_size"]:
+            compact_diary()
+        elif state["log_size"] - state["indexed_size"] >= INDEX_FLUSH_BYTES:
+            _save_index(state)
+
+    # Inside data_io.transaction() the append (and on_written) wait for the commit
+    data_io.append_file(_log_path(), record, on_written)
+    return current + 1
+
+def _entry_version(state: Dict, date_str: str) -> int:
+    location = state["offsets"].get(date_str)
+    if location is None:
+        return 0
+    with open(_log_path(), 'rb') as log:
+        return _read_record(log, *location).get("version", 0)
+
+@traced("diary.get_entry")
 def get_diary_entry(date_str: str) -> Optional[str]:
     """Get diary entry for a specific date
 
@@ -73,8 +254,23 @@ def get_diary_entry(date_str: str) -> Optional[str]:
     Returns:
         Diary entry text or None if not found
     """
-    entries = load_diary_entries()
-    return entries.get(date_str)
+    return get_diary_record(date_str)[0]
+
+def get_diary_record(date_str: str) -> Tuple[Optional[str], int]:
+    """Get a diary entry together with its version
+
+    Args:
+        date_str: Date in YYYY-MM-DD format
+
+    Returns:
+        (entry text or None, version); the version is 0 if there is no entry
+    """
+    location = _get_state()["offsets"].get(date_str)
+    if location is None:
+        return None, 0
+    with open(_log_path(), 'rb') as log:
+        record = _read_record(log, *location)
+    return record["entry"], record.get("version", 0)
 
 def prompt_diary_entry(existing: Optional[str] = None) -> str:
     """Prompt user for diary entry (multi-line input) using prompt_toolkit,
@@ -83,6 +279,11 @@ def prompt_diary_entry(existing: Optional[str] = None) -> str:
     Args:
         existing: Previous entry to show as reference
     """
+    # prompt_toolkit is slow to import, so only load it when an entry is edited
+    from prompt_toolkit import PromptSession, HTML
+    from prompt_toolkit.history import InMemoryHistory
+    from prompt_toolkit.key_binding import KeyBindings
+
     session = PromptSession(history=InMemoryHistory())
     
     kb = KeyBindings()
@@ -0,0 +1,312 @@
+import json
+import math
+import os
+import re
+import shlex
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import data_io
+import diary
+from data_io import INDEX_DIRNAME
+
+# Positional inverted index over the diary log: term -> {date: [positions]}.
+# Like the diary offset index it is persisted lazily and catches up on
+# records appended to the log since it was last written.
+SEARCH_INDEX_FILE = "diary_search.json"
+INDEX_FLUSH_BYTES = 64 * 1024
+
+# BM25 ranking parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+POSSESSIVE_PATTERN = re.compile(r"['\u2019]s\b")
+STEM_SUFFIXES = ("ings", "ing", "edly", "ed", "ies", "es", "s", "ly")
+SNIPPET_CHARS = 80
+
+_state: Optional[Dict[str, Any]] = None
+# Guards _state between threads; taken after the write lock
+_lock = threading.Lock()
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase word tokens ("Nina's house" -> ["nina", "house"])."""
+    text = POSSESSIVE_PATTERN.sub("", text.lower())
+    return TOKEN_PATTERN.findall(text.replace("'", "").replace("\u2019", ""))
+
+
+def stem(token: str) -> str:
+    """Strip a common English suffix ("burning" -> "burn", "guitars" -> "guitar")."""
+    for suffix in STEM_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            return token[:-len(suffix)] + ("y" if suffix == "ies" else "")
+    return token
+
+
+def _index_path() -> str:
+    return os.path.join(data_io.DATA_DIR, INDEX_DIRNAME, SEARCH_INDEX_FILE)
+
+
+def _empty_state(log_id: int) -> Dict[str, Any]:
+    return {"log_id": log_id, "log_size": 0, "saved_size": 0, "docs": {}, "postings": {}, "stems": None}
+
+
+def _remove_doc(state: Dict[str, Any], date_str: str) -> None:
+    if date_str not in state["docs"]:
+        return
+    del state["docs"][date_str]
+    for term in state["doc_terms"].pop(date_str, ()):
+        postings = state["postings"][term]
+        postings.pop(date_str, None)
+        if not postings:
+            del state["postings"][term]
+            if state["stems"] is not None:
+                state["stems"].get(stem(term), set()).discard(term)
+
+
+def _add_doc(state: Dict[str, Any], date_str: str, entry: str) -> None:
+    _remove_doc(state, date_str)
+    tokens = tokenize(entry)
+    if not tokens:
+        return
+    state["docs"][date_str] = len(tokens)
+    for position, term in enumerate(tokens):
+        postings = state["postings"].setdefault(term, {})
+        if not postings and state["stems"] is not None:
+            state["stems"].setdefault(stem(term), set()).add(term)
+        postings.setdefault(date_str, []).append(position)
+    state["doc_terms"][date_str] = list(set(tokens))
+
+
+def _catch_up(state: Dict[str, Any]) -> None:
+    for end, date_str, entry in diary.iter_log(state["log_size"]):
+        _add_doc(state, date_str, entry)
+        state["log_size"] = end
+
+
+def _save(state: Dict[str, Any]) -> None:
+    filepath = _index_path()
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    tmp_path = data_io.temp_path(filepath)
+    with open(tmp_path, "w") as f:
+        f.write(json.dumps({"log_id": state["log_id"], "log_size": state["log_size"],
+                              "docs": state["docs"], "postings": state["postings"]}, separators=(",", ":")))
+    os.replace(tmp_path, filepath)
+    state["saved_size"] = state["log_size"]
+
+
+@contextmanager
+def _locked():
+    """Hold _lock. The diary log is opened first: creating it takes the write
+    lock, which must not be taken while holding _lock."""
+    diary.log_position()
+    with _lock:
+        yield
+
+
+def _get_state() -> Dict[str, Any]:
+    """Load the search index, rebuilding it if the diary log was replaced and
+    indexing any records appended since it was saved. Called with _lock held."""
+    global _state
+    log_id, log_size = diary.log_position()
+
+    state = _state
+    if state is None and os.path.exists(_index_path()):
+        try:
+            with open(_index_path(), "r") as f:
+                saved = json.load(f)
+            state = dict(saved, saved_size=saved["log_size"], stems=None)
+        except (ValueError, KeyError):
+            state = None
+    if state is None or state["log_id"] != log_id or state["log_size"] > log_size:
+        state = _empty_state(log_id)
+    if "doc_terms" not in state:
+        doc_terms: Dict[str, List[str]] = {}
+        for term, postings in state["postings"].items():
+            for date_str in postings:
+                doc_terms.setdefault(date_str, []).append(term)
+        state["doc_terms"] = doc_terms
+
+    if state["log_size"] < log_size:
+        _catch_up(state)
+    if state["log_size"] - state["saved_size"] >= INDEX_FLUSH_BYTES or not os.path.exists(_index_path()):
+        _save(state)
+    _state = state
+    return state
+
+
+def on_entry_saved(date_str: str, entry: str, log_id: int, start: int, end: int) -> None:
+    """Apply a just-written diary record to the index if it is loaded in this
+    process. Otherwise the record is picked up from the log on next load."""
+    with _lock:
+        state = _state
+        if state is None or state["log_id"] != log_id or state["log_size"] != start:
+            return
+        _add_doc(state, date_str, entry)
+        state["log_size"] = end
+        if state["log_size"] - state["saved_size"] >= INDEX_FLUSH_BYTES:
+            _save(state)
+
+
+def on_log_compacted() -> None:
+    """Re-index after the diary log has been rewritten by compaction."""
+    global _state
+    with _lock:
+        if _state is not None:
+            _state = None
+            if os.path.exists(_index_path()):
+                os.remove(_index_path())
+            _get_state()
+
+
+def rebuild_index() -> None:
+    """Discard the persisted search index and rebuild it from the diary log."""
+    global _state
+    with _locked():
+        _state = None
+        if os.path.exists(_index_path()):
+            os.remove(_index_path())
+        _get_state()
+
+
+def parse_query(query: str) -> Tuple[List[str], List[List[str]]]:
+    """Split a query into single terms and quoted phrases.
+
+    ``burning "palexia ir"`` -> (["burning"], [["palexia", "ir"]])
+    """
+    terms: List[str] = []
+    phrases: List[List[str]] = []
+    try:
+        parts = shlex.split(query)
+    except ValueError:
+        parts = query.split()
+    for part in parts:
+        tokens = tokenize(part)
+        if len(tokens) > 1:
+            phrases.append(tokens)
+        else:
+            terms.extend(tokens)
+    return terms, phrases
+
+
+def _variants(state: Dict[str, Any], term: str, use_stem: bool) -> Set[str]:
+    if not use_stem:
+        return {term} if term in state["postings"] else set()
+    if state["stems"] is None:
+        stems: Dict[str, Set[str]] = {}
+        for indexed in state["postings"]:
+            stems.setdefault(stem(indexed), set()).add(indexed)
+        state["stems"] = stems
+    return set(state["stems"].get(stem(term), ()))
+
+
+def _positions(state: Dict[str, Any], variants: Iterable[str]) -> Dict[str, Set[int]]:
+    merged: Dict[str, Set[int]] = {}
+    for term in variants:
+        for date_str, positions in state["postings"][term].items():
+            merged.setdefault(date_str, set()).update(positions)
+    return merged
+
+
+def _phrase_matches(state: Dict[str, Any], phrase: List[str], use_stem: bool) -> Dict[str, int]:
+    """Return {date: number of occurrences} for documents containing the phrase."""
+    per_word = [_positions(state, _variants(state, word, use_stem)) for word in phrase]
+    candidates = set(per_word[0])
+    for positions in per_word[1:]:
+        candidates &= set(positions)
+    matches = {}
+    for date_str in candidates:
+        count = sum(
+            1 for start in per_word[0][date_str]
+            if all(start + i in per_word[i][date_str] for i in range(1, len(phrase)))
+        )
+        if count:
+            matches[date_str] = count
+    return matches
+
+
+def _snippet(text: str, words: List[str]) -> str:
+    lowered = text.lower()
+    hits = [lowered.find(word) for word in words if lowered.find(word) >= 0]
+    start = max(0, min(hits) - SNIPPET_CHARS // 2) if hits else 0
+    snippet = text[start:start + SNIPPET_CHARS].replace("\n", " ")
+    return ("..." if start > 0 else "") + snippet + ("..." if start + SNIPPET_CHARS < len(text) else "")
+
+
+def search(query: str, start: Optional[str] = None, end: Optional[str] = None,
+           use_stem: bool = False, limit: Optional[int] = 20) -> List[Dict[str, Any]]:
+    """Search diary entries.
+
+    Every term and quoted phrase in the query must appear in an entry for it
+    to match. Matches are ranked by BM25.
+
+    Args:
+        query: Search terms, with quoted phrases, e.g. ``palexia "burning pain"``
+        start: Only include entries on or after this date (YYYY-MM-DD)
+        end: Only include entries on or before this date (YYYY-MM-DD)
+        use_stem: Match other forms of each word ("burn" also finds "burning")
+        limit: Maximum number of results, or None for all
+
+    Returns:
+        List of {"date", "score", "snippet"} dictionaries, best match first
+    """
+    terms, phrases = parse_query(query)
+    if not terms and not phrases:
+        return []
+
+    with _locked():
+        state = _get_state()
+
+        # term frequency per (clause, document); a clause is a term or a phrase
+        clause_hits: List[Dict[str, int]] = []
+        for term in terms:
+            clause_hits.append({
+                date_str: len(positions)
+                for date_str, positions in _positions(state, _variants(state, term, use_stem)).items()
+            })
+        for phrase in phrases:
+            clause_hits.append(_phrase_matches(state, phrase, use_stem))
+
+        candidates = set(clause_hits[0])
+        for hits in clause_hits[1:]:
+            candidates &= set(hits)
+        candidates = {
+            d for d in candidates
+            if (start is None or d >= start) and (end is None or d <= end)
+        }
+        if not candidates:
+            return []
+
+        docs = state["docs"]
+        total_docs = len(docs)
+        avg_len = sum(docs.values()) / total_docs
+        scores = {}
+        for date_str in candidates:
+            score = 0.0
+            for hits in clause_hits:
+                idf = math.log(1 + (total_docs - len(hits) + 0.5) / (len(hits) + 0.5))
+                tf = hits[date_str]
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * docs[date_str] / avg_len)
+                score += idf * tf * (BM25_K1 + 1) / (tf + norm)
+            scores[date_str] = score
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        if limit is not None:
+            ranked = ranked[:limit]
+    words = terms + [" ".join(phrase) for phrase in phrases]
+    return [
+        {"date": date_str, "score": round(score, 4),
+         "snippet": _snippet(diary.get_diary_entry(date_str) or "", words)}
+        for date_str, score in ranked
+    ]
+
+
+def print_results(results: List[Dict[str, Any]]) -> None:
+    if not results:
+        print("No matching diary entries found")
+        return
+    for result in results:
+        print(f"\n{result['date']}  (score {result['score']:.2f})")
+        print(f"  {result['snippet']}")
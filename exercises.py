@@ -1,7 +1,5 @@
 from typing import Dict, Any
-from data_io import load_json, save_json
-
-EXERCISES_FILE = "exercises.json"
+from catalogs import EXERCISES_FILE, catalog_path, get_exercises, save_catalog
 
 def load_exercises() -> Dict[str, Any]:
     """Load exercises data from file or create default if not exists.
@@ -9,19 +7,7 @@ def load_exercises() -> Dict[str, Any]:
     Returns:
         Dictionary of exercises with their default repeats and sets
     """
-    data = load_json(EXERCISES_FILE)
-    if data is None:
-        # Default exercises dictionary (name → defaults)
-        data = {
-            "Scapula pull (3 secs)": {"repeats": 10, "sets": 1},
-            "Shoulder Shrug (downward arm extension)": {"repeats": 10, "sets": 1},
-            "Grip Rotation (500g)": {"repeats": 10, "sets": 1},
-            "Thoracic ext w/ foam roller": {"repeats": 10, "sets": 1},
-            "Wall Roller Shoulder Flexion": {"repeats": 10, "sets": 1},
-            "Diagonal Cervical Neck Tilt (RHS)": {"repeats": 10, "sets": 1}
-        }
-        save_json(EXERCISES_FILE, data)
-    return data
+    return get_exercises()
 
 def add_new_exercise(exercises: Dict[str, Any]) -> None:
     """Add a new exercise to the exercises dictionary.
@@ -50,6 +36,6 @@ def add_new_exercise(exercises: Dict[str, Any]) -> None:
                 print("Invalid input, please enter two numbers separated by a space.")
         
         exercises[name] = {"repeats": repeats, "sets": sets}
-        save_json(EXERCISES_FILE, exercises)
+        save_catalog(catalog_path(EXERCISES_FILE), exercises)
         print(f"Exercise '{name}' added.")
         return
\ No newline at end of file
@@ -0,0 +1,188 @@
+"""Timing spans and counters for finding where the time goes.
+
+Tracing is off unless TRACKER_TRACE is set or ``tracker.py --trace`` is
+passed. With it off, ``span()`` returns a shared no-op context manager and
+``count()`` returns straight away, so instrumented code pays one flag check.
+
+Spans nest per thread and are aggregated by their path, so the seven day
+loads under a weekly report show up as one line with a call count:
+
+    report.weekly                     1 call     812.40 ms  (self 0.31 ms)
+      report.html                     1 call      58.12 ms  (self 0.90 ms)
+        data_io.query_range           1 call       2.05 ms  (self 0.41 ms)
+      report.pdf                      1 call     753.97 ms  (self 753.97 ms)
+
+Spans opened in other threads (the PDF renderer's browsers, API workers)
+start their own trees. Counters such as files opened, bytes read and JSON
+parses are totals for the process.
+
+TRACKER_TRACE=1 (or ``--trace``) prints the tree and counters to stderr at
+exit; any other value (``--trace FILE``) is a path to write them to as JSON.
+"""
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+TRACE_ENV = "TRACKER_TRACE"
+STDERR_VALUES = ("1", "true", "yes", "-")
+
+_enabled = False
+_lock = threading.Lock()
+_local = threading.local()
+# Span path (outermost name first) -> [calls, total seconds]
+_spans: Dict[Tuple[str, ...], List[float]] = {}
+_counters: Dict[str, int] = {}
+_output: Optional[str] = None
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("name", "path", "started")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        self.path = (stack[-1] if stack else ()) + (self.name,)
+        stack.append(self.path)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.started
+        _local.stack.pop()
+        with _lock:
+            totals = _spans.get(self.path)
+            if totals is None:
+                _spans[self.path] = [1, elapsed]
+            else:
+                totals[0] += 1
+                totals[1] += elapsed
+        return False
+
+
+def enabled() -> bool:
+    """Whether spans and counters are being recorded."""
+    return _enabled
+
+
+def span(name: str):
+    """Context manager timing the block under ``name``, nested in the current span."""
+    return _Span(name) if _enabled else _NULL_SPAN
+
+
+def traced(name: str) -> Callable:
+    """Decorator timing every call of a function as a span."""
+    def decorate(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(name: str, amount: int = 1) -> None:
+    """Add ``amount`` to a counter."""
+    if _enabled:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + amount
+
+
+def enable(output: Optional[str] = None) -> None:
+    """Start recording.
+
+    Args:
+        output: Where to report at exit: "-" for a tree on stderr, a file
+            path for JSON, or None to leave reporting to the caller
+    """
+    global _enabled, _output
+    if output is not None and _output is None:
+        atexit.register(_report_at_exit)
+    if output is not None:
+        _output = output
+    _enabled = True
+
+
+def disable() -> None:
+    """Stop recording; what was recorded so far is kept."""
+    global _enabled
+    _enabled = False
+
+
+def reset() -> None:
+    """Discard every recorded span and counter."""
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+
+
+def snapshot() -> Dict[str, Any]:
+    """Recorded spans and counters as JSON-ready data."""
+    with _lock:
+        spans = [{"path": list(path), "calls": int(calls), "seconds": round(seconds, 6)}
+                 for path, (calls, seconds) in _spans.items()]
+        counters = dict(sorted(_counters.items()))
+    spans.sort(key=lambda s: s["path"])
+    return {"spans": spans, "counters": counters}
+
+
+def format_report() -> str:
+    """The span tree, slowest first at each level, followed by the counters."""
+    with _lock:
+        spans = {path: tuple(totals) for path, totals in _spans.items()}
+        counters = dict(sorted(_counters.items()))
+    children: Dict[Tuple[str, ...], List[Tuple[str, ...]]] = {}
+    for path in spans:
+        children.setdefault(path[:-1], []).append(path)
+    lines = []
+
+    def add(path: Tuple[str, ...]) -> None:
+        calls, seconds = spans[path]
+        self_seconds = seconds - sum(spans[child][1] for child in children.get(path, ()))
+        label = "  " * (len(path) - 1) + path[-1]
+        lines.append(f"{label:<40} {int(calls):>6} call{'s' if calls != 1 else ' '} "
+                     f"{seconds * 1000:10.2f} ms  (self {self_seconds * 1000:.2f} ms)")
+        for child in sorted(children.get(path, ()), key=lambda p: -spans[p][1]):
+            add(child)
+
+    for root in sorted(children.get((), ()), key=lambda p: -spans[p][1]):
+        add(root)
+    if counters:
+        lines.append("")
+        lines.extend(f"{name:<40} {value:>12}" for name, value in counters.items())
+    return "\n".join(lines) if lines else "Nothing was traced."
+
+
+def _report_at_exit() -> None:
+    if _output in STDERR_VALUES:
+        print("\n" + format_report(), file=sys.stderr)
+    elif _output:
+        with open(_output, "w") as f:
+            json.dump(snapshot(), f, indent=2)
+
+
+if os.environ.get(TRACE_ENV, "") not in ("", "0"):
+    enable(os.environ[TRACE_ENV])
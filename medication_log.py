@@ -0,0 +1,311 @@
+import bisect
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import data_io
+from catalogs import get_medications
+from data_io import INDEX_DIRNAME
+from instrumentation import traced
+
+# Individual doses (and timestamped pain readings, which dose-to-pain latency
+# is measured against) are appended to medications.log, one JSON record per
+# line:
+#
+#   {"id": 7, "time": "2025-03-02T08:15:00", "kind": "dose", "medication": "Pregabalin (150mg)", "doses": 1}
+#   {"id": 8, "time": "2025-03-02T09:40:00", "kind": "pain", "level": 6}
+#   {"id": 7, "kind": "removed"}
+#
+# Events are kept in memory sorted by time, with the doses of each day summed
+# per medication, so range queries are a bisect and day lookups a dict get.
+# The parsed events are persisted to the index directory lazily, like the
+# diary's offsets: records appended after that are re-read from the log tail.
+EVENT_LOG_FILE = "medications.log"
+EVENT_INDEX_FILE = "medication_events.json"
+INDEX_FLUSH_BYTES = 64 * 1024
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%S"
+KINDS = ("dose", "pain")
+
+_state: Optional[Dict[str, Any]] = None
+
+
+def _log_path() -> str:
+    return os.path.join(data_io.DATA_DIR, EVENT_LOG_FILE)
+
+
+def _index_path() -> str:
+    return os.path.join(data_io.DATA_DIR, INDEX_DIRNAME, EVENT_INDEX_FILE)
+
+
+def parse_time(value: Optional[str] = None) -> str:
+    """Normalize an event time to YYYY-MM-DDTHH:MM:SS (now if None).
+
+    Accepts anything datetime.fromisoformat does, e.g. "2025-03-02 08:15".
+
+    Raises:
+        ValueError: The time can't be parsed
+    """
+    if value is None:
+        return datetime.now().strftime(TIME_FORMAT)
+    try:
+        return datetime.fromisoformat(value.strip()).strftime(TIME_FORMAT)
+    except ValueError:
+        raise ValueError(f"Invalid time '{value}', expected YYYY-MM-DD HH:MM") from None
+
+
+def _empty_state(log_id: int) -> Dict[str, Any]:
+    return {"path": _log_path(), "log_id": log_id, "log_size": 0, "indexed_size": 0, "next_id": 1,
+            "times": [], "events": [], "by_id": {}, "day_doses": {}}
+
+
+def _add_event(state: Dict[str, Any], event: Tuple) -> None:
+    """Insert (time, id, kind, medication or None, amount) keeping time order."""
+    time, event_id, kind, medication, amount = event
+    i = bisect.bisect_right(state["times"], time)
+    state["times"].insert(i, time)
+    state["events"].insert(i, event)
+    state["by_id"][event_id] = time
+    state["next_id"] = max(state["next_id"], event_id + 1)
+    if kind == "dose":
+        day = state["day_doses"].setdefault(time[:10], {})
+        day[medication] = day.get(medication, 0) + amount
+
+
+def _remove_event(state: Dict[str, Any], event_id: int) -> None:
+    time = state["by_id"].pop(event_id, None)
+    if time is None:
+        return
+    i = bisect.bisect_left(state["times"], time)
+    while state["events"][i][1] != event_id:
+        i += 1
+    _, _, kind, medication, amount = state["events"].pop(i)
+    del state["times"][i]
+    if kind == "dose":
+        day = state["day_doses"][time[:10]]
+        day[medication] -= amount
+        if not day[medication]:
+            del day[medication]
+        if not day:
+            del state["day_doses"][time[:10]]
+
+
+def _apply_record(state: Dict[str, Any], record: Dict[str, Any]) -> None:
+    if record["kind"] == "removed":
+        _remove_event(state, record["id"])
+    elif record["kind"] == "dose":
+        _add_event(state, (record["time"], record["id"], "dose", record["medication"], record["doses"]))
+    else:
+        _add_event(state, (record["time"], record["id"], "pain", None, record["level"]))
+
+
+def _scan_log(state: Dict[str, Any], log, start: int) -> None:
+    """Apply every complete record in the log from byte offset ``start``."""
+    state["log_size"] = start
+    for offset, length, record in data_io.scan_log(log, start):
+        state["log_size"] = offset + length
+        if record is not None:
+            _apply_record(state, record)
+
+
+def _save_index(state: Dict[str, Any]) -> None:
+    filepath = _index_path()
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    tmp_path = data_io.temp_path(filepath)
+    with open(tmp_path, "w") as f:
+        f.write(json.dumps({"log_id": state["log_id"], "log_size": state["log_size"],
+                            "next_id": state["next_id"], "events": state["events"]}, separators=(",", ":")))
+    os.replace(tmp_path, filepath)
+    state["indexed_size"] = state["log_size"]
+
+
+def _load_index(log_id: int) -> Optional[Dict[str, Any]]:
+    try:
+        with open(_index_path(), "r") as f:
+            saved = json.load(f)
+        if saved["log_id"] != log_id:
+            return None
+        state = _empty_state(log_id)
+        state.update(log_size=saved["log_size"], indexed_size=saved["log_size"], next_id=saved["next_id"])
+        for event in saved["events"]:
+            _add_event(state, tuple(event))
+        return state
+    except FileNotFoundError:
+        return None
+    except (ValueError, KeyError, TypeError):
+        print(f"Warning: Rebuilding unreadable medication event index {_index_path()}")
+        return None
+
+
+def _get_state() -> Dict[str, Any]:
+    """Return the in-memory events, catching up on records appended since they were loaded."""
+    global _state
+    os.makedirs(data_io.DATA_DIR, exist_ok=True)
+    if not os.path.exists(_log_path()):
+        open(_log_path(), "ab").close()
+    stat = os.stat(_log_path())
+    state = _state if _state and _state["path"] == _log_path() else None
+    if state is None:
+        state = _load_index(stat.st_ino)
+    if state is None or state["log_id"] != stat.st_ino or state["log_size"] > stat.st_size:
+        # No usable index, or the log was replaced underneath it
+        state = _empty_state(stat.st_ino)
+    if state["log_size"] < stat.st_size:
+        with open(_log_path(), "rb") as log:
+            _scan_log(state, log, state["log_size"])
+    _state = state
+    return state
+
+
+def _next_id(state: Dict[str, Any]) -> int:
+    # Taken now rather than when the record is applied, so saves inside one
+    # transaction get distinct IDs; a rolled back ID is simply never used
+    event_id = state["next_id"]
+    state["next_id"] += 1
+    return event_id
+
+
+def _append(record: Dict[str, Any]) -> None:
+    """Append a record and apply it, once written (after commit inside a transaction).
+
+    Called with the write lock held.
+    """
+    state = _get_state()
+    line = (json.dumps(record) + "\n").encode("utf-8")
+
+    def on_written(offset: int) -> None:
+        _apply_record(state, record)
+        state["log_size"] = offset + len(line)
+        if state["log_size"] - state["indexed_size"] >= INDEX_FLUSH_BYTES:
+            _save_index(state)
+
+    data_io.append_file(_log_path(), line, on_written)
+
+
+def _medication(name: str) -> Dict[str, Any]:
+    for med in get_medications() or []:
+        if med["name"] == name:
+            return med
+    raise ValueError(f"Unknown medication '{name}'")
+
+
+@traced("medication_log.record_dose")
+def record_dose(medication: str, time: Optional[str] = None, doses: int = 1) -> int:
+    """Log doses of a medication taken at a point in time.
+
+    Args:
+        medication: Name of a medication in the catalog
+        time: When it was taken (see ``parse_time``), defaults to now
+        doses: Number of doses taken at once
+
+    Returns:
+        The event's ID
+
+    Raises:
+        ValueError: Unknown medication, invalid time or dose count
+    """
+    _medication(medication)
+    if isinstance(doses, bool) or not isinstance(doses, int) or doses < 1:
+        raise ValueError(f"Doses must be a positive whole number, got {doses!r}")
+    time = parse_time(time)
+    with data_io.write_lock():
+        event_id = _next_id(_get_state())
+        _append({"id": event_id, "time": time, "kind": "dose", "medication": medication, "doses": doses})
+    return event_id
+
+
+@traced("medication_log.record_pain")
+def record_pain(level: int, time: Optional[str] = None) -> int:
+    """Log a pain reading (0-10) at a point in time.
+
+    Returns:
+        The event's ID
+
+    Raises:
+        ValueError: Invalid level or time
+    """
+    from validation import parse_int
+
+    level = parse_int(level, 0, 10)
+    time = parse_time(time)
+    with data_io.write_lock():
+        event_id = _next_id(_get_state())
+        _append({"id": event_id, "time": time, "kind": "pain", "level": level})
+    return event_id
+
+
+def remove_event(event_id: int) -> bool:
+    """Remove a logged dose or pain reading.
+
+    Returns:
+        False if there is no event with that ID
+    """
+    with data_io.write_lock():
+        if event_id not in _get_state()["by_id"]:
+            return False
+        _append({"id": event_id, "kind": "removed"})
+    return True
+
+
+def _bounds(start: Optional[str], end: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    # A bare end date covers the whole day
+    return start, end + "T99" if end and len(end) == 10 else end
+
+
+def events(start: Optional[str] = None, end: Optional[str] = None, kind: Optional[str] = None,
+           medication: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Logged events in [start, end], in time order.
+
+    Args:
+        start: First date or time (YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS), or None
+        end: Last date or time, inclusive, or None
+        kind: Only "dose" or only "pain" events
+        medication: Only doses of this medication
+
+    Returns:
+        List of {id, time, kind, medication, doses} or {id, time, kind, level}
+    """
+    if kind is not None and kind not in KINDS:
+        raise ValueError(f"Unknown event kind '{kind}', expected one of: {', '.join(KINDS)}")
+    results = []
+    for time, event_id, event_kind, name, amount in event_rows(start, end):
+        if (kind and event_kind != kind) or (medication and name != medication):
+            continue
+        if event_kind == "dose":
+            results.append({"id": event_id, "time": time, "kind": "dose", "medication": name, "doses": amount})
+        else:
+            results.append({"id": event_id, "time": time, "kind": "pain", "level": amount})
+    return results
+
+
+def event_rows(start: Optional[str] = None, end: Optional[str] = None) -> List[Tuple]:
+    """Events in [start, end] as (time, id, kind, medication, amount) tuples, in time order.
+
+    The cheap form of ``events`` for analysis code: medication is None and
+    amount the level for pain readings; amount is the doses for doses.
+    """
+    start, end = _bounds(start, end)
+    state = _get_state()
+    times = state["times"]
+    lo = bisect.bisect_left(times, start) if start else 0
+    hi = bisect.bisect_right(times, end) if end else len(times)
+    return state["events"][lo:hi]
+
+
+def daily_doses(start: Optional[str] = None, end: Optional[str] = None) -> Dict[str, Dict[str, int]]:
+    """Doses logged per day and medication for the dates in [start, end].
+
+    Returns:
+        Dictionary of date -> {medication: doses}, only for days with doses
+    """
+    day_doses = _get_state()["day_doses"]
+    return {day: dict(doses) for day, doses in sorted(day_doses.items())
+            if (not start or day >= start) and (not end or day <= end)}
+
+
+def flush_index() -> None:
+    """Persist the parsed events so the next start doesn't re-read the log."""
+    with data_io.write_lock():
+        state = _get_state()
+        if state["indexed_size"] != state["log_size"]:
+            _save_index(state)
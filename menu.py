@@ -1,50 +1,45 @@
-import os
-from data_io import load_json, load_daily_data, save_daily_data
-from diary import get_diary_entry, save_diary_entry
+import copy
+from data_io import load_daily_data, save_daily_data, query_range, transaction, record_version, ConflictError
+from diary import get_diary_entry, get_diary_record, save_diary_entry, load_diary_entries
+from diary_search import search, print_results
 from visualize import display_entries, generate_weekly_report
 from prompts import prompt_yes_no, prompt_mood, prompt_pain, prompt_new_medication, prompt_exercise_data, prompt_meditation, prompt_time_based_data_full, prompt_medication_data
 from diary import prompt_diary_entry
-from exercises import add_new_exercise
+from exercises import add_new_exercise, load_exercises
 from time_activities import add_new_time_activity, load_time_based_activities
 from datetime import datetime
 
-EXERCISES_FILE = "exercises.json"
-TIME_ACTIVITIES_FILE = "time_activities.json"
-
 def show_todays_data():
     date_str = datetime.now().strftime("%Y-%m-%d")
-    filepath = os.path.join("data", f"{date_str}.json")
-    if os.path.exists(filepath):
-        entries = [(date_str, load_json(filepath))]
+    entries = query_range(date_str, date_str)
+    if entries:
         display_entries(entries)
 
 def view_all_diary_entries():
     """Display all diary entries with their dates"""
-    data_dir = os.path.join(os.path.dirname(__file__), "data")
-    
-    if not os.path.exists(data_dir):
-        print("No data directory found - no entries to display")
-        return
-        
-    entries_found = False
+    entries = load_diary_entries()
     print("\nAll Diary Entries:")
     print("------------------")
     
-    for filename in sorted(os.listdir(data_dir)):
-        if filename.endswith(".json"):
-            date_str = filename[:-5]  # Remove .json extension
-            try:
-                data = load_daily_data(date_str)
-                if data.get("diary_entry"):
-                    print(f"\nDate: {date_str}")
-                    print(f"Entry: {data['diary_entry']}")
-                    entries_found = True
-            except Exception as e:
-                print(f"\nError loading {filename}: {e}")
+    for date_str, entry in entries.items():
+        if entry:
+            print(f"\nDate: {date_str}")
+            print(f"Entry: {entry}")
                 
-    if not entries_found:
+    if not any(entries.values()):
         print("No diary entries found")
 
+def search_diary_entries():
+    """Prompt for a query and display matching diary entries"""
+    print("\nSearch terms; quote phrases, e.g. palexia \"burning pain\"")
+    query = input("Search: ").strip()
+    if not query:
+        return
+    start = input("From date (YYYY-MM-DD, blank for any): ").strip() or None
+    end = input("To date (YYYY-MM-DD, blank for any): ").strip() or None
+    use_stem = prompt_yes_no("Match other word forms (burn/burning)?", default=True)
+    print_results(search(query, start=start, end=end, use_stem=use_stem))
+
 def modify_past_future_data(date_str=None):
     """Modify data for a specific date. If no date is provided, prompts user for one.
     
@@ -90,15 +85,10 @@ def modify_past_future_data(date_str=None):
     time_data = prompt_time_based_data_full(existing_data)
     
     # Handle diary entry modification
-    existing_diary = get_diary_entry(date_str) or ''
+    existing_diary, diary_version = get_diary_record(date_str)
+    existing_diary = existing_diary or ''
     new_entry = prompt_diary_entry(existing_diary)
     
-    if new_entry.strip() or existing_diary:
-        try:
-            save_diary_entry(date_str, new_entry if new_entry.strip() else existing_diary)
-            print("Diary entry saved.")
-        except Exception as e:
-            print(f"Warning: Could not save diary entry: {e}")
     # Get medication data and ensure flat structure
     medication_data = prompt_medication_data(existing_data)
     
@@ -115,16 +105,41 @@ def modify_past_future_data(date_str=None):
     if 'diary_entry' in data_to_save:
         del data_to_save['diary_entry']
         
-    save_daily_data(date_str, data_to_save)
+    # The diary entry and the day's data are saved together or not at all, and
+    # only if nobody else saved this date while it was being edited
+    try:
+        with transaction():
+            if new_entry.strip() or existing_diary:
+                save_diary_entry(date_str, new_entry if new_entry.strip() else existing_diary,
+                                 expected_version=diary_version)
+            save_daily_data(date_str, data_to_save, expected_version=record_version(existing_data))
+    except ConflictError as e:
+        print(f"Not saved: {e}. Open {date_str} again to see the latest data.")
+        return
+    except Exception as e:
+        print(f"Error: Could not save data for {date_str}: {e}")
+        return
     print(f"\nData saved for {date_str}.")
     # Load diary entry separately for display
     entry_with_diary = data_to_save.copy()
     entry_with_diary['diary_entry'] = get_diary_entry(date_str) or ''
     display_entries([(date_str, entry_with_diary)])
 
+def log_dose_now(medications):
+    """Log one dose of a medication from the catalog in the medication event log."""
+    import medication_log
+    for i, med in enumerate(medications, 1):
+        print(f" {i} - {med['name']}")
+    choice = input(f"Medication taken (1-{len(medications)}): ").strip()
+    if not choice.isdigit() or not 1 <= int(choice) <= len(medications):
+        print("Invalid choice, nothing logged.")
+        return
+    name = medications[int(choice) - 1]["name"]
+    medication_log.record_dose(name)
+    print(f"Logged a dose of {name}")
+
 def main():
     show_todays_data()
-    time_based_activities = load_time_based_activities() # Load activities once
     while True:
         print("\nOptions:")
         print(" 1 - Enter daily data")
@@ -134,31 +149,38 @@ def main():
         print(" 5 - Modify past/future date")
         print(" 6 - View all diary entries")
         print(" 7 - Generate weekly report")
-        print(" 8 - Exit")
-        choice = input("Select option (1-8): ").strip()
+        print(" 8 - Search diary entries")
+        print(" 9 - Exit")
+        choice = input("Select option (1-9): ").strip()
         if choice == "1":
             modify_past_future_data(datetime.now().strftime("%Y-%m-%d"))
 
         elif choice == "2":
-            add_new_exercise()
+            # A copy: the cached catalog must only change once it is saved
+            add_new_exercise(copy.deepcopy(load_exercises()))
 
         elif choice == "3":
-            add_new_time_activity(time_based_activities)
+            add_new_time_activity(copy.deepcopy(load_time_based_activities()))
 
         elif choice == "4":
             from data_io import load_medications, save_medications
-            medications = load_medications() or []
+            medications = list(load_medications() or [])
             print("\nCurrent Medications:")
             for med in medications:
-                print(f"- {med['name']} ({med['doses_per_day']} doses/day)")
-            
+                if med.get("prn"):
+                    print(f"- {med['name']} (as needed, up to {med['doses_per_day']} doses/day)")
+                else:
+                    print(f"- {med['name']} ({med['doses_per_day']} doses/day)")
+
+            if medications and prompt_yes_no("\nLog a dose taken now?", default=False):
+                log_dose_now(medications)
+
             if prompt_yes_no("\nAdd new medication?", default=False):
                 new_med = prompt_new_medication()
                 if new_med:
                     medications.append(new_med)
                     save_medications(medications)
                     print(f"Added medication: {new_med['name']}")
-                    medications = load_medications() # Reload medications after adding a new one
 
         elif choice == "5":
             modify_past_future_data() # This already prompts for date, so no change needed here.
@@ -167,7 +189,9 @@ def main():
         elif choice == "7":
             generate_weekly_report()
         elif choice == "8":
+            search_diary_entries()
+        elif choice == "9":
             print("Goodbye!")
             break
         else:
-            print("Invalid option. Please select 1-8.")
\ No newline at end of file
+            print("Invalid option. Please select 1-9.")
\ No newline at end of file
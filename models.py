@@ -0,0 +1,200 @@
+"""Typed in-memory model of a day's tracking data.
+
+Records are stored as plain JSON objects whose fields drifted over time:
+pain may be an int, a numeric string or missing, meditation true/false or
+0/1, and mood occasionally a number. ``DailyEntry.from_dict`` checks and
+coerces a record once, so report and analysis code can read attributes
+directly instead of calling ``.get`` and re-checking types for every cell.
+
+All classes use ``__slots__`` and share interned name strings, which keeps a
+long history much smaller in memory than the nested dicts
+(see benchmarks/bench_models.py).
+"""
+import sys
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import data_io
+
+# Fields with a typed attribute; anything else is kept in DailyEntry.extra
+KNOWN_FIELDS = ("pain", "mood", "meditation", "time_based", "exercises", "medications", data_io.VERSION_FIELD)
+
+
+def _as_int(value: Any) -> Optional[int]:
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, int):
+        return value
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return int(number) if number.is_integer() else None
+
+
+def _as_number(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _as_bool(value: Any) -> Optional[bool]:
+    if value is None or isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return bool(value)
+    if isinstance(value, str):
+        text = value.strip().lower()
+        if text in ("y", "yes", "true", "1"):
+            return True
+        if text in ("n", "no", "false", "0"):
+            return False
+    return None
+
+
+class ExerciseLog:
+    """Repeats and sets done of one exercise."""
+
+    __slots__ = ("name", "repeats", "sets")
+
+    def __init__(self, name: str, repeats: int = 0, sets: int = 0):
+        self.name = name
+        self.repeats = repeats
+        self.sets = sets
+
+    @property
+    def volume(self) -> int:
+        """Total repetitions, repeats x sets."""
+        return self.repeats * self.sets
+
+    def __repr__(self) -> str:
+        return f"ExerciseLog({self.name!r}, repeats={self.repeats}, sets={self.sets})"
+
+
+class MedicationDose:
+    """Doses taken of one medication."""
+
+    __slots__ = ("name", "doses")
+
+    def __init__(self, name: str, doses: int = 0):
+        self.name = name
+        self.doses = doses
+
+    def __repr__(self) -> str:
+        return f"MedicationDose({self.name!r}, doses={self.doses})"
+
+
+class DailyEntry:
+    """One day's tracking data with every field in its canonical type.
+
+    Attributes:
+        date: YYYY-MM-DD
+        pain: 0-10, or None if not recorded (or not a number)
+        mood: Mood text, or None
+        meditation: True/False, or None if not recorded
+        time_based: Activity name -> value in the activity's unit
+        exercises: ExerciseLog per exercise, in record order
+        medications: MedicationDose per medication, in record order
+        version: Stored record version
+        extra: Unrecognized fields, kept as loaded
+    """
+
+    __slots__ = ("date", "pain", "mood", "meditation", "time_based", "exercises", "medications", "version", "extra")
+
+    def __init__(self, date: str, pain: Optional[int] = None, mood: Optional[str] = None,
+                 meditation: Optional[bool] = None, time_based: Optional[Dict[str, float]] = None,
+                 exercises: Tuple[ExerciseLog, ...] = (), medications: Tuple[MedicationDose, ...] = (),
+                 version: int = 0, extra: Optional[Dict[str, Any]] = None):
+        self.date = date
+        self.pain = pain
+        self.mood = mood
+        self.meditation = meditation
+        self.time_based = time_based if time_based is not None else {}
+        self.exercises = exercises
+        self.medications = medications
+        self.version = version
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, date_str: str, data: Optional[Dict[str, Any]]) -> "DailyEntry":
+        """Build an entry from a stored record, coercing each field once.
+
+        Values that can't be coerced (e.g. pain "bad") become None, or 0 for
+        exercise counts and doses, rather than failing the whole day.
+        """
+        data = data or {}
+        intern = sys.intern
+        pain = _as_int(data.get("pain"))
+        mood = data.get("mood")
+        time_based = {}
+        for activity, value in (data.get("time_based") or {}).items():
+            number = _as_number(value)
+            if number is not None:
+                time_based[intern(activity)] = number
+        exercises = tuple(
+            ExerciseLog(intern(name), _as_int(value.get("repeats")) or 0, _as_int(value.get("sets")) or 0)
+            for name, value in (data.get("exercises") or {}).items() if isinstance(value, dict)
+        )
+        medications = tuple(
+            MedicationDose(intern(name), _as_int(doses) or 0)
+            for name, doses in (data.get("medications") or {}).items()
+        )
+        extra = {key: value for key, value in data.items() if key not in KNOWN_FIELDS} or None
+        return cls(date_str, pain, str(mood) if mood is not None else None, _as_bool(data.get("meditation")),
+                   time_based, exercises, medications, data_io.record_version(data), extra)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The entry as a stored record (without its version)."""
+        data: Dict[str, Any] = {}
+        if self.exercises:
+            data["exercises"] = {ex.name: {"repeats": ex.repeats, "sets": ex.sets} for ex in self.exercises}
+        if self.meditation is not None:
+            data["meditation"] = self.meditation
+        if self.mood is not None:
+            data["mood"] = self.mood
+        if self.pain is not None:
+            data["pain"] = self.pain
+        if self.time_based:
+            data["time_based"] = dict(self.time_based)
+        if self.medications:
+            data["medications"] = {med.name: med.doses for med in self.medications}
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def exercise(self, name: str) -> Optional[ExerciseLog]:
+        """The log for an exercise, or None if it wasn't recorded."""
+        for ex in self.exercises:
+            if ex.name == name:
+                return ex
+        return None
+
+    def doses(self, name: str, default: int = 0) -> int:
+        """Doses taken of a medication, or ``default`` if it wasn't recorded."""
+        for med in self.medications:
+            if med.name == name:
+                return med.doses
+        return default
+
+    @property
+    def is_empty(self) -> bool:
+        """True if no field was recorded for the day."""
+        return (self.pain is None and self.mood is None and self.meditation is None and not self.time_based
+                and not self.exercises and not self.medications and not self.extra)
+
+    def __repr__(self) -> str:
+        return f"DailyEntry({self.date!r}, pain={self.pain!r}, mood={self.mood!r}, meditation={self.meditation!r})"
+
+
+def entries_from_records(records: Iterable[Tuple[str, Dict[str, Any]]]) -> List[DailyEntry]:
+    """Convert (date_str, data) records, e.g. from ``data_io.query_range``."""
+    return [DailyEntry.from_dict(date_str, data) for date_str, data in records]
+
+
+def load_entries(start: Optional[str] = None, end: Optional[str] = None) -> List[DailyEntry]:
+    """Load the stored days in [start, end] (YYYY-MM-DD, inclusive) as entries."""
+    return entries_from_records(data_io.query_range(start, end))
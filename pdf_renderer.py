@@ -0,0 +1,141 @@
+import atexit
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from instrumentation import count, span
+
+DEFAULT_WORKERS = 2
+MAX_ATTEMPTS = 2
+
+_STOP = object()
+
+
+class PdfRenderer:
+    """Long-lived pool of headless Chromium browsers for HTML -> PDF rendering.
+
+    Playwright's sync API is bound to the thread that started it, so each
+    worker thread owns one browser and renders one page at a time. Browsers
+    are launched on first use and kept warm between jobs; a browser that
+    crashes or disconnects is relaunched and the job is retried.
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, launch_options: Optional[Dict[str, Any]] = None):
+        self.workers = max(1, workers)
+        self.launch_options = launch_options or {}
+        self._jobs: "queue.Queue" = queue.Queue()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("PdfRenderer is closed")
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f"pdf-renderer-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _worker(self) -> None:
+        try:
+            from playwright.sync_api import sync_playwright
+            with sync_playwright() as p:
+                self._serve(p)
+        except Exception as e:
+            # Playwright itself could not start: fail the jobs instead of hanging
+            while True:
+                job = self._jobs.get()
+                if job is _STOP:
+                    break
+                if job[2].set_running_or_notify_cancel():
+                    job[2].set_exception(e)
+
+    def _serve(self, p) -> None:
+        browser = None
+        try:
+            while True:
+                job = self._jobs.get()
+                if job is _STOP:
+                    break
+                html, output_path, future = job
+                if not future.set_running_or_notify_cancel():
+                    continue
+                for attempt in range(1, MAX_ATTEMPTS + 1):
+                    try:
+                        if browser is None or not browser.is_connected():
+                            with span("pdf.launch_browser"):
+                                browser = p.chromium.launch(**self.launch_options)
+                        with span("pdf.render_page"):
+                            page = browser.new_page()
+                            try:
+                                page.set_content(html)
+                                page.pdf(path=output_path)
+                            finally:
+                                page.close()
+                        count("pdf.pages")
+                        future.set_result(output_path)
+                        break
+                    except Exception as e:
+                        crashed = browser is None or not browser.is_connected()
+                        if crashed and attempt < MAX_ATTEMPTS:
+                            browser = None
+                            continue
+                        future.set_exception(e)
+                        break
+        finally:
+            if browser is not None and browser.is_connected():
+                browser.close()
+
+    def submit(self, html: str, output_path: str) -> Future:
+        """Queue one page for rendering.
+
+        Returns:
+            Future resolving to output_path once the PDF has been written
+        """
+        self._start()
+        future: Future = Future()
+        self._jobs.put((html, output_path, future))
+        return future
+
+    def render(self, html: str, output_path: str) -> str:
+        """Render one page and wait for it to finish."""
+        return self.submit(html, output_path).result()
+
+    def render_batch(self, jobs: Iterable[Tuple[str, str]]) -> List[Tuple[str, Optional[Exception]]]:
+        """Render a batch of (html, output_path) jobs across the pool.
+
+        Returns:
+            (output_path, error) for each job in submission order; error is None on success
+        """
+        futures = [(output_path, self.submit(html, output_path)) for html, output_path in jobs]
+        return [(output_path, future.exception()) for output_path, future in futures]
+
+    def close(self) -> None:
+        """Stop the workers and close their browsers."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._jobs.put(_STOP)
+        for thread in threads:
+            thread.join()
+
+
+_renderer: Optional[PdfRenderer] = None
+_renderer_lock = threading.Lock()
+
+
+def get_renderer(workers: int = DEFAULT_WORKERS) -> PdfRenderer:
+    """Process-wide renderer, created on first use and closed at exit."""
+    global _renderer
+    with _renderer_lock:
+        if _renderer is None:
+            _renderer = PdfRenderer(workers=workers)
+            atexit.register(_renderer.close)
+        return _renderer
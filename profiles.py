@@ -0,0 +1,114 @@
+"""Profiles: one isolated data directory and set of catalogs per tracked person.
+
+The active profile of a process is chosen with TRACKER_PROFILE, ``tracker.py
+--profile`` or ``data_io.use_profile`` (see data_io for the layout). Queries
+across profiles run each profile in its own worker process, so profiles are
+read in parallel and the per-process caches of the data modules never mix
+data from two profiles.
+"""
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import data_io
+from data_io import DEFAULT_PROFILE, PROFILE_NAME_PATTERN
+
+
+def profiles_root() -> str:
+    """Directory holding the named profiles."""
+    return os.path.join(data_io.HOME_DIR, data_io.PROFILES_DIRNAME)
+
+
+def list_profiles() -> List[str]:
+    """Names of every profile with a data directory, the default profile first."""
+    names = []
+    if os.path.isdir(os.path.join(data_io.profile_dir(DEFAULT_PROFILE), "data")):
+        names.append(DEFAULT_PROFILE)
+    root = profiles_root()
+    if os.path.isdir(root):
+        names.extend(sorted(name for name in os.listdir(root)
+                            if PROFILE_NAME_PATTERN.match(name) and os.path.isdir(os.path.join(root, name, "data"))))
+    return names
+
+
+def create_profile(profile: str, copy_catalogs: bool = False) -> str:
+    """Create a profile's directories.
+
+    Args:
+        profile: Name of the new profile
+        copy_catalogs: Start from a copy of the active profile's catalogs
+            instead of the default ones
+
+    Returns:
+        The profile's directory
+
+    Raises:
+        ValueError: The name is invalid or the profile already exists
+    """
+    from catalogs import EXERCISES_FILE, MEDICATIONS_FILE, TIME_ACTIVITIES_FILE, catalog_path
+
+    directory = data_io.profile_dir(profile)
+    data_dir = os.path.join(directory, "data")
+    if os.path.exists(data_dir):
+        raise ValueError(f"Profile '{profile}' already exists")
+    os.makedirs(data_dir)
+    if copy_catalogs:
+        for filename in (EXERCISES_FILE, TIME_ACTIVITIES_FILE, MEDICATIONS_FILE):
+            if os.path.exists(catalog_path(filename)):
+                shutil.copyfile(catalog_path(filename), os.path.join(directory, filename))
+    return directory
+
+
+def _call_in_profile(profile: str, func: Callable[..., Any], args: Tuple) -> Any:
+    data_io.use_profile(profile)
+    data_io.recover_journal()
+    return func(*args)
+
+
+def map_profiles(func: Callable[..., Any], *args: Any, profiles: Optional[Iterable[str]] = None,
+                 workers: Optional[int] = None) -> Dict[str, Any]:
+    """Call ``func(*args)`` with each profile active, in parallel worker processes.
+
+    Args:
+        func: Module-level function (it is sent to the workers by reference)
+        *args: Arguments for ``func``; they and its results must be picklable
+        profiles: Profiles to run against, defaults to every profile
+        workers: Worker processes, defaults to one per profile up to the CPU count
+
+    Returns:
+        Profile name -> result, in the order of ``profiles``
+    """
+    profiles = list_profiles() if profiles is None else list(profiles)
+    for profile in profiles:
+        data_io.profile_dir(profile)  # Reject invalid names before starting workers
+    if not profiles:
+        return {}
+    workers = min(workers or os.cpu_count() or 1, len(profiles))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [(profile, pool.submit(_call_in_profile, profile, func, args)) for profile in profiles]
+        return {profile: future.result() for profile, future in futures}
+
+
+def query_profiles(start: Optional[str] = None, end: Optional[str] = None,
+                   fields: Optional[Iterable[str]] = None, profiles: Optional[Iterable[str]] = None,
+                   workers: Optional[int] = None) -> Dict[str, List[Tuple[str, Dict[str, Any]]]]:
+    """``data_io.query_range`` for each profile: profile name -> (date_str, data) list."""
+    return map_profiles(data_io.query_range, start, end, tuple(fields) if fields else None,
+                        profiles=profiles, workers=workers)
+
+
+def summarize_profiles(start: str, end: str, profiles: Optional[Iterable[str]] = None,
+                       workers: Optional[int] = None) -> Dict[str, Any]:
+    """Summaries of a date range for each profile and for all of them together.
+
+    Returns:
+        {"profiles": {name: summary}, "total": summary}, each summary as
+        returned by ``aggregates.summarize``
+    """
+    import aggregates
+    rollups = map_profiles(aggregates.range_rollup, start, end, profiles=profiles, workers=workers)
+    return {
+        "profiles": {profile: aggregates.summarize(rollup) for profile, rollup in rollups.items()},
+        "total": aggregates.summarize(aggregates.merge_rollups(rollups.values())),
+    }
@@ -3,6 +3,8 @@ from typing import Any, Optional
 from exercises import load_exercises
 from time_activities import load_time_based_activities
 from data_io import load_medications
+from validation import parse_doses, parse_exercise, parse_pain, parse_time_value, parse_yes_no
+from instrumentation import traced
 
 PAIN_SCALE = {
     0: "No pain",
@@ -18,9 +20,7 @@ PAIN_SCALE = {
     10: "Worst possible pain, overwhelming distress, persistent next day"
 }
 
-exercises = load_exercises()
-time_based_activities = load_time_based_activities()
-
+@traced("prompt.pain")
 def prompt_pain(existing_pain: Optional[int] = None) -> int:
     """Prompt user for neuropathic pain level (0-10).
     
@@ -40,11 +40,12 @@ def prompt_pain(existing_pain: Optional[int] = None) -> int:
             return existing_pain
         elif inp == "":
             return 0
-        elif inp.isdigit() and 0 <= int(inp) <= 10:
-            return int(inp)
-        else:
-            print("Please enter a number between 0 and 10.")
+        try:
+            return parse_pain(inp)
+        except ValueError as e:
+            print(e)
 
+@traced("prompt.yes_no")
 def prompt_yes_no(prompt: str, default: Optional[bool] = None) -> bool:
     """Prompt user for yes/no input.
     
@@ -70,6 +71,7 @@ def prompt_yes_no(prompt: str, default: Optional[bool] = None) -> bool:
         else:
             print("Please enter y or n.")
 
+@traced("prompt.mood")
 def prompt_mood(existing: Optional[str] = None) -> str:
     """Prompt user for mood description.
     
@@ -85,11 +87,14 @@ def prompt_mood(existing: Optional[str] = None) -> str:
         return existing
     return inp
 
+@traced("prompt.new_medication")
 def prompt_new_medication() -> dict:
     """Prompt user to add a new medication.
     
     Returns:
-        Dictionary with medication details: {name, doses_per_day}
+        Dictionary with medication details: {name, doses_per_day}, plus
+        "prn": True for a medication taken as needed (doses_per_day is then
+        the most that may be taken in a day)
     """
     print("\nAdd New Medication:")
     while True:
@@ -101,9 +106,13 @@ def prompt_new_medication() -> dict:
     while True:
         doses = input("Doses per day: ").strip()
         if doses.isdigit() and int(doses) > 0:
-            return {"name": name, "doses_per_day": int(doses)}
+            break
         print("Please enter a positive number.")
+    if prompt_yes_no("Taken as needed (PRN)?", default=False):
+        return {"name": name, "doses_per_day": int(doses), "prn": True}
+    return {"name": name, "doses_per_day": int(doses)}
 
+@traced("prompt.medication_doses")
 def prompt_medication_doses(medications: list, existing: Optional[dict] = None) -> dict:
     """Prompt user for daily medication doses.
     
@@ -127,16 +136,18 @@ def prompt_medication_doses(medications: list, existing: Optional[dict] = None)
             if inp == "":
                 doses[name] = default
                 break
-            if inp.isdigit() and 0 <= int(inp) <= max_doses:
-                doses[name] = int(inp)
+            try:
+                doses[name] = parse_doses(med, inp)
                 break
-            print(f"Please enter a number between 0 and {max_doses}.")
+            except ValueError as e:
+                print(e)
     return doses
 
+@traced("prompt.exercise_data")
 def prompt_exercise_data(existing_data=None):
     print("\nEnter exercise data (repeats and sets, e.g. '10 1'):")
     exercise_data = {}
-    for ex_name, defaults in exercises.items():
+    for ex_name, defaults in load_exercises().items():
         prev_repeats = prev_sets = None
         if existing_data and 'exercises' in existing_data and ex_name in existing_data['exercises']:
             prev_repeats = existing_data['exercises'][ex_name].get('repeats')
@@ -153,19 +164,21 @@ def prompt_exercise_data(existing_data=None):
                 else:
                     repeats, sets = defaults['repeats'], defaults['sets']
                 break
-            parts = user_input.split()
-            if len(parts) == 2 and parts[0].isdigit() and parts[1].isdigit():
-                repeats, sets = int(parts[0]), int(parts[1])
-                break
-            else:
-                print("Please enter repeats and sets separated by a space, e.g. '10 1'.")
+            try:
+                parsed = parse_exercise(user_input)
+            except ValueError as e:
+                print(e)
+                continue
+            repeats, sets = parsed["repeats"], parsed["sets"]
+            break
         exercise_data[ex_name] = {"repeats": repeats, "sets": sets}
     return exercise_data
 
+@traced("prompt.time_based_data")
 def prompt_time_based_data(existing_data=None):
     print("\nEnter time-based activity data (minutes or hours):")
     time_data = {}
-    for activity, details in time_based_activities.items():
+    for activity, details in load_time_based_activities().items():
         prev_value = None
         if existing_data and 'time_based' in existing_data and activity in existing_data['time_based']:
             prev_value = existing_data['time_based'][activity]
@@ -186,22 +199,21 @@ def prompt_time_based_data(existing_data=None):
         time_data[activity] = value
     return time_data
 
+@traced("prompt.meditation")
 def prompt_meditation(existing=None):
     prompt = f"Meditation (yes/no) [{ 'yes' if existing else 'no' }]: " if existing is not None else "Meditation (yes/no): "
     while True:
         inp = input(prompt).strip().lower()
         if inp == "" and existing is not None:
             return existing
-        elif inp in ['yes', 'y']:
-            return True
-        elif inp in ['no', 'n']:
-            return False
-        else:
-            print("Please enter yes or no.")
+        try:
+            return parse_yes_no(inp)
+        except ValueError as e:
+            print(e)
 
+@traced("prompt.medication_data")
 def prompt_medication_data(existing_data=None):
-    from data_io import load_medications # Import here to ensure it's always fresh
-    medications = load_medications() or [] # Load medications dynamically
+    medications = load_medications() or [] # Cached; reloaded when medications.json changes
     
     if not medications:
         return {}
@@ -219,19 +231,17 @@ def prompt_medication_data(existing_data=None):
         prompt = f"{name} (0-{max_doses}) [{prev_value if prev_value is not None else 0}]: "
         while True:
             try:
-                dose = int(input(prompt).strip() or (prev_value if prev_value is not None else 0))
-                if 0 <= dose <= max_doses:
-                    med_data[name] = dose
-                    break
-                print(f"Please enter between 0 and {max_doses}")
-            except ValueError:
-                print("Please enter a whole number")
+                med_data[name] = parse_doses(med, input(prompt).strip() or (prev_value if prev_value is not None else 0))
+                break
+            except ValueError as e:
+                print(e)
     return med_data
 
+@traced("prompt.time_based_data_full")
 def prompt_time_based_data_full(existing_data=None):
     print("\nEnter time-based activity data:")
     time_data = {}
-    for activity, details in time_based_activities.items():
+    for activity, details in load_time_based_activities().items():
         prev_value = None
         if existing_data and 'time_based' in existing_data and activity in existing_data['time_based']:
             prev_value = existing_data['time_based'][activity]
@@ -249,14 +259,11 @@ def prompt_time_based_data_full(existing_data=None):
                 if inp == "" and prev_value is not None:
                     value = prev_value
                     break
-                elif inp in ['yes', 'y']:
-                    value = 1
-                    break
-                elif inp in ['no', 'n']:
-                    value = 0
+                try:
+                    value = parse_time_value(details, inp)
                     break
-                else:
-                    print("Please enter yes or no.")
+                except ValueError as e:
+                    print(e)
         elif typ == "scale":
             scale_min = details.get("scale_range", {}).get("min", 0)
             scale_max = details.get("scale_range", {}).get("max", 10)
@@ -266,14 +273,10 @@ def prompt_time_based_data_full(existing_data=None):
                     value = prev_value
                     break
                 try:
-                    val_int = int(inp)
-                    if scale_min <= val_int <= scale_max:
-                        value = val_int
-                        break
-                    else:
-                        print(f"Value must be between {scale_min} and {scale_max}.")
-                except ValueError:
-                    print("Please enter a valid integer.")
+                    value = parse_time_value(details, inp)
+                    break
+                except ValueError as e:
+                    print(e)
         else:
             # minutes, hours, or kilometers - numeric, default zero
             while True:
@@ -285,9 +288,9 @@ def prompt_time_based_data_full(existing_data=None):
                         value = 0
                     break
                 try:
-                    value = float(inp)
+                    value = parse_time_value(details, inp)
                     break
-                except ValueError:
-                    print("Please enter a numeric value or leave blank for 0.")
+                except ValueError as e:
+                    print(f"{e} Leave blank for 0.")
         time_data[activity] = value
     return time_data
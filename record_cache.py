@@ -0,0 +1,167 @@
+import atexit
+import marshal
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import data_io
+from instrumentation import count
+
+# Parsed day files are kept in memory, least recently used first, and saved to
+# a sidecar file in the index directory at exit. An entry is only used while
+# the file's mtime, size and inode are unchanged, so a hit costs one stat.
+# TRACKER_RECORD_CACHE_BYTES=0 turns the cache off.
+RECORD_CACHE_FILE = "records.cache"
+MAX_BYTES = int(os.environ.get("TRACKER_RECORD_CACHE_BYTES", 16 * 1024 * 1024))
+FORMAT = 1
+
+# "entries": day filename -> (mtime_ns, size, inode, marshalled record) for
+# the DATA_DIR at "data_dir", whose sidecar is "path"; "bytes" is the total
+# size of the marshalled records
+_cache: Dict[str, Any] = {"data_dir": None, "path": None, "entries": OrderedDict(), "bytes": 0, "dirty": False}
+_lock = threading.Lock()
+
+
+def load(filename: str, filepath: str, loader: Callable[[str], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+    """Load a day file through the cache.
+
+    Args:
+        filename: Name of the file in DATA_DIR, the cache key
+        filepath: Path of the file
+        loader: Parses the file, returning None if it doesn't exist
+
+    Returns:
+        The record, or None if the file doesn't exist
+
+    Raises:
+        ValueError: The file is corrupt (from ``loader``; nothing is cached)
+    """
+    if MAX_BYTES <= 0:
+        return loader(filepath)
+    try:
+        stat = os.stat(filepath)
+    except FileNotFoundError:
+        return None
+    key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    with _lock:
+        entries = _entries()
+        entry = entries.get(filename)
+        if entry is not None and entry[:3] == key:
+            entries.move_to_end(filename)
+            blob = entry[3]
+        else:
+            blob = None
+    if blob is not None:
+        count("record_cache.hits")
+        # A fresh copy each time: callers are free to modify what they get
+        return marshal.loads(blob)
+    count("record_cache.misses")
+    data = loader(filepath)
+    if data is not None:
+        blob = marshal.dumps(data)
+        with _lock:
+            _put(filename, key + (blob,))
+    return data
+
+
+def _path() -> str:
+    return os.path.join(data_io.index_dir(), RECORD_CACHE_FILE)
+
+
+def _entries() -> "OrderedDict[str, Tuple[int, int, int, bytes]]":
+    """The cache of DATA_DIR, read from its sidecar file on first use.
+
+    Called with _lock held. Switching profiles saves the previous profile's
+    cache before reading the new one.
+    """
+    if _cache["data_dir"] == data_io.DATA_DIR:
+        return _cache["entries"]
+    _save_locked()
+    path = _path()
+    entries: "OrderedDict[str, Tuple[int, int, int, bytes]]" = OrderedDict()
+    try:
+        with open(path, "rb") as f:
+            raw = f.read()
+        count("files.read")
+        count("bytes.read", len(raw))
+        saved = marshal.loads(raw)
+        if saved.get("format") == (FORMAT, sys.version_info[:2]):
+            for filename, mtime_ns, size, inode, blob in saved["entries"]:
+                entries[filename] = (mtime_ns, size, inode, blob)
+    except FileNotFoundError:
+        pass
+    except (OSError, EOFError, ValueError, TypeError, AttributeError, KeyError):
+        print(f"Warning: Ignoring unreadable record cache {path}")
+        entries.clear()
+    _cache.update(data_dir=data_io.DATA_DIR, path=path, entries=entries,
+                  bytes=sum(len(e[3]) for e in entries.values()), dirty=False)
+    _evict()
+    return entries
+
+
+def _put(filename: str, entry: Tuple[int, int, int, bytes]) -> None:
+    """Store a parsed day file as the most recently used entry. Called with _lock held."""
+    entries = _entries()
+    previous = entries.pop(filename, None)
+    if previous is not None:
+        _cache["bytes"] -= len(previous[3])
+    entries[filename] = entry
+    _cache["bytes"] += len(entry[3])
+    _cache["dirty"] = True
+    _evict()
+
+
+def _evict() -> None:
+    entries = _cache["entries"]
+    while _cache["bytes"] > MAX_BYTES and entries:
+        _, evicted = entries.popitem(last=False)
+        _cache["bytes"] -= len(evicted[3])
+        _cache["dirty"] = True
+        count("record_cache.evictions")
+
+
+def _save_locked() -> None:
+    if not _cache["dirty"] or _cache["path"] is None:
+        return
+    saved = {"format": (FORMAT, sys.version_info[:2]),
+             "entries": [(filename,) + entry for filename, entry in _cache["entries"].items()]}
+    try:
+        os.makedirs(os.path.dirname(_cache["path"]), exist_ok=True)
+        tmp_path = data_io.temp_path(_cache["path"])
+        with open(tmp_path, "wb") as f:
+            marshal.dump(saved, f)
+        os.replace(tmp_path, _cache["path"])
+    except OSError as e:
+        print(f"Warning: Could not save the record cache: {e}")
+    _cache["dirty"] = False
+
+
+def save() -> None:
+    """Write the cache to its sidecar file if it changed.
+
+    Runs at exit; the cache is a derived file, so it is not fsynced and a
+    lost or stale one only costs re-parsing.
+    """
+    with _lock:
+        _save_locked()
+
+
+def forget() -> None:
+    """Save the cache and drop it from memory, as if the process had restarted."""
+    with _lock:
+        _save_locked()
+        _cache.update(data_dir=None, path=None, entries=OrderedDict(), bytes=0, dirty=False)
+
+
+def clear() -> None:
+    """Drop the cache of the active profile, in memory and on disk."""
+    with _lock:
+        path = _path()
+        _cache.update(data_dir=None, path=None, entries=OrderedDict(), bytes=0, dirty=False)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+atexit.register(save)
@@ -0,0 +1,317 @@
+"""Compact binary encoding of a day's record (the "compact" storage backend).
+
+A record is a fixed header followed by fixed-size items, all little-endian:
+
+    header   magic "CR", format version, presence flags, pain (int8, -1 =
+             null), meditation (0/1, 2 = null), version (uint32), mood length
+    mood     UTF-8 bytes
+    time     count (uint8), then per activity: name ID (uint16), value tag
+             (uint8: float/int/bool/null), value (float64)
+    exercise count (uint8), then per exercise: name ID, repeats, sets (uint16 each)
+    meds     count (uint8), then per medication: name ID, doses (uint16 each)
+    extras   length (uint32) + compact JSON of every field that doesn't fit
+             the layout above (unknown fields, a non-string mood, ...)
+
+Exercise, activity and medication names are interned to small IDs in
+data/names.json. IDs are seeded in catalog order and only ever appended,
+so renaming or reordering a catalog never changes what a stored ID means.
+
+Values are normalized on write (meditation 0/1 becomes false/true, numeric
+strings become numbers), and decoding reproduces the normalized record
+exactly.
+"""
+import json
+import os
+import struct
+from typing import Any, Dict, List, Optional, Tuple
+
+import data_io
+from instrumentation import count
+from catalogs import get_exercises, get_medications, get_time_activities, invalidate, load_catalog
+
+NAMES_FILE = "names.json"
+MAGIC = b"CR"
+FORMAT_VERSION = 1
+SECTIONS = ("time_based", "exercises", "medications")
+
+HEADER = struct.Struct("<2sBBbBIH")
+COUNT = struct.Struct("<B")
+EXTRAS_LENGTH = struct.Struct("<I")
+TIME_ITEM = struct.Struct("<HBd")
+EXERCISE_ITEM = struct.Struct("<HHH")
+MEDICATION_ITEM = struct.Struct("<HH")
+
+HAS_PAIN = 1
+HAS_MEDITATION = 2
+HAS_MOOD = 4
+HAS_VERSION = 8
+HAS_TIME = 16
+HAS_EXERCISES = 32
+HAS_MEDICATIONS = 64
+HAS_EXTRAS = 128
+
+TAG_FLOAT = 0
+TAG_INT = 1
+TAG_BOOL = 2
+TAG_NULL = 3
+
+MAX_ITEMS = 255
+MAX_UINT16 = 0xFFFF
+MAX_EXACT_INT = 2 ** 53
+
+
+def _names_path() -> str:
+    return os.path.join(data_io.DATA_DIR, NAMES_FILE)
+
+
+def load_names() -> Dict[str, List[str]]:
+    """The name table, section -> list of names indexed by ID (empty if none saved yet)."""
+    return load_catalog(_names_path()) or {section: [] for section in SECTIONS}
+
+
+def _intern(data: Dict[str, Any]) -> Dict[str, Dict[str, int]]:
+    """IDs for every name in the record's sections, adding new names to the table.
+
+    Called with the write lock held. New names are written straight away,
+    outside any open transaction: IDs are never reused, so a name saved for
+    a transaction that is then rolled back is merely unused.
+    """
+    names = load_catalog(_names_path())
+    if names is None:
+        names = {
+            "exercises": list(get_exercises() or {}),
+            "time_based": list(get_time_activities() or {}),
+            "medications": [med["name"] for med in get_medications() or []],
+        }
+    ids = {section: {name: i for i, name in enumerate(names.get(section, []))} for section in SECTIONS}
+    added = not os.path.exists(_names_path())
+    for section in SECTIONS:
+        for name in data.get(section) or {}:
+            if name not in ids[section]:
+                if len(ids[section]) > MAX_UINT16:
+                    raise ValueError(f"Too many {section} names for the compact format")
+                ids[section][name] = len(ids[section])
+                added = True
+    if added:
+        table = {section: sorted(ids[section], key=ids[section].get) for section in SECTIONS}
+        data_io.atomic_write(_names_path(), json.dumps(table, indent=2))
+        invalidate(_names_path())
+    return ids
+
+
+def _normalize_number(value: Any) -> Any:
+    if isinstance(value, str):
+        try:
+            number = float(value)
+        except ValueError:
+            return value
+        return int(number) if number.is_integer() and "." not in value else number
+    return value
+
+
+def normalize(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Coerce the known fields to their canonical types.
+
+    meditation becomes a bool, pain, doses, repeats and sets become ints and
+    numeric strings become numbers. Values that can't be coerced are kept.
+    """
+    record = dict(data)
+    if "meditation" in record and record["meditation"] is not None:
+        value = record["meditation"]
+        if isinstance(value, str) and value.strip().lower() in ("y", "yes", "true", "1", "n", "no", "false", "0"):
+            record["meditation"] = value.strip().lower() in ("y", "yes", "true", "1")
+        elif isinstance(value, (int, float)):
+            record["meditation"] = bool(value)
+    if "pain" in record:
+        record["pain"] = _normalize_number(record["pain"])
+        if isinstance(record["pain"], float) and record["pain"].is_integer():
+            record["pain"] = int(record["pain"])
+    if isinstance(record.get("time_based"), dict):
+        record["time_based"] = {name: _normalize_number(value) for name, value in record["time_based"].items()}
+    if isinstance(record.get("medications"), dict):
+        record["medications"] = {name: _normalize_number(value) for name, value in record["medications"].items()}
+    if isinstance(record.get("exercises"), dict):
+        record["exercises"] = {
+            name: ({key: _normalize_number(v) for key, v in value.items()} if isinstance(value, dict) else value)
+            for name, value in record["exercises"].items()
+        }
+    return record
+
+
+def _is_uint16(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool) and 0 <= value <= MAX_UINT16
+
+
+def _time_item(value: Any) -> Optional[Tuple[int, float]]:
+    if value is None:
+        return TAG_NULL, 0.0
+    if isinstance(value, bool):
+        return TAG_BOOL, float(value)
+    if isinstance(value, int):
+        return (TAG_INT, float(value)) if abs(value) <= MAX_EXACT_INT else None
+    if isinstance(value, float):
+        return TAG_FLOAT, value
+    return None
+
+
+def _fits_time(section: Any) -> bool:
+    return (isinstance(section, dict) and len(section) <= MAX_ITEMS
+            and all(_time_item(value) is not None for value in section.values()))
+
+
+def _fits_exercises(section: Any) -> bool:
+    return isinstance(section, dict) and len(section) <= MAX_ITEMS and all(
+        isinstance(value, dict) and list(value) == ["repeats", "sets"]
+        and _is_uint16(value["repeats"]) and _is_uint16(value["sets"])
+        for value in section.values()
+    )
+
+
+def _fits_medications(section: Any) -> bool:
+    return (isinstance(section, dict) and len(section) <= MAX_ITEMS
+            and all(_is_uint16(value) for value in section.values()))
+
+
+def encode(data: Dict[str, Any]) -> bytes:
+    """Encode a record, normalizing it and interning its names first."""
+    record = normalize(data)
+    ids = _intern(record)
+    flags = 0
+    extras: Dict[str, Any] = {}
+    pain, meditation, version, mood = -1, 2, 0, b""
+
+    for key, value in record.items():
+        if key == "pain" and (value is None or (_is_uint16(value) and value <= 127)):
+            flags |= HAS_PAIN
+            pain = -1 if value is None else value
+        elif key == "meditation" and (value is None or isinstance(value, bool)):
+            flags |= HAS_MEDITATION
+            meditation = 2 if value is None else int(value)
+        elif key == "mood" and isinstance(value, str) and len(value.encode("utf-8")) <= MAX_UINT16:
+            flags |= HAS_MOOD
+            mood = value.encode("utf-8")
+        elif key == data_io.VERSION_FIELD and isinstance(value, int) and 0 <= value < 2 ** 32:
+            flags |= HAS_VERSION
+            version = value
+        elif key == "time_based" and _fits_time(value):
+            flags |= HAS_TIME
+        elif key == "exercises" and _fits_exercises(value):
+            flags |= HAS_EXERCISES
+        elif key == "medications" and _fits_medications(value):
+            flags |= HAS_MEDICATIONS
+        else:
+            extras[key] = value
+
+    parts = [HEADER.pack(MAGIC, FORMAT_VERSION, flags | (HAS_EXTRAS if extras else 0),
+                         pain, meditation, version, len(mood)), mood]
+    if flags & HAS_TIME:
+        section = record["time_based"]
+        parts.append(COUNT.pack(len(section)))
+        parts.extend(TIME_ITEM.pack(ids["time_based"][name], *_time_item(value)) for name, value in section.items())
+    if flags & HAS_EXERCISES:
+        section = record["exercises"]
+        parts.append(COUNT.pack(len(section)))
+        parts.extend(EXERCISE_ITEM.pack(ids["exercises"][name], value["repeats"], value["sets"])
+                     for name, value in section.items())
+    if flags & HAS_MEDICATIONS:
+        section = record["medications"]
+        parts.append(COUNT.pack(len(section)))
+        parts.extend(MEDICATION_ITEM.pack(ids["medications"][name], value) for name, value in section.items())
+    if extras:
+        payload = json.dumps(extras, separators=(",", ":")).encode("utf-8")
+        parts.append(EXTRAS_LENGTH.pack(len(payload)))
+        parts.append(payload)
+    return b"".join(parts)
+
+
+_TIME_DECODERS = (float, int, bool, lambda value: None)  # By tag
+
+# (path, table) of the last name table decode() used. The table is
+# append-only, so a stale copy still decodes every ID it has; it is only
+# reloaded on an unknown ID or when the profile changed.
+_decode_names: Optional[Tuple[str, Dict[str, List[str]]]] = None
+
+
+def _decode(raw: bytes, names: Dict[str, List[str]]) -> Dict[str, Any]:
+    magic, format_version, flags, pain, meditation, version, mood_length = HEADER.unpack_from(raw)
+    if magic != MAGIC or format_version != FORMAT_VERSION:
+        raise ValueError("Not a compact record")
+    offset = HEADER.size + mood_length
+    record: Dict[str, Any] = {}
+
+    time_items = exercise_items = medication_items = None
+    if flags & HAS_TIME:
+        end = offset + 1 + raw[offset] * TIME_ITEM.size
+        time_items = TIME_ITEM.iter_unpack(raw[offset + 1:end])
+        offset = end
+    if flags & HAS_EXERCISES:
+        end = offset + 1 + raw[offset] * EXERCISE_ITEM.size
+        exercise_items = EXERCISE_ITEM.iter_unpack(raw[offset + 1:end])
+        offset = end
+    if flags & HAS_MEDICATIONS:
+        end = offset + 1 + raw[offset] * MEDICATION_ITEM.size
+        medication_items = MEDICATION_ITEM.iter_unpack(raw[offset + 1:end])
+        offset = end
+
+    # Same field order as the interactive entry saves them
+    if exercise_items is not None:
+        exercise_names = names["exercises"]
+        record["exercises"] = {exercise_names[i]: {"repeats": repeats, "sets": sets}
+                               for i, repeats, sets in exercise_items}
+    if flags & HAS_MEDITATION:
+        record["meditation"] = None if meditation == 2 else meditation == 1
+    if flags & HAS_MOOD:
+        record["mood"] = raw[HEADER.size:HEADER.size + mood_length].decode("utf-8")
+    if flags & HAS_PAIN:
+        record["pain"] = None if pain < 0 else pain
+    if time_items is not None:
+        time_names = names["time_based"]
+        record["time_based"] = {time_names[i]: _TIME_DECODERS[tag](value) for i, tag, value in time_items}
+    if medication_items is not None:
+        medication_names = names["medications"]
+        record["medications"] = {medication_names[i]: doses for i, doses in medication_items}
+    if flags & HAS_EXTRAS:
+        (length,) = EXTRAS_LENGTH.unpack_from(raw, offset)
+        offset += EXTRAS_LENGTH.size
+        record.update(json.loads(raw[offset:offset + length]))
+    if flags & HAS_VERSION:
+        record[data_io.VERSION_FIELD] = version
+    return record
+
+
+def decode(raw: bytes) -> Dict[str, Any]:
+    """Decode a record written by ``encode``.
+
+    Raises:
+        ValueError: The data is not a valid compact record
+    """
+    global _decode_names
+    path = _names_path()
+    try:
+        if _decode_names is not None and _decode_names[0] == path:
+            try:
+                return _decode(raw, _decode_names[1])
+            except (IndexError, KeyError):
+                pass  # Written with names added after our copy of the table was loaded
+        _decode_names = (path, load_names())
+        return _decode(raw, _decode_names[1])
+    except (IndexError, KeyError, struct.error) as e:
+        raise ValueError(f"Corrupt compact record: {e}")
+
+
+def load(filepath: str) -> Optional[Dict[str, Any]]:
+    """Read and decode a record file, or None if it doesn't exist."""
+    try:
+        with open(filepath, "rb") as f:
+            raw = f.read()
+    except FileNotFoundError:
+        return None
+    count("files.read")
+    count("bytes.read", len(raw))
+    count("records.decoded")
+    return decode(raw)
+
+
+def save(filepath: str, data: Dict[str, Any]) -> None:
+    """Encode a record and replace the file atomically (inside the open transaction, if any)."""
+    data_io.write_file(filepath, encode(data))
@@ -0,0 +1,170 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from data_io import list_dates, open_history_view
+from instrumentation import span
+from diary import load_diary_entries
+from models import load_entries
+
+PERIODS = ("weekly", "monthly", "custom")
+DEFAULT_OUTPUT_TEMPLATE = os.path.join("reports", "{period}", "{label}.html")
+DEFAULT_WORKERS = 4
+
+
+def _parse_date(date_str: str) -> date:
+    return datetime.strptime(date_str, "%Y-%m-%d").date()
+
+
+def period_ranges(period: str, start: str, end: str, days: Optional[int] = None) -> List[Tuple[str, str, str]]:
+    """Split [start, end] into report periods.
+
+    Weekly periods are ISO weeks (Monday to Sunday) and monthly periods are
+    calendar months; the first and last period are widened to whole weeks or
+    months. Custom periods are consecutive runs of ``days`` days from start.
+
+    Args:
+        period: "weekly", "monthly" or "custom"
+        start: First date to cover (YYYY-MM-DD)
+        end: Last date to cover (YYYY-MM-DD)
+        days: Length of each custom period
+
+    Returns:
+        List of (label, period_start, period_end) tuples in date order
+    """
+    first, last = _parse_date(start), _parse_date(end)
+    ranges = []
+    if period == "weekly":
+        current = first - timedelta(days=first.weekday())
+        while current <= last:
+            year, week, _ = current.isocalendar()
+            ranges.append((f"{year}-W{week:02d}", current, current + timedelta(days=6)))
+            current += timedelta(days=7)
+    elif period == "monthly":
+        current = first.replace(day=1)
+        while current <= last:
+            following = (current + timedelta(days=32)).replace(day=1)
+            ranges.append((current.strftime("%Y-%m"), current, following - timedelta(days=1)))
+            current = following
+    elif period == "custom":
+        if not days or days < 1:
+            raise ValueError("Custom periods need a positive number of days")
+        current = first
+        while current <= last:
+            period_end = min(current + timedelta(days=days - 1), last)
+            ranges.append((f"{current:%Y-%m-%d}_to_{period_end:%Y-%m-%d}", current, period_end))
+            current = period_end + timedelta(days=1)
+    else:
+        raise ValueError(f"Unknown period '{period}', expected one of: {', '.join(PERIODS)}")
+    return [(label, f"{s:%Y-%m-%d}", f"{e:%Y-%m-%d}") for label, s, e in ranges]
+
+
+def _dates_between(start: str, end: str) -> List[str]:
+    first, last = _parse_date(start), _parse_date(end)
+    return [(first + timedelta(days=i)).strftime("%Y-%m-%d") for i in range((last - first).days + 1)]
+
+
+def plan_period_reports(period: str, start: Optional[str] = None, end: Optional[str] = None,
+                        days: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Dict[str, Any], Dict[str, str]]:
+    """Load the data for a date range once and split it into report periods.
+
+    Periods without any data are skipped.
+
+    Args:
+        period: "weekly", "monthly" or "custom"
+        start: First date to cover, defaults to the earliest stored date
+        end: Last date to cover, defaults to the latest stored date
+        days: Length of each custom period
+
+    Returns:
+        (periods, daily_data, diary_entries) where each period is a
+        {"label", "start", "end", "dates"} dictionary and the two mappings
+        are shared by every period. When the whole history is in the
+        columnar store, daily_data is a memory-mapped view that decodes
+        each day as a report reads it; close it when done.
+    """
+    stored = list_dates(start, end)
+    if not stored:
+        return [], {}, {}
+    start = start or stored[0]
+    end = end or stored[-1]
+
+    ranges = period_ranges(period, start, end, days)
+    daily_data = open_history_view()
+    if daily_data is None:
+        # Checked and typed once, however many periods a day appears in
+        daily_data = {entry.date: entry for entry in load_entries(ranges[0][1], ranges[-1][2])}
+    diary_entries = load_diary_entries()
+
+    periods = []
+    for label, period_start, period_end in ranges:
+        dates = _dates_between(period_start, period_end)
+        if any(d in daily_data for d in dates):
+            periods.append({"label": label, "start": period_start, "end": period_end, "dates": dates})
+    return periods, daily_data, diary_entries
+
+
+def generate_batch_reports(period: str, start: Optional[str] = None, end: Optional[str] = None,
+                           days: Optional[int] = None, output_template: str = DEFAULT_OUTPUT_TEMPLATE,
+                           pdf: bool = False, workers: int = DEFAULT_WORKERS) -> List[str]:
+    """Write a report for every period in a date range.
+
+    Each period's report is streamed to its own file from the shared
+    dataset (see ``plan_period_reports``), several periods at a time.
+
+    Args:
+        period: "weekly", "monthly" or "custom"
+        start: First date to cover, defaults to the earliest stored date
+        end: Last date to cover, defaults to the latest stored date
+        days: Length of each custom period
+        output_template: HTML output path; may use {period}, {label}, {start} and {end}
+        pdf: Also render each report to PDF next to its HTML file
+        workers: Number of parallel writers (and browsers, for PDFs)
+
+    Returns:
+        Paths of the files written
+    """
+    from visualize import write_report
+
+    with span("reports.plan"):
+        periods, daily_data, diary_entries = plan_period_reports(period, start, end, days)
+
+    def write(report: Dict[str, Any]) -> str:
+        path = output_template.format(period=period, label=report["label"],
+                                      start=report["start"], end=report["end"])
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        write_report(path, f"{period.capitalize()} Report {report['label']}",
+                     f"{period.capitalize()} Summary ({report['start']} to {report['end']})",
+                     report["dates"], daily_data, diary_entries)
+        return path
+
+    try:
+        with span("reports.write_html"), ThreadPoolExecutor(max_workers=workers) as pool:
+            written = list(pool.map(write, periods))
+    finally:
+        if hasattr(daily_data, "close"):
+            daily_data.close()
+
+    if pdf and written:
+        from pdf_renderer import PdfRenderer
+        renderer = PdfRenderer(workers=workers)
+        try:
+            pdf_jobs = [(_read_text(path), os.path.splitext(path)[0] + ".pdf") for path in list(written)]
+            with span("reports.render_pdfs"):
+                results = renderer.render_batch(pdf_jobs)
+            for pdf_path, error in results:
+                if error is None:
+                    written.append(pdf_path)
+                else:
+                    print(f"Error generating PDF {pdf_path}: {error}")
+        finally:
+            renderer.close()
+    return written
+
+
+def _read_text(path: str) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
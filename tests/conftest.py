@@ -0,0 +1,55 @@
+"""Shared fixtures: every test runs against its own throwaway data directory."""
+import os
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+import aggregates  # noqa: E402
+import data_io  # noqa: E402
+import diary  # noqa: E402
+import diary_search  # noqa: E402
+import medication_log  # noqa: E402
+import record_cache  # noqa: E402
+
+BACKENDS = ("json", "columnar", "compact")
+MEDICATIONS = [
+    {"name": "Pregabalin (150mg)", "doses_per_day": 2},
+    {"name": "Palexia IR (50mg)", "doses_per_day": 1, "prn": True},
+]
+
+
+@pytest.fixture
+def store(request, tmp_path, monkeypatch):
+    """Point the tracker at an empty default profile in ``tmp_path``.
+
+    Uses the json backend; parametrize indirectly with a backend name
+    (``@pytest.mark.parametrize("store", BACKENDS, indirect=True)``) to run a
+    test against another one. The path globals and the in-memory state of
+    the data modules are restored afterwards. The data directory is absolute,
+    so caches keyed by path never carry over between tests.
+    """
+    for name in ("PROFILE", "PROFILE_DIR", "DATA_DIR"):
+        monkeypatch.setattr(data_io, name, getattr(data_io, name))
+    monkeypatch.setattr(data_io, "HOME_DIR", str(tmp_path))
+    monkeypatch.setattr(data_io, "STORAGE_BACKEND", getattr(request, "param", "json"))
+    monkeypatch.setattr(data_io, "_daily_index_cache", {"path": None, "index": None, "dates": []})
+    for module in (aggregates, diary, diary_search, medication_log):
+        monkeypatch.setattr(module, "_state", None)
+    monkeypatch.chdir(tmp_path)
+    data_io.use_profile(data_io.DEFAULT_PROFILE)
+    yield tmp_path
+    # Saved now, while the data directory still exists, rather than at exit
+    record_cache.forget()
+
+
+@pytest.fixture
+def medications(store):
+    """Save a medication catalog with one scheduled and one as-needed medication."""
+    from catalogs import MEDICATIONS_FILE, catalog_path, save_catalog
+
+    save_catalog(catalog_path(MEDICATIONS_FILE), {"medications": MEDICATIONS})
+    return MEDICATIONS
@@ -0,0 +1,91 @@
+import pytest
+
+import adherence
+import data_io
+import medication_log
+
+SCHEDULED = "Pregabalin (150mg)"
+PRN = "Palexia IR (50mg)"
+
+
+@pytest.fixture
+def history(medications):
+    """Three tracked days: all doses logged, one dose in the daily record, an extra dose logged."""
+    medication_log.record_pain(7, "2024-03-01 07:30")
+    medication_log.record_dose(SCHEDULED, "2024-03-01 08:00")
+    medication_log.record_pain(6, "2024-03-01 09:00")
+    medication_log.record_pain(4, "2024-03-01 10:00")
+    medication_log.record_dose(SCHEDULED, "2024-03-01 20:00")
+    medication_log.record_dose(PRN, "2024-03-01 21:00")
+    data_io.save_daily_data("2024-03-02", {"pain": 5, "medications": {SCHEDULED: 1, PRN: 0}})
+    medication_log.record_dose(SCHEDULED, "2024-03-03 08:00", doses=3)
+
+
+def _rates(summaries):
+    return [(date_str, summary["rate"]) for date_str, summary in summaries]
+
+
+def test_daily_adherence_caps_extra_doses_and_ignores_prn(history):
+    days = adherence.daily_adherence()
+    assert _rates(days) == [("2024-03-01", 1.0), ("2024-03-02", 0.5), ("2024-03-03", 1.0)]
+    assert days[0][1]["prn"] == {PRN: 1}
+    assert list(days[0][1]["medications"]) == [SCHEDULED]
+
+
+def test_logged_and_recorded_doses_of_a_day_are_not_double_counted(history):
+    medication_log.record_dose(SCHEDULED, "2024-03-02 09:00")
+    assert adherence.doses_by_day("2024-03-02", "2024-03-02") == {"2024-03-02": {SCHEDULED: 1, PRN: 0}}
+    medication_log.record_dose(SCHEDULED, "2024-03-02 21:00")
+    assert _rates(adherence.daily_adherence("2024-03-02", "2024-03-02")) == [("2024-03-02", 1.0)]
+
+
+def test_range_weekly_and_rolling_adherence(history):
+    total = adherence.range_adherence()
+    assert (total["days"], total["taken"], total["prescribed"]) == (3, 5, 6)
+    assert [week for week, _ in adherence.weekly_adherence()] == ["2024-W09"]
+    # The untracked days around the history count for neither taken nor prescribed doses
+    assert adherence.rolling_adherence("2024-03-01", "2024-03-04", window=2) == [
+        ("2024-03-01", 1.0), ("2024-03-02", 0.75), ("2024-03-03", 0.75), ("2024-03-04", 1.0)]
+    with pytest.raises(ValueError):
+        adherence.rolling_adherence("2024-03-01", "2024-03-04", window=0)
+
+
+def test_dose_pain_latency(history):
+    assert adherence.dose_pain_latency("2024-03-01", "2024-03-01", medication=SCHEDULED) == {
+        SCHEDULED: {"doses": 2, "with_baseline": 1, "relieved": 1, "relief_rate": 1.0,
+                    "median_minutes": 60.0, "mean_minutes": 60.0}}
+
+
+def test_removed_events_stop_counting(history):
+    event_id = medication_log.record_dose(SCHEDULED, "2024-03-04 08:00")
+    assert medication_log.daily_doses("2024-03-04") == {"2024-03-04": {SCHEDULED: 1}}
+    assert medication_log.remove_event(event_id)
+    assert not medication_log.remove_event(event_id)
+    assert medication_log.daily_doses("2024-03-04") == {}
+
+
+def test_event_log_survives_restarts_and_a_torn_tail(history):
+    medication_log.flush_index()
+    medication_log.record_pain(3, "2024-03-04 12:00")
+    expected = medication_log.events()
+    with open(medication_log._log_path(), "ab") as log:
+        log.write(b'{"id": 99, "time": "2024-03-05T08:00:00", "kind": "do')
+
+    medication_log._state = None  # As after a restart: the saved index plus the log tail
+    assert medication_log.events() == expected
+    event_id = medication_log.record_pain(2, "2024-03-05 12:00")
+    medication_log._state = None
+    assert medication_log.events(start="2024-03-05") == [
+        {"id": event_id, "time": "2024-03-05T12:00:00", "kind": "pain", "level": 2}]
+
+
+def test_invalid_events_are_refused(medications):
+    with pytest.raises(ValueError):
+        medication_log.record_dose("Unknown", "2024-03-01 08:00")
+    with pytest.raises(ValueError):
+        medication_log.record_dose(SCHEDULED, "2024-03-01 08:00", doses=0)
+    with pytest.raises(ValueError):
+        medication_log.record_pain(11, "2024-03-01 08:00")
+    with pytest.raises(ValueError):
+        medication_log.record_pain(3, "yesterday")
+    assert medication_log.events() == []
@@ -0,0 +1,102 @@
+import json
+import os
+import threading
+
+import pytest
+
+import aggregates
+import data_io
+from catalogs import MEDICATIONS_FILE, catalog_path, save_catalog
+from conftest import BACKENDS, MEDICATIONS
+
+DAYS = {
+    "2024-01-30": {"pain": 2, "time_based": {"Guitar": 30}, "meditation": True},
+    "2024-01-31": {"pain": 6, "exercises": {"Grip Rotation (500g)": {"repeats": 10, "sets": 2}}},
+    "2024-02-01": {"pain": 4, "time_based": {"Guitar": 15, "Total Computer Use": 3}},
+    "2024-02-29": {"pain": 8},
+    "2024-03-01": {"pain": 1, "time_based": {"Guitar": 5}},
+}
+
+
+def _all_levels():
+    return {level: aggregates.rollups(level) for level in aggregates.LEVELS}
+
+
+@pytest.mark.parametrize("store", BACKENDS, indirect=True)
+def test_incremental_rollups_match_a_rebuild(store):
+    for date_str, data in DAYS.items():
+        data_io.save_daily_data(date_str, data)
+    data_io.save_daily_data("2024-02-01", {"pain": 9})
+    incremental = _all_levels()
+    assert [key for key, _ in incremental["month"]] == ["2024-01", "2024-02", "2024-03"]
+    assert dict(incremental["day"])["2024-02-01"]["pain"]["mean"] == 9
+
+    aggregates.rebuild()
+    assert _all_levels() == incremental
+
+
+def test_range_rollups_combine_months_and_partial_days(store):
+    for date_str, data in DAYS.items():
+        data_io.save_daily_data(date_str, data)
+    summary = aggregates.summarize_range("2024-01-31", "2024-03-01")
+    assert summary["days"] == 4
+    assert summary["pain"] == {"min": 1, "max": 8, "mean": 19 / 4}
+    assert summary["activities"]["Guitar"]["total"] == 20
+
+
+def test_rollups_follow_days_changed_behind_their_back(store):
+    for date_str, data in DAYS.items():
+        data_io.save_daily_data(date_str, data)
+    aggregates.rollups("day")
+    with open(os.path.join(data_io.DATA_DIR, "2024-03-02.json"), "w") as f:
+        json.dump({"pain": 3}, f)
+    os.remove(os.path.join(data_io.DATA_DIR, "2024-01-30.json"))
+    days = dict(aggregates.rollups("day"))
+    assert "2024-01-30" not in days and days["2024-03-02"]["pain"]["mean"] == 3
+    assert dict(aggregates.rollups("month"))["2024-03"]["days"] == 2
+
+
+def test_expected_doses_use_the_schedule_saved_with_the_day(medications):
+    data_io.save_daily_data("2024-01-01", {"medications": {MEDICATIONS[0]["name"]: 1}})
+    save_catalog(catalog_path(MEDICATIONS_FILE), {"medications": [dict(MEDICATIONS[0], doses_per_day=4)]})
+    aggregates.rebuild()
+    assert dict(aggregates.rollups("day"))["2024-01-01"]["adherence"] == {
+        MEDICATIONS[0]["name"]: {"taken": 1, "expected": 2, "rate": 0.5}}
+
+
+@pytest.mark.parametrize("store", BACKENDS, indirect=True)
+def test_edits_keep_the_schedule_first_saved_with_the_day(store, medications):
+    name = MEDICATIONS[0]["name"]
+    data_io.save_daily_data("2024-01-01", {"pain": 3, "medications": {name: 1}})
+    save_catalog(catalog_path(MEDICATIONS_FILE), {"medications": [dict(MEDICATIONS[0], doses_per_day=4)]})
+    # As the menu and an API GET/PUT round trip save it: the record without the schedule
+    data_io.save_daily_data("2024-01-01", {"pain": 4, "medications": {name: 2}})
+    assert data_io.load_daily_data("2024-01-01")[data_io.SCHEDULE_FIELD] == {name: 2}
+    assert dict(aggregates.rollups("day"))["2024-01-01"]["adherence"] == {
+        name: {"taken": 2, "expected": 2, "rate": 1.0}}
+    # The schedule is the store's own bookkeeping, not part of the record handed out
+    assert data_io.query_range() == [("2024-01-01", {"pain": 4, "medications": {name: 2}, "version": 2})]
+
+
+@pytest.mark.parametrize("store", BACKENDS, indirect=True)
+def test_threads_saving_and_querying_keep_the_rollups_consistent(store):
+    threads, days = 4, 10
+    errors = []
+
+    def work(worker):
+        try:
+            for i in range(days):
+                data_io.save_daily_data(f"2024-0{worker + 1}-{i + 1:02d}", {"pain": i % 11})
+                aggregates.rollups("week")
+                aggregates.summarize_range("2024-01-01", "2024-12-31")
+        except Exception as e:  # Reported below; an assert here would only print
+            errors.append(e)
+
+    workers = [threading.Thread(target=work, args=(worker,)) for worker in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert errors == []
+    assert len(aggregates.rollups("day")) == threads * days
+    assert aggregates.summarize_range("2024-01-01", "2024-12-31")["days"] == threads * days
@@ -0,0 +1,50 @@
+import math
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+import analytics  # noqa: E402
+
+GUITAR = [10, 40, 0, 30, 20, 50, 5, 35, 15, 45]
+# Pain levels are whole numbers, so the pain a day's guitar minutes cause is too
+PAIN = [g // 5 for g in GUITAR]
+
+
+def _frame(columns, start="2024-01-01"):
+    return pd.DataFrame(columns, index=pd.date_range(start, periods=len(next(iter(columns.values())))),
+                        dtype=float)
+
+
+def test_a_lagged_effect_shows_up_at_its_lag():
+    # Pain follows the previous day's guitar minutes exactly
+    pain = [None] + PAIN[:-1]
+    frame = _frame({"pain": pain, "time:Guitar": GUITAR, "sleep": [-g for g in GUITAR]})
+    result = analytics.lagged_correlations(frame, lags=(0, 1))
+    assert result.loc["time:Guitar", "lag 1"] == pytest.approx(1.0)
+    assert result.loc["sleep", "lag 1"] == pytest.approx(-1.0)
+    # Lag 0 is the plain same-day correlation
+    same_day = pd.Series(GUITAR[1:], dtype=float).corr(pd.Series(PAIN[:-1], dtype=float))
+    assert result.loc["time:Guitar", "lag 0"] == pytest.approx(same_day)
+    assert list(result.columns) == ["lag 0", "lag 1"] and "pain" not in result.index
+
+
+def test_sparse_and_constant_columns_get_no_correlation():
+    frame = _frame({"pain": PAIN, "time:Guitar": GUITAR,
+                    "meditation": [1.0] * len(GUITAR),
+                    "med:Rare": [1, None, None, None, 2, None, None, None, None, 3]})
+    result = analytics.lagged_correlations(frame, lags=(0,), min_periods=5)
+    assert result.loc["time:Guitar", "lag 0"] == pytest.approx(1.0)
+    assert math.isnan(result.loc["meditation", "lag 0"])
+    assert math.isnan(result.loc["med:Rare", "lag 0"])
+
+
+def test_lags_count_calendar_days_across_untracked_days():
+    # Day 6 isn't tracked; the pairs around it must not close up over the gap
+    records = [(f"2024-01-{day:02d}", {"pain": pain, "time_based": {"Guitar": guitar}})
+               for day, (pain, guitar) in enumerate(zip([None] + PAIN, GUITAR + [None]), 1)
+               if day != 6]
+    frame = analytics.frame_from_records(records)
+    assert len(frame) == len(GUITAR) + 1 and frame.loc["2024-01-06"].isna().all()
+    result = analytics.lagged_correlations(frame, columns=["time:Guitar"], lags=(1,), min_periods=5)
+    assert result.loc["time:Guitar", "lag 1"] == pytest.approx(1.0)
@@ -0,0 +1,117 @@
+import threading
+
+import pytest
+
+pytest.importorskip("flask")
+
+import api  # noqa: E402
+import data_io  # noqa: E402
+
+
+@pytest.fixture
+def client(store):
+    return api.create_app().test_client()
+
+
+def test_days_round_trip_with_etags(client):
+    response = client.put("/api/days/2024-01-01", json={"pain": 4, "time_based": {"Guitar": 30}})
+    assert response.status_code == 200 and response.json["version"] == 1
+    assert response.headers["ETag"] == '"1"'
+
+    response = client.get("/api/days/2024-01-01")
+    assert response.json["data"] == {"pain": 4, "time_based": {"Guitar": 30}, "version": 1}
+    assert response.headers["ETag"] == '"1"'
+    assert client.get("/api/days?from=2024-01-01&to=2024-01-31").json == [
+        {"date": "2024-01-01", "data": {"pain": 4, "time_based": {"Guitar": 30}, "version": 1}}]
+
+
+def test_if_match_makes_saves_compare_and_swap(client):
+    client.put("/api/days/2024-01-01", json={"pain": 1})
+    assert client.put("/api/days/2024-01-01", json={"pain": 2}, headers={"If-Match": '"1"'}).json["version"] == 2
+
+    response = client.put("/api/days/2024-01-01", json={"pain": 3}, headers={"If-Match": '"1"'})
+    assert response.status_code == 409
+    assert (response.json["expected_version"], response.json["current_version"]) == (1, 2)
+
+    # A weak ETag, as some clients send back, names the same version
+    assert client.put("/api/days/2024-01-01", json={"pain": 3}, headers={"If-Match": 'W/"2"'}).json["version"] == 3
+    assert client.put("/api/days/2024-01-01", json={"pain": 4}, headers={"If-Match": "soon"}).status_code == 400
+
+
+def test_a_get_put_round_trip_keeps_the_stored_medication_schedule(client, medications):
+    name = medications[0]["name"]
+    client.put("/api/days/2024-01-01", json={"medications": {name: 1}})
+    data = client.get("/api/days/2024-01-01").json["data"]
+    assert data_io.SCHEDULE_FIELD not in data
+    client.put("/api/days/2024-01-01", json=dict(data, medications={name: 2}), headers={"If-Match": '"1"'})
+    assert data_io.load_daily_data("2024-01-01")[data_io.SCHEDULE_FIELD] == {name: 2}
+    assert data_io.SCHEDULE_FIELD not in client.get("/api/days").json[0]["data"]
+
+
+def test_if_match_star_requires_an_existing_record(client):
+    assert client.put("/api/days/2024-01-01", json={"pain": 1}, headers={"If-Match": "*"}).status_code == 412
+    assert client.get("/api/days/2024-01-01").status_code == 404
+    client.put("/api/days/2024-01-01", json={"pain": 1})
+    assert client.put("/api/days/2024-01-01", json={"pain": 2}, headers={"If-Match": "*"}).json["version"] == 2
+
+    assert client.put("/api/diary/2024-01-01", json={"entry": "Sore"}, headers={"If-Match": "*"}).status_code == 412
+    client.put("/api/diary/2024-01-01", json={"entry": "Sore"})
+    assert client.put("/api/diary/2024-01-01", json={"entry": "Worse"},
+                      headers={"If-Match": "*"}).json["version"] == 2
+
+
+def test_diary_entries_round_trip_with_etags(client):
+    assert client.put("/api/diary/2024-01-01", json={"entry": "Sore"}).json["version"] == 1
+    assert client.put("/api/diary/2024-01-01", json={"entry": "Worse"}, headers={"If-Match": '"0"'}).status_code == 409
+    response = client.get("/api/diary/2024-01-01")
+    assert response.json["entry"] == "Sore" and response.headers["ETag"] == '"1"'
+    assert client.get("/api/diary").json == {"2024-01-01": "Sore"}
+    assert [r["date"] for r in client.get("/api/diary/search?q=sore").json] == ["2024-01-01"]
+
+
+def test_bad_requests_are_rejected(client):
+    assert client.get("/api/days/2024-13-01").status_code == 400
+    assert client.get("/api/days/2024-01-01").status_code == 404
+    response = client.put("/api/days/2024-01-01", json={"pain": 15})
+    assert response.status_code == 400 and response.json["problems"]
+    assert client.put("/api/days/2024-01-01", data="not json").status_code == 400
+    assert client.get("/api/rollups/year").status_code == 404
+    for limit in ("ten", "0"):
+        response = client.get(f"/api/diary/search?q=sore&limit={limit}")
+        assert response.status_code == 400 and response.json["error"].startswith("limit: ")
+
+
+def test_cached_responses_follow_writes(client):
+    client.put("/api/days/2024-01-01", json={"pain": 1})
+    assert client.get("/api/days").json[0]["data"]["pain"] == 1
+    assert client.get("/api/rollups/day").json["2024-01-01"]["pain"]["mean"] == 1
+    client.put("/api/days/2024-01-01", json={"pain": 5})
+    assert client.get("/api/days").json[0]["data"]["pain"] == 5
+    assert client.get("/api/rollups/day").json["2024-01-01"]["pain"]["mean"] == 5
+
+
+def test_concurrent_clients_lose_no_update(store):
+    app = api.create_app()
+    threads, increments = 8, 5
+
+    def increment():
+        client = app.test_client()
+        for _ in range(increments):
+            while True:
+                response = client.get("/api/days/2024-01-01")
+                minutes, etag = (response.json["data"]["time_based"]["Guitar"], response.headers["ETag"]) \
+                    if response.status_code == 200 else (0, '"0"')
+                status = client.put("/api/days/2024-01-01", json={"time_based": {"Guitar": minutes + 1}},
+                                    headers={"If-Match": etag}).status_code
+                if status != 409:
+                    assert status == 200
+                    break
+
+    workers = [threading.Thread(target=increment) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    response = app.test_client().get("/api/days/2024-01-01")
+    assert response.json["data"]["time_based"]["Guitar"] == threads * increments
+    assert response.json["version"] == threads * increments
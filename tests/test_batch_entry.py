@@ -0,0 +1,42 @@
+import pytest
+
+import batch_entry
+import data_io
+import diary
+
+
+def test_a_batch_with_repeated_dates_numbers_every_version(store, capsys):
+    diary.save_diary_entry("2024-01-01", "before the batch")
+    saved = batch_entry.log_entries([
+        ("2024-01-01", {"pain": 3}, "first"),
+        ("2024-01-01", {"mood": "ok"}, "second"),
+        ("2024-01-02", {"pain": 5}, None),
+    ])
+    assert saved == [("2024-01-01", 1), ("2024-01-02", 1)]
+    assert data_io.load_daily_data("2024-01-01") == {"pain": 3, "mood": "ok", "version": 1}
+    assert diary.get_diary_record("2024-01-01") == ("second", 3)
+    diary._state = None  # As after a restart: the log alone decides
+    assert diary.get_diary_record("2024-01-01") == ("second", 3)
+    # Saving is silent; the CLI and the menu report what was saved
+    assert capsys.readouterr().out == ""
+
+
+def test_saves_repeated_in_one_transaction_keep_counting_versions(store):
+    data_io.save_daily_data("2024-01-01", {"pain": 1})
+    with data_io.transaction():
+        assert data_io.save_daily_data("2024-01-01", {"pain": 2}) == 2
+        assert data_io.save_daily_data("2024-01-01", {"pain": 3}, expected_version=2) == 3
+        with pytest.raises(data_io.ConflictError):
+            diary.save_diary_entry("2024-01-01", "stale", expected_version=1)
+        assert diary.save_diary_entry("2024-01-01", "a") == 1
+        assert diary.save_diary_entry("2024-01-01", "b", expected_version=1) == 2
+    assert data_io.load_daily_data("2024-01-01") == {"pain": 3, "version": 3}
+    assert diary.get_diary_record("2024-01-01") == ("b", 2)
+
+
+def test_an_invalid_entry_saves_nothing(store):
+    with pytest.raises(ValueError) as e:
+        batch_entry.log_entries([("2024-01-01", {"pain": 3}, "fine"), ("2024-01-02", {"pain": 15}, None)])
+    assert "2024-01-02" in str(e.value)
+    assert data_io.list_dates() == []
+    assert diary.get_diary_entry("2024-01-01") is None
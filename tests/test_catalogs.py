@@ -0,0 +1,57 @@
+import json
+import os
+
+import catalogs
+from catalogs import TIME_ACTIVITIES_FILE, catalog_path
+
+
+def _write_behind_the_cache(filename, data, mtime_ns):
+    with open(filename, "w") as f:
+        json.dump(data, f, indent=2)  # As save_catalog writes it
+    os.utime(filename, ns=(mtime_ns, mtime_ns))
+
+
+def test_unchanged_catalogs_are_parsed_once(store):
+    first = catalogs.get_time_activities()
+    assert first == catalogs.DEFAULT_TIME_ACTIVITIES
+    assert catalogs.get_time_activities() is first
+
+
+def test_a_catalog_changed_on_disk_is_reloaded(store):
+    filename = catalog_path(TIME_ACTIVITIES_FILE)
+    before = catalogs.get_time_activities()
+    mtime_ns = os.stat(filename).st_mtime_ns
+    _write_behind_the_cache(filename, {"Guitar": {"type": "minutes"}}, mtime_ns + 1_000_000)
+    assert catalogs.get_time_activities() == {"Guitar": {"type": "minutes"}}
+    assert before == catalogs.DEFAULT_TIME_ACTIVITIES  # Handed-out copies are left alone
+
+    # A same-size rewrite is only noticed through its new mtime
+    _write_behind_the_cache(filename, {"Violin": {"type": "minutes"}}, mtime_ns + 2_000_000)
+    assert catalogs.get_time_activities() == {"Violin": {"type": "minutes"}}
+
+
+def test_a_deleted_catalog_is_rebuilt_from_its_default(store):
+    catalogs.save_catalog(catalog_path(TIME_ACTIVITIES_FILE), {"Guitar": {"type": "minutes"}})
+    assert catalogs.get_time_activities() == {"Guitar": {"type": "minutes"}}
+    os.remove(catalog_path(TIME_ACTIVITIES_FILE))
+    assert catalogs.get_time_activities() == catalogs.DEFAULT_TIME_ACTIVITIES
+    assert os.path.exists(catalog_path(TIME_ACTIVITIES_FILE))
+
+
+def test_a_catalog_created_after_a_miss_is_picked_up(store):
+    assert catalogs.get_medications() is None
+    meds = {"medications": [{"name": "Pregabalin (150mg)", "doses_per_day": 2}]}
+    with open(catalog_path(catalogs.MEDICATIONS_FILE), "w") as f:
+        json.dump(meds, f)
+    assert catalogs.get_medications() == meds["medications"]
+
+
+def test_invalidate_forces_a_reload_the_signature_would_miss(store):
+    filename = catalog_path(TIME_ACTIVITIES_FILE)
+    catalogs.save_catalog(filename, {"Guitar": {"type": "minutes"}})
+    stat = os.stat(filename)
+    # Same size and mtime, as a copy preserving timestamps could leave it
+    _write_behind_the_cache(filename, {"Violin": {"type": "minutes"}}, stat.st_mtime_ns)
+    assert catalogs.get_time_activities() == {"Guitar": {"type": "minutes"}}
+    catalogs.invalidate(filename)
+    assert catalogs.get_time_activities() == {"Violin": {"type": "minutes"}}
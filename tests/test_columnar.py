@@ -0,0 +1,143 @@
+import os
+import threading
+from datetime import date, timedelta
+
+import pytest
+
+import columnar
+import instrumentation
+
+RECORDS = [
+    ("2024-03-01", {"pain": 4, "mood": "ok", "meditation": True,
+                    "time_based": {"Guitar": 30, "Total Computer Use": 2.5},
+                    "exercises": {"Grip Rotation (500g)": {"repeats": 10, "sets": 2}},
+                    "medications": {"Pregabalin (150mg)": 2}, "version": 1}),
+    ("2024-03-02", {"pain": 7, "mood": None, "meditation": False, "exercises": {}, "medications": {},
+                    "tags": ["flare", "cold"], "version": 1}),
+    ("2024-03-04", {"pain": 2, "time_based": {"Driving": 0}, "notes": {"sleep": {}}, "version": 3}),
+]
+
+
+@pytest.fixture
+def history(tmp_path):
+    history_dir = str(tmp_path / columnar.HISTORY_DIRNAME)
+    for date_str, data in RECORDS:
+        columnar.append_day(date_str, data, history_dir, sync=False)
+    yield history_dir
+    columnar._state.pop(history_dir, None)
+
+
+def test_scan_round_trips_every_value_type(history):
+    assert list(columnar.scan(history)) == RECORDS
+
+
+def test_empty_dicts_keep_their_keys():
+    data = {"exercises": {}, "notes": {"sleep": {}}, "pain": 1}
+    assert columnar.unflatten_record(dict(columnar.flatten_record(data))) == data
+
+
+def test_scan_selects_dates_and_fields(history):
+    assert [d for d, _ in columnar.scan(history, "2024-03-02", "2024-03-04")] == ["2024-03-02", "2024-03-04"]
+    assert list(columnar.scan(history, fields=["pain"])) == [(d, {"pain": data["pain"]}) for d, data in RECORDS]
+    assert columnar.read_day("2024-03-03", history) is None
+
+
+def test_latest_row_of_a_day_wins_and_compaction_keeps_only_it(history):
+    columnar.append_day("2024-03-01", {"pain": 9, "version": 2}, history, sync=False)
+    assert columnar.read_day("2024-03-01", history) == {"pain": 9, "version": 2}
+    assert columnar.row_count(history) == len(RECORDS) + 1
+
+    assert columnar.compact(history) == len(RECORDS)
+    assert columnar.row_count(history) == len(RECORDS)
+    assert columnar.read_day("2024-03-01", history) == {"pain": 9, "version": 2}
+    assert list(columnar.scan(history))[1:] == RECORDS[1:]
+
+
+def test_a_scan_reads_only_the_rows_it_selects(tmp_path):
+    history_dir = str(tmp_path / columnar.HISTORY_DIRNAME)
+    first = date(2023, 1, 1)
+    for i in range(400):
+        columnar.append_day((first + timedelta(days=i)).strftime("%Y-%m-%d"), {"pain": i % 11}, history_dir,
+                            sync=False)
+    # An edit of an old day lands at the end of the store, far from its week
+    columnar.append_day("2023-01-03", {"pain": 10}, history_dir, sync=False)
+    instrumentation.reset()
+    instrumentation.enable()
+    try:
+        week = list(columnar.scan(history_dir, "2023-01-01", "2023-01-07", fields=["pain"]))
+        read = instrumentation.snapshot()["counters"]["bytes.read"]
+    finally:
+        instrumentation.disable()
+        instrumentation.reset()
+        columnar._state.pop(history_dir, None)
+    assert dict(week)["2023-01-03"] == {"pain": 10}
+    assert read <= (7 + columnar.SCAN_MAX_GAP_ROWS) * columnar.CELL_SIZE
+
+
+def _crash_on_replace(monkeypatch, calls_before_crash):
+    """Make the n-th os.replace of a compaction raise, as if the process died there."""
+    real_replace = os.replace
+    calls = []
+
+    def replace(src, dst):
+        calls.append(src)
+        if len(calls) > calls_before_crash:
+            raise OSError("simulated crash")
+        real_replace(src, dst)
+
+    monkeypatch.setattr(columnar.os, "replace", replace)
+
+
+@pytest.mark.parametrize("calls_before_crash", [0, 1])
+def test_recover_finishes_or_discards_an_interrupted_compaction(history, monkeypatch, calls_before_crash):
+    columnar.append_day("2024-03-01", {"pain": 9}, history, sync=False)
+    expected = list(columnar.scan(history))
+    _crash_on_replace(monkeypatch, calls_before_crash)
+    with pytest.raises(OSError):
+        columnar.compact(history)
+    monkeypatch.undo()
+
+    columnar.recover(history)
+    new_dir, old_dir = columnar._swap_dirs(history)
+    assert not os.path.exists(new_dir) and not os.path.exists(old_dir)
+    assert list(columnar.scan(history)) == expected
+
+
+def test_compact_ignores_a_stale_old_directory(history):
+    _, old_dir = columnar._swap_dirs(history)
+    os.makedirs(old_dir)
+    with open(os.path.join(old_dir, columnar.DATES_FILE), "wb") as f:
+        f.write(b"junk")
+    assert columnar.compact(history) == len(RECORDS)
+    assert not os.path.exists(old_dir)
+    assert list(columnar.scan(history)) == RECORDS
+
+
+def test_mapped_history_matches_scan(history):
+    columnar.append_day("2024-03-02", {"pain": 5, "exercises": {}}, history, sync=False)
+    expected = list(columnar.scan(history))
+    with columnar.open_mapped(history) as view:
+        assert list(view.records()) == expected
+        assert list(view.records("2024-03-02", "2024-03-02")) == expected[1:2]
+        assert view["2024-03-04"] == RECORDS[2][1]
+        assert "2024-03-03" not in view and len(view) == 3
+        assert list(view.column_values(("time_based", "Guitar"))) == [("2024-03-01", 30)]
+        assert list(view.numeric(("pain",))) == [4.0, 5.0, 2.0]
+
+
+def test_mapped_history_can_be_shared_between_threads(history):
+    expected = list(columnar.scan(history))
+    results = []
+    with columnar.open_mapped(history) as view:
+        barrier = threading.Barrier(8)
+
+        def read():
+            barrier.wait()
+            results.append(list(view.records()))
+
+        threads = [threading.Thread(target=read) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert results == [expected] * 8
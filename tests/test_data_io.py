@@ -0,0 +1,179 @@
+import json
+import os
+import stat
+from datetime import date, timedelta
+
+import pytest
+
+import data_io
+import diary
+from conftest import BACKENDS
+
+DAYS = {
+    "2024-01-01": {"pain": 3, "mood": "ok", "time_based": {"Guitar": 20}},
+    "2024-01-02": {"pain": 6, "exercises": {"Grip Rotation (500g)": {"repeats": 10, "sets": 1}}},
+    "2024-01-05": {"pain": 1, "meditation": True},
+}
+
+
+def _stored(date_str):
+    data = data_io.load_daily_data(date_str)
+    if data is not None:
+        data.pop(data_io.VERSION_FIELD)
+    return data
+
+
+@pytest.mark.parametrize("store", BACKENDS, indirect=True)
+def test_saved_days_round_trip_and_query_in_date_order(store):
+    for date_str in reversed(list(DAYS)):
+        assert data_io.save_daily_data(date_str, DAYS[date_str]) == 1
+    assert {date_str: _stored(date_str) for date_str in DAYS} == DAYS
+    assert data_io.list_dates() == list(DAYS)
+    assert [d for d, _ in data_io.query_range("2024-01-02", "2024-01-31")] == ["2024-01-02", "2024-01-05"]
+    assert data_io.query_range(fields=["pain"]) == [(d, {"pain": data["pain"]}) for d, data in DAYS.items()]
+    assert [d for d, _ in data_io.iter_records("2024-01-01", "2024-01-02")] == ["2024-01-01", "2024-01-02"]
+
+
+def test_index_notices_day_files_written_behind_its_back(store):
+    data_io.save_daily_data("2024-01-01", DAYS["2024-01-01"])
+    assert data_io.list_dates() == ["2024-01-01"]
+    with open(os.path.join(data_io.DATA_DIR, "2024-01-03.json"), "w") as f:
+        json.dump({"pain": 2}, f)
+    assert data_io.list_dates() == ["2024-01-01", "2024-01-03"]
+    os.remove(os.path.join(data_io.DATA_DIR, "2024-01-01.json"))
+    assert data_io.query_range() == [("2024-01-03", {"pain": 2})]
+
+
+@pytest.mark.parametrize("store", BACKENDS, indirect=True)
+def test_a_failed_transaction_writes_nothing(store):
+    data_io.save_daily_data("2024-01-01", {"pain": 1})
+    with pytest.raises(RuntimeError):
+        with data_io.transaction():
+            data_io.save_daily_data("2024-01-01", {"pain": 5})
+            data_io.save_daily_data("2024-01-02", {"pain": 5})
+            diary.save_diary_entry("2024-01-02", "never written")
+            raise RuntimeError("abort")
+    assert _stored("2024-01-01") == {"pain": 1}
+    assert data_io.load_daily_data("2024-01-02") is None
+    assert diary.get_diary_entry("2024-01-02") is None
+    assert not os.path.exists(os.path.join(data_io.DATA_DIR, data_io.JOURNAL_FILE))
+
+
+@pytest.mark.parametrize("store", BACKENDS, indirect=True)
+def test_recover_journal_finishes_a_commit_interrupted_by_a_crash(store, monkeypatch):
+    data_io.save_daily_data("2024-01-01", {"pain": 1})
+    real_apply = data_io._apply_op
+    applied = []
+
+    def crash_after_first_op(op):
+        if applied:
+            raise OSError("simulated crash")
+        applied.append(op)
+        real_apply(op)
+
+    monkeypatch.setattr(data_io, "_apply_op", crash_after_first_op)
+    with pytest.raises(OSError):
+        with data_io.transaction():
+            data_io.save_daily_data("2024-01-01", {"pain": 7})
+            data_io.save_daily_data("2024-01-02", {"pain": 8})
+            diary.save_diary_entry("2024-01-02", "after the crash")
+    monkeypatch.setattr(data_io, "_apply_op", real_apply)
+    assert os.path.exists(os.path.join(data_io.DATA_DIR, data_io.JOURNAL_FILE))
+
+    assert data_io.recover_journal() == 3
+    assert not os.path.exists(os.path.join(data_io.DATA_DIR, data_io.JOURNAL_FILE))
+    assert _stored("2024-01-01") == {"pain": 7}
+    assert _stored("2024-01-02") == {"pain": 8}
+    assert data_io.list_dates() == ["2024-01-01", "2024-01-02"]
+    diary._state = None  # As after a restart
+    assert diary.get_diary_record("2024-01-02") == ("after the crash", 1)
+    # Replaying again (a crash during recovery) is harmless
+    assert data_io.recover_journal() == 0
+
+
+@pytest.fixture
+def synced_files(monkeypatch):
+    """Record the inode of every regular file passed to os.fsync."""
+    synced = []
+    real_fsync = os.fsync
+
+    def fsync(fd):
+        info = os.fstat(fd)
+        if stat.S_ISREG(info.st_mode):
+            synced.append(info.st_ino)
+        real_fsync(fd)
+
+    monkeypatch.setattr(os, "fsync", fsync)
+    return synced
+
+
+def _inode(date_str):
+    return os.stat(os.path.join(data_io.DATA_DIR, data_io._day_filename(date_str))).st_ino
+
+
+def test_batched_writes_are_synced_under_their_final_names(store, synced_files):
+    with data_io.batch_writes():
+        data_io.save_daily_data("2024-01-01", {"pain": 1})
+        data_io.save_daily_data("2024-01-02", {"pain": 2})
+    assert {_inode("2024-01-01"), _inode("2024-01-02")} <= set(synced_files)
+
+
+def test_a_transaction_syncs_its_writes_before_dropping_the_journal(store, synced_files, monkeypatch):
+    real_remove = os.remove
+    synced_at_removal = []
+
+    def remove(path):
+        if os.path.basename(path) == data_io.JOURNAL_FILE:
+            synced_at_removal.extend(synced_files)
+        real_remove(path)
+
+    monkeypatch.setattr(os, "remove", remove)
+    # Inside an enclosing batch too, whose own flush only comes at its end
+    with data_io.batch_writes(), data_io.transaction():
+        data_io.save_daily_data("2024-01-01", {"pain": 1})
+        diary.save_diary_entry("2024-01-01", "synced")
+    log = os.stat(diary._log_path()).st_ino
+    assert {_inode("2024-01-01"), log} <= set(synced_at_removal)
+
+
+def test_a_torn_journal_is_discarded(store):
+    data_io.save_daily_data("2024-01-01", {"pain": 1})
+    journal = os.path.join(data_io.DATA_DIR, data_io.JOURNAL_FILE)
+    with open(journal, "w") as f:
+        f.write('{"ops": [{"op": "write", "path": ')
+    assert data_io.recover_journal() == 0
+    assert not os.path.exists(journal)
+    assert _stored("2024-01-01") == {"pain": 1}
+
+
+def _save_days(year, count):
+    for i in range(count):
+        data_io.save_daily_data((date(year, 1, 1) + timedelta(days=i)).strftime("%Y-%m-%d"),
+                                {"pain": i % 11, "time_based": {"Guitar": i}})
+
+
+@pytest.mark.parametrize("store", ["json", "compact"], indirect=True)
+def test_pooled_loading_matches_serial_loading(store):
+    with data_io.bulk_writes():
+        _save_days(2020, 150)
+    # An unreadable day is skipped the same way by every loader
+    with open(os.path.join(data_io.DATA_DIR, data_io._day_filename("2020-03-05")), "wb") as f:
+        f.write(b"{torn")
+    serial = list(data_io.iter_records(workers=1))
+    assert len(serial) == 149
+    assert list(data_io.iter_records(workers=4)) == serial
+    assert list(data_io.iter_records(workers=2, processes=True)) == serial
+    assert list(data_io.iter_records("2020-02-01", "2020-04-15", fields=["pain"], workers=4)) == \
+        data_io.query_range("2020-02-01", "2020-04-15", fields=["pain"])
+
+
+def test_pooled_loading_merges_day_files_and_columnar_rows(store, monkeypatch):
+    with data_io.bulk_writes():
+        _save_days(2020, 100)
+    monkeypatch.setattr(data_io, "STORAGE_BACKEND", "columnar")
+    with data_io.bulk_writes():
+        _save_days(2021, 100)
+    records = list(data_io.iter_records(workers=4))
+    assert [d for d, _ in records] == data_io.list_dates()
+    assert len(records) == 200
+    assert records == list(data_io.iter_records(workers=1))
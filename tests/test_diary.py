@@ -0,0 +1,87 @@
+import json
+import multiprocessing
+import os
+
+import data_io
+import diary
+import diary_search
+
+
+def _restart():
+    """Drop the in-memory state, as if the process had restarted."""
+    diary._state = None
+    diary_search._state = None
+
+
+def test_entries_round_trip_with_versions(store):
+    assert diary.save_diary_entry("2024-01-02", "Sore forearms") == 1
+    assert diary.save_diary_entry("2024-01-01", "Good day") == 1
+    assert diary.save_diary_entry("2024-01-02", "Sore forearms, better by evening") == 2
+    _restart()
+    assert diary.get_diary_record("2024-01-02") == ("Sore forearms, better by evening", 2)
+    assert diary.load_diary_entries() == {"2024-01-01": "Good day", "2024-01-02": "Sore forearms, better by evening"}
+    assert diary.get_diary_record("2024-01-03") == (None, 0)
+
+
+def test_a_torn_record_at_the_end_of_the_log_is_ignored_and_cut_off(store):
+    diary.save_diary_entry("2024-01-01", "kept")
+    with open(diary._log_path(), "ab") as log:
+        log.write(b'{"date": "2024-01-02", "entry": "to')
+    _restart()
+    assert diary.load_diary_entries() == {"2024-01-01": "kept"}
+    diary.save_diary_entry("2024-01-03", "after the crash")
+    _restart()
+    assert diary.load_diary_entries() == {"2024-01-01": "kept", "2024-01-03": "after the crash"}
+
+
+def test_compaction_keeps_the_latest_entries(store):
+    for i in range(5):
+        diary.save_diary_entry("2024-01-01", f"draft {i}")
+    diary.save_diary_entry("2024-01-02", "other day")
+    size = os.path.getsize(diary._log_path())
+    diary.compact_diary()
+    assert os.path.getsize(diary._log_path()) < size
+    _restart()
+    assert diary.get_diary_record("2024-01-01") == ("draft 4", 5)
+    assert diary.load_diary_entries() == {"2024-01-01": "draft 4", "2024-01-02": "other day"}
+
+
+def _start_diary(home_dir):
+    data_io.HOME_DIR = home_dir
+    data_io.use_profile(data_io.DEFAULT_PROFILE)
+    return diary.load_diary_entries()
+
+
+def test_legacy_entries_are_imported_once_by_concurrent_processes(store):
+    legacy = {"2023-12-31": "From the old file", "2023-12-30": "Older"}
+    with open(diary._diary_json_path(), "w") as f:
+        json.dump(legacy, f)
+    with multiprocessing.get_context("spawn").Pool(4) as pool:
+        results = pool.map(_start_diary, [str(store)] * 4)
+    assert results == [dict(sorted(legacy.items()))] * 4
+    with open(diary._log_path(), "rb") as log:
+        assert len(log.readlines()) == len(legacy)
+    # The old file is the user's own; importing it leaves it as it was
+    with open(diary._diary_json_path()) as f:
+        assert json.load(f) == legacy
+    diary.save_diary_entry("2023-12-31", "Edited since")
+    _restart()
+    assert diary.load_diary_entries() == {"2023-12-30": "Older", "2023-12-31": "Edited since"}
+
+
+def test_search_follows_saves_compaction_and_restarts(store):
+    diary.save_diary_entry("2024-01-01", "Burning in my fingers after guitar")
+    diary.save_diary_entry("2024-01-02", "Tingling hands, the pain crept back")
+    assert [r["date"] for r in diary_search.search("burning")] == ["2024-01-01"]
+    assert [r["date"] for r in diary_search.search('"pain crept back"')] == ["2024-01-02"]
+    assert [r["date"] for r in diary_search.search("burn", use_stem=True)] == ["2024-01-01"]
+
+    diary.save_diary_entry("2024-01-01", "A quiet day")
+    assert diary_search.search("burning") == []
+    assert [r["date"] for r in diary_search.search("burn", use_stem=True)] == []
+    diary.compact_diary()
+    assert [r["date"] for r in diary_search.search("quiet")] == ["2024-01-01"]
+
+    _restart()
+    assert [r["date"] for r in diary_search.search("tingling hands")] == ["2024-01-02"]
+    assert [r["date"] for r in diary_search.search("day", start="2024-01-02")] == []
@@ -0,0 +1,61 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import data_io
+import diary
+import instrumentation
+from conftest import BACKENDS, REPO_DIR
+
+
+@pytest.fixture
+def untraced():
+    """Recording switched off with nothing recorded, as when TRACKER_TRACE is unset."""
+    was_enabled = instrumentation.enabled()
+    instrumentation.disable()
+    instrumentation.reset()
+    yield
+    instrumentation.reset()
+    if was_enabled:
+        instrumentation.enable()
+
+
+@pytest.mark.parametrize("store", BACKENDS, indirect=True)
+def test_untraced_work_records_nothing(store, untraced):
+    with data_io.batch_writes():
+        for day in range(1, 8):
+            data_io.save_daily_data(f"2024-01-{day:02d}", {"pain": day})
+    diary.save_diary_entry("2024-01-03", "A quiet day")
+    assert len(data_io.query_range("2024-01-01", "2024-01-31")) == 7
+    assert list(data_io.iter_records(fields=["pain"]))
+    assert instrumentation.snapshot() == {"spans": [], "counters": {}}
+    assert instrumentation.format_report() == "Nothing was traced."
+
+
+def test_untraced_spans_and_counters_are_no_ops(untraced):
+    @instrumentation.traced("test.work")
+    def work(value):
+        return value * 2
+
+    assert instrumentation.span("a") is instrumentation.span("b")
+    with instrumentation.span("test.outer") as outer:
+        assert work(21) == 42
+        instrumentation.count("test.calls", 5)
+    assert outer is instrumentation.span("c")
+    assert instrumentation.snapshot() == {"spans": [], "counters": {}}
+
+
+@pytest.mark.parametrize("value", [None, "", "0"])
+def test_tracing_stays_off_and_silent_without_the_variable(tmp_path, value):
+    env = {k: v for k, v in os.environ.items() if k != instrumentation.TRACE_ENV}
+    if value is not None:
+        env[instrumentation.TRACE_ENV] = value
+    script = ("import instrumentation, data_io\n"
+              "data_io.load_daily_data('2024-01-01')\n"
+              "print(instrumentation.enabled(), instrumentation.snapshot())\n")
+    result = subprocess.run([sys.executable, "-c", script], cwd=REPO_DIR, env=dict(env, TRACKER_HOME=str(tmp_path)),
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False {'spans': [], 'counters': {}}"
+    assert result.stderr == ""
@@ -0,0 +1,85 @@
+import math
+from datetime import date, timedelta
+
+import pytest
+
+import columnar
+import data_io
+
+
+def _day(i):
+    return (date(2023, 12, 25) + timedelta(days=i)).strftime("%Y-%m-%d")
+
+
+def _record(i):
+    data = {"pain": i % 11, "version": 1}
+    if i % 3 == 0:
+        data["time_based"] = {"Guitar": i * 5, "Total Computer Use": i / 4}
+    if i % 4 == 0:
+        data["mood"] = f"mood {i}"
+    if i % 5 == 0:
+        data["exercises"] = {"Grip Rotation (500g)": {"repeats": 10, "sets": i % 3}}
+    if i % 7 == 0:
+        data["meditation"] = i % 2 == 0
+    return data
+
+
+@pytest.fixture
+def history(tmp_path):
+    """40 days, then a few of them edited out of date order."""
+    history_dir = str(tmp_path / columnar.HISTORY_DIRNAME)
+    for i in range(40):
+        columnar.append_day(_day(i), _record(i), history_dir, sync=False)
+    for i in (30, 2, 17):
+        columnar.append_day(_day(i), {"pain": 10, "tags": ["edited"], "version": 2}, history_dir, sync=False)
+    yield history_dir
+    columnar._state.pop(history_dir, None)
+
+
+@pytest.mark.parametrize("start, end, fields", [
+    (None, None, None),
+    ("2024-01-01", "2024-01-10", None),
+    ("2023-12-20", "2023-12-26", ["pain"]),
+    (None, "2024-01-05", ["time_based", "mood"]),
+    ("2024-01-20", None, ["exercises", "tags"]),
+    ("2024-03-01", None, None),
+])
+def test_mapped_records_match_a_scan(history, start, end, fields):
+    expected = list(columnar.scan(history, start, end, fields))
+    with columnar.open_mapped(history) as view:
+        assert list(view.records(start, end, fields)) == expected
+
+
+def test_mapped_columns_match_a_scan(history):
+    scanned = dict(columnar.scan(history))
+    guitar = [(d, data["time_based"]["Guitar"]) for d, data in scanned.items() if "Guitar" in data.get("time_based", {})]
+    with columnar.open_mapped(history) as view:
+        assert list(view.dates()) == list(scanned)
+        assert dict(view) == scanned
+        assert list(view.column_values(("time_based", "Guitar"))) == guitar
+        pain = view.numeric(("pain",), "2023-12-25", "2023-12-31")
+        assert list(pain) == [scanned[_day(i)]["pain"] for i in range(7)]
+        meditation = view.numeric(("meditation",))
+        assert [value for value in meditation if not math.isnan(value)] == [
+            float(data["meditation"]) for data in scanned.values() if "meditation" in data]
+
+
+def test_a_compacted_store_maps_the_same_records(history):
+    expected = list(columnar.scan(history))
+    columnar.compact(history)
+    with columnar.open_mapped(history) as view:
+        assert list(view.records()) == expected
+
+
+@pytest.mark.parametrize("store", ["columnar"], indirect=True)
+def test_streaming_from_the_view_matches_query_range(store):
+    with data_io.bulk_writes():
+        for i in range(40):
+            data_io.save_daily_data(_day(i), _record(i))
+    data_io.save_daily_data(_day(3), {"pain": 9})
+    view = data_io.open_history_view()
+    assert view is not None
+    view.close()
+    assert list(data_io.iter_records()) == data_io.query_range()
+    assert list(data_io.iter_records("2024-01-01", "2024-01-15", fields=["mood"])) == \
+        data_io.query_range("2024-01-01", "2024-01-15", fields=["mood"])
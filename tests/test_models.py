@@ -0,0 +1,49 @@
+import pytest
+
+import data_io
+from models import DailyEntry, load_entries
+
+
+def test_malformed_fields_are_coerced_instead_of_failing_the_day():
+    entry = DailyEntry.from_dict("2024-01-01", {
+        "pain": "7", "mood": 3, "meditation": "yes",
+        "time_based": {"Guitar": "25", "Driving": "a while", "Total Computer Use": 1.5},
+        "exercises": {"Grip Rotation (500g)": {"repeats": "10", "sets": None}, "Broken": "10x2"},
+        "medications": {"Pregabalin (150mg)": "2", "Palexia IR (50mg)": "two"},
+        "version": 4,
+    })
+    assert (entry.pain, entry.mood, entry.meditation, entry.version) == (7, "3", True, 4)
+    assert entry.time_based == {"Guitar": 25.0, "Total Computer Use": 1.5}
+    assert [(ex.name, ex.repeats, ex.sets, ex.volume) for ex in entry.exercises] == [
+        ("Grip Rotation (500g)", 10, 0, 0)]
+    assert entry.doses("Pregabalin (150mg)") == 2
+    assert entry.doses("Palexia IR (50mg)", default=-1) == 0
+    assert entry.doses("Unknown", default=-1) == -1
+
+
+@pytest.mark.parametrize("raw, pain", [("bad", None), (4.0, 4), (4.5, None), (True, 1), (None, None), ("3", 3)])
+def test_pain_is_a_whole_number_or_none(raw, pain):
+    assert DailyEntry.from_dict("2024-01-01", {"pain": raw}).pain == pain
+
+
+@pytest.mark.parametrize("raw, meditation", [(1, True), (0, False), ("No", False), ("maybe", None), (None, None)])
+def test_meditation_is_a_boolean_or_none(raw, meditation):
+    assert DailyEntry.from_dict("2024-01-01", {"meditation": raw}).meditation is meditation
+
+
+def test_missing_and_unknown_fields():
+    empty = DailyEntry.from_dict("2024-01-01", None)
+    assert empty.is_empty and empty.version == 0 and empty.exercises == ()
+    entry = DailyEntry.from_dict("2024-01-01", {"tags": ["flare"], "exercises": None})
+    assert not entry.is_empty and entry.extra == {"tags": ["flare"]}
+    assert entry.to_dict() == {"tags": ["flare"]}
+
+
+def test_entries_round_trip_through_the_store(store):
+    record = {"pain": 3, "mood": "ok", "meditation": False, "time_based": {"Guitar": 20},
+              "exercises": {"Grip Rotation (500g)": {"repeats": 10, "sets": 2}}}
+    data_io.save_daily_data("2024-01-01", record)
+    [entry] = load_entries("2024-01-01", "2024-01-01")
+    assert entry.to_dict() == record and entry.version == 1
+    with pytest.raises(AttributeError):
+        entry.notes = "slots leave no room for new attributes"
@@ -0,0 +1,135 @@
+import sys
+import types
+
+import pytest
+
+import pdf_renderer
+
+
+class FakeBrowser:
+    def __init__(self, playwright):
+        self.playwright = playwright
+        self.connected = True
+
+    def is_connected(self):
+        return self.connected
+
+    def new_page(self):
+        return FakePage(self)
+
+    def close(self):
+        self.connected = False
+        self.playwright.closed += 1
+
+
+class FakePage:
+    def __init__(self, browser):
+        self.browser = browser
+        self.html = None
+
+    def set_content(self, html):
+        fault = self.browser.playwright.faults.pop(0) if self.browser.playwright.faults else None
+        if fault == "crash":
+            self.browser.connected = False
+            raise RuntimeError("Target closed")
+        if fault == "error":
+            raise ValueError("bad page")
+        self.html = html
+
+    def pdf(self, path):
+        with open(path, "w") as f:
+            f.write(self.html)
+
+    def close(self):
+        pass
+
+
+class FakePlaywright:
+    """Stands in for playwright.sync_api; ``faults`` lists what the next pages do ("crash", "error", None)."""
+
+    def __init__(self):
+        self.launches = 0
+        self.closed = 0
+        self.faults = []
+        self.chromium = types.SimpleNamespace(launch=self.launch)
+
+    def launch(self, **options):
+        self.launches += 1
+        return FakeBrowser(self)
+
+    def sync_playwright(self):
+        playwright = self
+
+        class Context:
+            def __enter__(self):
+                return playwright
+
+            def __exit__(self, *exc):
+                return False
+
+        return Context()
+
+
+@pytest.fixture
+def playwright(monkeypatch):
+    fake = FakePlaywright()
+    module = types.ModuleType("playwright.sync_api")
+    module.sync_playwright = fake.sync_playwright
+    monkeypatch.setitem(sys.modules, "playwright", types.ModuleType("playwright"))
+    monkeypatch.setitem(sys.modules, "playwright.sync_api", module)
+    return fake
+
+
+@pytest.fixture
+def renderer(playwright):
+    renderer = pdf_renderer.PdfRenderer(workers=1)
+    yield renderer
+    renderer.close()
+
+
+def test_one_warm_browser_renders_every_job(renderer, playwright, tmp_path):
+    paths = [str(tmp_path / f"{i}.pdf") for i in range(3)]
+    assert renderer.render_batch([(f"<p>{i}</p>", path) for i, path in enumerate(paths)]) == \
+        [(path, None) for path in paths]
+    assert renderer.render("<p>again</p>", paths[0]) == paths[0]
+    assert playwright.launches == 1
+    renderer.close()
+    assert playwright.closed == 1
+
+
+def test_a_crashed_browser_is_relaunched_and_the_job_retried(renderer, playwright, tmp_path):
+    playwright.faults = ["crash"]
+    path = str(tmp_path / "report.pdf")
+    assert renderer.render("<p>report</p>", path) == path
+    with open(path) as f:
+        assert f.read() == "<p>report</p>"
+    assert playwright.launches == 2
+
+
+def test_jobs_fail_without_retries_unless_the_browser_crashed(renderer, playwright, tmp_path):
+    playwright.faults = ["error", "crash", "crash", None]
+    results = renderer.render_batch([("<p>a</p>", str(tmp_path / "a.pdf")),
+                                     ("<p>b</p>", str(tmp_path / "b.pdf")),
+                                     ("<p>c</p>", str(tmp_path / "c.pdf"))])
+    # a: a page error is not retried; b: crashes on both attempts; c: renders on a fresh browser
+    assert [type(error) for _, error in results] == [ValueError, RuntimeError, type(None)]
+    assert playwright.launches == 3
+
+
+def test_jobs_fail_instead_of_hanging_when_playwright_cannot_start(monkeypatch, tmp_path):
+    module = types.ModuleType("playwright.sync_api")
+
+    def sync_playwright():
+        raise OSError("no browser installed")
+
+    module.sync_playwright = sync_playwright
+    monkeypatch.setitem(sys.modules, "playwright", types.ModuleType("playwright"))
+    monkeypatch.setitem(sys.modules, "playwright.sync_api", module)
+    renderer = pdf_renderer.PdfRenderer(workers=2)
+    try:
+        with pytest.raises(OSError):
+            renderer.render("<p>x</p>", str(tmp_path / "x.pdf"))
+    finally:
+        renderer.close()
+    with pytest.raises(RuntimeError):
+        renderer.submit("<p>x</p>", str(tmp_path / "x.pdf"))
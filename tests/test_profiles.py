@@ -0,0 +1,47 @@
+import pytest
+
+import data_io
+import diary
+import profiles
+
+
+@pytest.fixture
+def two_profiles(store):
+    data_io.save_daily_data("2024-01-01", {"pain": 1})
+    profiles.create_profile("alice")
+    data_io.use_profile("alice")
+    data_io.save_daily_data("2024-01-01", {"pain": 7})
+    data_io.save_daily_data("2024-01-02", {"pain": 8})
+    diary.save_diary_entry("2024-01-01", "Alice's day")
+    data_io.use_profile(data_io.DEFAULT_PROFILE)
+
+
+def test_profiles_keep_their_data_apart(two_profiles):
+    assert profiles.list_profiles() == [data_io.DEFAULT_PROFILE, "alice"]
+    assert data_io.query_range(fields=["pain"]) == [("2024-01-01", {"pain": 1})]
+    assert diary.get_diary_entry("2024-01-01") is None
+    data_io.use_profile("alice")
+    assert data_io.query_range(fields=["pain"]) == [("2024-01-01", {"pain": 7}), ("2024-01-02", {"pain": 8})]
+    assert diary.get_diary_entry("2024-01-01") == "Alice's day"
+
+
+def test_queries_across_profiles(two_profiles):
+    assert profiles.query_profiles(fields=["pain"]) == {
+        data_io.DEFAULT_PROFILE: [("2024-01-01", {"pain": 1})],
+        "alice": [("2024-01-01", {"pain": 7}), ("2024-01-02", {"pain": 8})],
+    }
+    summary = profiles.summarize_profiles("2024-01-01", "2024-01-31")
+    assert summary["profiles"]["alice"]["days"] == 2
+    assert summary["total"]["days"] == 3
+    assert summary["total"]["pain"]["max"] == 8
+
+
+def test_invalid_profile_changes_are_refused(store):
+    with pytest.raises(ValueError):
+        profiles.create_profile("../escape")
+    profiles.create_profile("bob")
+    with pytest.raises(ValueError):
+        profiles.create_profile("bob")
+    with data_io.write_lock():
+        with pytest.raises(RuntimeError):
+            data_io.use_profile("bob")
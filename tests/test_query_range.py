@@ -0,0 +1,51 @@
+import pytest
+
+import data_io
+from conftest import BACKENDS
+
+DAYS = {
+    "2023-12-31": {"pain": 5, "mood": "tired"},
+    "2024-01-01": {"mood": "ok"},
+    "2024-01-02": {"pain": 2, "time_based": {"Guitar": 20}},
+    "2024-02-29": {"meditation": True, "time_based": {"Guitar": 10}},
+}
+
+
+@pytest.fixture
+def days(store):
+    for date_str, data in DAYS.items():
+        data_io.save_daily_data(date_str, data)
+
+
+def test_list_dates_selects_an_inclusive_range(days):
+    assert data_io.list_dates() == list(DAYS)
+    assert data_io.list_dates("2024-01-01", "2024-01-02") == ["2024-01-01", "2024-01-02"]
+    assert data_io.list_dates(start="2024-01-02") == ["2024-01-02", "2024-02-29"]
+    assert data_io.list_dates(end="2023-12-31") == ["2023-12-31"]
+    # Bounds between stored dates, and an empty range
+    assert data_io.list_dates("2024-01-03", "2024-03-01") == ["2024-02-29"]
+    assert data_io.list_dates("2024-03-01", "2024-12-31") == []
+
+
+def test_list_dates_keeps_days_with_any_of_the_fields(days):
+    assert data_io.list_dates(fields=["pain"]) == ["2023-12-31", "2024-01-02"]
+    assert data_io.list_dates(fields=["meditation", "mood"]) == ["2023-12-31", "2024-01-01", "2024-02-29"]
+    assert data_io.list_dates("2024-01-01", None, fields=["time_based"]) == ["2024-01-02", "2024-02-29"]
+    assert data_io.list_dates(fields=["exercises"]) == []
+
+
+@pytest.mark.parametrize("store", BACKENDS, indirect=True)
+def test_query_range_returns_only_the_requested_fields(days):
+    assert data_io.query_range(fields=["pain"]) == [("2023-12-31", {"pain": 5}), ("2024-01-02", {"pain": 2})]
+    assert data_io.query_range("2024-01-01", "2024-12-31", fields=["mood", "time_based"]) == [
+        ("2024-01-01", {"mood": "ok"}),
+        ("2024-01-02", {"time_based": {"Guitar": 20}}),
+        ("2024-02-29", {"time_based": {"Guitar": 10}}),
+    ]
+    assert data_io.query_range(fields=["exercises"]) == []
+
+
+def test_the_index_follows_a_saved_field_change(days):
+    data_io.save_daily_data("2024-01-01", {"pain": 7})
+    assert data_io.list_dates(fields=["mood"]) == ["2023-12-31"]
+    assert data_io.query_range("2024-01-01", "2024-01-01", fields=["pain"]) == [("2024-01-01", {"pain": 7})]
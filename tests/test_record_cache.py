@@ -0,0 +1,54 @@
+import json
+import os
+
+import pytest
+
+import data_io
+import instrumentation
+import record_cache
+
+
+@pytest.fixture
+def counters():
+    """Record the I/O counters during the test; call the fixture to read them."""
+    instrumentation.reset()
+    instrumentation.enable()
+    yield lambda: instrumentation.snapshot()["counters"]
+    instrumentation.disable()
+    instrumentation.reset()
+
+
+@pytest.mark.parametrize("store", ["json", "compact"], indirect=True)
+def test_hits_return_fresh_copies(store, counters):
+    data_io.save_daily_data("2024-01-01", {"pain": 3, "time_based": {"Guitar": 10}})
+    first = data_io.load_daily_data("2024-01-01")
+    first["time_based"]["Guitar"] = 99
+    assert data_io.load_daily_data("2024-01-01")["time_based"] == {"Guitar": 10}
+    assert counters()["record_cache.hits"] >= 1
+
+
+def test_rewritten_files_are_never_served_stale(store):
+    data_io.save_daily_data("2024-01-01", {"pain": 3})
+    assert data_io.load_daily_data("2024-01-01")["pain"] == 3
+    # Same size, written behind the cache's back
+    with open(os.path.join(data_io.DATA_DIR, "2024-01-01.json"), "w") as f:
+        json.dump({"pain": 4, "version": 1}, f, indent=2)
+    assert data_io.load_daily_data("2024-01-01")["pain"] == 4
+
+
+def test_the_sidecar_serves_the_next_process(store, counters):
+    data_io.save_daily_data("2024-01-01", {"pain": 3})
+    data_io.load_daily_data("2024-01-01")
+    record_cache.forget()  # Saves the sidecar, as at exit
+    assert os.path.exists(os.path.join(data_io.index_dir(), record_cache.RECORD_CACHE_FILE))
+    instrumentation.reset()
+    assert data_io.load_daily_data("2024-01-01") == {"pain": 3, "version": 1}
+    assert counters().get("record_cache.misses", 0) == 0
+
+
+def test_an_unreadable_sidecar_is_ignored(store):
+    data_io.save_daily_data("2024-01-01", {"pain": 3})
+    record_cache.forget()
+    with open(os.path.join(data_io.index_dir(), record_cache.RECORD_CACHE_FILE), "wb") as f:
+        f.write(b"garbage")
+    assert data_io.load_daily_data("2024-01-01") == {"pain": 3, "version": 1}
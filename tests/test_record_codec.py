@@ -0,0 +1,43 @@
+import pytest
+
+import record_codec
+from catalogs import TIME_ACTIVITIES_FILE, catalog_path, save_catalog
+
+RECORDS = [
+    {"pain": 4, "mood": "ok", "meditation": True, "version": 3,
+     "time_based": {"Guitar": 30, "Total Computer Use": 2.5, "Driving": True, "Piano": None},
+     "exercises": {"Grip Rotation (500g)": {"repeats": 10, "sets": 2}},
+     "medications": {"Pregabalin (150mg)": 2}},
+    {"pain": None, "meditation": None, "exercises": {}, "medications": {}},
+    # Fields that don't fit the fixed layout go to the extras
+    {"pain": 11.5, "mood": ["tired", "flat"], "time_based": {"Guitar": 2 ** 60},
+     "exercises": {"Grip Rotation (500g)": {"repeats": 10, "sets": 1, "weight": "500g"}},
+     "medications": {"Pregabalin (150mg)": -1}, "notes": {"sleep": 6}},
+    {},
+]
+
+
+@pytest.mark.parametrize("data", RECORDS)
+def test_decode_reproduces_the_normalized_record(store, data):
+    assert record_codec.decode(record_codec.encode(data)) == record_codec.normalize(data)
+
+
+def test_values_are_normalized_on_write(store):
+    data = {"pain": "6", "meditation": "yes", "time_based": {"Guitar": "45", "Total Computer Use": "1.5"}}
+    assert record_codec.decode(record_codec.encode(data)) == {
+        "pain": 6, "meditation": True, "time_based": {"Guitar": 45, "Total Computer Use": 1.5}}
+
+
+def test_name_ids_survive_catalog_changes(store):
+    raw = record_codec.encode({"time_based": {"Guitar": 30, "Piano": 10}})
+    save_catalog(catalog_path(TIME_ACTIVITIES_FILE), {"Violin": {"type": "minutes"}, "Piano": {"type": "minutes"}})
+    assert record_codec.decode(record_codec.encode({"time_based": {"Violin": 5}})) == {"time_based": {"Violin": 5}}
+    assert record_codec.decode(raw) == {"time_based": {"Guitar": 30, "Piano": 10}}
+
+
+def test_corrupt_records_raise_value_error(store):
+    raw = record_codec.encode(RECORDS[0])
+    with pytest.raises(ValueError):
+        record_codec.decode(raw[:len(raw) // 2])
+    with pytest.raises(ValueError):
+        record_codec.decode(b"XX" + raw[2:])
@@ -0,0 +1,40 @@
+import pytest
+
+from reports import period_ranges
+
+
+def test_monthly_periods_are_whole_calendar_months_across_a_year_end():
+    assert period_ranges("monthly", "2023-12-15", "2024-02-10") == [
+        ("2023-12", "2023-12-01", "2023-12-31"),
+        ("2024-01", "2024-01-01", "2024-01-31"),
+        ("2024-02", "2024-02-01", "2024-02-29"),
+    ]
+    assert period_ranges("monthly", "2023-02-28", "2023-02-28") == [("2023-02", "2023-02-01", "2023-02-28")]
+
+
+def test_weekly_periods_are_iso_weeks_labelled_by_their_iso_year():
+    assert period_ranges("weekly", "2020-12-31", "2021-01-04") == [
+        ("2020-W53", "2020-12-28", "2021-01-03"),
+        ("2021-W01", "2021-01-04", "2021-01-10"),
+    ]
+    # The week holding 2024-12-31 is the first of 2025
+    assert period_ranges("weekly", "2024-12-29", "2024-12-31") == [
+        ("2024-W52", "2024-12-23", "2024-12-29"),
+        ("2025-W01", "2024-12-30", "2025-01-05"),
+    ]
+
+
+def test_custom_periods_run_from_start_and_stop_at_end():
+    assert period_ranges("custom", "2024-02-27", "2024-03-04", days=3) == [
+        ("2024-02-27_to_2024-02-29", "2024-02-27", "2024-02-29"),
+        ("2024-03-01_to_2024-03-03", "2024-03-01", "2024-03-03"),
+        ("2024-03-04_to_2024-03-04", "2024-03-04", "2024-03-04"),
+    ]
+
+
+def test_invalid_periods_are_refused():
+    assert period_ranges("monthly", "2024-03-01", "2024-02-01") == []
+    with pytest.raises(ValueError):
+        period_ranges("custom", "2024-01-01", "2024-01-31")
+    with pytest.raises(ValueError):
+        period_ranges("yearly", "2024-01-01", "2024-12-31")
@@ -0,0 +1,25 @@
+import subprocess
+import sys
+
+import pytest
+
+from conftest import REPO_DIR
+
+# Only imported once the feature needing them runs (see benchmarks/check_import_time.py)
+LAZY_MODULES = ["playwright", "tabulate", "prompt_toolkit", "pandas", "numpy", "jinja2", "flask",
+                "multiprocessing", "record_cache", "medication_log", "adherence"]
+
+
+def _imported_modules(module):
+    """Every module ``-X importtime`` reports while importing ``module`` in a fresh interpreter."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=REPO_DIR, capture_output=True, text=True, check=True)
+    return {line.rsplit("|", 1)[1].strip() for line in result.stderr.splitlines()
+            if line.startswith("import time:") and line.count("|") == 2}
+
+
+@pytest.mark.parametrize("module", ["menu", "tracker"])
+def test_entry_points_leave_heavy_dependencies_unimported(module):
+    imported = _imported_modules(module)
+    assert module in imported
+    assert sorted(m for m in LAZY_MODULES if m in imported) == []
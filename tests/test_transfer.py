@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+import transfer
+from conftest import BACKENDS
+
+RECORDS = [
+    ("2024-01-01", {"pain": 4, "mood": "ok", "meditation": True,
+                    "time_based": {"Guitar": 30, "Total Computer Use": 2.5},
+                    "exercises": {"Grip Rotation (500g)": {"repeats": 10, "sets": 2}},
+                    "medications": {"Pregabalin (150mg)": 2}}),
+    ("2024-01-02", {"pain": None, "mood": "10", "exercises": {}, "medications": {}, "tags": ["flare", "cold"]}),
+    ("2024-01-04", {"pain": 2, "time_based": {"Driving": False}, "notes": {"sleep": {"hours": 6.5}}}),
+]
+EXTENSIONS = {"json": "_days", "jsonl": ".jsonl", "csv": ".csv", "columnar": ".ctc"}
+
+
+@pytest.mark.parametrize("fmt", transfer.FORMATS)
+def test_every_format_round_trips(tmp_path, fmt):
+    path = str(tmp_path / f"out{EXTENSIONS[fmt]}")
+    assert transfer.write_records(fmt, RECORDS, path) == len(RECORDS)
+    assert list(transfer.read_records(fmt, path)) == RECORDS
+    if fmt != "json":
+        assert transfer.detect_format(path) == fmt
+
+
+def test_columnar_files_span_row_groups_and_select_fields(tmp_path):
+    path = str(tmp_path / "out.ctc")
+    records = [(f"2024-02-{day:02d}", {"pain": day % 11, "mood": f"day {day}"}) for day in range(1, 29)]
+    transfer.write_columnar(records, path, row_group_size=5)
+    assert list(transfer.read_columnar(path)) == records
+    assert list(transfer.read_columnar(path, fields=["pain"])) == [(d, {"pain": data["pain"]}) for d, data in records]
+
+
+@pytest.mark.parametrize("store", BACKENDS, indirect=True)
+@pytest.mark.parametrize("fmt", transfer.FORMATS)
+def test_store_exports_read_back_as_stored(store, fmt):
+    assert transfer.import_records(RECORDS) == len(RECORDS)
+    stored = list(transfer.read_store())
+    assert [d for d, _ in stored] == [d for d, _ in RECORDS]
+    path = os.path.join(str(store), f"export{EXTENSIONS[fmt]}")
+    assert transfer.export_records(fmt, path) == len(RECORDS)
+    assert list(transfer.read_records(fmt, path)) == stored
+
+
+def test_import_can_merge_into_stored_days(store):
+    transfer.import_records([("2024-01-01", {"pain": 3, "time_based": {"Guitar": 10}})])
+    transfer.import_records([("2024-01-01", {"time_based": {"Piano": 5}})], merge=True)
+    assert list(transfer.read_store()) == [("2024-01-01", {"pain": 3, "time_based": {"Guitar": 10, "Piano": 5}})]
+
+
+def test_validation_skips_keeps_or_fails_on_invalid_records(store):
+    records = [("2024-01-01", {"pain": 3}), ("2024-01-02", {"pain": 15}),
+               ("2024-01-03", {"time_based": {"Unknown activity": 5}})]
+    report = {}
+    assert [d for d, _ in transfer.validated(records, report=report)] == ["2024-01-01"]
+    assert (report["valid"], report["invalid"], len(report["problems"])) == (1, 2, 2)
+    assert [d for d, _ in transfer.validated(records, on_invalid="keep")] == [d for d, _ in records]
+    with pytest.raises(ValueError, match="2024-01-02"):
+        list(transfer.validated(records, on_invalid="fail"))
+
+
+def test_malformed_input_raises_value_error(tmp_path):
+    path = str(tmp_path / "bad.jsonl")
+    with open(path, "w") as f:
+        f.write('{"date": "2024-01-01", "pain": 1}\n{"pain": 2}\n')
+    with pytest.raises(ValueError, match="bad.jsonl:2"):
+        list(transfer.read_jsonl(path))
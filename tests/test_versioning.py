@@ -0,0 +1,80 @@
+import multiprocessing
+import threading
+
+import pytest
+
+import data_io
+import diary
+from conftest import BACKENDS
+
+
+@pytest.mark.parametrize("store", BACKENDS, indirect=True)
+def test_day_compare_and_swap_refuses_stale_versions(store):
+    assert data_io.save_daily_data("2024-01-01", {"pain": 1}, expected_version=0) == 1
+    assert data_io.save_daily_data("2024-01-01", {"pain": 2}, expected_version=1) == 2
+    with pytest.raises(data_io.ConflictError) as e:
+        data_io.save_daily_data("2024-01-01", {"pain": 3}, expected_version=1)
+    assert (e.value.expected, e.value.actual) == (1, 2)
+    with pytest.raises(data_io.ConflictError):
+        data_io.save_daily_data("2024-01-01", {"pain": 3}, expected_version=0)
+    assert data_io.load_daily_data("2024-01-01") == {"pain": 2, "version": 2}
+
+
+def test_diary_compare_and_swap_refuses_stale_versions(store):
+    assert diary.save_diary_entry("2024-01-01", "first", expected_version=0) == 1
+    with pytest.raises(data_io.ConflictError) as e:
+        diary.save_diary_entry("2024-01-01", "second", expected_version=0)
+    assert (e.value.expected, e.value.actual) == (0, 1)
+    assert diary.save_diary_entry("2024-01-01", "second", expected_version=1) == 2
+    assert diary.get_diary_record("2024-01-01") == ("second", 2)
+
+
+@pytest.mark.parametrize("store", BACKENDS, indirect=True)
+def test_threads_incrementing_one_day_lose_no_update(store):
+    threads, increments = 8, 10
+
+    def increment():
+        for _ in range(increments):
+            while True:
+                data = data_io.load_daily_data("2024-01-01") or {}
+                try:
+                    data_io.save_daily_data("2024-01-01", {"pain": data.get("pain", 0) + 1},
+                                            expected_version=data_io.record_version(data))
+                    break
+                except data_io.ConflictError:
+                    pass
+
+    workers = [threading.Thread(target=increment) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert data_io.load_daily_data("2024-01-01") == {"pain": threads * increments, "version": threads * increments}
+
+
+def _process_worker(home_dir, backend, worker, increments):
+    data_io.HOME_DIR, data_io.STORAGE_BACKEND = home_dir, backend
+    data_io.use_profile(data_io.DEFAULT_PROFILE)
+    data_io.save_daily_data(f"2024-02-{worker + 1:02d}", {"pain": worker})
+    for _ in range(increments):
+        while True:
+            data = data_io.load_daily_data("2024-01-01") or {}
+            try:
+                data_io.save_daily_data("2024-01-01", {"pain": data.get("pain", 0) + 1},
+                                        expected_version=data_io.record_version(data))
+                break
+            except data_io.ConflictError:
+                pass
+
+
+@pytest.mark.parametrize("store", BACKENDS, indirect=True)
+def test_processes_writing_at_once_lose_no_save(store):
+    processes, increments = 3, 5
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(processes) as pool:
+        pool.starmap(_process_worker, [(str(store), data_io.STORAGE_BACKEND, worker, increments)
+                                       for worker in range(processes)])
+    assert data_io.load_daily_data("2024-01-01") == {"pain": processes * increments,
+                                                     "version": processes * increments}
+    assert data_io.query_range("2024-02-01", "2024-02-28", fields=["pain"]) == [
+        (f"2024-02-{worker + 1:02d}", {"pain": worker}) for worker in range(processes)]
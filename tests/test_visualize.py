@@ -0,0 +1,28 @@
+import pytest
+
+pytest.importorskip("jinja2")
+
+import visualize  # noqa: E402
+
+DATES = ["2024-01-01", "2024-01-02"]
+PERIOD_DATA = {"2024-01-01": {"pain": 3, "mood": "<b>fine</b>", "time_based": {"Guitar": 20}}}
+DIARY = {"2024-01-01": "<script>alert('x')</script> & more", "2024-01-02": None}
+
+
+def test_diary_text_and_record_values_are_escaped(store):
+    html = visualize.render_report("A & B", "<Week>", DATES, PERIOD_DATA, DIARY)
+    assert "<script>" not in html and "<b>fine</b>" not in html
+    assert "&lt;script&gt;alert(&#39;x&#39;)&lt;/script&gt; &amp; more" in html
+    assert "&lt;b&gt;fine&lt;/b&gt;" in html
+    assert "&lt;Week&gt;" in html and "A &amp; B" in html
+
+
+def test_a_streamed_report_matches_the_rendered_one(store, tmp_path):
+    path = tmp_path / "report.html"
+    visualize.write_report(str(path), "Week", "Week", DATES, PERIOD_DATA, DIARY)
+    assert path.read_text(encoding="utf-8") == visualize.render_report("Week", "Week", DATES, PERIOD_DATA, DIARY)
+
+
+def test_a_period_without_data_shows_the_empty_message(store):
+    html = visualize.render_report("Week", "Week", DATES, {}, {}, empty_message="Nothing <here>")
+    assert "Nothing &lt;here&gt;" in html and "Diary Entries" not in html
@@ -1,7 +1,5 @@
 from typing import Dict, Any
-from data_io import load_json, save_json
-
-TIME_ACTIVITIES_FILE = "time_activities.json"
+from catalogs import TIME_ACTIVITIES_FILE, catalog_path, get_time_activities, save_catalog
 
 def load_time_based_activities() -> Dict[str, Any]:
     """Load time-based activities data from file or create default if not exists.
@@ -9,17 +7,7 @@ def load_time_based_activities() -> Dict[str, Any]:
     Returns:
         Dictionary of time-based activities with their types
     """
-    data = load_json(TIME_ACTIVITIES_FILE)
-    if data is None:
-        data = {
-            "Driving": {"type": "minutes"},
-            "Guitar": {"type": "minutes"},
-            "Piano": {"type": "minutes"},
-            "Computer Training": {"type": "minutes"},
-            "Total Computer Use": {"type": "hours"}
-        }
-        save_json(TIME_ACTIVITIES_FILE, data)
-    return data
+    return get_time_activities()
 
 def add_new_time_activity(time_based_activities: Dict[str, Any]) -> None:
     """Add a new time-based activity to the activities dictionary.
@@ -62,6 +50,6 @@ def add_new_time_activity(time_based_activities: Dict[str, Any]) -> None:
         if extra_info:
             time_based_activities[name]["scale_range"] = extra_info
         
-        save_json(TIME_ACTIVITIES_FILE, time_based_activities)
+        save_catalog(catalog_path(TIME_ACTIVITIES_FILE), time_based_activities)
         print(f"Time-based activity '{name}' added.")
         return
\ No newline at end of file
@@ -1,20 +1,370 @@
+import argparse
+import json
+import sys
 from datetime import datetime
 import data_io
+import columnar
 from data_io import (load_json, save_json, load_daily_data, save_daily_data, load_medications)
 from diary import get_diary_entry, save_diary_entry
-from exercises import load_exercises
-from time_activities import load_time_based_activities
 from diary import prompt_diary_entry, get_diary_entry, save_diary_entry
 from prompts import prompt_pain, prompt_yes_no, prompt_mood, prompt_medication_doses
 from visualize import display_entries
 
 
-EXERCISES_FILE = "exercises.json"
-TIME_ACTIVITIES_FILE = "time_activities.json"
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Daily pain, exercise and medication tracker")
+    parser.add_argument("--profile", help="Profile (tracked person) to use, defaults to $TRACKER_PROFILE or 'default'")
+    parser.add_argument("--trace", action="store_true",
+                        help="Time file I/O, report stages and prompts; print the timing tree to stderr at exit")
+    parser.add_argument("--trace-file", metavar="FILE", help="Like --trace, but write the timings to FILE as JSON")
+    subparsers = parser.add_subparsers(dest="command")
 
-exercises = load_exercises()
-time_based_activities = load_time_based_activities()
+    migrate_parser = subparsers.add_parser("migrate", help="Convert per-day JSON files to the columnar or compact format")
+    migrate_parser.add_argument("--to", choices=["columnar", "compact"], default="columnar",
+                                help="Target format: the columnar history store or compact .rec day files")
+    migrate_parser.add_argument("--overwrite", action="store_true", help="Re-import days already converted")
+    migrate_parser.add_argument("--compact", action="store_true", help="Compact the columnar store after importing")
+
+    search_parser = subparsers.add_parser("search", help="Search diary entries")
+    search_parser.add_argument("query", help='Search terms; quote phrases, e.g. \'palexia "burning pain"\'')
+    search_parser.add_argument("--from", dest="start", help="Only entries on or after this date (YYYY-MM-DD)")
+    search_parser.add_argument("--to", dest="end", help="Only entries on or before this date (YYYY-MM-DD)")
+    search_parser.add_argument("--stem", action="store_true", help="Match other word forms (burn/burning)")
+    search_parser.add_argument("--limit", type=int, default=20, help="Maximum number of results")
+    search_parser.add_argument("--json", action="store_true", help="Print results as JSON")
+
+    rollups_parser = subparsers.add_parser("rollups", help="Show stored day/week/month rollups")
+    rollups_parser.add_argument("level", choices=["day", "week", "month"], help="Bucket size")
+    rollups_parser.add_argument("--from", dest="start", help="Only buckets on or after this date (YYYY-MM-DD)")
+    rollups_parser.add_argument("--to", dest="end", help="Only buckets on or before this date (YYYY-MM-DD)")
+    rollups_parser.add_argument("--rebuild", action="store_true", help="Recompute every rollup from the daily data first")
+    rollups_parser.add_argument("--json", action="store_true", help="Print rollups as JSON")
+
+    log_parser = subparsers.add_parser("log", help="Log a day's data without prompts")
+    log_parser.add_argument("--date", help="Date to log (YYYY-MM-DD), defaults to today")
+    log_parser.add_argument("--pain", help="Pain level (0-10)")
+    log_parser.add_argument("--mood", help="Mood description")
+    log_parser.add_argument("--meditation", help="Meditated today (yes/no)")
+    log_parser.add_argument("--time", action="append", default=[], metavar="ACTIVITY=VALUE",
+                            help="Time-based activity in its unit, e.g. Guitar=20; repeatable")
+    log_parser.add_argument("--exercise", action="append", default=[], metavar="EXERCISE=REPSxSETS",
+                            help="Exercise repeats and sets, e.g. 'Grip Rotation (500g)=10x2'; repeatable")
+    log_parser.add_argument("--med", action="append", default=[], metavar="MEDICATION=DOSES",
+                            help="Doses taken, e.g. 'Pregabalin (150mg)=2'; repeatable")
+    log_parser.add_argument("--diary", help="Diary entry text")
+    log_parser.add_argument("--input", metavar="FILE",
+                            help="Read entries from a JSON Lines file ('-' for stdin), one {\"date\": ...} per line")
+    log_parser.add_argument("--replace", action="store_true", help="Replace stored days instead of merging into them")
+    log_parser.add_argument("--dry-run", action="store_true", help="Only validate, don't save anything")
+
+    formats = ["json", "jsonl", "csv", "columnar"]
+    export_parser = subparsers.add_parser("export", help="Export daily data to JSON files, JSONL, CSV or columnar")
+    export_parser.add_argument("output", help="Output file or directory ('-' for stdout)")
+    export_parser.add_argument("--format", choices=formats, help="Defaults to the output's extension")
+    export_parser.add_argument("--from", dest="start", help="First date to export (YYYY-MM-DD)")
+    export_parser.add_argument("--to", dest="end", help="Last date to export (YYYY-MM-DD)")
+
+    import_parser = subparsers.add_parser("import", help="Import daily data from JSON files, JSONL, CSV or columnar")
+    import_parser.add_argument("input", help="Input file or directory ('-' for stdin)")
+    import_parser.add_argument("--format", choices=formats, help="Defaults to the input's extension")
+    import_parser.add_argument("--merge", action="store_true", help="Merge into stored days instead of replacing them")
+    import_parser.add_argument("--on-invalid", choices=["skip", "keep", "fail"], default="skip",
+                               help="What to do with records that don't match the catalogs")
+    import_parser.add_argument("--dry-run", action="store_true", help="Only validate, don't save anything")
+
+    convert_parser = subparsers.add_parser("convert", help="Convert between export formats without touching the store")
+    convert_parser.add_argument("input", help="Input file or directory ('-' for stdin)")
+    convert_parser.add_argument("output", help="Output file or directory ('-' for stdout)")
+    convert_parser.add_argument("--from-format", choices=formats, help="Defaults to the input's extension")
+    convert_parser.add_argument("--to-format", choices=formats, help="Defaults to the output's extension")
+    convert_parser.add_argument("--validate", choices=["skip", "keep", "fail"],
+                                help="Check records against the catalogs while converting")
+
+    serve_parser = subparsers.add_parser("serve", help="Serve the data over a local HTTP/JSON API")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    serve_parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    serve_parser.add_argument("--workers", type=int, default=8, help="Worker threads handling requests")
+
+    profiles_parser = subparsers.add_parser("profiles", help="List or create profiles, or summarize a range across them")
+    profiles_parser.add_argument("action", choices=["list", "create", "summary"])
+    profiles_parser.add_argument("name", nargs="?", help="Profile to create")
+    profiles_parser.add_argument("--copy-catalogs", action="store_true",
+                                 help="Start the new profile from this profile's catalogs")
+    profiles_parser.add_argument("--from", dest="start", help="First date to summarize (YYYY-MM-DD)")
+    profiles_parser.add_argument("--to", dest="end", help="Last date to summarize (YYYY-MM-DD), defaults to today")
+    profiles_parser.add_argument("--only", action="append", metavar="PROFILE",
+                                 help="Summarize only this profile; repeatable")
+    profiles_parser.add_argument("--workers", type=int, help="Worker processes, defaults to one per profile up to the CPU count")
+    profiles_parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+
+    meds_parser = subparsers.add_parser("meds", help="Log timestamped doses and pain readings, or report adherence")
+    meds_parser.add_argument("action", choices=["take", "pain", "remove", "list", "adherence", "latency"])
+    meds_parser.add_argument("value", nargs="?",
+                             help="Medication to take, pain level (0-10) or event ID to remove")
+    meds_parser.add_argument("--at", help="When the dose was taken or pain read (YYYY-MM-DD HH:MM), defaults to now")
+    meds_parser.add_argument("--doses", type=int, default=1, help="Doses taken at once")
+    meds_parser.add_argument("--from", dest="start", help="First date (YYYY-MM-DD)")
+    meds_parser.add_argument("--to", dest="end", help="Last date (YYYY-MM-DD), defaults to today for adherence")
+    meds_parser.add_argument("--by", choices=["day", "week", "rolling", "total"], default="week",
+                             help="Adherence per day, per ISO week, over a rolling window or in total")
+    meds_parser.add_argument("--window", type=int, default=7, help="Days in the rolling adherence window")
+    meds_parser.add_argument("--medication", help="Only this medication (list, latency)")
+    meds_parser.add_argument("--json", action="store_true", help="Print results as JSON")
+
+    args = parser.parse_args(argv)
+    if args.trace or args.trace_file:
+        import instrumentation
+        instrumentation.enable(args.trace_file or "-")
+    if args.profile:
+        try:
+            data_io.use_profile(args.profile)
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+    replayed = data_io.recover_journal()
+    if replayed:
+        print(f"Recovered {replayed} write(s) from an interrupted save.")
+    if args.command == "search":
+        import diary_search
+        results = diary_search.search(args.query, start=args.start, end=args.end,
+                                      use_stem=args.stem, limit=args.limit)
+        if args.json:
+            print(json.dumps(results, indent=2))
+        else:
+            diary_search.print_results(results)
+    elif args.command == "rollups":
+        import aggregates
+        if args.rebuild:
+            aggregates.rebuild()
+        results = aggregates.rollups(args.level, start=args.start, end=args.end)
+        if args.json:
+            print(json.dumps(dict(results), indent=2))
+        else:
+            for key, summary in results:
+                pain = summary["pain"]
+                mean = f"{pain['mean']:.1f}" if pain["mean"] is not None else "N/A"
+                print(f"{key}: {summary['days']} day(s), pain {pain['min']}-{pain['max']} (mean {mean}), "
+                      f"meditation {summary['meditation_days']} day(s)")
+    elif args.command == "serve":
+        import api
+        api.serve(args.host, args.port, args.workers)
+    elif args.command == "profiles":
+        return run_profiles(args)
+    elif args.command == "meds":
+        return run_meds(args)
+    elif args.command == "log":
+        return run_log(args)
+    elif args.command in ("export", "import", "convert"):
+        return run_transfer(args)
+    elif args.command == "migrate" and args.to == "compact":
+        converted = data_io.migrate_to_compact(overwrite=args.overwrite)
+        print(f"Converted {converted} day(s) to compact records")
+        print("Set TRACKER_STORAGE=compact to read and write compact records.")
+    elif args.command == "migrate":
+        imported = data_io.migrate_to_columnar(overwrite=args.overwrite)
+        print(f"Imported {imported} day(s) into {data_io.history_dir()}")
+        if args.compact:
+            with data_io.write_lock():
+                rows = columnar.compact(data_io.history_dir())
+            print(f"Compacted history store to {rows} row(s)")
+        print("Set TRACKER_STORAGE=columnar to read and write through the columnar store.")
+    else:
+        from menu import main as menu_main
+        menu_main()
+
+def run_profiles(args) -> int:
+    """Run the profiles subcommand."""
+    import profiles
+
+    if args.action == "list":
+        for name in profiles.list_profiles():
+            print(f"{name}{' (active)' if name == data_io.PROFILE else ''}")
+        return 0
+    if args.action == "create":
+        if not args.name:
+            print("Error: profiles create needs a profile name", file=sys.stderr)
+            return 1
+        try:
+            directory = profiles.create_profile(args.name, copy_catalogs=args.copy_catalogs)
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        print(f"Created profile '{args.name}' in {directory or '.'}")
+        return 0
+
+    end = args.end or datetime.now().strftime("%Y-%m-%d")
+    if not args.start:
+        print("Error: profiles summary needs --from", file=sys.stderr)
+        return 1
+    try:
+        result = profiles.summarize_profiles(args.start, end, profiles=args.only, workers=args.workers)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return 0
+    rows = list(result["profiles"].items()) + [("total", result["total"])]
+    for name, summary in rows:
+        pain = summary["pain"]
+        mean = f"{pain['mean']:.1f}" if pain["mean"] is not None else "N/A"
+        print(f"{name}: {summary['days']} day(s), pain {pain['min']}-{pain['max']} (mean {mean}), "
+              f"meditation {summary['meditation_days']} day(s)")
+    return 0
+
+def _rate(rate) -> str:
+    return f"{rate:.0%}" if rate is not None else "N/A"
+
+def run_meds(args) -> int:
+    """Run the meds subcommand."""
+    import adherence
+    import medication_log
+
+    try:
+        if args.action in ("take", "pain", "remove") and args.value is None:
+            raise ValueError(f"meds {args.action} needs a "
+                             + {"take": "medication", "pain": "pain level", "remove": "event ID"}[args.action])
+        if args.action == "take":
+            event_id = medication_log.record_dose(args.value, args.at, args.doses)
+            print(f"Logged {args.doses} dose(s) of {args.value} (event {event_id})")
+        elif args.action == "pain":
+            event_id = medication_log.record_pain(args.value, args.at)
+            print(f"Logged pain {args.value} (event {event_id})")
+        elif args.action == "remove":
+            if not args.value.isdigit() or not medication_log.remove_event(int(args.value)):
+                raise ValueError(f"No event with ID {args.value}")
+            print(f"Removed event {args.value}")
+        elif args.action == "list":
+            results = medication_log.events(args.start, args.end, medication=args.medication)
+            if args.json:
+                print(json.dumps(results, indent=2))
+                return 0
+            for event in results:
+                what = (f"{event['doses']} x {event['medication']}" if event["kind"] == "dose"
+                        else f"pain {event['level']}")
+                print(f"{event['id']:>6}  {event['time'].replace('T', ' ')}  {what}")
+        elif args.action == "latency":
+            results = adherence.dose_pain_latency(args.start, args.end, args.medication)
+            if args.json:
+                print(json.dumps(results, indent=2))
+                return 0
+            if not results:
+                print("No doses logged in that range.")
+            for name, stats in results.items():
+                median = f"{stats['median_minutes']:.0f} min" if stats["median_minutes"] is not None else "N/A"
+                print(f"{name}: {stats['doses']} dose(s), {stats['with_baseline']} with a pain reading before, "
+                      f"{stats['relieved']} followed by relief (median {median})")
+        else:
+            end = args.end or datetime.now().strftime("%Y-%m-%d")
+            if args.by == "rolling":
+                if not args.start:
+                    raise ValueError("Rolling adherence needs --from")
+                results = adherence.rolling_adherence(args.start, end, args.window)
+                if args.json:
+                    print(json.dumps(results, indent=2))
+                    return 0
+                for date_str, rate in results:
+                    print(f"{date_str}: {_rate(rate)} over {args.window} day(s)")
+                return 0
+            if args.by == "total":
+                results = [(f"{args.start or 'start'} to {end}", adherence.range_adherence(args.start, end))]
+            elif args.by == "day":
+                results = adherence.daily_adherence(args.start, end)
+            else:
+                results = adherence.weekly_adherence(args.start, end)
+            if args.json:
+                print(json.dumps(dict(results), indent=2))
+                return 0
+            for key, summary in results:
+                per_med = ", ".join(f"{name} {_rate(med['rate'])}" for name, med in summary["medications"].items())
+                prn = ", ".join(f"{name} x{doses}" for name, doses in summary["prn"].items())
+                print(f"{key}: {_rate(summary['rate'])} of {summary['prescribed']} scheduled dose(s) over "
+                      f"{summary['days']} day(s)" + (f" ({per_med})" if per_med else "")
+                      + (f"; as needed: {prn}" if prn else ""))
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+def run_log(args) -> int:
+    """Run the log subcommand."""
+    import batch_entry
+
+    try:
+        if args.input:
+            if args.input == "-":
+                entries = list(batch_entry.read_jsonl_entries(sys.stdin))
+            else:
+                with open(args.input, "r", encoding="utf-8") as f:
+                    entries = list(batch_entry.read_jsonl_entries(f, args.input))
+        else:
+            record = batch_entry.build_record(
+                args.pain, args.mood, args.meditation, batch_entry.parse_assignments(args.time),
+                batch_entry.parse_assignments(args.exercise), batch_entry.parse_assignments(args.med))
+            if not record and args.diary is None:
+                print("Nothing to log; pass values such as --pain 3 --time Guitar=20, or --input FILE")
+                return 1
+            entries = [(args.date or datetime.now().strftime("%Y-%m-%d"), record, args.diary)]
+
+        if args.dry_run:
+            valid, problems = batch_entry.validate_entries(entries)
+            if problems:
+                raise ValueError("\n".join(problems))
+            print(f"{len(valid)} entr{'y' if len(valid) == 1 else 'ies'} valid; nothing saved")
+            return 0
+        saved = batch_entry.log_entries(entries, replace=args.replace)
+    except (OSError, ValueError) as e:
+        print(f"Not saved:\n{e}")
+        return 1
+    except data_io.ConflictError as e:
+        print(f"Not saved: {e}")
+        return 1
+    for date_str, version in saved:
+        print(f"Logged {date_str} (version {version})")
+    return 0
+
+def run_transfer(args) -> int:
+    """Run the export, import or convert subcommand."""
+    import transfer
+
+    # Progress goes to stderr so data can be piped through stdout
+    try:
+        if args.command == "export":
+            fmt = args.format or transfer.detect_format(args.output)
+            count = transfer.export_records(fmt, args.output, args.start, args.end)
+            print(f"Exported {count} day(s) as {fmt}", file=sys.stderr)
+            return 0
+
+        if args.command == "convert":
+            source_fmt = args.from_format or transfer.detect_format(args.input)
+            target_fmt = args.to_format or transfer.detect_format(args.output)
+            records = transfer.read_records(source_fmt, args.input)
+            report = {}
+            if args.validate:
+                records = transfer.validated(records, args.validate, report)
+            count = transfer.write_records(target_fmt, records, args.output)
+            print(f"Converted {count} day(s) from {source_fmt} to {target_fmt}", file=sys.stderr)
+            if report.get("problems"):
+                transfer.print_report(report)
+            return 0
+
+        fmt = args.format or transfer.detect_format(args.input)
+        report = {}
+        records = transfer.validated(transfer.read_records(fmt, args.input), args.on_invalid, report)
+        if args.dry_run:
+            count = sum(1 for _ in records)
+            print(f"{count} day(s) would be imported", file=sys.stderr)
+        else:
+            count = transfer.import_records(records, merge=args.merge)
+            print(f"Imported {count} day(s) from {fmt}", file=sys.stderr)
+        if report["invalid"]:
+            action = "skipped" if args.on_invalid == "skip" else "imported anyway"
+            print(f"{report['invalid']} day(s) didn't match the catalogs and were {action}:", file=sys.stderr)
+            transfer.print_report(report)
+        return 0
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
 
 if __name__ == "__main__":
-    from menu import main
-    main()
+    sys.exit(main())
@@ -0,0 +1,406 @@
+"""Streaming import and export of the daily tracking data.
+
+Records flow through the pipeline as (date_str, data) pairs produced and
+consumed by generators, so memory use doesn't grow with the history. The
+supported formats are:
+
+    json      a directory of YYYY-MM-DD.json files, the tracker's own layout
+    jsonl     one {"date": ..., **data} object per line
+    csv       long format, one row per value: date,section,name,field,value
+    columnar  a single binary file of row groups (see write_columnar)
+"""
+import csv
+import json
+import os
+import struct
+import sys
+import zlib
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import data_io
+from columnar import DATE_FILE_PATTERN, flatten_record, unflatten_record
+
+FORMATS = ("json", "jsonl", "csv", "columnar")
+FORMAT_EXTENSIONS = {".jsonl": "jsonl", ".ndjson": "jsonl", ".csv": "csv", ".ctc": "columnar"}
+CSV_COLUMNS = ["date", "section", "name", "field", "value"]
+INVALID_ACTIONS = ("skip", "keep", "fail")
+
+# Rows buffered per row group of a columnar file
+ROW_GROUP_SIZE = 1024
+
+COLUMNAR_MAGIC = b"CTRKCOL1"
+_FOOTER_TAIL = struct.Struct("<I8s")
+
+Record = Tuple[str, Dict[str, Any]]
+
+
+def detect_format(path: str) -> str:
+    """Guess the format of a path from its extension; directories are json."""
+    if os.path.isdir(path):
+        return "json"
+    extension = os.path.splitext(path)[1].lower()
+    if extension in FORMAT_EXTENSIONS:
+        return FORMAT_EXTENSIONS[extension]
+    raise ValueError(f"Can't tell the format of '{path}', pass one of: {', '.join(FORMATS)}")
+
+
+@contextmanager
+def _open_text(path: str, mode: str, newline: Optional[str] = None):
+    """Open a text file, with "-" meaning stdin or stdout."""
+    if path == "-":
+        yield sys.stdin if "r" in mode else sys.stdout
+        return
+    if "w" in mode:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+    with open(path, mode, encoding="utf-8", newline=newline) as f:
+        yield f
+
+
+def _check_date(date_str: Any) -> str:
+    if not isinstance(date_str, str):
+        raise ValueError(f"Invalid date {date_str!r}, expected YYYY-MM-DD")
+    try:
+        datetime.strptime(date_str, "%Y-%m-%d")
+    except ValueError:
+        raise ValueError(f"Invalid date {date_str!r}, expected YYYY-MM-DD")
+    return date_str
+
+
+# --- Readers -----------------------------------------------------------------
+
+def read_store(start: Optional[str] = None, end: Optional[str] = None) -> Iterator[Record]:
+    """Stream stored records in date order (see ``data_io.iter_records``)."""
+    for date_str, data in data_io.iter_records(start, end):
+        data = dict(data)
+        data.pop(data_io.VERSION_FIELD, None)
+        yield date_str, data
+
+
+def read_json_dir(path: str) -> Iterator[Record]:
+    """Stream the YYYY-MM-DD.json files of a directory in date order."""
+    for filename in sorted(os.listdir(path)):
+        if DATE_FILE_PATTERN.match(filename):
+            with open(os.path.join(path, filename), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            data.pop(data_io.VERSION_FIELD, None)
+            yield filename[:-5], data
+
+
+def read_jsonl(path: str) -> Iterator[Record]:
+    """Stream records from a JSON Lines file ("-" for stdin)."""
+    with _open_text(path, "r") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{line_number}: {e}")
+            if not isinstance(data, dict) or "date" not in data:
+                raise ValueError(f"{path}:{line_number}: expected an object with a \"date\" field")
+            date_str = _check_date(data.pop("date"))
+            data.pop(data_io.VERSION_FIELD, None)
+            yield date_str, data
+
+
+def _decode_csv_value(text: str) -> Any:
+    if text == "":
+        return ""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return text
+
+
+def read_csv(path: str) -> Iterator[Record]:
+    """Stream records from a long-format CSV file ("-" for stdin).
+
+    Rows of the same date must be consecutive, as written by ``write_csv``;
+    a date that shows up again later is read as a second record for that day.
+    """
+    with _open_text(path, "r", newline="") as f:
+        reader = csv.DictReader(f)
+        missing = [column for column in CSV_COLUMNS if column not in (reader.fieldnames or [])]
+        if missing:
+            raise ValueError(f"{path}: missing CSV column(s): {', '.join(missing)}")
+        current_date: Optional[str] = None
+        data: Dict[str, Any] = {}
+        for row in reader:
+            date_str = _check_date(row["date"])
+            if date_str != current_date:
+                if current_date is not None:
+                    yield current_date, data
+                current_date, data = date_str, {}
+            section, name, field = row["section"], row["name"], row["field"]
+            value = _decode_csv_value(row["value"])
+            if section == data_io.VERSION_FIELD:
+                continue
+            if not name:
+                data[section] = value
+            elif not field:
+                data.setdefault(section, {})[name] = value
+            else:
+                data.setdefault(section, {}).setdefault(name, {})[field] = value
+        if current_date is not None:
+            yield current_date, data
+
+
+def _read_columnar_footer(f) -> Dict[str, Any]:
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    if size < len(COLUMNAR_MAGIC) + _FOOTER_TAIL.size:
+        raise ValueError("Not a columnar export file")
+    f.seek(size - _FOOTER_TAIL.size)
+    footer_length, magic = _FOOTER_TAIL.unpack(f.read(_FOOTER_TAIL.size))
+    f.seek(0)
+    if magic != COLUMNAR_MAGIC or f.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+        raise ValueError("Not a columnar export file")
+    f.seek(size - _FOOTER_TAIL.size - footer_length)
+    return json.loads(f.read(footer_length))
+
+
+def _read_chunk(f, location: List[int]) -> bytes:
+    f.seek(location[0])
+    return zlib.decompress(f.read(location[1]))
+
+
+def read_columnar(path: str, fields: Optional[Iterable[str]] = None) -> Iterator[Record]:
+    """Stream records from a columnar export file, one row group at a time.
+
+    Args:
+        path: File written by ``write_columnar``
+        fields: Top-level fields to read; the other columns are never decoded
+    """
+    wanted = set(fields) if fields is not None else None
+    with open(path, "rb") as f:
+        footer = _read_columnar_footer(f)
+        columns = [tuple(column) for column in footer["columns"]]
+        for group in footer["row_groups"]:
+            ordinals = struct.unpack(f"<{group['rows']}i", _read_chunk(f, group["dates"]))
+            rows: List[Dict[Tuple[str, ...], Any]] = [{} for _ in ordinals]
+            for column_index, location in group["columns"].items():
+                column = columns[int(column_index)]
+                if wanted is not None and column[0] not in wanted:
+                    continue
+                chunk = json.loads(_read_chunk(f, location))
+                for row, value in zip(chunk["rows"], chunk["values"]):
+                    rows[row][column] = value
+            for ordinal, flat in zip(ordinals, rows):
+                yield date.fromordinal(ordinal).strftime("%Y-%m-%d"), unflatten_record(flat)
+
+
+def read_records(fmt: str, path: str) -> Iterator[Record]:
+    """Stream records from a file or directory in the given format."""
+    readers = {"json": read_json_dir, "jsonl": read_jsonl, "csv": read_csv, "columnar": read_columnar}
+    if fmt not in readers:
+        raise ValueError(f"Unknown format '{fmt}', expected one of: {', '.join(FORMATS)}")
+    return readers[fmt](path)
+
+
+# --- Writers -----------------------------------------------------------------
+
+def write_json_dir(records: Iterable[Record], path: str) -> int:
+    """Write each record to <path>/YYYY-MM-DD.json; returns the number written."""
+    os.makedirs(path, exist_ok=True)
+    count = 0
+    with data_io.batch_writes():
+        for date_str, data in records:
+            data_io.atomic_write(os.path.join(path, f"{date_str}.json"), json.dumps(data, indent=2))
+            count += 1
+    return count
+
+
+def write_jsonl(records: Iterable[Record], path: str) -> int:
+    """Write records as JSON Lines ("-" for stdout); returns the number written."""
+    count = 0
+    with _open_text(path, "w") as f:
+        for date_str, data in records:
+            f.write(json.dumps(dict({"date": date_str}, **data)) + "\n")
+            count += 1
+    return count
+
+
+def _encode_csv_value(value: Any) -> str:
+    if isinstance(value, str):
+        # Strings that would read back as another type are written quoted
+        try:
+            json.loads(value)
+        except json.JSONDecodeError:
+            return value
+    return json.dumps(value)
+
+
+def csv_rows(date_str: str, data: Dict[str, Any]) -> Iterator[List[str]]:
+    """Long-format CSV rows for one record."""
+    for section, value in data.items():
+        if not isinstance(value, dict) or not value:
+            yield [date_str, section, "", "", _encode_csv_value(value)]
+            continue
+        for name, item in value.items():
+            if isinstance(item, dict):
+                for field, field_value in item.items():
+                    yield [date_str, section, name, field, _encode_csv_value(field_value)]
+            else:
+                yield [date_str, section, name, "", _encode_csv_value(item)]
+
+
+def write_csv(records: Iterable[Record], path: str) -> int:
+    """Write records in long CSV format ("-" for stdout); returns the number written."""
+    count = 0
+    with _open_text(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_COLUMNS)
+        for date_str, data in records:
+            writer.writerows(csv_rows(date_str, data))
+            count += 1
+    return count
+
+
+def write_columnar(records: Iterable[Record], path: str, row_group_size: int = ROW_GROUP_SIZE) -> int:
+    """Write records to a single columnar binary file.
+
+    The file is COLUMNAR_MAGIC, then one block per row group, then a JSON
+    footer, its length (uint32) and COLUMNAR_MAGIC again. Each row group
+    holds a zlib-compressed int32 array of day ordinals and, per column (a
+    flattened field path such as exercises/Grip/repeats), a compressed
+    {"rows": [...], "values": [...]} chunk listing only the rows that have a
+    value. The footer lists the columns and where each group's chunks are,
+    so readers can skip columns they don't need. At most one row group is
+    held in memory.
+
+    Returns:
+        Number of records written
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    columns: Dict[Tuple[str, ...], int] = {}
+    row_groups: List[Dict[str, Any]] = []
+    count = 0
+    tmp_path = data_io.temp_path(path)
+    with open(tmp_path, "wb") as f:
+        f.write(COLUMNAR_MAGIC)
+
+        def write_chunk(payload: bytes) -> List[int]:
+            offset = f.tell()
+            f.write(zlib.compress(payload))
+            return [offset, f.tell() - offset]
+
+        def flush(group: List[Tuple[int, Dict[Tuple[str, ...], Any]]]) -> None:
+            chunks: Dict[int, Dict[str, list]] = {}
+            for row, (_, flat) in enumerate(group):
+                for column, value in flat.items():
+                    index = columns.setdefault(column, len(columns))
+                    chunk = chunks.setdefault(index, {"rows": [], "values": []})
+                    chunk["rows"].append(row)
+                    chunk["values"].append(value)
+            ordinals = [ordinal for ordinal, _ in group]
+            row_groups.append({
+                "rows": len(group),
+                "dates": write_chunk(struct.pack(f"<{len(ordinals)}i", *ordinals)),
+                "columns": {str(index): write_chunk(json.dumps(chunk, separators=(",", ":")).encode("utf-8"))
+                            for index, chunk in chunks.items()},
+            })
+
+        group: List[Tuple[int, Dict[Tuple[str, ...], Any]]] = []
+        for date_str, data in records:
+            ordinal = datetime.strptime(date_str, "%Y-%m-%d").date().toordinal()
+            group.append((ordinal, dict(flatten_record(data))))
+            count += 1
+            if len(group) >= row_group_size:
+                flush(group)
+                group = []
+        if group:
+            flush(group)
+
+        footer = json.dumps({"columns": [list(column) for column in sorted(columns, key=columns.get)],
+                             "row_groups": row_groups}).encode("utf-8")
+        f.write(footer)
+        f.write(_FOOTER_TAIL.pack(len(footer), COLUMNAR_MAGIC))
+        data_io.sync_file(f, path)
+    os.replace(tmp_path, path)
+    return count
+
+
+def write_records(fmt: str, records: Iterable[Record], path: str) -> int:
+    """Write records to a file or directory in the given format."""
+    writers = {"json": write_json_dir, "jsonl": write_jsonl, "csv": write_csv, "columnar": write_columnar}
+    if fmt not in writers:
+        raise ValueError(f"Unknown format '{fmt}', expected one of: {', '.join(FORMATS)}")
+    return writers[fmt](records, path)
+
+
+# --- Pipelines ---------------------------------------------------------------
+
+def validated(records: Iterable[Record], on_invalid: str = "skip",
+              report: Optional[Dict[str, Any]] = None) -> Iterator[Record]:
+    """Check each record against the catalogs as it streams past.
+
+    Args:
+        records: Records to check
+        on_invalid: "skip" drops records with problems, "keep" passes them on
+            unchanged and "fail" raises ValueError at the first one
+        report: Filled in with "valid", "invalid" and "problems" counts/messages
+    """
+    from validation import validate_record
+    from catalogs import get_exercises, get_medications, get_time_activities
+
+    if on_invalid not in INVALID_ACTIONS:
+        raise ValueError(f"Unknown action '{on_invalid}', expected one of: {', '.join(INVALID_ACTIONS)}")
+    report = report if report is not None else {}
+    report.update(valid=0, invalid=0, problems=[])
+    exercises, time_activities = get_exercises(), get_time_activities()
+    medications = get_medications() or []
+    for date_str, data in records:
+        record, problems = validate_record(data, exercises, time_activities, medications)
+        if not problems:
+            report["valid"] += 1
+            yield date_str, record
+            continue
+        report["invalid"] += 1
+        report["problems"].extend(f"{date_str}: {problem}" for problem in problems)
+        if on_invalid == "fail":
+            raise ValueError(f"{date_str}: {'; '.join(problems)}")
+        if on_invalid == "keep":
+            yield date_str, data
+
+
+def import_records(records: Iterable[Record], merge: bool = False) -> int:
+    """Save records into the tracker's store in one bulk write.
+
+    Args:
+        records: Records to save, e.g. from ``validated(read_records(...))``
+        merge: Merge each record into the stored day instead of replacing it
+
+    Returns:
+        Number of days saved
+    """
+    count = 0
+    with data_io.bulk_writes():
+        for date_str, data in records:
+            if merge:
+                existing = data_io.load_daily_data(date_str) or {}
+                existing.pop(data_io.VERSION_FIELD, None)
+                data = data_io.merge_record(existing, data)
+            data_io.save_daily_data(date_str, data)
+            count += 1
+    return count
+
+
+def export_records(fmt: str, path: str, start: Optional[str] = None, end: Optional[str] = None) -> int:
+    """Write the stored records in [start, end] to a file; returns the number written."""
+    return write_records(fmt, read_store(start, end), path)
+
+
+def print_report(report: Dict[str, Any], limit: int = 20, stream=None) -> None:
+    """Print the validation problems collected by ``validated``."""
+    stream = stream or sys.stderr
+    problems = report.get("problems", [])
+    for problem in problems[:limit]:
+        print(f"  {problem}", file=stream)
+    if len(problems) > limit:
+        print(f"  ... and {len(problems) - limit} more", file=stream)
@@ -0,0 +1,175 @@
+"""Checks and normalization for tracked values.
+
+Each ``parse_*`` function accepts what a user or an import file would
+supply (strings, numbers, booleans) and returns the value in the form it is
+stored in, or raises ValueError with a message fit to show the user.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+from catalogs import get_exercises, get_medications, get_time_activities
+from data_io import VERSION_FIELD
+
+PAIN_MIN = 0
+PAIN_MAX = 10
+TIME_ACTIVITY_TYPES = ("minutes", "hours", "yes/no", "scale", "kilometers")
+YES_VALUES = ("y", "yes", "true", "1")
+NO_VALUES = ("n", "no", "false", "0")
+
+
+def _is_whole(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def parse_int(value: Any, minimum: Optional[int] = None, maximum: Optional[int] = None) -> int:
+    """Whole number within [minimum, maximum]."""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    elif isinstance(value, str) and value.strip().lstrip("-").isdigit():
+        value = int(value.strip())
+    if not _is_whole(value):
+        raise ValueError("Please enter a whole number.")
+    if (minimum is not None and value < minimum) or (maximum is not None and value > maximum):
+        if minimum is not None and maximum is not None:
+            raise ValueError(f"Please enter a number between {minimum} and {maximum}.")
+        raise ValueError(f"Please enter a number of at least {minimum}." if minimum is not None
+                         else f"Please enter a number of at most {maximum}.")
+    return value
+
+
+def parse_number(value: Any) -> float:
+    """Numeric value, e.g. minutes or kilometers."""
+    if isinstance(value, bool):
+        raise ValueError("Please enter a numeric value.")
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError("Please enter a numeric value.")
+    if number != number or number in (float("inf"), float("-inf")):
+        raise ValueError("Please enter a numeric value.")
+    return number
+
+
+def parse_yes_no(value: Any) -> bool:
+    """y/yes/true/1 or n/no/false/0."""
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in YES_VALUES:
+        return True
+    if text in NO_VALUES:
+        return False
+    raise ValueError("Please enter yes or no.")
+
+
+def parse_pain(value: Any) -> int:
+    """Pain level on the 0-10 scale."""
+    return parse_int(value, PAIN_MIN, PAIN_MAX)
+
+
+def parse_time_value(details: Dict[str, Any], value: Any) -> Any:
+    """Value of a time-based activity according to its catalog type.
+
+    Args:
+        details: The activity's catalog entry, e.g. {"type": "minutes"}
+        value: Value to check
+
+    Returns:
+        1/0 for yes/no activities, an int for scales and a float otherwise
+    """
+    typ = details.get("type", "minutes")
+    if typ == "yes/no":
+        return 1 if parse_yes_no(value) else 0
+    if typ == "scale":
+        scale_range = details.get("scale_range", {})
+        return parse_int(value, scale_range.get("min", 0), scale_range.get("max", 10))
+    return parse_number(value)
+
+
+def parse_exercise(value: Any) -> Dict[str, int]:
+    """Repeats and sets, from a {"repeats", "sets"} mapping or a "10 1" string."""
+    if isinstance(value, str):
+        parts = value.split()
+        if len(parts) != 2:
+            raise ValueError("Please enter repeats and sets separated by a space, e.g. '10 1'.")
+        value = {"repeats": parts[0], "sets": parts[1]}
+    if not isinstance(value, dict) or "repeats" not in value or "sets" not in value:
+        raise ValueError("Please enter repeats and sets separated by a space, e.g. '10 1'.")
+    return {"repeats": parse_int(value["repeats"], 0), "sets": parse_int(value["sets"], 0)}
+
+
+def parse_doses(medication: Dict[str, Any], value: Any) -> int:
+    """Doses taken of a medication, at most its doses_per_day."""
+    return parse_int(value, 0, medication["doses_per_day"])
+
+
+def validate_record(data: Dict[str, Any], exercises: Optional[Dict[str, Any]] = None,
+                    time_activities: Optional[Dict[str, Any]] = None,
+                    medications: Optional[List[Dict[str, Any]]] = None) -> Tuple[Dict[str, Any], List[str]]:
+    """Check a day's record against the catalogs.
+
+    Exercises, activities and medications must be in their catalogs and their
+    values must fit the catalog entry. Fields the tracker doesn't know about
+    are kept as they are.
+
+    Args:
+        data: Daily tracking data
+        exercises: Exercise catalog, defaults to the saved one
+        time_activities: Time-based activity catalog, defaults to the saved one
+        medications: Medication catalog, defaults to the saved one
+
+    Returns:
+        (normalized record, list of problems); the record is only complete
+        when the list is empty
+    """
+    exercises = get_exercises() if exercises is None else exercises
+    time_activities = get_time_activities() if time_activities is None else time_activities
+    medications = (get_medications() or []) if medications is None else medications
+    medications_by_name = {med["name"]: med for med in medications}
+
+    record: Dict[str, Any] = {}
+    problems: List[str] = []
+
+    def check(label: str, parse, value: Any) -> Any:
+        try:
+            return parse(value)
+        except ValueError as e:
+            problems.append(f"{label}: {e}")
+            return None
+
+    for key, value in data.items():
+        if key == VERSION_FIELD:
+            continue  # Assigned by the store on save
+        if key == "pain":
+            record[key] = check("pain", parse_pain, value) if value is not None else None
+        elif key == "meditation":
+            record[key] = check("meditation", parse_yes_no, value)
+        elif key == "mood":
+            record[key] = value if value is None or isinstance(value, (str, int, float)) else str(value)
+        elif key in ("exercises", "time_based", "medications") and not isinstance(value, dict):
+            problems.append(f"{key}: expected a mapping of names to values")
+        elif key == "exercises":
+            record[key] = {}
+            for name, ex_value in value.items():
+                if name not in exercises:
+                    problems.append(f"unknown exercise '{name}'")
+                    continue
+                record[key][name] = check(f"exercise '{name}'", parse_exercise, ex_value)
+        elif key == "time_based":
+            record[key] = {}
+            for name, act_value in value.items():
+                if name not in time_activities:
+                    problems.append(f"unknown time-based activity '{name}'")
+                    continue
+                record[key][name] = check(f"activity '{name}'",
+                                          lambda v: parse_time_value(time_activities[name], v), act_value)
+        elif key == "medications":
+            record[key] = {}
+            for name, doses in value.items():
+                if name not in medications_by_name:
+                    problems.append(f"unknown medication '{name}'")
+                    continue
+                record[key][name] = check(f"medication '{name}'",
+                                          lambda v: parse_doses(medications_by_name[name], v), doses)
+        else:
+            record[key] = value
+    return record, problems
@@ -1,12 +1,21 @@
 import os
 import json
-from tabulate import tabulate
 from datetime import datetime, timedelta
-from data_io import load_daily_data, load_medications, load_json
-from playwright.sync_api import sync_playwright
-
-DATA_DIR = "data"
-TIME_ACTIVITIES_FILE = "time_activities.json"
+import data_io
+from data_io import query_range, list_dates, iter_records
+from diary import get_diary_entry
+from catalogs import TIME_ACTIVITIES_FILE, catalog_path, load_catalog
+import aggregates
+from models import DailyEntry
+from instrumentation import count, span, traced
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+REPORT_TEMPLATE = "report.html.j2"
+SUMMARY_TEMPLATE = "summary_tables.html.j2"
+# Number of template output chunks collected before each write
+STREAM_BUFFER_CHUNKS = 64
+
+_jinja_env = None
 
 PAIN_SCALE = {
     0: "No pain",
@@ -23,53 +32,48 @@ PAIN_SCALE = {
 }
 
 def load_time_activities():
+    count("visualize.load_time_activities")
     try:
-        with open(TIME_ACTIVITIES_FILE, "r") as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
+        return load_catalog(catalog_path(TIME_ACTIVITIES_FILE)) or {}
+    except json.JSONDecodeError:
         return {}
 
-def load_all_data():
-    time_activities = load_time_activities()
-    entries = []
-    for filename in sorted(os.listdir(DATA_DIR)):
-        if filename.endswith(".json"):
-            date_str = filename[:-5]
-            filepath = os.path.join(DATA_DIR, filename)
-            with open(filepath, "r") as f:
-                try:
-                    data = json.load(f)
-                    entries.append((date_str, data))
-                except json.JSONDecodeError:
-                    print(f"Warning: Could not decode {filename}")
-    return entries
+def load_all_data(workers=None, processes=False):
+    """Iterate every stored day as (date_str, data), in date order.
+
+    Records come from the memory-mapped store when the whole history is in
+    it; otherwise day files are read and parsed on a pool of workers (see
+    ``data_io.iter_records`` for the arguments) a bounded batch ahead of the
+    caller. Either way memory use doesn't grow with the history.
+    """
+    return iter_records(workers=workers, processes=processes)
 
 def display_entries(entries):
+    from tabulate import tabulate
+
+    time_activities = load_time_activities()
     for date_str, data in entries:
+        entry = data if isinstance(data, DailyEntry) else DailyEntry.from_dict(date_str, data)
         print(f"\n=== {date_str} ===")
         
         print("\nMood & Meditation:")
         mood_data = [
-            ["Mood", data.get("mood", "N/A")],
-            ["Meditation", "Yes" if data.get("meditation") else "No"],
-            ["Pain", f"{data.get('pain', 'N/A')} - {PAIN_SCALE.get(data.get('pain', 0), '')}"]
+            ["Mood", entry.mood if entry.mood is not None else "N/A"],
+            ["Meditation", "Yes" if entry.meditation else "No"],
+            ["Pain", f"{entry.pain if entry.pain is not None else 'N/A'} - {PAIN_SCALE.get(entry.pain, '')}"]
         ]
         print(tabulate(mood_data, tablefmt="grid"))
 
-        if "exercises" in data:
+        if entry.exercises:
             print("\nExercises:")
-            ex_table = [
-                [ex_name, ex_data["repeats"], ex_data["sets"]]
-                for ex_name, ex_data in data["exercises"].items()
-            ]
+            ex_table = [[ex.name, ex.repeats, ex.sets] for ex in entry.exercises]
             print(tabulate(ex_table, headers=["Exercise", "Repeats", "Sets"], tablefmt="grid"))
 
-        if "time_based" in data:
+        if entry.time_based:
             print("\nTime-based Activities:")
-            time_activities = load_time_activities()
             tb_table = [
                 [activity, f"{value} {time_activities.get(activity, {}).get('type', '')}"]
-                for activity, value in data["time_based"].items()
+                for activity, value in entry.time_based.items()
             ]
             print(tabulate(tb_table, headers=["Activity", "Duration"], tablefmt="grid"))
 
@@ -77,252 +81,237 @@ def get_last_seven_days_data():
     """Loads daily data for the last seven days."""
     today = datetime.now()
     seven_days_ago = today - timedelta(days=6)
-    
-    weekly_data = {}
-    current_date = seven_days_ago
-    while current_date <= today:
-        date_str = current_date.strftime("%Y-%m-%d")
-        daily_data = load_daily_data(date_str)
-        if daily_data:
-            weekly_data[date_str] = daily_data
-        current_date += timedelta(days=1)
-    return weekly_data
-
-def get_weekly_summary_html_table():
-    """Generates a consolidated summary of data for the last seven days as an HTML string."""
-    weekly_data = get_last_seven_days_data()
-
-    if not weekly_data:
-        return "<p>No data found for the last 7 days.</p>"
+    return {
+        date_str: daily_data
+        for date_str, daily_data in query_range(seven_days_ago.strftime("%Y-%m-%d"), today.strftime("%Y-%m-%d"))
+        if daily_data
+    }
 
+def _last_seven_dates():
     today = datetime.now()
-    dates = [(today - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(6, -1, -1)]
-
-    mood_pain_meditation_medication_data = {
-        "Mood": ["N/A"] * 7,
-        "Pain": ["N/A"] * 7,
-        "Meditation": ["N/A"] * 7,
-    }
-    
+    return [(today - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(6, -1, -1)]
+
+def _template_env():
+    """Jinja2 environment for the report templates, compiled once per process."""
+    global _jinja_env
+    if _jinja_env is None:
+        from jinja2 import Environment, FileSystemLoader
+        _jinja_env = Environment(loader=FileSystemLoader(TEMPLATES_DIR), autoescape=True,
+                                 trim_blocks=True, lstrip_blocks=True)
+    return _jinja_env
+
+def summary_context(dates, period_data, diary_entries, empty_message="No data found."):
+    """Builds the template context for the summary tables of a run of days.
+
+    Only the row and column names are computed up front; each row's cells are
+    generated while the template is rendered, so the work is linear in the
+    number of cells and no row is held in memory after it is written.
+
+    Args:
+        dates: Dates (YYYY-MM-DD) to show as columns, in order
+        period_data: Mapping of date to that day's tracking data, as a
+            DailyEntry or a stored record
+        diary_entries: Mapping of date to diary entry text
+        empty_message: Shown instead of the tables when none of the dates have data
+    """
+    days = []
+    for date_str in dates:
+        data = period_data.get(date_str)
+        days.append(data if isinstance(data, DailyEntry) else DailyEntry.from_dict(date_str, data))
     all_exercises = set()
     all_time_activities = set()
     all_medications = set()
+    for entry in days:
+        all_exercises.update(ex.name for ex in entry.exercises)
+        all_time_activities.update(entry.time_based)
+        all_medications.update(med.name for med in entry.medications)
+    time_activities_config = load_time_activities()
+
+    def pain_cell(entry):
+        if entry.pain is None:
+            return "N/A"
+        return f"{entry.pain} - {PAIN_SCALE.get(entry.pain, '')}"
+
+    def meditation_cell(entry):
+        if entry.meditation is None:
+            return "N/A"
+        return "Yes" if entry.meditation else "No"
+
+    def time_cell(entry, activity):
+        value = entry.time_based.get(activity)
+        if value is None:
+            return "N/A"
+        unit = time_activities_config.get(activity, {}).get('type', '')
+        return f"{value} {unit}".strip()
+
+    def exercise_cell(entry, ex_name, field):
+        ex = entry.exercise(ex_name)
+        return getattr(ex, field) if ex is not None else 0
+
+    def general_rows():
+        yield "Mood", (d.mood if d.mood is not None else "N/A" for d in days)
+        yield "Pain", (pain_cell(d) for d in days)
+        yield "Meditation", (meditation_cell(d) for d in days)
+        for med_name in sorted(all_medications):
+            yield f"Medication: {med_name} (Doses)", (d.doses(med_name) for d in days)
+
+    def time_rows():
+        for activity in sorted(all_time_activities):
+            yield f"Time: {activity}", (time_cell(d, activity) for d in days)
+
+    def exercise_rows():
+        for ex_name in sorted(all_exercises):
+            for field in ("repeats", "sets"):
+                yield (f"Exercise: {ex_name} ({field.capitalize()})",
+                       (exercise_cell(d, ex_name, field) for d in days))
+
+    sections = [{"title": "Mood, Pain, Meditation & Medication", "label": "Field", "rows": general_rows()}]
+    if all_time_activities:
+        sections.append({"title": "Time-based Activities", "label": "Activity", "rows": time_rows()})
+    if all_exercises:
+        sections.append({"title": "Exercises", "label": "Exercise", "rows": exercise_rows()})
+
+    has_data = any(not entry.is_empty for entry in days)
+    return {
+        "has_data": has_data,
+        "empty_message": empty_message,
+        "dates": dates,
+        # Period figures come from the stored rollups rather than the day columns
+        "totals_rows": totals_rows(aggregates.summarize_range(dates[0], dates[-1])) if has_data else (),
+        # Field names take 20% of the width, the day columns share the rest
+        "column_width": f"{80 / len(dates):.1f}%",
+        "sections": sections,
+        "diary_rows": ((d, diary_entries.get(d) or "No entry") for d in dates),
+    }
 
-    # Load diary entries from the separate file
-    diary_entries_from_file = load_json(os.path.join(DATA_DIR, "diary_entries.json")) or {}
-    diary_entries_data = {}
-
-    for date_str in dates:
-        data = weekly_data.get(date_str, {})
-        if "exercises" in data:
-            all_exercises.update(data["exercises"].keys())
-        if "time_based" in data:
-            all_time_activities.update(data["time_based"].keys())
-        if "medications" in data:
-            all_medications.update(data["medications"].keys())
-        
-        # Populate diary_entries_data from the loaded file
-        diary_entries_data[date_str] = diary_entries_from_file.get(date_str, "No entry")
-
-
-    for med_name in sorted(list(all_medications)):
-        mood_pain_meditation_medication_data[f"Medication: {med_name} (Doses)"] = [0] * 7
-
-    time_activities_table_data = {}
-    for activity in sorted(list(all_time_activities)):
-        time_activities_table_data[f"Time: {activity}"] = ["N/A"] * 7
-
-    exercises_table_data = {}
-    for ex_name in sorted(list(all_exercises)):
-        exercises_table_data[f"Exercise: {ex_name} (Repeats)"] = [0] * 7
-        exercises_table_data[f"Exercise: {ex_name} (Sets)"] = [0] * 7
-
-    for i, date_str in enumerate(dates):
-        data = weekly_data.get(date_str, {})
-
-        mood = data.get("mood")
-        if mood is not None:
-            mood_pain_meditation_medication_data["Mood"][i] = mood
-        
-        pain = data.get("pain")
-        if pain is not None:
-            pain_desc = PAIN_SCALE.get(pain, '') if isinstance(pain, int) else ''
-            mood_pain_meditation_medication_data["Pain"][i] = f"{pain} - {pain_desc}"
-        
-        meditation = data.get("meditation")
-        if meditation is not None:
-            mood_pain_meditation_medication_data["Meditation"][i] = "Yes" if meditation else "No"
-
-        if "medications" in data:
-            for med_name, doses_taken in data["medications"].items():
-                mood_pain_meditation_medication_data[f"Medication: {med_name} (Doses)"][i] = doses_taken
-
-        time_activities_config = load_time_activities()
-        if "time_based" in data:
-            for activity, value in data["time_based"].items():
-                unit = time_activities_config.get(activity, {}).get('type', '')
-                time_activities_table_data[f"Time: {activity}"][i] = f"{value} {unit}".strip()
-
-        if "exercises" in data:
-            for ex_name, ex_data in data["exercises"].items():
-                exercises_table_data[f"Exercise: {ex_name} (Repeats)"][i] = ex_data.get("repeats", 0)
-                exercises_table_data[f"Exercise: {ex_name} (Sets)"][i] = ex_data.get("sets", 0)
-        
-    headers = ["Field"] + dates
-    
-    html_content = ""
-
-    # Mood, Pain, Meditation, Medication Table
-    html_content += "<h2>Mood, Pain, Meditation & Medication</h2>"
-    html_content += "<table border='1' style='width:100%; border-collapse: collapse; margin-bottom: 2em;'>"
-    html_content += "<tbody>"
-    html_content += "<tr>"
-    html_content += "<th style='width: 20%;'>Field</th>" # Adjusted width for field names
-    for header in headers[1:]:
-        html_content += f"<th style='width: 11.4%;'>{header}</th>" # Adjusted for 7 columns (80% / 7)
-    html_content += "</tr>"
-    for field, values in mood_pain_meditation_medication_data.items():
-        html_content += "<tr>"
-        html_content += f"<td>{field}</td>"
-        for value in values:
-            html_content += f"<td>{value}</td>"
-        html_content += "</tr>"
-    html_content += "</tbody></table>"
-
-    # Time-based Activities Table
-    if time_activities_table_data:
-        html_content += "<h2>Time-based Activities</h2>"
-        html_content += "<table border='1' style='width:100%; border-collapse: collapse; margin-bottom: 2em;'>"
-        html_content += "<tbody>"
-        html_content += "<tr>"
-        html_content += "<th style='width: 20%;'>Activity</th>" # Adjusted width for activity names
-        for header in headers[1:]:
-            html_content += f"<th style='width: 11.4%;'>{header}</th>" # Adjusted for 7 columns (80% / 7)
-        html_content += "</tr>"
-        for field, values in time_activities_table_data.items():
-            html_content += "<tr>"
-            html_content += f"<td>{field}</td>"
-            for value in values:
-                html_content += f"<td>{value}</td>"
-            html_content += "</tr>"
-        html_content += "</tbody></table>"
-
-    # Exercises Table
-    if exercises_table_data:
-        html_content += "<h2>Exercises</h2>"
-        html_content += "<table border='1' style='width:100%; border-collapse: collapse; margin-bottom: 2em;'>"
-        html_content += "<tbody>"
-        html_content += "<tr>"
-        html_content += "<th style='width: 20%;'>Exercise</th>" # Adjusted width for exercise names
-        for header in headers[1:]:
-            html_content += f"<th style='width: 11.4%;'>{header}</th>" # Adjusted for 7 columns (80% / 7)
-        html_content += "</tr>"
-        for field, values in exercises_table_data.items():
-            html_content += "<tr>"
-            html_content += f"<td>{field}</td>"
-            for value in values:
-                html_content += f"<td>{value}</td>"
-            html_content += "</tr>"
-        html_content += "</tbody></table>"
-
-    # Diary Entries
-    html_content += "<h2>Diary Entries</h2>"
-    html_content += "<table class='diary-table' border='1' style='width:100%; border-collapse: collapse; margin-bottom: 2em;'>"
-    html_content += "<tbody>"
-    html_content += "<tr>"
-    html_content += "<th style='width: 15%;'>Date</th><th style='width: 85%;'>Entry</th>" # No change needed for diary table
-    html_content += "</tr>"
-    for date_str in dates:
-        entry = diary_entries_data.get(date_str, "No entry")
-        html_content += f"<tr><td>{date_str}</td><td><p>{entry}</p></td></tr>"
-    html_content += "</tbody></table>"
-    
-    return html_content
-
+def _format_number(value):
+    if value is None:
+        return "N/A"
+    return f"{value:g}" if float(value).is_integer() else f"{value:.2f}"
+
+def totals_rows(summary):
+    """Yields (field, value) rows for a period summary from ``aggregates``."""
+    pain = summary["pain"]
+    yield "Days tracked", summary["days"]
+    yield "Pain (min / mean / max)", " / ".join(_format_number(pain[k]) for k in ("min", "mean", "max"))
+    yield "Meditation days", summary["meditation_days"]
+    for unit, total in summary["totals"].items():
+        if total:
+            yield f"Total {unit}", _format_number(total)
+    for activity, stats in summary["activities"].items():
+        unit = f" {stats['unit']}" if stats["unit"] else ""
+        yield (f"Time: {activity}",
+               f"{_format_number(stats['total'])}{unit} total, {_format_number(stats['mean'])}{unit} per day logged")
+    for med_name, dose in summary["adherence"].items():
+        rate = f" ({dose['rate'] * 100:.0f}%)" if dose["rate"] is not None else ""
+        yield f"Adherence: {med_name}", f"{_format_number(dose['taken'])} of {_format_number(dose['expected'])} doses{rate}"
+    for ex_name, volume in summary["exercise_volume"].items():
+        yield f"Volume: {ex_name} (Repeats x Sets)", _format_number(volume)
+
+def build_summary_html(dates, period_data, diary_entries):
+    """Builds the summary tables for any run of dates as an HTML string."""
+    context = summary_context(dates, period_data, diary_entries)
+    return _template_env().get_template(SUMMARY_TEMPLATE).render(context)
+
+@traced("report.weekly_summary")
+def get_weekly_summary_html_table():
+    """Generates a consolidated summary of data for the last seven days as an HTML string."""
+    dates = _last_seven_dates()
+    weekly_data = get_last_seven_days_data()
+    diary_entries = {date_str: get_diary_entry(date_str) for date_str in dates}
+    context = summary_context(dates, weekly_data, diary_entries, "No data found for the last 7 days.")
+    return _template_env().get_template(SUMMARY_TEMPLATE).render(context)
+
+def write_report(output_path, title, heading, dates, period_data, diary_entries,
+                 empty_message="No data found."):
+    """Renders a full report page and streams it straight to a file.
+
+    Args:
+        output_path: HTML file to write
+        title: Page title
+        heading: Heading shown above the tables
+        dates: Dates (YYYY-MM-DD) to show as columns, in order
+        period_data: Mapping of date to that day's tracking data, as a
+            DailyEntry or a stored record
+        diary_entries: Mapping of date to diary entry text
+        empty_message: Shown instead of the tables when none of the dates have data
+    """
+    with span("report.write"):
+        context = summary_context(dates, period_data, diary_entries, empty_message)
+        stream = _template_env().get_template(REPORT_TEMPLATE).stream(context, title=title, heading=heading)
+        stream.enable_buffering(STREAM_BUFFER_CHUNKS)
+        with open(output_path, "w", encoding="utf-8") as f:
+            stream.dump(f)
+
+def render_report(title, heading, dates, period_data, diary_entries, empty_message="No data found."):
+    """Renders a full report page as an HTML string; see write_report for the arguments."""
+    with span("report.render"):
+        context = summary_context(dates, period_data, diary_entries, empty_message)
+        return _template_env().get_template(REPORT_TEMPLATE).render(context, title=title, heading=heading)
+
+@traced("report.weekly")
 def generate_weekly_report():
     """Generates a weekly report and writes it to an HTML file."""
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Weekly Report</title>
-        <style>
-            body {{ font-family: sans-serif; margin: 2cm; font-size: 12px; }}
-            h1 {{ text-align: center; }}
-            .table-container {{ max-width: 21cm; /* A4 width approx */ overflow-x: auto; margin: 0 auto; }}
-            table {{
-                width: 100%;
-                border-collapse: collapse;
-                margin-bottom: 1em;
-                /* page-break-inside: avoid; Keep table on one page if possible */
-                table-layout: fixed; /* Crucial for predictable column widths */
-            }}
-            th, td {{
-                border: 1px solid #ccc;
-                padding: 8px;
-                text-align: left;
-                page-break-inside: auto; /* Allow content within cells to break across pages */
-                page-break-after: auto; /* Allow page break after cell if needed */
-                overflow-wrap: break-word; /* Modern word wrapping */
-                word-wrap: break-word; /* Fallback for older browsers/wkhtmltopdf */
-                white-space: normal; /* Ensure text wraps normally */
-                min-width: 50px; /* Prevent columns from becoming too narrow */
-                max-width: 150px; /* Set a maximum width for field values */
-            }}
-            tr {{
-                /* page-break-inside: avoid; Keep rows on one page if possible */
-                page-break-after: auto; /* Allow a page break after a row if needed */
-            }}
-            thead {{
-                display: table-header-group; /* Repeat table headers on each page */
-            }}
-            th {{ background-color: #f2f2f2; }}
-            .diary-table td p {{
-                page-break-inside: auto; /* Allow paragraphs within diary cells to break */
-                word-wrap: break-word;
-                white-space: pre-wrap;
-            }}
-        </style>
-    </head>
-    <body>
-        <h1>Weekly Summary (Last 7 Days)</h1>
-        <div class="table-container">
-            {get_weekly_summary_html_table()}
-        </div>
-    </body>
-    </html>
-    """
-    
     html_report_filename = "weekly_report.html"
     pdf_report_filename = "weekly_report.pdf"
 
-    with open(html_report_filename, "w") as f:
-        f.write(html_content)
+    dates = _last_seven_dates()
+    with span("report.html"):
+        diary_entries = {date_str: get_diary_entry(date_str) for date_str in dates}
+        write_report(html_report_filename, "Weekly Report", "Weekly Summary (Last 7 Days)",
+                     dates, get_last_seven_days_data(), diary_entries, "No data found for the last 7 days.")
     print(f"Weekly HTML report generated and saved to {html_report_filename}")
 
-    # Convert HTML to PDF using Playwright
+    # Convert HTML to PDF with the shared Playwright browser pool, which keeps
+    # Chromium warm between reports
     try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch()
-            page = browser.new_page()
-            page.set_content(html_content)
-            page.pdf(path=pdf_report_filename)
-            browser.close()
+        from pdf_renderer import get_renderer
+        with open(html_report_filename, "r", encoding="utf-8") as f:
+            html_content = f.read()
+        with span("report.pdf"):
+            get_renderer().render(html_content, pdf_report_filename)
         print(f"Weekly PDF report generated and saved to {pdf_report_filename}")
     except Exception as e:
         print(f"Error generating PDF with Playwright: {e}")
 
 def main():
-    if not os.path.exists(DATA_DIR):
+    if not os.path.exists(data_io.DATA_DIR):
         print("No data directory found.")
         return
 
-    entries = load_all_data()
-    if not entries:
+    if not list_dates():
         print("No daily data found.")
         return
 
     generate_weekly_report()
 
+def batch_main(argv=None):
+    """Command-line entry point for generating reports over many periods."""
+    import argparse
+    from reports import DEFAULT_OUTPUT_TEMPLATE, DEFAULT_WORKERS, PERIODS, generate_batch_reports
+
+    parser = argparse.ArgumentParser(prog="visualize.py batch",
+                                     description="Generate a report for every week, month or custom period in a date range")
+    parser.add_argument("--period", choices=PERIODS, default="weekly")
+    parser.add_argument("--days", type=int, help="Length of each custom period in days")
+    parser.add_argument("--from", dest="start", help="First date to cover (YYYY-MM-DD), defaults to the earliest entry")
+    parser.add_argument("--to", dest="end", help="Last date to cover (YYYY-MM-DD), defaults to the latest entry")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT_TEMPLATE,
+                        help="HTML output path template using {period}, {label}, {start} and {end}")
+    parser.add_argument("--pdf", action="store_true", help="Also render each report to PDF")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    args = parser.parse_args(argv)
+
+    written = generate_batch_reports(args.period, start=args.start, end=args.end, days=args.days,
+                                     output_template=args.output, pdf=args.pdf, workers=args.workers)
+    if not written:
+        print("No daily data found for the requested range.")
+    for path in written:
+        print(f"Report saved to {path}")
+
 if __name__ == "__main__":
-    main()
+    import sys
+    if sys.argv[1:2] == ["batch"]:
+        batch_main(sys.argv[2:])
+    else:
+        main()